@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from .services.account_registry import connect_signals
+        connect_signals()
+
+        from django.conf import settings
+        if getattr(settings, 'METRICS_ENABLED', True):
+            from .metrics import install_outbound_hook
+            install_outbound_hook()
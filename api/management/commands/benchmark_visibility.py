@@ -0,0 +1,191 @@
+"""
+Management command to benchmark assigned-client visibility filters.
+
+Compares the legacy ``OR`` + ``.distinct()`` filter against the EXISTS-based
+filters in ``api/visibility.py`` for the clients, payments, instalments and
+check-in submissions list queries (first page + count), as an employee without
+``can_view_all_*`` flags would run them.
+
+Usage:
+    python manage.py benchmark_visibility --account-id 1
+    python manage.py benchmark_visibility --account-id 1 --employee-id 42 --iterations 50
+    python manage.py benchmark_visibility --account-id 1 --explain
+    python manage.py benchmark_visibility --account-id 1 --json results.json
+"""
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+
+from api.models import Client, Payment, Installment, CheckInSubmission, Employee
+from api.visibility import filter_clients_for_user, filter_rows_for_assigned_clients
+
+
+PAGE_SIZE = 50
+
+
+class Command(BaseCommand):
+    help = 'Benchmark legacy DISTINCT visibility filters against EXISTS-based filters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--account-id',
+            type=int,
+            required=True,
+            help='Account to benchmark against'
+        )
+        parser.add_argument(
+            '--employee-id',
+            type=int,
+            help='Employee to filter for (defaults to the employee with the most assigned clients)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='Timed iterations per query (default: 20)'
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Print EXPLAIN ANALYZE output for each query'
+        )
+        parser.add_argument(
+            '--json',
+            type=str,
+            metavar='PATH',
+            help='Write results as JSON to PATH'
+        )
+
+    def handle(self, *args, **options):
+        account_id = options['account_id']
+        employee = self._get_employee(account_id, options['employee_id'])
+        iterations = max(1, options['iterations'])
+
+        self.stdout.write(
+            f'Benchmarking visibility filters for employee {employee.id} '
+            f'({employee.email}) in account {account_id}, {iterations} iterations\n'
+        )
+
+        results = []
+        for name, legacy, current in self._build_cases(account_id, employee):
+            for variant, queryset in (('legacy', legacy), ('exists', current)):
+                page_timings = self._time(lambda: list(queryset[:PAGE_SIZE]), iterations)
+                count_timings = self._time(lambda: queryset.count(), iterations)
+                result = {
+                    'query': name,
+                    'variant': variant,
+                    'rows': queryset.count(),
+                    'page_ms_p50': _percentile(page_timings, 50),
+                    'page_ms_p95': _percentile(page_timings, 95),
+                    'count_ms_p50': _percentile(count_timings, 50),
+                    'count_ms_p95': _percentile(count_timings, 95),
+                }
+                results.append(result)
+                self.stdout.write(
+                    f'{name:<12} {variant:<7} rows={result["rows"]:<8} '
+                    f'page p50={result["page_ms_p50"]:.2f}ms p95={result["page_ms_p95"]:.2f}ms  '
+                    f'count p50={result["count_ms_p50"]:.2f}ms p95={result["count_ms_p95"]:.2f}ms'
+                )
+
+                if options['explain']:
+                    self._explain(queryset[:PAGE_SIZE])
+
+        if options['json']:
+            with open(options['json'], 'w') as fh:
+                json.dump({
+                    'account_id': account_id,
+                    'employee_id': employee.id,
+                    'iterations': iterations,
+                    'results': results,
+                }, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'\nResults written to {options["json"]}'))
+
+    def _get_employee(self, account_id, employee_id):
+        """Return the employee to benchmark as."""
+        if employee_id:
+            try:
+                return Employee.objects.get(id=employee_id, account_id=account_id)
+            except Employee.DoesNotExist:
+                raise CommandError(f'Employee {employee_id} not found in account {account_id}.')
+
+        employee = Employee.objects.filter(account_id=account_id).annotate(
+            assigned=Count('coached_clients', distinct=True) +
+            Count('closed_clients', distinct=True) +
+            Count('set_clients', distinct=True)
+        ).order_by('-assigned').first()
+        if employee is None:
+            raise CommandError(f'No employees found in account {account_id}.')
+        return employee
+
+    def _build_cases(self, account_id, user):
+        """Return (name, legacy_queryset, exists_queryset) tuples."""
+        related_q = Q(client__coach=user) | Q(client__closer=user) | Q(client__setter=user)
+
+        clients = Client.objects.filter(account_id=account_id).select_related(
+            'account', 'coach', 'closer', 'setter'
+        ).order_by('first_name')
+        payments = Payment.objects.filter(account_id=account_id).select_related(
+            'client', 'client_package', 'account'
+        ).order_by('-payment_date')
+        installments = Installment.objects.filter(account_id=account_id).select_related(
+            'client', 'account'
+        ).order_by('-schedule_date')
+        submissions = CheckInSubmission.objects.filter(account_id=account_id).select_related(
+            'client', 'form', 'account'
+        ).order_by('-submitted_at')
+
+        return [
+            (
+                'clients',
+                clients.filter(Q(coach=user) | Q(closer=user) | Q(setter=user)).distinct(),
+                filter_clients_for_user(clients, user),
+            ),
+            (
+                'payments',
+                payments.filter(related_q).distinct(),
+                filter_rows_for_assigned_clients(payments, user),
+            ),
+            (
+                'instalments',
+                installments.filter(related_q).distinct(),
+                filter_rows_for_assigned_clients(installments, user),
+            ),
+            (
+                'submissions',
+                submissions.filter(related_q).distinct(),
+                filter_rows_for_assigned_clients(submissions, user),
+            ),
+        ]
+
+    def _time(self, fn, iterations):
+        """Run fn once to warm up, then return per-iteration timings in ms."""
+        fn()
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def _explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS) {sql}', params)
+            for (line,) in cursor.fetchall():
+                self.stdout.write(f'    {line}')
+        self.stdout.write('')
+
+
+def _percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    if len(values) == 1:
+        return values[0]
+    ordered = sorted(values)
+    if pct == 50:
+        return statistics.median(ordered)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
@@ -0,0 +1,167 @@
+"""
+Management command to merge duplicate short links.
+
+Before link creation reused existing codes, every regeneration of a client's
+links added another short_urls row for the same (domain, original_url). This
+command keeps one row per pair -- the oldest active one, which is also the
+row shorten_urls_bulk() reuses -- and for every other row:
+
+- moves its click_analytics rows and its click count to the kept row
+- repoints clients.short_checkin_link / short_onboarding_link /
+  short_reviews_link values that use it
+- deletes it
+
+Merged codes stop resolving, so duplicates created or clicked within
+--min-age-days are left alone and links in recent messages keep working; run
+the command again later to merge them. Deleting rows does not shrink the
+short_urls indexes; pass --reindex to rebuild them afterwards with
+REINDEX ... CONCURRENTLY.
+
+Usage:
+    python manage.py compact_short_urls --dry-run
+    python manage.py compact_short_urls --domain check.gymname.com --min-age-days 90
+    python manage.py compact_short_urls --reindex
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+CLIENT_LINK_COLUMNS = ('short_checkin_link', 'short_onboarding_link', 'short_reviews_link')
+
+MERGES_SQL = """
+CREATE TEMP TABLE short_url_merges ON COMMIT DROP AS
+SELECT dup.id AS dup_id,
+       dup.clicks,
+       'https://' || dup.domain || '/' || dup.short_code AS dup_url,
+       keep.id AS keep_id,
+       'https://' || keep.domain || '/' || keep.short_code AS keep_url
+FROM (
+    SELECT id, domain, short_code, clicks, created_at,
+           first_value(id) OVER (
+               PARTITION BY domain, original_url ORDER BY is_active DESC, id
+           ) AS keep_id
+    FROM short_urls
+    WHERE domain IS NOT NULL
+      AND short_code IS NOT NULL
+      {domain_filter}
+) AS dup
+JOIN short_urls AS keep ON keep.id = dup.keep_id
+WHERE dup.id <> dup.keep_id
+  AND keep.is_active
+  AND dup.created_at < %(cutoff)s
+  AND NOT EXISTS (
+      SELECT 1 FROM click_analytics AS ca
+      WHERE ca.short_url_id = dup.id AND ca.clicked_at >= %(cutoff)s
+  )
+"""
+
+
+class Command(BaseCommand):
+    help = 'Merge duplicate short_urls rows per (domain, original_url) and repoint client links'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--domain',
+            type=str,
+            help='Only compact links on this domain'
+        )
+        parser.add_argument(
+            '--min-age-days',
+            type=int,
+            default=30,
+            help='Leave duplicates created or clicked within this many days (default: 30)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be merged without changing anything'
+        )
+        parser.add_argument(
+            '--reindex',
+            action='store_true',
+            help='Rebuild the short_urls indexes afterwards (REINDEX TABLE CONCURRENTLY)'
+        )
+
+    def handle(self, *args, **options):
+        if options['min_age_days'] < 0:
+            raise CommandError('--min-age-days must not be negative.')
+        if options['reindex'] and options['dry_run']:
+            raise CommandError('--reindex cannot be combined with --dry-run.')
+
+        params = {'cutoff': timezone.now() - timedelta(days=options['min_age_days'])}
+        domain_filter = ''
+        if options['domain']:
+            domain_filter = 'AND domain = %(domain)s'
+            params['domain'] = options['domain']
+
+        sizes_before = self._index_sizes()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(MERGES_SQL.format(domain_filter=domain_filter), params)
+            cursor.execute(
+                'SELECT count(*), count(DISTINCT keep_id), COALESCE(sum(clicks), 0) FROM short_url_merges'
+            )
+            duplicates, kept, clicks = cursor.fetchone()
+            self.stdout.write(
+                f'{duplicates} duplicate short links of {kept} links ({clicks} clicks) to merge'
+            )
+            if options['dry_run'] or not duplicates:
+                transaction.set_rollback(True)
+                return
+
+            cursor.execute(
+                """
+                UPDATE click_analytics SET short_url_id = m.keep_id
+                FROM short_url_merges AS m
+                WHERE click_analytics.short_url_id = m.dup_id
+                """
+            )
+            moved_clicks = cursor.rowcount
+            cursor.execute(
+                """
+                UPDATE short_urls SET clicks = short_urls.clicks + t.clicks
+                FROM (
+                    SELECT keep_id, sum(clicks) AS clicks FROM short_url_merges GROUP BY keep_id
+                ) AS t
+                WHERE short_urls.id = t.keep_id
+                """
+            )
+            repointed = 0
+            for column in CLIENT_LINK_COLUMNS:
+                cursor.execute(
+                    f"""
+                    UPDATE clients SET {column} = m.keep_url, updated_at = now()
+                    FROM short_url_merges AS m
+                    WHERE clients.{column} = m.dup_url
+                    """
+                )
+                repointed += cursor.rowcount
+            cursor.execute(
+                'DELETE FROM short_urls USING short_url_merges AS m WHERE short_urls.id = m.dup_id'
+            )
+            deleted = cursor.rowcount
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} duplicate short links, moved {moved_clicks} click events, '
+            f'repointed {repointed} client links'
+        ))
+
+        if options['reindex']:
+            with connection.cursor() as cursor:
+                cursor.execute('REINDEX TABLE CONCURRENTLY short_urls')
+            sizes_after = self._index_sizes()
+            for name, before in sorted(sizes_before.items()):
+                after = sizes_after.get(name, 0)
+                self.stdout.write(f'  {name:<48} {before / 1024:>10.0f} kB -> {after / 1024:>10.0f} kB')
+
+    def _index_sizes(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT indexrelid::regclass::text, pg_relation_size(indexrelid)
+                FROM pg_index
+                WHERE indrelid = 'short_urls'::regclass
+                """
+            )
+            return dict(cursor.fetchall())
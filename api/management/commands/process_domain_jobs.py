@@ -0,0 +1,64 @@
+"""
+Management command to provision queued custom domains.
+
+Claims pending DomainProvisioningJobs, issues certificates and writes nginx
+configs per domain, then tests and reloads nginx once per batch. Run from
+cron, or as a long-lived worker with --loop on the proxy host.
+
+Usage:
+    python manage.py process_domain_jobs
+    python manage.py process_domain_jobs --batch-size 50
+    python manage.py process_domain_jobs --loop --interval 5
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.services.domain_jobs import process_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Provision queued custom forms/payment domains (SSL + nginx)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Jobs to claim per batch (default: DOMAIN_JOB_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, polling for jobs every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=5,
+            help='Seconds between polls in --loop mode when the queue is empty (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            jobs = self._process_batch(options['batch_size'])
+            if not options['loop']:
+                return
+            close_old_connections()
+            if not jobs:
+                time.sleep(max(1, options['interval']))
+
+    def _process_batch(self, batch_size):
+        try:
+            jobs = process_pending_jobs(batch_size)
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f'Domain provisioning failed: {str(e)}'))
+            return []
+
+        for job in jobs:
+            line = f'{job.domain_type} domain {job.domain} (account {job.account_id}): {job.status}'
+            if job.status == 'succeeded':
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                self.stdout.write(self.style.ERROR(f'{line} - {job.error}'))
+        return jobs
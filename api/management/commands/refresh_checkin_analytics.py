@@ -0,0 +1,68 @@
+"""
+Management command to refresh check-in answer rollups.
+
+Folds new submissions into check_in_answer_rollups. The analytics endpoint
+never refreshes rollups itself: it aggregates the submissions since the last
+run live, so run this from cron (every few minutes) to keep that tail short.
+Each form is refreshed incrementally from its watermark.
+
+Usage:
+    python manage.py refresh_checkin_analytics
+    python manage.py refresh_checkin_analytics --account-id 1
+    python manage.py refresh_checkin_analytics --form-id <uuid> --rebuild
+"""
+from django.core.management.base import BaseCommand
+
+from api.models import CheckInForm
+from api.services.checkin_analytics import (
+    get_analyzable_fields, invalidate_form_analytics, refresh_form_analytics
+)
+
+
+class Command(BaseCommand):
+    help = 'Incrementally refresh check-in answer analytics rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--account-id',
+            type=int,
+            help='Only refresh forms belonging to this account'
+        )
+        parser.add_argument(
+            '--form-id',
+            type=str,
+            help='Only refresh this form'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Drop existing rollups and rebuild from all submissions'
+        )
+
+    def handle(self, *args, **options):
+        forms = CheckInForm.objects.select_related('account').order_by('created_at')
+        if options['account_id']:
+            forms = forms.filter(account_id=options['account_id'])
+        if options['form_id']:
+            forms = forms.filter(id=options['form_id'])
+
+        total_forms = 0
+        total_submissions = 0
+        for form in forms.iterator():
+            if not get_analyzable_fields(form.form_schema):
+                continue
+            if options['rebuild']:
+                invalidate_form_analytics(form.id)
+            try:
+                processed = refresh_form_analytics(form)
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f'Form {form.id}: {str(e)}'))
+                continue
+            total_forms += 1
+            total_submissions += processed
+            if processed:
+                self.stdout.write(f'Form {form.id} ({form.title}): {processed} new submissions')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed {total_forms} forms, {total_submissions} submissions processed'
+        ))
@@ -0,0 +1,74 @@
+"""
+Management command to refresh per-account dashboard rollups.
+
+Reads only rows changed since each account's watermarks and recomputes the
+days they touch. Run from cron, or as a long-lived worker with --loop.
+
+Usage:
+    python manage.py refresh_dashboard_rollups
+    python manage.py refresh_dashboard_rollups --account-id 1
+    python manage.py refresh_dashboard_rollups --full          # rebuild all days
+    python manage.py refresh_dashboard_rollups --loop --interval 300
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.models import Account
+from api.services.dashboard_rollups import refresh_account_rollups
+
+
+class Command(BaseCommand):
+    help = 'Incrementally refresh per-account dashboard rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--account-id',
+            type=int,
+            help='Only refresh this account'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignore watermarks and rebuild every day with data or a rollup row'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, refreshing every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=300,
+            help='Seconds between refresh passes in --loop mode (default: 300)'
+        )
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            self._refresh_all(options['account_id'], full)
+            if not options['loop']:
+                return
+            # Only the first pass of a looping worker is a full rebuild
+            full = False
+            close_old_connections()
+            time.sleep(max(1, options['interval']))
+
+    def _refresh_all(self, account_id, full):
+        accounts = Account.objects.order_by('id').values_list('id', flat=True)
+        if account_id:
+            accounts = accounts.filter(id=account_id)
+
+        refreshed = 0
+        for current_id in accounts:
+            try:
+                days = refresh_account_rollups(current_id, full=full)
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f'Account {current_id}: {str(e)}'))
+                continue
+            refreshed += 1
+            self.stdout.write(f'Account {current_id}: {days} days recomputed')
+
+        self.stdout.write(self.style.SUCCESS(f'Refreshed dashboard rollups for {refreshed} accounts'))
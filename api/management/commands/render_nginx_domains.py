@@ -0,0 +1,81 @@
+"""
+Management command to regenerate the nginx custom domain map config.
+
+Renders every verified forms_domain and payment_domain from the accounts
+table into NGINX_DOMAIN_MAP_PATH (see api/services/nginx_domain_map.py). The
+file is only replaced when its content changes, so running this from cron or
+after a deploy is idempotent. With --reload, nginx is tested and reloaded
+when the file changed; if nginx -t fails the previous file is put back.
+
+When switching NGINX_CONFIG_MODE from per_domain to map, --prune-sites
+removes the old per-domain files for the rendered domains (they would
+otherwise declare the same server names twice).
+
+Usage:
+    python manage.py render_nginx_domains --dry-run
+    python manage.py render_nginx_domains --reload
+    python manage.py render_nginx_domains --reload --prune-sites
+"""
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services import nginx_domain_map
+from api.services.domain_service import DomainService
+
+
+class Command(BaseCommand):
+    help = 'Render verified custom domains into the single nginx map config'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Print the config instead of writing it'
+        )
+        parser.add_argument(
+            '--reload',
+            action='store_true',
+            help='Test and reload nginx if the config changed'
+        )
+        parser.add_argument(
+            '--prune-sites',
+            action='store_true',
+            help='Remove per-domain sites-available/sites-enabled files for the rendered domains'
+        )
+
+    def handle(self, *args, **options):
+        domains = nginx_domain_map.configured_domains()
+        content = nginx_domain_map.render(domains)
+        if options['dry_run']:
+            self.stdout.write(content)
+            return
+
+        previous = nginx_domain_map.read_config()
+        success, message, changed = nginx_domain_map.write(content)
+        if not success:
+            raise CommandError(message)
+        self.stdout.write(f'{message}: {nginx_domain_map.config_path()} ({len(domains)} domains)')
+
+        if options['prune_sites']:
+            self._prune_sites(domains)
+            changed = True
+
+        if options['reload'] and changed:
+            reload_success, reload_message = DomainService.test_and_reload_nginx()
+            if not reload_success:
+                if previous is not None:
+                    nginx_domain_map.write(previous)
+                raise CommandError(f'{reload_message} (previous config restored)')
+            self.stdout.write(self.style.SUCCESS(reload_message))
+
+    def _prune_sites(self, domains):
+        pruned = 0
+        for domain in domains:
+            config_path = os.path.join(DomainService.NGINX_SITES_AVAILABLE, domain)
+            if not os.path.lexists(config_path):
+                continue
+            DomainService.disable_site(domain)
+            DomainService.run(['rm', config_path])
+            pruned += 1
+        self.stdout.write(f'Removed {pruned} per-domain nginx configs')
@@ -0,0 +1,439 @@
+"""
+Management command to benchmark hot API endpoints end to end.
+
+Requests go through the full Django stack (middleware, token authentication,
+permissions, serializers) with DRF's APIClient, against data created by
+``seed_benchmark_data``. Requests that write (CSV import, public form submit)
+run inside a transaction that is rolled back, so every run sees the same data.
+Outbound calls made by the check-in trigger (n8n, URL shortener) go to a local
+stub HTTP server, so the fan-out cost includes real HTTP round trips without
+leaving the machine.
+
+For each benchmark the command records wall time (p50/p95/min/max/mean), the
+number of DB queries and the response size, and writes them as JSON so runs
+can be compared with ``--compare``.
+
+Usage:
+    python manage.py run_benchmarks --output before.json
+    python manage.py run_benchmarks --output after.json --compare before.json
+    python manage.py run_benchmarks --only clients_list,payment_details --iterations 50
+"""
+import csv
+import io
+import json
+import platform
+import statistics
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import django
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from api.models import (
+    Account, CheckInSchedule, Client, Employee, EmployeeToken, Payment, ShortUrl
+)
+from .benchmark_visibility import _percentile
+from .seed_benchmark_data import BENCH_EMAIL_DOMAIN
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Accepts n8n webhook pushes and URL shortener requests."""
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        if self.path.startswith('/api/shorten/'):
+            body = {'status': 'success', 'data': {'full_short_url': f'https://{BENCH_EMAIL_DOMAIN}/s/stub'}}
+        else:
+            body = {'status': 'ok'}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def _stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark hot API endpoints against seeded data and write results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--account-id',
+            type=int,
+            help='Account to benchmark against (defaults to the first seeded benchmark account)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='Timed iterations per benchmark (default: 20)'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=2,
+            help='Untimed warm-up iterations per benchmark (default: 2)'
+        )
+        parser.add_argument(
+            '--only',
+            type=str,
+            help='Comma-separated benchmark names to run'
+        )
+        parser.add_argument(
+            '--import-rows',
+            type=int,
+            default=500,
+            help='Rows in the generated CSV for import benchmarks (default: 500)'
+        )
+        parser.add_argument(
+            '--label',
+            type=str,
+            default='',
+            help='Free-form label stored with the results (e.g. branch name)'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            metavar='PATH',
+            help='Write results as JSON to PATH'
+        )
+        parser.add_argument(
+            '--compare',
+            type=str,
+            metavar='PATH',
+            help='Compare against a previous JSON result file'
+        )
+
+    def handle(self, *args, **options):
+        account = self._get_account(options['account_id'])
+        self.iterations = max(1, options['iterations'])
+        self.warmup = max(0, options['warmup'])
+        self.import_rows = max(1, options['import_rows'])
+        self._prepare(account)
+
+        benchmarks = self._benchmarks()
+        if options['only']:
+            wanted = [name.strip() for name in options['only'].split(',') if name.strip()]
+            unknown = set(wanted) - set(benchmarks)
+            if unknown:
+                raise CommandError(
+                    f'Unknown benchmark(s): {", ".join(sorted(unknown))}. '
+                    f'Available: {", ".join(benchmarks)}'
+                )
+            benchmarks = {name: benchmarks[name] for name in wanted}
+
+        self.stdout.write(
+            f'Benchmarking account {account.id} ({account.name}): '
+            f'{self.iterations} iterations, {self.warmup} warm-up\n'
+        )
+
+        results = {}
+        with _stub_server() as stub_url, override_settings(
+            ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver'],
+            N8N_CHECKIN_WEBHOOK_URL=f'{stub_url}/webhook/checkin',
+            URL_SHORTENER_API_URL=stub_url,
+            SLOW_REQUEST_THRESHOLD_MS=0,
+            SHORT_LINK_CLICK_FLUSH_INTERVAL=0,  # keep benchmark clicks out of the database
+        ):
+            for name, (fn, expected_status, writes) in benchmarks.items():
+                result = self._run(fn, expected_status, writes)
+                results[name] = result
+                self._print_result(name, result)
+
+        report = {
+            'meta': self._meta(account, options['label']),
+            'results': results,
+        }
+
+        if options['compare']:
+            self._compare(options['compare'], results)
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'\nResults written to {options["output"]}'))
+
+    def _get_account(self, account_id):
+        """Return the account to benchmark against."""
+        if account_id:
+            try:
+                return Account.objects.get(id=account_id)
+            except Account.DoesNotExist:
+                raise CommandError(f'Account {account_id} not found.')
+
+        account = Account.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}').order_by('id').first()
+        if account is None:
+            raise CommandError('No benchmark data found. Run "python manage.py seed_benchmark_data" first.')
+        return account
+
+    def _prepare(self, account):
+        """Look up the users, clients and schedule the benchmarks need."""
+        self.account = account
+
+        admin = Employee.objects.filter(account=account, role='super_admin', is_active=True).order_by('id').first()
+        employee = Employee.objects.filter(
+            account=account, role='employee', is_active=True, can_view_all_clients=False
+        ).order_by('id').first()
+        if admin is None or employee is None:
+            raise CommandError(f'Account {account.id} needs an active super_admin and a plain employee.')
+
+        self.admin_client = self._api_client(admin)
+        self.employee_client = self._api_client(employee)
+        self.public_client = APIClient()
+
+        # The client with the most payments makes payment_details the worst case
+        top = (
+            Payment.objects.filter(account=account)
+            .values('client_id').annotate(n=Count('id')).order_by('-n').first()
+        )
+        if top is None:
+            raise CommandError(f'Account {account.id} has no payments.')
+        self.payment_client_id = top['client_id']
+
+        self.checkin_uuid = (
+            Client.objects.filter(
+                account=account, checkin_link__isnull=False,
+                packages__status='active',
+            )
+            .values_list('checkin_link', flat=True).order_by('id').first()
+        )
+        schedule = CheckInSchedule.objects.filter(account=account, is_active=True).order_by('created_at').first()
+        self.schedule_id = str(schedule.id) if schedule else None
+        self.short_code = (
+            ShortUrl.objects.filter(domain=BENCH_EMAIL_DOMAIN, is_active=True)
+            .values_list('short_code', flat=True).order_by('id').first()
+        )
+
+    def _api_client(self, employee):
+        token, _ = EmployeeToken.objects.get_or_create(user=employee)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    def _benchmarks(self):
+        """Return {name: (callable returning a response, expected status, writes)}."""
+        admin, employee, public = self.admin_client, self.employee_client, self.public_client
+        benchmarks = {
+            'clients_list': (lambda: admin.get('/api/clients/', secure=True), 200, False),
+            'clients_list_assigned': (lambda: employee.get('/api/clients/', secure=True), 200, False),
+            'clients_search': (lambda: admin.get('/api/clients/', {'search': 'smith'}, secure=True), 200, False),
+            'clients_list_gzip': (
+                lambda: admin.get('/api/clients/', secure=True, HTTP_ACCEPT_ENCODING='gzip'), 200, False,
+            ),
+            'clients_list_sparse': (
+                lambda: admin.get('/api/clients/', {'fields': 'id,first_name,last_name,status,coach_name'}, secure=True),
+                200, False,
+            ),
+            'payments_list': (lambda: admin.get('/api/payments/', secure=True), 200, False),
+            'payments_list_sparse': (
+                lambda: admin.get('/api/payments/', {'fields': 'id,client_name,amount,status,payment_date'}, secure=True),
+                200, False,
+            ),
+            'submissions_list': (lambda: admin.get('/api/checkin-submissions/', secure=True), 200, False),
+            'checkin_forms_list': (lambda: admin.get('/api/checkin-forms/', secure=True), 200, False),
+            'clients_statistics': (lambda: admin.get('/api/clients/statistics/', secure=True), 200, False),
+            'payments_statistics': (lambda: admin.get('/api/payments/statistics/', secure=True), 200, False),
+            'payment_details': (
+                lambda: admin.get(f'/api/clients/{self.payment_client_id}/payment-details/', secure=True),
+                200, False,
+            ),
+            'clients_export_csv': (lambda: admin.get('/api/clients/export/', secure=True), 200, False),
+            'payments_export_csv': (lambda: admin.get('/api/payments/export/', secure=True), 200, False),
+            'clients_import_csv': (
+                lambda: admin.post(
+                    '/api/clients/import/', {'file': self._import_file()}, format='multipart', secure=True
+                ),
+                200, True,
+            ),
+        }
+        if self.checkin_uuid:
+            benchmarks['public_checkin_load'] = (
+                lambda: public.get(f'/api/public/checkin/{self.checkin_uuid}/', secure=True), 200, False,
+            )
+            benchmarks['public_checkin_submit'] = (
+                lambda: public.post(
+                    f'/api/public/checkin/{self.checkin_uuid}/submit/',
+                    {'submission_data': {'weight': 80.5, 'energy': 7, 'mood': 'good', 'notes': 'benchmark'}},
+                    format='json', secure=True,
+                ),
+                201, True,
+            )
+        if self.short_code:
+            benchmarks['short_link_redirect'] = (
+                lambda: public.get(f'/api/public/links/{BENCH_EMAIL_DOMAIN}/{self.short_code}/', secure=True),
+                302, False,
+            )
+        if self.schedule_id:
+            benchmarks['checkin_trigger_fanout'] = (
+                lambda: public.post(
+                    '/api/internal/checkin-trigger/',
+                    {'schedule_id': self.schedule_id, 'day_filter': 'monday'},
+                    format='json', secure=True, HTTP_X_WEBHOOK_SECRET=settings.WEBHOOK_SECRET,
+                ),
+                200, True,
+            )
+        return benchmarks
+
+    def _import_file(self):
+        """A CSV of new clients (rolled back after each request)."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['first_name', 'last_name', 'email', 'status', 'country', 'currency'])
+        stamp = time.time_ns()
+        for row in range(self.import_rows):
+            writer.writerow([
+                'Import', f'Row {row}', f'bench-import-{stamp}-{row}@{BENCH_EMAIL_DOMAIN}',
+                'active', 'United Kingdom', 'gbp',
+            ])
+        return SimpleUploadedFile('clients.csv', buffer.getvalue().encode(), content_type='text/csv')
+
+    def _call(self, fn, writes):
+        if not writes:
+            return fn()
+        with transaction.atomic():
+            response = fn()
+            transaction.set_rollback(True)
+        return response
+
+    def _run(self, fn, expected_status, writes):
+        for _ in range(self.warmup):
+            self._call(fn, writes)
+
+        timings = []
+        queries = []
+        response_bytes = 0
+        status_code = None
+        for _ in range(self.iterations):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = self._call(fn, writes)
+                if response.streaming:
+                    response_bytes = sum(len(chunk) for chunk in response.streaming_content)
+                else:
+                    response_bytes = len(response.content)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured))
+            status_code = response.status_code
+
+        result = {
+            'status': status_code,
+            'ok': status_code == expected_status,
+            'p50_ms': round(_percentile(timings, 50), 3),
+            'p95_ms': round(_percentile(timings, 95), 3),
+            'min_ms': round(min(timings), 3),
+            'max_ms': round(max(timings), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'queries': max(queries),
+            'response_bytes': response_bytes,
+        }
+        return result
+
+    def _print_result(self, name, result):
+        line = (
+            f'{name:<24} p50={result["p50_ms"]:>9.2f}ms p95={result["p95_ms"]:>9.2f}ms '
+            f'queries={result["queries"]:<5} bytes={result["response_bytes"]:<9}'
+        )
+        if result['ok']:
+            self.stdout.write(line)
+        else:
+            self.stdout.write(self.style.WARNING(f'{line} unexpected status {result["status"]}'))
+
+    def _meta(self, account, label):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT
+                    (SELECT count(*) FROM clients WHERE account_id = %(id)s),
+                    (SELECT count(*) FROM payments WHERE account_id = %(id)s),
+                    (SELECT count(*) FROM check_in_submissions WHERE account_id = %(id)s),
+                    (SELECT count(*) FROM clients),
+                    (SELECT count(*) FROM payments),
+                    (SELECT count(*) FROM check_in_submissions)
+                """,
+                {'id': account.id}
+            )
+            row = cursor.fetchone()
+            cursor.execute('SHOW server_version')
+            server_version = cursor.fetchone()[0]
+
+        return {
+            'label': label,
+            'started_at': datetime.now(dt_timezone.utc).isoformat(),
+            'git_commit': _git_commit(),
+            'database': connection.settings_dict.get('NAME'),
+            'postgres': server_version,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': self.iterations,
+            'warmup': self.warmup,
+            'account_id': account.id,
+            'rows': {
+                'account_clients': row[0],
+                'account_payments': row[1],
+                'account_submissions': row[2],
+                'total_clients': row[3],
+                'total_payments': row[4],
+                'total_submissions': row[5],
+            },
+        }
+
+    def _compare(self, path, results):
+        try:
+            with open(path) as fh:
+                baseline = json.load(fh)['results']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'Could not read baseline {path}: {e}')
+
+        self.stdout.write(f'\nCompared with {path}:')
+        for name, result in results.items():
+            before = baseline.get(name)
+            if not before:
+                self.stdout.write(f'{name:<24} (no baseline)')
+                continue
+            delta = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+            line = (
+                f'{name:<24} p50 {before["p50_ms"]:>9.2f}ms -> {result["p50_ms"]:>9.2f}ms ({delta:+6.1f}%)  '
+                f'queries {before["queries"]} -> {result["queries"]}'
+            )
+            if delta > 10:
+                self.stdout.write(self.style.WARNING(line))
+            elif delta < -10:
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                self.stdout.write(line)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, timeout=5,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
@@ -0,0 +1,476 @@
+"""
+Management command to seed synthetic data for benchmarks.
+
+Generates accounts, employees, packages, check-in forms/schedules, clients,
+short links, client packages, Stripe customers, payments, instalments and
+check-in submissions with set-based ``INSERT ... SELECT generate_series()`` statements,
+so millions of rows load in minutes. Data is deterministic for a given
+``--seed``.
+
+Every seeded account uses an ``@bench.example`` email, which is how
+``--reset`` finds the rows to delete; seeded short links use the
+``bench.example`` domain. Because ``NoDbTestRunner`` points at a
+real database, the command refuses to run unless the database name contains
+"test" or "bench" (see scripts/init_test_db.sh and docker-compose.test.yml),
+or ``--allow-any-database`` is passed.
+
+Seeded employees can log in with password ``bench-password``; the first
+employee of each account is a super_admin, the rest are plain employees
+without ``can_view_all_*`` flags, assigned to clients as coach/closer/setter.
+
+Usage:
+    python manage.py seed_benchmark_data                  # 100 accounts, 200k clients, 2M payments, 1M submissions
+    python manage.py seed_benchmark_data --scale 0.01     # 1% of the default volumes
+    python manage.py seed_benchmark_data --reset --clients 50000 --payments 500000
+"""
+import json
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+
+BENCH_EMAIL_DOMAIN = 'bench.example'
+BENCH_PASSWORD = 'bench-password'
+
+DEFAULT_VOLUMES = {
+    'accounts': 100,
+    'clients': 200_000,
+    'payments': 2_000_000,
+    'submissions': 1_000_000,
+}
+EMPLOYEES_PER_ACCOUNT = 10
+PACKAGES_PER_ACCOUNT = 5
+INSTALMENTS_PER_CLIENT = 3
+
+FORM_SCHEMA = {
+    'fields': [
+        {'id': 'weight', 'type': 'number', 'label': 'Weight (kg)'},
+        {'id': 'energy', 'type': 'number', 'label': 'Energy (1-10)'},
+        {'id': 'mood', 'type': 'select', 'label': 'Mood', 'options': ['great', 'good', 'ok', 'bad']},
+        {'id': 'notes', 'type': 'textarea', 'label': 'Anything else?'},
+    ]
+}
+
+
+class Command(BaseCommand):
+    help = 'Seed synthetic benchmark data (accounts, clients, payments, submissions, ...)'
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_VOLUMES.items():
+            parser.add_argument(
+                f'--{name}',
+                type=int,
+                help=f'Number of {name} to create (default: {default:,} x --scale)'
+            )
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=1.0,
+            help='Multiplier applied to the default volumes (default: 1.0)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=float,
+            default=0.42,
+            help='Random seed between -1 and 1 passed to setseed() (default: 0.42)'
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Delete previously seeded benchmark data first'
+        )
+        parser.add_argument(
+            '--allow-any-database',
+            action='store_true',
+            help='Run even if the database name does not contain "test" or "bench"'
+        )
+
+    def handle(self, *args, **options):
+        db_name = connection.settings_dict.get('NAME') or ''
+        if not options['allow_any_database'] and not any(tag in db_name.lower() for tag in ('test', 'bench')):
+            raise CommandError(
+                f'Refusing to seed database "{db_name}". Use a dedicated test database '
+                f'(scripts/init_test_db.sh) or pass --allow-any-database.'
+            )
+        if not -1 <= options['seed'] <= 1:
+            raise CommandError('--seed must be between -1 and 1.')
+
+        volumes = {
+            name: options[name] if options[name] is not None else max(1, int(default * options['scale']))
+            for name, default in DEFAULT_VOLUMES.items()
+        }
+
+        with connection.cursor() as cursor:
+            if options['reset']:
+                self._step('Deleting previous benchmark data', cursor, self._reset)
+            cursor.execute(
+                'SELECT count(*) FROM accounts WHERE email LIKE %s',
+                [f'%@{BENCH_EMAIL_DOMAIN}']
+            )
+            if cursor.fetchone()[0]:
+                raise CommandError('Benchmark data already exists. Pass --reset to replace it.')
+
+        self.stdout.write(
+            'Seeding ' + ', '.join(f'{count:,} {name}' for name, count in volumes.items()) + '\n'
+        )
+        started = time.perf_counter()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('SELECT setseed(%s)', [options['seed']])
+            self._step('accounts', cursor, self._seed_accounts, volumes)
+            self._step('employees', cursor, self._seed_employees)
+            self._step('packages, forms and schedules', cursor, self._seed_packages_and_forms)
+            self._step('clients', cursor, self._seed_clients, volumes)
+            self._step('short links', cursor, self._seed_short_links)
+            self._step('client packages and Stripe customers', cursor, self._seed_client_packages)
+            self._step('payments', cursor, self._seed_payments, volumes)
+            self._step('instalments', cursor, self._seed_instalments)
+            self._step('check-in submissions', cursor, self._seed_submissions, volumes)
+
+        with connection.cursor() as cursor:
+            self._step('ANALYZE', cursor, lambda cur: cur.execute('ANALYZE'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nSeeded benchmark data in {time.perf_counter() - started:.1f}s. '
+            f'Log in as bench-employee-1-1@{BENCH_EMAIL_DOMAIN} / {BENCH_PASSWORD}'
+        ))
+
+    def _step(self, label, cursor, fn, *args):
+        start = time.perf_counter()
+        self.stdout.write(f'  {label}...', ending='')
+        self.stdout.flush()
+        fn(cursor, *args)
+        self.stdout.write(f' {time.perf_counter() - start:.1f}s')
+
+    def _reset(self, cursor):
+        """Delete every row belonging to a benchmark account, children first."""
+        accounts = 'SELECT id FROM accounts WHERE email LIKE %s'
+        forms = f'SELECT id FROM check_in_forms WHERE account_id IN ({accounts})'
+        statements = [
+            f'DELETE FROM account_daily_rollups WHERE account_id IN ({accounts})',
+            f'DELETE FROM account_rollup_state WHERE account_id IN ({accounts})',
+            f'DELETE FROM check_in_answer_rollups WHERE account_id IN ({accounts})',
+            f'DELETE FROM check_in_form_analytics_state WHERE form_id IN ({forms})',
+            f'DELETE FROM check_in_submissions WHERE account_id IN ({accounts})',
+            f'DELETE FROM check_in_schedules WHERE account_id IN ({accounts})',
+            f'DELETE FROM check_in_form_packages WHERE form_id IN ({forms})',
+            f'DELETE FROM check_in_forms WHERE account_id IN ({accounts})',
+            f'DELETE FROM instalments WHERE account_id IN ({accounts})',
+            f'DELETE FROM payments WHERE account_id IN ({accounts})',
+            f'DELETE FROM stripe_customers WHERE account_id IN ({accounts})',
+            f'DELETE FROM client_packages WHERE client_id IN (SELECT id FROM clients WHERE account_id IN ({accounts}))',
+            f'DELETE FROM clients WHERE account_id IN ({accounts})',
+            f'DELETE FROM packages WHERE account_id IN ({accounts})',
+            f'DELETE FROM employee_tokens WHERE user_id IN (SELECT id FROM employees WHERE account_id IN ({accounts}))',
+            f'DELETE FROM employees WHERE account_id IN ({accounts})',
+            'DELETE FROM accounts WHERE email LIKE %s',
+        ]
+        params = [f'%@{BENCH_EMAIL_DOMAIN}']
+        with transaction.atomic():
+            for sql in statements:
+                cursor.execute(sql, params)
+            cursor.execute(
+                'DELETE FROM click_analytics WHERE short_url_id IN (SELECT id FROM short_urls WHERE domain = %s)',
+                [BENCH_EMAIL_DOMAIN]
+            )
+            cursor.execute('DELETE FROM short_urls WHERE domain = %s', [BENCH_EMAIL_DOMAIN])
+
+    def _seed_accounts(self, cursor, volumes):
+        cursor.execute(
+            """
+            INSERT INTO accounts (
+                name, email, timezone, company_currency, created_at, updated_at,
+                forms_domain_verified, forms_domain_configured,
+                payment_domain_verified, payment_domain_configured
+            )
+            SELECT 'Bench Account ' || g, 'bench-' || g || '@' || %(domain)s,
+                   'Europe/London', 'gbp', now(), now(), false, false, false, false
+            FROM generate_series(1, %(accounts)s) AS g
+            """,
+            {'domain': BENCH_EMAIL_DOMAIN, 'accounts': volumes['accounts']}
+        )
+        cursor.execute(
+            """
+            CREATE TEMP TABLE bench_accounts ON COMMIT DROP AS
+            SELECT row_number() OVER (ORDER BY id) AS rn, id
+            FROM accounts WHERE email LIKE %s
+            """,
+            [f'%@{BENCH_EMAIL_DOMAIN}']
+        )
+
+    def _seed_employees(self, cursor):
+        cursor.execute(
+            """
+            INSERT INTO employees (
+                account_id, name, email, status, role, password,
+                is_active, is_staff, is_superuser,
+                can_view_all_clients, can_manage_all_clients,
+                can_view_all_payments, can_manage_all_payments,
+                can_view_all_installments, can_manage_all_installments
+            )
+            SELECT a.id,
+                   'Bench Employee ' || a.rn || '-' || e,
+                   'bench-employee-' || a.rn || '-' || e || '@' || %(domain)s,
+                   'active'::employee_status,
+                   (CASE WHEN e = 1 THEN 'super_admin' ELSE 'employee' END)::employee_role,
+                   %(password)s, true, false, false,
+                   e = 1, e = 1, e = 1, e = 1, e = 1, e = 1
+            FROM bench_accounts AS a
+            CROSS JOIN generate_series(1, %(employees)s) AS e
+            """,
+            {
+                'domain': BENCH_EMAIL_DOMAIN,
+                'password': make_password(BENCH_PASSWORD),
+                'employees': EMPLOYEES_PER_ACCOUNT,
+            }
+        )
+        cursor.execute(
+            """
+            CREATE TEMP TABLE bench_employees ON COMMIT DROP AS
+            SELECT account_id, id, row_number() OVER (PARTITION BY account_id ORDER BY id) AS rn
+            FROM employees WHERE account_id IN (SELECT id FROM bench_accounts)
+            """
+        )
+        cursor.execute('CREATE INDEX ON bench_employees (account_id, rn)')
+
+    def _seed_packages_and_forms(self, cursor):
+        cursor.execute(
+            """
+            INSERT INTO packages (account_id, package_name, description)
+            SELECT a.id, 'Bench Package ' || k, 'Synthetic benchmark package'
+            FROM bench_accounts AS a
+            CROSS JOIN generate_series(1, %s) AS k
+            """,
+            [PACKAGES_PER_ACCOUNT]
+        )
+        cursor.execute(
+            """
+            CREATE TEMP TABLE bench_packages ON COMMIT DROP AS
+            SELECT account_id, id, row_number() OVER (PARTITION BY account_id ORDER BY id) AS rn
+            FROM packages WHERE account_id IN (SELECT id FROM bench_accounts)
+            """
+        )
+        cursor.execute(
+            """
+            INSERT INTO check_in_forms (
+                id, account_id, form_type, title, description, form_schema,
+                is_active, created_at, updated_at
+            )
+            SELECT gen_random_uuid(), a.id, 'checkins', 'Weekly Check-In',
+                   'Synthetic benchmark form', %s::jsonb, true, now(), now()
+            FROM bench_accounts AS a
+            """,
+            [json.dumps(FORM_SCHEMA)]
+        )
+        cursor.execute(
+            """
+            CREATE TEMP TABLE bench_forms ON COMMIT DROP AS
+            SELECT account_id, id FROM check_in_forms
+            WHERE account_id IN (SELECT id FROM bench_accounts)
+            """
+        )
+        cursor.execute(
+            """
+            INSERT INTO check_in_form_packages (form_id, package_id, created_at)
+            SELECT f.id, p.id, now()
+            FROM bench_forms AS f
+            JOIN bench_packages AS p ON p.account_id = f.account_id
+            """
+        )
+        cursor.execute(
+            """
+            INSERT INTO check_in_schedules (
+                id, form_id, account_id, schedule_type, day_of_week, time, timezone,
+                webhook_job_ids, is_active, created_at, updated_at
+            )
+            SELECT gen_random_uuid(), f.id, f.account_id, 'INDIVIDUAL_DAYS', NULL, '09:00',
+                   'Europe/London', '[]'::jsonb, true, now(), now()
+            FROM bench_forms AS f
+            """
+        )
+
+    def _seed_clients(self, cursor, volumes):
+        cursor.execute(
+            """
+            INSERT INTO clients (
+                account_id, first_name, last_name, email, status, client_start_date,
+                country, currency, lead_origin, notice_given, no_more_payments,
+                checkin_link, short_checkin_link, coach_id, closer_id, setter_id,
+                created_at, updated_at
+            )
+            SELECT a.id,
+                   (ARRAY['James','Olivia','Liam','Emma','Noah','Ava','Oliver','Sophia','Elijah','Mia',
+                          'Lucas','Amelia','Mason','Harper','Ethan','Isla','Leo','Grace','Jack','Chloe'])
+                       [1 + floor(random() * 20)::int],
+                   (ARRAY['Smith','Jones','Taylor','Brown','Williams','Wilson','Johnson','Davies',
+                          'Patel','Wright','Walker','Khan','Evans','Thomas','Roberts','Green'])
+                       [1 + floor(random() * 16)::int],
+                   'bench-client-' || g || '@' || %(domain)s,
+                   (CASE
+                       WHEN r < 0.70 THEN 'active'
+                       WHEN r < 0.80 THEN 'inactive'
+                       WHEN r < 0.88 THEN 'onboarding'
+                       WHEN r < 0.94 THEN 'paused'
+                       ELSE 'cancelled'
+                    END)::client_status,
+                   current_date - (random() * 900)::int,
+                   (ARRAY['United Kingdom','United States','Ireland','Germany','Australia'])
+                       [1 + floor(random() * 5)::int],
+                   'gbp',
+                   (ARRAY['instagram','referral','ads','organic'])[1 + floor(random() * 4)::int],
+                   false, false,
+                   gen_random_uuid(),
+                   'https://bench.example/s/c' || g,
+                   coach.id, closer.id, setter.id,
+                   now() - (random() * interval '900 days'), now()
+            FROM (
+                SELECT g, random() AS r, 1 + (g %% %(accounts)s) AS account_rn
+                FROM generate_series(1, %(clients)s) AS g
+            ) AS s
+            JOIN bench_accounts AS a ON a.rn = s.account_rn
+            LEFT JOIN bench_employees AS coach
+                ON coach.account_id = a.id AND coach.rn = 2 + (g %% %(staff)s)
+            LEFT JOIN bench_employees AS closer
+                ON closer.account_id = a.id AND closer.rn = 2 + ((g / 7) %% %(staff)s)
+            LEFT JOIN bench_employees AS setter
+                ON setter.account_id = a.id AND setter.rn = 2 + ((g / 13) %% %(staff)s)
+            """,
+            {
+                'domain': BENCH_EMAIL_DOMAIN,
+                'accounts': volumes['accounts'],
+                'clients': volumes['clients'],
+                'staff': max(1, EMPLOYEES_PER_ACCOUNT - 1),
+            }
+        )
+
+    def _seed_short_links(self, cursor):
+        """One short_urls row per client, behind its short_checkin_link."""
+        cursor.execute(
+            """
+            INSERT INTO short_urls (
+                short_code, original_url, domain, title, clicks, created_at, updated_at, is_active
+            )
+            SELECT substring(c.short_checkin_link from '[^/]+$'),
+                   'https://forms.' || %(domain)s || '/check-in/' || c.checkin_link || '/',
+                   %(domain)s, 'Check-In: ' || c.first_name || ' ' || c.last_name, 0,
+                   c.created_at, now(), true
+            FROM clients AS c
+            WHERE c.email LIKE %(emails)s
+            """,
+            {'domain': BENCH_EMAIL_DOMAIN, 'emails': f'%@{BENCH_EMAIL_DOMAIN}'}
+        )
+
+    def _seed_client_packages(self, cursor):
+        cursor.execute(
+            """
+            INSERT INTO client_packages (
+                client_id, package_id, monthly_payment_amount, payment_schedule,
+                start_date, checkin_day, status
+            )
+            SELECT c.id, p.id, (100 + (c.id %% 5) * 50)::numeric(10, 2), 'subscription'::payment_schedule,
+                   c.client_start_date,
+                   (ARRAY['monday','tuesday','wednesday','thursday','friday','saturday','sunday'])
+                       [1 + (c.id %% 7)],
+                   'active'::client_package_status
+            FROM clients AS c
+            JOIN bench_packages AS p
+                ON p.account_id = c.account_id AND p.rn = 1 + (c.id %% %s)
+            WHERE c.account_id IN (SELECT id FROM bench_accounts)
+            """,
+            [PACKAGES_PER_ACCOUNT]
+        )
+        cursor.execute(
+            """
+            CREATE TEMP TABLE bench_clients ON COMMIT DROP AS
+            SELECT row_number() OVER (ORDER BY c.id) AS rn, c.id, c.account_id, c.email,
+                   cp.id AS client_package_id
+            FROM clients AS c
+            JOIN client_packages AS cp ON cp.client_id = c.id
+            WHERE c.account_id IN (SELECT id FROM bench_accounts)
+            """
+        )
+        cursor.execute('CREATE UNIQUE INDEX ON bench_clients (rn)')
+        cursor.execute(
+            """
+            INSERT INTO stripe_customers (stripe_customer_id, account_id, client_id, email, status)
+            SELECT 'cus_bench' || c.id, c.account_id, c.id, c.email, 'active'
+            FROM bench_clients AS c
+            """
+        )
+
+    def _seed_payments(self, cursor, volumes):
+        cursor.execute(
+            """
+            INSERT INTO payments (
+                id, account_id, client_id, client_package_id, stripe_customer_id,
+                amount, paid_currency, company_currency_amount, exchange_rate,
+                native_account_currency, status, failure_reason, payment_date, updated_at
+            )
+            SELECT 'py_bench_' || s.g, c.account_id, c.id, c.client_package_id, 'cus_bench' || c.id,
+                   s.amount, 'gbp', s.amount, 1, 'gbp',
+                   (CASE
+                       WHEN s.r < 0.85 THEN 'paid'
+                       WHEN s.r < 0.93 THEN 'failed'
+                       WHEN s.r < 0.97 THEN 'refunded'
+                       WHEN s.r < 0.98 THEN 'disputed'
+                       ELSE 'incomplete'
+                    END)::payment_status,
+                   CASE WHEN s.r >= 0.85 AND s.r < 0.93 THEN 'card_declined' END,
+                   s.paid_at, s.paid_at
+            FROM (
+                SELECT g,
+                       random() AS r,
+                       round((50 + random() * 450)::numeric, 2) AS amount,
+                       now() - (random() * interval '730 days') AS paid_at,
+                       1 + floor(random() * %(clients)s)::bigint AS client_rn
+                FROM generate_series(1, %(payments)s) AS g
+            ) AS s
+            JOIN bench_clients AS c ON c.rn = s.client_rn
+            """,
+            {'clients': self._bench_client_count(cursor), 'payments': volumes['payments']}
+        )
+
+    def _seed_instalments(self, cursor):
+        cursor.execute(
+            """
+            INSERT INTO instalments (
+                account_id, client_id, client_package_id, invoice_id, stripe_customer_id,
+                amount, currency, status, instalment_number, schedule_date,
+                date_created, date_updated
+            )
+            SELECT c.account_id, c.id, c.client_package_id, 'in_bench_' || c.id || '_' || n,
+                   'cus_bench' || c.id, 150, 'gbp',
+                   (CASE WHEN n = 1 THEN 'paid' ELSE 'open' END)::instalment_status,
+                   n, current_date + (n - 1) * 30, now(), now()
+            FROM bench_clients AS c
+            CROSS JOIN generate_series(1, %s) AS n
+            """,
+            [INSTALMENTS_PER_CLIENT]
+        )
+
+    def _seed_submissions(self, cursor, volumes):
+        cursor.execute(
+            """
+            INSERT INTO check_in_submissions (id, form_id, client_id, account_id, submission_data, submitted_at)
+            SELECT gen_random_uuid(), f.id, c.id, c.account_id,
+                   jsonb_build_object(
+                       'weight', round((55 + random() * 50)::numeric, 1),
+                       'energy', 1 + floor(random() * 10)::int,
+                       'mood', (ARRAY['great','good','ok','bad'])[1 + floor(random() * 4)::int],
+                       'notes', 'Synthetic benchmark submission'
+                   ),
+                   now() - (random() * interval '365 days')
+            FROM (
+                SELECT g, 1 + floor(random() * %(clients)s)::bigint AS client_rn
+                FROM generate_series(1, %(submissions)s) AS g
+            ) AS s
+            JOIN bench_clients AS c ON c.rn = s.client_rn
+            JOIN bench_forms AS f ON f.account_id = c.account_id
+            """,
+            {'clients': self._bench_client_count(cursor), 'submissions': volumes['submissions']}
+        )
+
+    def _bench_client_count(self, cursor):
+        cursor.execute('SELECT count(*) FROM bench_clients')
+        return cursor.fetchone()[0]
@@ -0,0 +1,257 @@
+"""
+In-process request metrics.
+
+RequestMetricsMiddleware (api/middleware.py) records, for every request:
+
+- wall time
+- number of DB queries and time spent in them
+- time spent in outbound HTTP calls (URL shortener, n8n, webhook scheduler,
+  Stripe; all of them go through ``requests``)
+- response size
+
+keyed by DRF view and action (e.g. ``ClientViewSet``/``list``). Observations
+are kept in cumulative histograms in memory and exposed in the Prometheus text
+format at ``GET /api/internal/metrics/``. Rolling windows come from the
+scraper: ``rate(crm_http_request_duration_seconds_bucket[5m])`` and friends.
+
+Histograms are per worker process; each gunicorn worker reports its own
+numbers, which Prometheus aggregates with ``sum by (...)``.
+"""
+import contextvars
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUEST_LABELS = ('view', 'action', 'method')
+
+
+class Histogram:
+    """Cumulative histogram with one series per label set."""
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        for labels, series in sorted(self._series.items()):
+            label_str = _format_labels(self.labelnames, labels)
+            prefix = label_str + ',' if label_str else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{_format_value(bound)}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series[-1]}')
+            lines.append(f'{self.name}_sum{{{label_str}}} {_format_value(series[-2])}')
+            lines.append(f'{self.name}_count{{{label_str}}} {series[-1]}')
+        return lines
+
+
+class Counter:
+    """Monotonic counter with one series per label set."""
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._series = {}
+
+    def inc(self, labels, amount=1):
+        self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} counter',
+        ]
+        for labels, value in sorted(self._series.items()):
+            lines.append(f'{self.name}{{{_format_labels(self.labelnames, labels)}}} {_format_value(value)}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+_lock = threading.Lock()
+
+REQUESTS_TOTAL = Counter(
+    'crm_http_requests_total', 'Requests handled, by view, action, method and status.',
+    REQUEST_LABELS + ('status',),
+)
+REQUEST_DURATION = Histogram(
+    'crm_http_request_duration_seconds', 'Request wall time.',
+    REQUEST_LABELS, DURATION_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    'crm_http_request_db_queries', 'Database queries issued per request.',
+    REQUEST_LABELS, QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    'crm_http_request_db_duration_seconds', 'Time spent in database queries per request.',
+    REQUEST_LABELS, DURATION_BUCKETS,
+)
+REQUEST_OUTBOUND_DURATION = Histogram(
+    'crm_http_request_outbound_duration_seconds', 'Time spent in outbound HTTP calls per request.',
+    REQUEST_LABELS, DURATION_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    'crm_http_response_size_bytes', 'Response body size.',
+    REQUEST_LABELS, SIZE_BUCKETS,
+)
+OUTBOUND_DURATION = Histogram(
+    'crm_outbound_request_duration_seconds', 'Duration of individual outbound HTTP calls, by host.',
+    ('host',), DURATION_BUCKETS,
+)
+
+METRICS = (
+    REQUESTS_TOTAL, REQUEST_DURATION, REQUEST_DB_QUERIES, REQUEST_DB_DURATION,
+    REQUEST_OUTBOUND_DURATION, RESPONSE_SIZE, OUTBOUND_DURATION,
+)
+
+
+class RequestStats:
+    """Counters accumulated while a single request is being handled."""
+
+    __slots__ = ('db_queries', 'db_time', 'outbound_calls', 'outbound_time', 'queries')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.outbound_calls = 0
+        self.outbound_time = 0.0
+        self.queries = []  # (duration, sql), for the slow-request log
+
+    def top_queries(self, limit):
+        return sorted(self.queries, key=lambda query: query[0], reverse=True)[:limit]
+
+
+_current_stats = contextvars.ContextVar('crm_request_stats', default=None)
+
+
+def start_request():
+    """Begin collecting stats for the current request. Returns (stats, token)."""
+    stats = RequestStats()
+    return stats, _current_stats.set(stats)
+
+
+def end_request(token):
+    _current_stats.reset(token)
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    """connection.execute_wrapper() hook counting and timing queries."""
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        stats.db_queries += 1
+        stats.db_time += duration
+        stats.queries.append((duration, sql))
+
+
+def record_outbound(url, duration):
+    """Record one outbound HTTP call against the current request (if any)."""
+    host = urlsplit(url).hostname or 'unknown'
+    with _lock:
+        OUTBOUND_DURATION.observe((host,), duration)
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.outbound_calls += 1
+        stats.outbound_time += duration
+
+
+def observe_request(labels, status_code, duration, stats, response_size):
+    """Fold a finished request into the histograms."""
+    with _lock:
+        REQUESTS_TOTAL.inc(labels + (str(status_code),))
+        REQUEST_DURATION.observe(labels, duration)
+        REQUEST_DB_QUERIES.observe(labels, stats.db_queries)
+        REQUEST_DB_DURATION.observe(labels, stats.db_time)
+        REQUEST_OUTBOUND_DURATION.observe(labels, stats.outbound_time)
+        if response_size is not None:
+            RESPONSE_SIZE.observe(labels, response_size)
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for metric in METRICS:
+            lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """Drop every recorded observation (tests)."""
+    with _lock:
+        for metric in METRICS:
+            metric._series.clear()
+
+
+_outbound_hook_installed = False
+
+
+def install_outbound_hook():
+    """
+    Time every HTTP call made through ``requests`` (used by the URL shortener,
+    webhook scheduler and n8n clients, and by stripe-python). Called once from
+    ApiConfig.ready().
+    """
+    global _outbound_hook_installed
+    if _outbound_hook_installed:
+        return
+    try:
+        from requests.adapters import HTTPAdapter
+    except ImportError:
+        return
+
+    original_send = HTTPAdapter.send
+
+    def send(self, request, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original_send(self, request, *args, **kwargs)
+        finally:
+            record_outbound(request.url, time.perf_counter() - start)
+
+    HTTPAdapter.send = send
+    _outbound_hook_installed = True
@@ -0,0 +1,146 @@
+"""
+Request instrumentation and response compression middleware.
+
+See api/metrics.py for the metrics that are recorded and how they are exposed.
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:  # optional; responses are gzipped only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+re_accepts_br = _lazy_re_compile(r"\bbr\b")
+
+
+def _view_labels(view_func, method):
+    """(view, action) labels for a resolved view function."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return view_func.__name__, ''
+    # Function views wrapped by @api_view have cls == WrappedAPIView
+    view_name = view_func.__name__ if cls.__name__ == 'WrappedAPIView' else cls.__name__
+    actions = getattr(view_func, 'actions', None) or {}
+    return view_name, actions.get(method.lower(), '')
+
+
+class RequestMetricsMiddleware:
+    """
+    Record per-request wall time, DB queries/time, outbound HTTP time and
+    response size, keyed by DRF view and action, and log requests slower than
+    SLOW_REQUEST_THRESHOLD_MS together with their slowest queries.
+
+    Should be the first entry in MIDDLEWARE so timings cover the whole stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        request._metrics_labels = ('unmatched', '', request.method)
+        stats, token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.db_execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        duration = time.perf_counter() - start
+
+        if response.streaming:
+            response_size = None
+        else:
+            response_size = len(response.content)
+
+        labels = request._metrics_labels
+        metrics.observe_request(labels, response.status_code, duration, stats, response_size)
+
+        threshold_ms = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 1000)
+        if threshold_ms > 0 and duration * 1000 >= threshold_ms:
+            self.log_slow_request(request, response, labels, duration, stats, response_size)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, '_metrics_labels'):
+            view_name, action = _view_labels(view_func, request.method)
+            request._metrics_labels = (view_name, action, request.method)
+        return None
+
+    def log_slow_request(self, request, response, labels, duration, stats, response_size):
+        top_queries = getattr(settings, 'SLOW_REQUEST_TOP_QUERIES', 5)
+        logger.warning(json.dumps({
+            'event': 'slow_request',
+            'method': request.method,
+            'path': request.path,
+            'view': labels[0],
+            'action': labels[1],
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'db_queries': stats.db_queries,
+            'db_ms': round(stats.db_time * 1000, 1),
+            'outbound_calls': stats.outbound_calls,
+            'outbound_ms': round(stats.outbound_time * 1000, 1),
+            'response_bytes': response_size,
+            'top_queries': [
+                {'ms': round(query_time * 1000, 1), 'sql': sql[:1000]}
+                for query_time, sql in stats.top_queries(top_queries)
+            ],
+        }))
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress responses of at least RESPONSE_COMPRESSION_MIN_SIZE bytes.
+
+    Uses Brotli when the `brotli` package is installed and the client accepts
+    `br`, gzip otherwise (Django's GZipMiddleware, including its length
+    randomization). Streaming responses are always gzipped, chunk by chunk.
+    Place it right after RequestMetricsMiddleware, so every other middleware
+    sees the uncompressed body and the recorded response size is the
+    compressed one.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if response.streaming:
+            return super().process_response(request, response)
+        if len(response.content) < getattr(settings, 'RESPONSE_COMPRESSION_MIN_SIZE', 1024):
+            return response
+
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is None or not re_accepts_br.search(accept_encoding):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed_content = brotli.compress(
+            response.content, quality=getattr(settings, 'RESPONSE_BROTLI_QUALITY', 5)
+        )
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
@@ -1,8 +1,15 @@
 """
 Mixins for API ViewSets
 """
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from rest_framework.exceptions import ValidationError
-from .models import Account
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
+from .services import change_versions
+from .services.account_registry import account_exists, get_account
 
 
 class AccountResolutionMixin:
@@ -57,8 +64,8 @@ class AccountResolutionMixin:
                     'detail': 'X-Account-ID header is required for master token requests.'
                 })
             
-            # Validate account exists
-            if not Account.objects.filter(id=account_id).exists():
+            # Validate account exists (cached; see services/account_registry.py)
+            if not account_exists(account_id):
                 raise ValidationError({
                     'detail': f'Account with ID {account_id} does not exist.'
                 })
@@ -85,7 +92,7 @@ class AccountResolutionMixin:
         # Check if this is a master token request
         if getattr(user, 'is_master_token', False):
             account_id = self.get_resolved_account_id()
-            self._resolved_account = Account.objects.get(id=account_id)
+            self._resolved_account = get_account(account_id)
             return self._resolved_account
         
         # Regular user - use their account
@@ -101,3 +108,283 @@ class AccountResolutionMixin:
         self._resolved_account = None
         super().initial(request, *args, **kwargs)
 
+
+
+class SparseFieldsetMixin:
+    """
+    Mixin for ViewSets that lets list and retrieve requests pick their fields.
+
+        GET /api/clients/?fields=id,first_name,coach_name
+        GET /api/payments/?omit=account_name,failure_reason
+
+    The serializer is trimmed to the requested fields, and the queryset is
+    projected onto the columns those fields read:
+        - .only() with the column behind each field's source
+          (coach_name -> coach.name -> coach__name)
+        - select_related limited to the relations still needed
+        - prefetch_related lookups of dropped fields removed
+
+    Fields whose source is not a model field (SerializerMethodField, model
+    properties, get_FOO_display) list the fields they read in the
+    serializer's Meta.field_sources, in the same dotted notation as source:
+
+        class Meta:
+            field_sources = {'client_name': ('client.first_name', 'client.last_name')}
+
+    When a requested field's columns are unknown the queryset is left as it
+    is and only the response is trimmed. The primary key, the account and the
+    view's keyset_ordering columns are always loaded (object permissions and
+    cursor pagination read them). Unknown field names are a 400.
+    """
+
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+    sparse_fieldset_actions = ('list', 'retrieve')
+
+    def get_sparse_fieldset(self):
+        """
+        Names of the fields requested with ?fields= / ?omit=, in serializer
+        order, or None when the full representation is wanted.
+        """
+        if self.action not in self.sparse_fieldset_actions:
+            return None
+        if not hasattr(self, '_sparse_fieldset'):
+            self._sparse_fieldset = self._parse_sparse_fieldset()
+        return self._sparse_fieldset
+
+    def _parse_sparse_fieldset(self):
+        requested = _split_param(self.request.query_params.get(self.fields_query_param))
+        omitted = _split_param(self.request.query_params.get(self.omit_query_param))
+        if not requested and not omitted:
+            return None
+
+        readable = [
+            name for name, field in self._sparse_fieldset_serializer().fields.items()
+            if not field.write_only
+        ]
+        unknown = sorted((set(requested) | set(omitted)) - set(readable))
+        if unknown:
+            raise ValidationError({
+                'detail': f"Unknown fields: {', '.join(unknown)}. Available fields: {', '.join(readable)}"
+            })
+        return [
+            name for name in readable
+            if (not requested or name in requested) and name not in omitted
+        ]
+
+    def _sparse_fieldset_serializer(self):
+        serializer_class = self.get_serializer_class()
+        return serializer_class(context=self.get_serializer_context())
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is not None:
+            target = getattr(serializer, 'child', serializer)
+            for name in list(target.fields):
+                if name not in fieldset:
+                    target.fields.pop(name)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is None:
+            return queryset
+
+        serializer = self._sparse_fieldset_serializer()
+        field_sources = getattr(getattr(serializer, 'Meta', None), 'field_sources', {})
+        sources = []
+        for name in fieldset:
+            field = serializer.fields[name]
+            if name in field_sources:
+                sources.extend(field_sources[name])
+            elif field.source == '*' or isinstance(field, BaseSerializer):
+                # Reads the whole object (or a nested serializer): keep every column
+                return queryset
+            else:
+                sources.append(field.source)
+
+        model = queryset.model
+        required = [
+            name.lstrip('-') for name in getattr(self, 'keyset_ordering', None) or ()
+            if name.lstrip('-') != 'pk'
+        ]
+        if any(field.name == 'account' for field in model._meta.concrete_fields):
+            required.append('account')
+        return project_queryset(queryset, sources + required)
+
+
+def _split_param(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def _source_lookups(model, source):
+    """
+    (columns, select_related paths, prefetch lookups) read by a dotted
+    serializer source on ``model``, or None when the source is not a chain
+    of model fields.
+    """
+    columns, joins, prefetches = set(), set(), set()
+    path = []
+    attrs = source.split('.')
+    for position, attr in enumerate(attrs):
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        last = position == len(attrs) - 1
+
+        if field.many_to_many or field.one_to_many:
+            if path:
+                return None
+            # Served by prefetch_related, nothing to load on this row
+            prefetches.add(attr)
+            return columns, joins, prefetches
+        if not field.concrete:
+            # Reverse one-to-one
+            return None
+
+        path.append(field.name)
+        lookup = '__'.join(path)
+        columns.add(lookup)
+        if not last:
+            if not field.is_relation:
+                return None
+            joins.add(lookup)
+            model = field.related_model
+    return columns, joins, prefetches
+
+
+def project_queryset(queryset, sources):
+    """
+    Restrict ``queryset`` to the columns, select_related joins and prefetch
+    lookups read by ``sources`` (dotted serializer sources). Returns the
+    queryset unchanged when a source cannot be resolved to model fields.
+    """
+    columns, joins, prefetches = {queryset.model._meta.pk.name}, set(), set()
+    for source in sources:
+        lookups = _source_lookups(queryset.model, source)
+        if lookups is None:
+            return queryset
+        columns |= lookups[0]
+        joins |= lookups[1]
+        prefetches |= lookups[2]
+
+    kept_prefetches = [
+        lookup for lookup in queryset._prefetch_related_lookups
+        if getattr(lookup, 'prefetch_to', lookup).split('__')[0] in prefetches
+    ]
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if joins:
+        queryset = queryset.select_related(*sorted(joins))
+    if kept_prefetches:
+        queryset = queryset.prefetch_related(*kept_prefetches)
+    return queryset.only(*sorted(columns))
+
+
+class RowSerializerMixin:
+    """
+    Mixin for ViewSets whose list action can skip model instances.
+
+    With ``row_serializer_class`` set (see row_serializers.py), list reads
+    ``.values()`` rows for the filtered queryset and builds the response with
+    the row serializer, which mirrors the view's serializer_class. Works with
+    SparseFieldsetMixin (only the requested fields are selected) and with
+    cursor pagination (the keyset_ordering columns are selected as well).
+
+    Falls back to the regular serializer when the view uses another
+    serializer class for the request, or when API_ROW_SERIALIZERS is off.
+    """
+
+    row_serializer_class = None
+
+    def get_row_serializer(self):
+        row_serializer_class = self.row_serializer_class
+        if row_serializer_class is None or not getattr(settings, 'API_ROW_SERIALIZERS', True):
+            return None
+        if self.get_serializer_class() is not row_serializer_class.serializer_class:
+            return None
+        fieldset = self.get_sparse_fieldset() if hasattr(self, 'get_sparse_fieldset') else None
+        return row_serializer_class(fields=fieldset)
+
+    def list(self, request, *args, **kwargs):
+        row_serializer = self.get_row_serializer()
+        if row_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        lookups = list(row_serializer.lookups)
+        for name in getattr(self, 'keyset_ordering', None) or ():
+            if name.lstrip('-') not in lookups:
+                lookups.append(name.lstrip('-'))
+        rows = self.filter_queryset(self.get_queryset()).prefetch_related(None).values(*lookups)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(row_serializer.many(page))
+        return Response(row_serializer.many(rows))
+
+
+class ConditionalGetMixin:
+    """
+    Mixin for ViewSets with ETag / Last-Modified on list and retrieve.
+
+    The validators come from account_change_versions for the resources in
+    ``change_resources`` (see services/change_versions.py), not from the
+    response body, so a request with a matching If-None-Match (or
+    If-Modified-Since) gets 304 Not Modified after one primary-key lookup,
+    without running the list query or the serializer.
+
+    ``change_resources`` must name every resource the responses read; a
+    client shows its coach's name and its account's name:
+
+        class ClientViewSet(AccountResolutionMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+            change_resources = ('clients', 'employees', 'account')
+
+    The ETag also covers the full URL (filters, page, ?fields=), the caller
+    (assigned-only visibility) and the response format. Responses are marked
+    Cache-Control: private, no-cache so browsers revalidate instead of
+    reusing them unchecked.
+    """
+
+    change_resources = ()
+    conditional_get_actions = ('list', 'retrieve')
+
+    def get_change_validators(self):
+        """(etag, last_modified) for this request, or None without conditional GET."""
+        if not self.change_resources or self.action not in self.conditional_get_actions:
+            return None
+        user = self.request.user
+        caller = 'master' if getattr(user, 'is_master_token', False) else f'employee:{user.pk}'
+        return change_versions.get_validators(
+            self.get_resolved_account_id(),
+            self.change_resources,
+            key_parts=(
+                self.request.get_full_path(),
+                caller,
+                getattr(self.request, 'accepted_media_type', ''),
+            ),
+        )
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def _conditional_response(self, handler, request, *args, **kwargs):
+        validators = self.get_change_validators()
+        if validators is None:
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified = validators
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        if last_modified and not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(last_modified)
+        response.headers.setdefault('ETag', etag)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
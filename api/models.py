@@ -101,13 +101,10 @@ class MasterTokenUser:
     
     @property
     def account(self):
-        """Lazy load the account object"""
+        """Lazy load the account object from the account registry cache"""
         if self._account is None and self._account_id:
-            from api.models import Account
-            try:
-                self._account = Account.objects.get(id=self._account_id)
-            except Account.DoesNotExist:
-                self._account = None
+            from api.services.account_registry import get_account
+            self._account = get_account(self._account_id)
         return self._account
     
     @property
@@ -351,9 +348,10 @@ class Employee(AbstractBaseUser, PermissionsMixin):
         if self.role in ['super_admin', 'admin']:
             return self.get_role_display()
         
-        # Get custom roles - need to check if we're in a query context
+        # Get custom roles - need to check if we're in a query context.
+        # Filtered in Python so a prefetch_related('custom_roles') is reused.
         try:
-            custom_role_names = list(self.custom_roles.filter(is_active=True).values_list('name', flat=True))
+            custom_role_names = [role.name for role in self.custom_roles.all() if role.is_active]
             if custom_role_names:
                 return ', '.join(custom_role_names)
         except:
@@ -582,6 +580,7 @@ class Payment(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
     failure_reason = models.TextField(null=True, blank=True)
     payment_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
     class Meta:
         managed = False
@@ -795,3 +794,257 @@ class CheckInSubmission(models.Model):
 
     def __str__(self):
         return f"{self.client.first_name} - {self.form.title} ({self.submitted_at.strftime('%Y-%m-%d')})"
+
+
+class CheckInFormAnalyticsState(models.Model):
+    """Refresh watermark for a form's answer rollups"""
+    
+    form = models.OneToOneField(
+        CheckInForm,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        db_column='form_id',
+        related_name='analytics_state'
+    )
+    schema_hash = models.CharField(max_length=64, blank=True, default='')
+    last_submitted_at = models.DateTimeField(null=True, blank=True)
+    last_submission_id = models.UUIDField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = False
+        db_table = 'check_in_form_analytics_state'
+
+    def __str__(self):
+        return f"Analytics state for form {self.form_id} (through {self.last_submitted_at})"
+
+
+class CheckInAnswerRollup(models.Model):
+    """
+    Pre-aggregated check-in answers per form, client, week and field.
+    
+    Numeric fields have one row with option='' holding count/sum/sum of
+    squares/min/max. Choice fields have one row per selected option holding
+    its count.
+    """
+    
+    id = models.BigAutoField(primary_key=True)
+    form = models.ForeignKey(
+        CheckInForm,
+        on_delete=models.CASCADE,
+        db_column='form_id',
+        related_name='answer_rollups'
+    )
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, db_column='account_id')
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, db_column='client_id')
+    week_start = models.DateField()
+    field_id = models.TextField()
+    option = models.TextField(blank=True, default='')
+    answer_count = models.IntegerField(default=0)
+    value_sum = models.FloatField(default=0)
+    value_sum_sq = models.FloatField(default=0)
+    value_min = models.FloatField(null=True, blank=True)
+    value_max = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = False
+        db_table = 'check_in_answer_rollups'
+
+    def __str__(self):
+        return f"{self.form_id} {self.field_id} {self.week_start} client {self.client_id}"
+
+
+class AccountDailyRollup(models.Model):
+    """Per-account daily dashboard metrics (see refresh_dashboard_rollups)"""
+    
+    id = models.BigAutoField(primary_key=True)
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, db_column='account_id', related_name='daily_rollups')
+    day = models.DateField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid_payments = models.IntegerField(default=0)
+    failed_payments = models.IntegerField(default=0)
+    refunded_payments = models.IntegerField(default=0)
+    new_clients = models.IntegerField(default=0)
+    churned_clients = models.IntegerField(default=0)
+    submissions = models.IntegerField(default=0)
+    installments_due = models.IntegerField(default=0)
+    installments_due_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    active_clients = models.IntegerField(null=True, blank=True)
+    overdue_installments = models.IntegerField(null=True, blank=True)
+    overdue_amount = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = False
+        db_table = 'account_daily_rollups'
+        unique_together = [['account', 'day']]
+
+    def __str__(self):
+        return f"Rollup {self.account_id} {self.day}"
+
+
+class AccountRollupState(models.Model):
+    """Change watermarks for incremental dashboard rollup refresh"""
+    
+    account = models.OneToOneField(
+        Account,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        db_column='account_id',
+        related_name='rollup_state'
+    )
+    payments_watermark = models.DateTimeField(null=True, blank=True)
+    clients_watermark = models.DateTimeField(null=True, blank=True)
+    installments_watermark = models.DateTimeField(null=True, blank=True)
+    submissions_watermark = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = False
+        db_table = 'account_rollup_state'
+
+    def __str__(self):
+        return f"Rollup state for account {self.account_id}"
+
+
+class AccountRollupChange(models.Model):
+    """
+    A dashboard rollup day that a deleted or re-dated row was counted on.
+    Logged by database triggers; consumed by the rollup refresh.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    # No foreign key (rows are logged while an account's data is deleted)
+    account_id = models.IntegerField()
+    affected_at = models.DateTimeField(null=True, blank=True)
+    affected_day = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        managed = False
+        db_table = 'account_rollup_changes'
+
+    def __str__(self):
+        return f"Rollup change for account {self.account_id}"
+
+
+class AccountChangeVersion(models.Model):
+    """
+    Change counter per account and resource, bumped by database triggers
+    (see supabase/migrations/20261019180000_create_account_change_versions.sql).
+    List and detail ETags are derived from it (ConditionalGetMixin).
+    """
+    
+    account_id = models.IntegerField()
+    resource = models.CharField(max_length=50)
+    version = models.BigIntegerField(default=1)
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'account_change_versions'
+        unique_together = [['account_id', 'resource']]
+
+    def __str__(self):
+        return f"{self.resource} v{self.version} for account {self.account_id}"
+
+
+class ShortUrl(models.Model):
+    """
+    Short link served at https://<domain>/<short_code>.
+    
+    Shared with the standalone URL shortener service; rows are written either
+    by that service or by the native backend in api/utils/url_shortener.py.
+    """
+    
+    id = models.BigAutoField(primary_key=True)
+    short_code = models.TextField(null=True, blank=True)
+    original_url = models.TextField()
+    domain = models.TextField(null=True, blank=True)
+    title = models.TextField(blank=True, default='')
+    clicks = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        managed = False
+        db_table = 'short_urls'
+        unique_together = [['domain', 'short_code']]
+
+    def __str__(self):
+        return f"{self.domain}/{self.short_code}"
+
+    @property
+    def full_short_url(self):
+        return f"https://{self.domain}/{self.short_code}"
+
+
+class ClickAnalytics(models.Model):
+    """One click on a short link"""
+    
+    id = models.BigAutoField(primary_key=True)
+    short_url = models.ForeignKey(
+        ShortUrl,
+        on_delete=models.CASCADE,
+        db_column='short_url_id',
+        related_name='click_events'
+    )
+    clicked_at = models.DateTimeField()
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.TextField(blank=True, default='')
+    referer = models.CharField(max_length=2048, blank=True, default='')
+    country = models.CharField(max_length=2, blank=True, default='')
+    city = models.CharField(max_length=100, blank=True, default='')
+
+    class Meta:
+        managed = False
+        db_table = 'click_analytics'
+
+    def __str__(self):
+        return f"Click on {self.short_url_id} at {self.clicked_at}"
+
+
+class DomainProvisioningJob(models.Model):
+    """
+    Background provisioning of a custom forms or payment domain.
+    
+    Processed by `python manage.py process_domain_jobs` (see
+    api/services/domain_jobs.py); steps tracks cert, config and reload.
+    """
+    
+    DOMAIN_TYPE_CHOICES = [
+        ('forms', 'Forms'),
+        ('payment', 'Payment'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    STEPS = ('cert', 'config', 'reload')
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, db_column='account_id', related_name='domain_jobs')
+    domain = models.TextField()
+    domain_type = models.CharField(max_length=20, choices=DOMAIN_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    steps = models.JSONField(default=dict)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        managed = False
+        db_table = 'domain_provisioning_jobs'
+
+    def __str__(self):
+        return f"{self.domain_type} domain {self.domain} ({self.status})"
@@ -0,0 +1,282 @@
+"""
+Pagination classes for API ViewSets.
+
+Two modes are supported:
+
+- Page-number pagination (the default), DRF's ``PageNumberPagination``
+  with ``PAGE_SIZE`` rows per page, which returns ``count``/``next``/
+  ``previous``/``results`` and accepts ``?page=``.
+- Keyset (cursor) pagination, which seeks past the last row of the previous
+  page using the viewset's ``keyset_ordering`` instead of an ``OFFSET`` scan,
+  and skips the ``COUNT(*)`` query entirely. Cost per page is constant no
+  matter how deep the client scrolls.
+
+ViewSets opt in to keyset pagination by declaring a ``keyset_ordering`` tuple
+whose last element is a unique column (usually the primary key):
+
+    class PaymentViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
+        keyset_ordering = ('-payment_date', '-id')
+
+Clients then request ``?pagination=cursor`` for the first page and follow the
+opaque ``next`` URL (which carries ``?cursor=``) for subsequent pages.
+"""
+import base64
+import datetime
+import decimal
+import json
+import uuid
+from collections.abc import Mapping
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination over a compound ordering.
+
+    The cursor is an opaque base64 token holding the ordering values of the
+    last row on the current page. The next page is fetched with a
+    ``WHERE (a, b) < (x, y)``-style predicate (expanded into an OR-of-ANDs so
+    mixed directions work), so PostgreSQL can walk a matching composite index
+    directly instead of scanning and discarding ``OFFSET`` rows.
+
+    Any ``?ordering=`` parameter is ignored in this mode: the keyset ordering
+    must be stable and unique for cursors to be correct. Infinite-scroll
+    clients may pick their batch size with ``?page_size=`` (up to 500).
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, keyset_ordering=None):
+        # Explicit ordering for one-off use inside custom actions; otherwise
+        # the view's `keyset_ordering` attribute is used.
+        self.keyset_ordering = keyset_ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view, queryset)
+        self.next_position = None
+
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(
+                self.build_seek_filter(queryset.model, position)
+            )
+
+        # Fetch one extra row to find out whether there is a next page,
+        # instead of running a COUNT(*) over the whole result set.
+        rows = list(queryset[:self.page_size + 1])
+        page = rows[:self.page_size]
+
+        if len(rows) > self.page_size:
+            self.next_position = self.get_position_from_instance(page[-1])
+
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                    'format': 'uri',
+                },
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                value = int(request.query_params[self.page_size_query_param])
+                if value > 0:
+                    return min(value, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_ordering(self, view, queryset):
+        """
+        Return the keyset ordering for the view.
+
+        Falls back to descending primary key when neither the paginator nor
+        the view declares ``keyset_ordering``.
+        """
+        ordering = self.keyset_ordering or getattr(view, 'keyset_ordering', None)
+        if ordering:
+            return tuple(ordering)
+        return ('-pk',)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.next_position)
+        )
+
+    # ------------------------------------------------------------------
+    # Cursor encoding
+    # ------------------------------------------------------------------
+
+    def encode_cursor(self, position):
+        """
+        Encode a list of ordering values into an opaque URL-safe token.
+        """
+        payload = {
+            'o': list(self.ordering),
+            'v': [_encode_value(value) for value in position],
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        """
+        Decode the cursor from the request, returning the list of raw
+        ordering values or None when no cursor was supplied.
+
+        Raises:
+            NotFound: If the cursor is malformed or was issued for a
+                different ordering.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            ordering = payload['o']
+            values = payload['v']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if list(ordering) != list(self.ordering) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return values
+
+    # ------------------------------------------------------------------
+    # Seek predicate
+    # ------------------------------------------------------------------
+
+    def get_position_from_instance(self, instance):
+        # Model instance, or a .values() row (RowSerializerMixin)
+        if isinstance(instance, Mapping):
+            return [instance[item.lstrip('-')] for item in self.ordering]
+        position = []
+        for item in self.ordering:
+            name = item.lstrip('-')
+            if name == 'pk':
+                name = instance._meta.pk.attname
+            position.append(getattr(instance, name))
+        return position
+
+    def build_seek_filter(self, model, position):
+        """
+        Build the predicate selecting rows strictly after ``position``.
+
+        For an ordering ``(-a, -b)`` and position ``(x, y)`` this produces::
+
+            a <= x AND (a < x OR (a = x AND b < y))
+
+        The redundant leading range on the first column lets PostgreSQL use
+        it as an index bound rather than evaluating the OR as a filter.
+        """
+        fields = []
+        for item, raw_value in zip(self.ordering, position):
+            descending = item.startswith('-')
+            name = item.lstrip('-')
+            field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+            try:
+                value = field.to_python(raw_value)
+            except Exception:
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            fields.append((name, descending, value))
+
+        seek = Q()
+        equal_prefix = Q()
+        for name, descending, value in fields:
+            lookup = 'lt' if descending else 'gt'
+            seek |= equal_prefix & Q(**{f'{name}__{lookup}': value})
+            equal_prefix &= Q(**{name: value})
+
+        first_name, first_descending, first_value = fields[0]
+        bound = 'lte' if first_descending else 'gte'
+        return Q(**{f'{first_name}__{bound}': first_value}) & seek
+
+
+class DefaultPagination(BasePagination):
+    """
+    Project-wide default paginator.
+
+    Uses page-number pagination unless the view declares ``keyset_ordering``
+    and the request asks for cursor pagination (``?pagination=cursor``, or a
+    ``?cursor=`` token from a previous keyset page).
+    """
+    mode_query_param = 'pagination'
+    page_number_class = PageNumberPagination
+    keyset_class = KeysetPagination
+
+    def __init__(self):
+        self._delegate = None
+
+    def wants_keyset(self, request, view):
+        if not getattr(view, 'keyset_ordering', None):
+            return False
+        if request.query_params.get(self.keyset_class.cursor_query_param):
+            return True
+        return request.query_params.get(self.mode_query_param) == 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.wants_keyset(request, view):
+            self._delegate = self.keyset_class()
+        else:
+            self._delegate = self.page_number_class()
+        return self._delegate.paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        return self._delegate.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number_class().get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self._delegate.to_html() if self._delegate else ''
+
+    def get_results(self, data):
+        return self._delegate.get_results(data)
+
+    def get_schema_operation_parameters(self, view):
+        return self.page_number_class().get_schema_operation_parameters(view)
+
+
+def _encode_value(value):
+    """Convert an ordering value into a JSON-serialisable primitive."""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, decimal.Decimal)):
+        return str(value)
+    return value
@@ -0,0 +1,19 @@
+"""
+orjson-based JSON parser.
+
+Drop-in replacement for DRF's JSONParser (API_JSON_PARSER). Request bodies
+must be UTF-8, which is the only encoding JSON allows.
+"""
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser with orjson doing the decoding."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -1,5 +1,61 @@
 from rest_framework import permissions
 
+from .models import Account
+
+
+PERMISSION_FLAGS = (
+    'can_view_all_clients', 'can_manage_all_clients',
+    'can_view_all_payments', 'can_manage_all_payments',
+    'can_view_all_installments', 'can_manage_all_installments',
+)
+
+
+class PermissionContext:
+    """
+    Permission-relevant columns of the authenticated user, compiled once per
+    request. Built only from attributes already loaded on the user (role,
+    account_id, can_* flags), so evaluating permissions never queries the
+    database (e.g. no Account load just to prove the relation exists).
+    """
+
+    __slots__ = (
+        'user', 'is_authenticated', 'is_master_token', 'user_id', 'account_id',
+        'role', 'is_super_admin', 'is_admin',
+    ) + PERMISSION_FLAGS
+
+    def __init__(self, user):
+        self.user = user
+        self.is_authenticated = bool(user is not None and user.is_authenticated)
+        self.is_master_token = self.is_authenticated and getattr(user, 'is_master_token', False)
+        self.user_id = getattr(user, 'id', None) if self.is_authenticated else None
+        self.account_id = getattr(user, 'account_id', None) if self.is_authenticated else None
+
+        if self.is_master_token:
+            # Master token users have super_admin privileges and every flag
+            self.role = 'super_admin'
+            for flag in PERMISSION_FLAGS:
+                setattr(self, flag, True)
+        else:
+            self.role = getattr(user, 'role', None) if self.is_authenticated else None
+            for flag in PERMISSION_FLAGS:
+                setattr(self, flag, self.is_authenticated and bool(getattr(user, flag, False)))
+
+        self.is_super_admin = self.role == 'super_admin'
+        self.is_admin = self.role in ('super_admin', 'admin')
+
+
+def get_permission_context(request):
+    """
+    Get the compiled PermissionContext for a request, building it on first use.
+    Rebuilt if request.user changes (e.g. force_authenticate in tests).
+    """
+    user = request.user
+    context = getattr(request, '_permission_context', None)
+    if context is None or context.user is not user:
+        context = PermissionContext(user)
+        request._permission_context = context
+    return context
+
 
 def is_master_token_user(user):
     """Helper function to check if user is a MasterTokenUser"""
@@ -13,7 +69,22 @@ def get_resolved_account_id(request, view):
     """
     if hasattr(view, 'get_resolved_account_id'):
         return view.get_resolved_account_id()
-    return request.user.account_id
+    return get_permission_context(request).account_id
+
+
+def get_object_account_id(obj):
+    """
+    Account an object belongs to: its account_id, the Account itself, or the
+    account of its client (e.g. ClientPackage, whose querysets select the
+    client). None for objects that are not scoped to an account.
+    """
+    if hasattr(obj, 'account_id'):
+        return obj.account_id
+    if isinstance(obj, Account):
+        return obj.pk
+    if getattr(obj, 'client_id', None) is not None:
+        return obj.client.account_id
+    return None
 
 
 class IsAccountMember(permissions.BasePermission):
@@ -22,28 +93,28 @@ class IsAccountMember(permissions.BasePermission):
     Master token users are always allowed (they specify account via X-Account-ID header).
     """
     def has_permission(self, request, view):
-        if not request.user.is_authenticated:
+        context = get_permission_context(request)
+        if not context.is_authenticated:
             return False
         # Master token users are always allowed at permission level
         # Account validation is done in the mixin
-        if is_master_token_user(request.user):
+        if context.is_master_token:
             return True
-        return hasattr(request.user, 'account')
+        # account_id is a column on the user; no need to load the Account
+        return context.account_id is not None
 
     def has_object_permission(self, request, view, obj):
+        context = get_permission_context(request)
         # Master token users can access any object in the specified account
-        if is_master_token_user(request.user):
-            account_id = get_resolved_account_id(request, view)
-            if hasattr(obj, 'account_id'):
-                return obj.account_id == account_id
+        object_account_id = get_object_account_id(obj)
+        if context.is_master_token:
+            if object_account_id is not None:
+                return object_account_id == get_resolved_account_id(request, view)
             return True
-        
-        # Check if object has account_id
-        if hasattr(obj, 'account_id'):
-            return obj.account_id == request.user.account_id
-        # For Employee objects
-        if hasattr(obj, 'account'):
-            return obj.account_id == request.user.account_id
+
+        # Objects scoped to an account (including Employee and Account objects)
+        if object_account_id is not None:
+            return object_account_id == context.account_id
         return False
 
 
@@ -53,12 +124,8 @@ class IsSuperAdminOrAdmin(permissions.BasePermission):
     Master token users have super_admin privileges.
     """
     def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        # Master token users have super_admin privileges
-        if is_master_token_user(request.user):
-            return True
-        return request.user.is_admin
+        context = get_permission_context(request)
+        return context.is_authenticated and context.is_admin
 
 
 class IsSuperAdmin(permissions.BasePermission):
@@ -67,12 +134,8 @@ class IsSuperAdmin(permissions.BasePermission):
     Master token users have super_admin privileges.
     """
     def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        # Master token users have super_admin privileges
-        if is_master_token_user(request.user):
-            return True
-        return request.user.is_super_admin
+        context = get_permission_context(request)
+        return context.is_authenticated and context.is_super_admin
 
 
 class CanManageEmployees(permissions.BasePermission):
@@ -82,28 +145,25 @@ class CanManageEmployees(permissions.BasePermission):
     Master token users have full access.
     """
     def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        # Master token users can manage all employees
-        if is_master_token_user(request.user):
-            return True
-        return request.user.is_admin
+        context = get_permission_context(request)
+        return context.is_authenticated and context.is_admin
 
     def has_object_permission(self, request, view, obj):
+        context = get_permission_context(request)
         # Master token users can do anything
-        if is_master_token_user(request.user):
+        if context.is_master_token:
             return True
-        
+
         # Super Admin can do anything
-        if request.user.is_super_admin:
+        if context.is_super_admin:
             return True
-        
+
         # Admin cannot modify/delete Super Admin
-        if request.user.role == 'admin' and obj.is_super_admin:
+        if context.role == 'admin' and obj.is_super_admin:
             if view.action in ['update', 'partial_update', 'destroy']:
                 return False
-        
-        return request.user.account_id == obj.account_id
+
+        return context.account_id == obj.account_id
 
 
 class IsSelfOrAdmin(permissions.BasePermission):
@@ -112,16 +172,17 @@ class IsSelfOrAdmin(permissions.BasePermission):
     Master token users can update any employee.
     """
     def has_object_permission(self, request, view, obj):
+        context = get_permission_context(request)
         # Master token users can update any employee
-        if is_master_token_user(request.user):
+        if context.is_master_token:
             return True
-        
+
         # Admin/SuperAdmin can access anyone in their account
-        if request.user.is_admin:
-            return request.user.account_id == obj.account_id
-        
+        if context.is_admin:
+            return context.account_id == obj.account_id
+
         # Regular employees can only access themselves
-        return obj.id == request.user.id
+        return obj.id == context.user_id
 
 
 class CanViewClients(permissions.BasePermission):
@@ -129,23 +190,13 @@ class CanViewClients(permissions.BasePermission):
     Permission to view clients:
     - Master token: always allowed
     - Super admin: always allowed
-    - User with can_view_all_clients: always allowed  
+    - User with can_view_all_clients: always allowed
     - Otherwise: ViewSet filters to only assigned clients
     """
     def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        # Master token can view all
-        if is_master_token_user(request.user):
-            return True
-        # Super admin can view all
-        if request.user.is_super_admin:
-            return True
-        # User with explicit permission can view all
-        if getattr(request.user, 'can_view_all_clients', False):
-            return True
-        # Others can view but ViewSet will filter to assigned only
-        return True
+        # Everyone authenticated can view; the ViewSet filters to assigned
+        # clients unless the context grants can_view_all_clients
+        return get_permission_context(request).is_authenticated
 
 
 class CanManageClients(permissions.BasePermission):
@@ -157,36 +208,24 @@ class CanManageClients(permissions.BasePermission):
     - Otherwise: not allowed to create, can only update/delete assigned (checked in ViewSet)
     """
     def has_permission(self, request, view):
-        if not request.user.is_authenticated:
+        context = get_permission_context(request)
+        if not context.is_authenticated:
             return False
-        # Master token can manage all
-        if is_master_token_user(request.user):
-            return True
-        # Super admin can manage all
-        if request.user.is_super_admin:
-            return True
-        # User with explicit permission can manage all
-        if getattr(request.user, 'can_manage_all_clients', False):
+        if context.is_super_admin or context.can_manage_all_clients:
             return True
         # For create action, deny if no manage permission
         if view.action == 'create':
             return False
         # For update/delete, allow but ViewSet will check assignment
         return True
-    
+
     def has_object_permission(self, request, view, obj):
         """Check if user can modify this specific client"""
-        # Master token can manage all
-        if is_master_token_user(request.user):
-            return True
-        if request.user.is_super_admin:
-            return True
-        if getattr(request.user, 'can_manage_all_clients', False):
+        context = get_permission_context(request)
+        if context.is_super_admin or context.can_manage_all_clients:
             return True
         # Check if client is assigned to user
-        return (obj.coach_id == request.user.id or 
-                obj.closer_id == request.user.id or 
-                obj.setter_id == request.user.id)
+        return context.user_id in (obj.coach_id, obj.closer_id, obj.setter_id)
 
 
 class CanViewPayments(permissions.BasePermission):
@@ -198,16 +237,7 @@ class CanViewPayments(permissions.BasePermission):
     - Otherwise: ViewSet filters to payments for assigned clients only
     """
     def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        # Master token can view all
-        if is_master_token_user(request.user):
-            return True
-        if request.user.is_super_admin:
-            return True
-        if getattr(request.user, 'can_view_all_payments', False):
-            return True
-        return True
+        return get_permission_context(request).is_authenticated
 
 
 class CanManagePayments(permissions.BasePermission):
@@ -219,16 +249,8 @@ class CanManagePayments(permissions.BasePermission):
     - Otherwise: not allowed
     """
     def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        # Master token can manage all
-        if is_master_token_user(request.user):
-            return True
-        if request.user.is_super_admin:
-            return True
-        if getattr(request.user, 'can_manage_all_payments', False):
-            return True
-        return False
+        context = get_permission_context(request)
+        return context.is_authenticated and (context.is_super_admin or context.can_manage_all_payments)
 
 
 class CanViewInstallments(permissions.BasePermission):
@@ -240,16 +262,7 @@ class CanViewInstallments(permissions.BasePermission):
     - Otherwise: ViewSet filters to installments for assigned clients only
     """
     def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return False
-        # Master token can view all
-        if is_master_token_user(request.user):
-            return True
-        if request.user.is_super_admin:
-            return True
-        if getattr(request.user, 'can_view_all_installments', False):
-            return True
-        return True
+        return get_permission_context(request).is_authenticated
 
 
 class CanManageInstallments(permissions.BasePermission):
@@ -261,13 +274,23 @@ class CanManageInstallments(permissions.BasePermission):
     - Otherwise: not allowed
     """
     def has_permission(self, request, view):
-        if not request.user.is_authenticated:
+        context = get_permission_context(request)
+        return context.is_authenticated and (context.is_super_admin or context.can_manage_all_installments)
+
+
+class CanViewDashboard(permissions.BasePermission):
+    """
+    Permission to view the account-wide dashboard rollups:
+    - Master token: always allowed
+    - Super admin: always allowed
+    - User with both can_view_all_clients and can_view_all_payments: allowed
+    - Otherwise: denied (rollups are account-wide and cannot be filtered
+      to assigned clients)
+    """
+    def has_permission(self, request, view):
+        context = get_permission_context(request)
+        if not context.is_authenticated:
             return False
-        # Master token can manage all
-        if is_master_token_user(request.user):
-            return True
-        if request.user.is_super_admin:
+        if context.is_super_admin:
             return True
-        if getattr(request.user, 'can_manage_all_installments', False):
-            return True
-        return False
+        return context.can_view_all_clients and context.can_view_all_payments
@@ -0,0 +1,34 @@
+"""
+orjson-based JSON renderer.
+
+Drop-in replacement for DRF's JSONRenderer (API_JSON_RENDERER): dicts, lists,
+strings, numbers and UUIDs are encoded by orjson; everything else (datetimes,
+Decimals, lazy strings, querysets, generators) goes through DRF's own encoder
+fallback, so responses keep exactly the format JSONRenderer produces.
+"""
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Datetimes are passed to DRF's encoder so they keep its format (milliseconds, "Z")
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer with orjson doing the encoding."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        option = OPTIONS
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+        ret = orjson.dumps(data, default=_encoder.default, option=option)
+
+        # Like JSONRenderer, escape U+2028/U+2029 so the output is valid JavaScript
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,164 @@
+"""
+Row serializers
+
+Read-only fast path for hot list endpoints. A RowSerializer mirrors an
+existing ModelSerializer (``serializer_class``) field for field, but builds
+each response dict straight from a ``.values()`` row instead of running
+DRF's per-field get_attribute/to_representation machinery on a model
+instance.
+
+The mapping is compiled once per serializer and field selection:
+
+- model fields and ``source='relation.field'`` fields read one column of the
+  row; values whose DRF representation is the database value itself (strings,
+  integers, booleans, JSON, primary keys) are copied as is, everything else
+  (dates, datetimes, decimals, UUIDs, choices) goes through the serializer
+  field's own to_representation
+- a field read through a nullable relation is left out when the relation is
+  null, as DRF does for read-only fields
+- SerializerMethodFields are declared in ``computed_fields`` as
+  (lookups, function) and receive the looked-up values positionally
+
+Serializers with fields that cannot be mapped (nested serializers,
+many-to-many, undeclared method fields) raise ImproperlyConfigured when
+compiled. tests_row_serializers.py checks the output against the mirrored
+serializer.
+"""
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import fields as drf_fields, relations
+from rest_framework.fields import empty
+from rest_framework.serializers import BaseSerializer
+
+from .serializers import ClientSerializer, PaymentSerializer
+
+# Fields whose representation of a database value is the value itself
+PASSTHROUGH_FIELDS = (
+    drf_fields.CharField, drf_fields.IntegerField, drf_fields.BooleanField, drf_fields.JSONField,
+)
+
+_compiled = {}
+
+
+def full_name(first_name, last_name):
+    """Same as the serializers' get_client_name()."""
+    return f"{first_name} {last_name or ''}".strip()
+
+
+class RowSerializer:
+    """
+    Base class; subclasses set ``serializer_class`` and declare the
+    serializer's method fields in ``computed_fields``.
+    """
+
+    serializer_class = None
+    computed_fields = {}
+
+    def __init__(self, fields=None):
+        # ``fields``: names to include (serializer order), e.g. a sparse fieldset
+        self.mappers, self.lookups = self.compile(tuple(fields) if fields is not None else None)
+
+    @classmethod
+    def compile(cls, fields=None):
+        key = (cls, fields)
+        if key not in _compiled:
+            _compiled[key] = cls._compile(fields)
+        return _compiled[key]
+
+    @classmethod
+    def _compile(cls, fields):
+        serializer = cls.serializer_class()
+        model = serializer.Meta.model
+        mappers, lookups = [], []
+
+        def lookup(name):
+            if name not in lookups:
+                lookups.append(name)
+            return name
+
+        for name, field in serializer.fields.items():
+            if field.write_only or (fields is not None and name not in fields):
+                continue
+
+            if name in cls.computed_fields:
+                names, function = cls.computed_fields[name]
+                mappers.append((name, 'computed', tuple(lookup(n) for n in names), function, ()))
+                continue
+
+            if field.default is not empty:
+                raise ImproperlyConfigured(f"{cls.__name__}: field '{name}' has a default")
+            if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None:
+                convert = None
+            elif isinstance(field, (relations.RelatedField, relations.ManyRelatedField)):
+                raise ImproperlyConfigured(f"{cls.__name__}: related field '{name}' is not supported")
+            elif isinstance(field, PASSTHROUGH_FIELDS) and not getattr(field, 'binary', False):
+                convert = None
+            elif isinstance(field, BaseSerializer):
+                raise ImproperlyConfigured(f"{cls.__name__}: nested serializer '{name}' is not supported")
+            else:
+                convert = field.to_representation
+
+            key, guards = cls._resolve(model, name, field)
+            mappers.append((
+                name, 'value', lookup(key), convert, tuple(lookup(guard) for guard in guards)
+            ))
+        return tuple(mappers), tuple(lookups)
+
+    @classmethod
+    def _resolve(cls, model, name, field):
+        """
+        ``.values()`` lookup for a field's source, and the nullable relations
+        along the way (the field is omitted when one of them is null).
+        """
+        if field.source == '*':
+            raise ImproperlyConfigured(f"{cls.__name__}: field '{name}' needs an entry in computed_fields")
+        path, guards = [], []
+        attrs = field.source.split('.')
+        for position, attr in enumerate(attrs):
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f"{cls.__name__}: source '{field.source}' of field '{name}' is not a model field"
+                )
+            if not model_field.concrete or model_field.many_to_many:
+                raise ImproperlyConfigured(f"{cls.__name__}: field '{name}' reads a to-many relation")
+            path.append(attr)
+            if position < len(attrs) - 1:
+                if not model_field.is_relation:
+                    raise ImproperlyConfigured(
+                        f"{cls.__name__}: source '{field.source}' of field '{name}' is not a model field"
+                    )
+                if model_field.null:
+                    guards.append('__'.join(path))
+                model = model_field.related_model
+        return '__'.join(path), guards
+
+    def to_representation(self, row):
+        data = {}
+        for name, kind, key, convert, guards in self.mappers:
+            if kind == 'computed':
+                data[name] = convert(*[row[lookup] for lookup in key])
+                continue
+            if guards and any(row[guard] is None for guard in guards):
+                continue
+            value = row[key]
+            if value is None or convert is None:
+                data[name] = value
+            else:
+                data[name] = convert(value)
+        return data
+
+    def many(self, rows):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
+
+
+class ClientRowSerializer(RowSerializer):
+    serializer_class = ClientSerializer
+
+
+class PaymentRowSerializer(RowSerializer):
+    serializer_class = PaymentSerializer
+    computed_fields = {
+        'client_name': (('client__first_name', 'client__last_name'), full_name),
+    }
@@ -99,9 +99,15 @@ class EmployeeRoleSerializer(serializers.ModelSerializer):
             'color', 'is_active', 'employee_count', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'account', 'account_name', 'employee_count', 'created_at', 'updated_at']
+        # Columns read by computed fields, for ?fields= projection (see SparseFieldsetMixin)
+        field_sources = {'employee_count': ()}
     
     def get_employee_count(self, obj):
         """Return count of active employees with this role"""
+        # Annotated by EmployeeRoleViewSet.get_queryset() for list/detail
+        count = getattr(obj, 'active_employee_count', None)
+        if count is not None:
+            return count
         return obj.employees.filter(status='active').count()
     
     def validate_color(self, value):
@@ -143,17 +149,26 @@ class EmployeeSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'account', 'last_login', 'account_name', 'custom_role_names', 
                             'custom_role_colors', 'display_role']
+        field_sources = {
+            'custom_role_names': ('custom_roles',),
+            'custom_role_colors': ('custom_roles',),
+            'display_role': ('role', 'custom_roles'),
+        }
         extra_kwargs = {
             'password': {'write_only': True},
         }
     
     def get_custom_role_names(self, obj):
         """Return list of custom role names"""
-        return [role.name for role in obj.custom_roles.filter(is_active=True)]
+        return [role.name for role in self._active_custom_roles(obj)]
     
     def get_custom_role_colors(self, obj):
         """Return list of custom role colors"""
-        return [role.color for role in obj.custom_roles.filter(is_active=True)]
+        return [role.color for role in self._active_custom_roles(obj)]
+    
+    def _active_custom_roles(self, obj):
+        """Active roles, filtered in Python so prefetch_related('custom_roles') is used"""
+        return [role for role in obj.custom_roles.all() if role.is_active]
 
     def create(self, validated_data):
         password = validated_data.pop('password', None)
@@ -320,6 +335,52 @@ class ClientSerializer(serializers.ModelSerializer):
         return value
 
 
+class AccountEmployeeField(serializers.Field):
+    """
+    Employee primary key resolved against a pre-loaded mapping instead of a
+    per-value query. Expects context['employees'] = {id: Employee} holding the
+    request account's employees, which also enforces account membership.
+    """
+    default_error_messages = {
+        'does_not_exist': 'Employee "{pk_value}" does not belong to your account.',
+        'incorrect_type': 'Incorrect type. Expected pk value, received {data_type}.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        employee = self.context['employees'].get(pk)
+        if employee is None:
+            self.fail('does_not_exist', pk_value=pk)
+        return employee
+
+    def to_representation(self, value):
+        return value.pk
+
+
+class ClientBulkUpsertItemSerializer(ClientSerializer):
+    """
+    Validates one item of POST /api/clients/bulk-upsert/ without database
+    queries, so thousands of items can be validated per request.
+    """
+    coach = AccountEmployeeField(required=False, allow_null=True)
+    closer = AccountEmployeeField(required=False, allow_null=True)
+    setter = AccountEmployeeField(required=False, allow_null=True)
+
+    def validate_coach(self, value):
+        return value
+
+    def validate_closer(self, value):
+        return value
+
+    def validate_setter(self, value):
+        return value
+
+
 class PackageSerializer(serializers.ModelSerializer):
     account_name = serializers.CharField(source='account.name', read_only=True)
     
@@ -359,27 +420,34 @@ class PackageSerializer(serializers.ModelSerializer):
             'checkin_form', 'onboarding_form', 'reviews_form'
         ]
         read_only_fields = ['id', 'account', 'account_name', 'checkin_form', 'onboarding_form', 'reviews_form']
+        field_sources = {
+            'checkin_form': ('forms',),
+            'onboarding_form': ('forms',),
+            'reviews_form': ('forms',),
+        }
     
     def get_checkin_form(self, obj):
         """Get the checkin form linked to this package"""
-        form = obj.forms.filter(form_type='checkins').first()
-        if form:
-            return {'id': str(form.id), 'title': form.title}
-        return None
+        return self._linked_form(obj, 'checkins')
     
     def get_onboarding_form(self, obj):
         """Get the onboarding form linked to this package"""
-        form = obj.forms.filter(form_type='onboarding').first()
-        if form:
-            return {'id': str(form.id), 'title': form.title}
-        return None
+        return self._linked_form(obj, 'onboarding')
     
     def get_reviews_form(self, obj):
         """Get the reviews form linked to this package"""
-        form = obj.forms.filter(form_type='reviews').first()
-        if form:
-            return {'id': str(form.id), 'title': form.title}
-        return None
+        return self._linked_form(obj, 'reviews')
+    
+    def _linked_form(self, obj, form_type):
+        """
+        First linked form of a type, picked from obj.forms.all() so that
+        PackageViewSet's prefetch_related('forms') serves all three fields.
+        """
+        forms = [form for form in obj.forms.all() if form.form_type == form_type]
+        if not forms:
+            return None
+        form = min(forms, key=lambda form: str(form.pk))
+        return {'id': str(form.id), 'title': form.title}
     
     def validate_checkin_form_id(self, value):
         """Validate checkin form belongs to account and is correct type"""
@@ -498,11 +566,46 @@ class PaymentSerializer(serializers.ModelSerializer):
             'exchange_rate', 'native_account_currency', 'status', 'failure_reason', 'payment_date'
         ]
         read_only_fields = ['id', 'account', 'account_name', 'client_name']
+        field_sources = {'client_name': ('client.first_name', 'client.last_name')}
 
     def get_client_name(self, obj):
         return f"{obj.client.first_name} {obj.client.last_name or ''}".strip()
 
 
+class PaymentIngestItemSerializer(serializers.Serializer):
+    """
+    Validates one item of POST /api/payments/bulk-ingest/.
+
+    The client is given directly (client), or resolved by the view from
+    stripe_customer_id or client_email with set-based lookups, so this
+    serializer runs no queries.
+    """
+    id = serializers.CharField(max_length=255)
+    client = serializers.IntegerField(required=False, allow_null=True)
+    client_email = serializers.EmailField(required=False, allow_null=True)
+    stripe_customer_id = serializers.CharField(max_length=255, required=False, allow_null=True)
+    client_package = serializers.IntegerField(required=False, allow_null=True)
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    paid_currency = serializers.CharField(required=False, allow_null=True)
+    company_currency_amount = serializers.DecimalField(
+        max_digits=10, decimal_places=2, required=False, allow_null=True
+    )
+    exchange_rate = serializers.DecimalField(
+        max_digits=10, decimal_places=6, required=False, allow_null=True
+    )
+    native_account_currency = serializers.CharField(max_length=10, required=False, allow_null=True)
+    status = serializers.ChoiceField(choices=Payment.STATUS_CHOICES)
+    failure_reason = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    payment_date = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if not (attrs.get('client') or attrs.get('client_email') or attrs.get('stripe_customer_id')):
+            raise serializers.ValidationError(
+                'One of client, client_email or stripe_customer_id is required.'
+            )
+        return attrs
+
+
 class InstallmentSerializer(serializers.ModelSerializer):
     client_name = serializers.SerializerMethodField()
     account_name = serializers.CharField(source='account.name', read_only=True)
@@ -515,6 +618,7 @@ class InstallmentSerializer(serializers.ModelSerializer):
             'status', 'instalment_number', 'schedule_date', 'date_created', 'date_updated'
         ]
         read_only_fields = ['id', 'account', 'account_name', 'client_name', 'date_created', 'date_updated']
+        field_sources = {'client_name': ('client.first_name', 'client.last_name')}
 
     def get_client_name(self, obj):
         return f"{obj.client.first_name} {obj.client.last_name or ''}".strip()
@@ -531,6 +635,7 @@ class StripeCustomerSerializer(serializers.ModelSerializer):
             'client', 'client_name', 'email', 'status'
         ]
         read_only_fields = ['stripe_customer_id', 'account', 'stripe_account_name', 'client_name']
+        field_sources = {'client_name': ('client.first_name', 'client.last_name')}
 
     def get_client_name(self, obj):
         return f"{obj.client.first_name} {obj.client.last_name or ''}".strip()
@@ -638,6 +743,11 @@ class CheckInFormSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'account', 'account_name', 'package_names', 
                            'form_type_display', 'schedule', 'submission_count', 
                            'created_at', 'updated_at']
+        field_sources = {
+            'package_names': ('packages',),
+            'submission_count': (),
+            'form_type_display': ('form_type',),
+        }
     
     def get_package_names(self, obj):
         """Return list of package names or empty list if unassigned"""
@@ -645,6 +755,10 @@ class CheckInFormSerializer(serializers.ModelSerializer):
     
     def get_submission_count(self, obj):
         """Return total number of submissions for this form"""
+        # Annotated by CheckInFormViewSet.get_queryset() for list/detail
+        count = getattr(obj, 'submission_total', None)
+        if count is not None:
+            return count
         return obj.submissions.count()
     
     def validate_packages(self, value):
@@ -790,6 +904,7 @@ class CheckInSubmissionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'form_title', 'client_name', 'client_email', 
                            'account', 'submitted_at']
+        field_sources = {'client_name': ('client.first_name', 'client.last_name')}
     
     def get_client_name(self, obj):
         return f"{obj.client.first_name} {obj.client.last_name or ''}".strip()
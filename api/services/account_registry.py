@@ -0,0 +1,155 @@
+"""
+Account Registry
+
+Process-wide cache of the account columns read on hot request paths (name,
+timezone, currency, custom forms/payment domain flags), keyed by account id.
+
+Master-token traffic (n8n) resolves its X-Account-ID on every request; with
+the registry that costs one query per account per TTL instead of two per
+request. Entries are dropped on Account save/delete in this process and expire
+after ACCOUNT_REGISTRY_TTL seconds, which bounds staleness in other worker
+processes.
+
+Two views of a cached account are available:
+- get_account_snapshot(): a read-only AccountSnapshot
+- get_account(): a fresh Account instance with only the cached columns loaded
+  (other columns are deferred and load on access; save() writes only the
+  loaded columns unless update_fields is given)
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from api.models import Account
+
+logger = logging.getLogger(__name__)
+
+# In Account field order, as required by Model.from_db()
+SNAPSHOT_FIELDS = [
+    field.attname for field in Account._meta.concrete_fields
+    if field.attname in {
+        'id', 'name', 'timezone', 'company_currency',
+        'forms_domain', 'forms_domain_verified', 'forms_domain_configured', 'forms_domain_added_at',
+        'payment_domain', 'payment_domain_verified', 'payment_domain_configured',
+    }
+]
+
+_lock = threading.Lock()
+_entries = {}  # account id -> (values tuple, expires_at)
+
+
+class AccountSnapshot:
+    """Read-only copy of an account's cached columns."""
+
+    __slots__ = tuple(SNAPSHOT_FIELDS)
+
+    def __init__(self, values):
+        for name, value in zip(SNAPSHOT_FIELDS, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('AccountSnapshot is read-only; use get_account() to modify an account')
+
+    def __repr__(self):
+        return f"AccountSnapshot(id={self.id}, name={self.name!r})"
+
+
+def _ttl():
+    return getattr(settings, 'ACCOUNT_REGISTRY_TTL', 300)
+
+
+def _get_values(account_id):
+    """Cached column values for an account, loading them on a miss."""
+    if account_id is None:
+        return None
+    try:
+        account_id = int(account_id)
+    except (TypeError, ValueError):
+        return None
+
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(account_id)
+    if entry is not None and entry[1] > now:
+        return entry[0]
+
+    values = Account.objects.filter(id=account_id).values_list(*SNAPSHOT_FIELDS).first()
+    if values is None:
+        # Missing accounts are not cached so a newly created one resolves at once
+        invalidate_account(account_id)
+        return None
+
+    ttl = _ttl()
+    if ttl > 0:
+        with _lock:
+            _entries[account_id] = (values, now + ttl)
+    return values
+
+
+def get_account_snapshot(account_id):
+    """
+    Get the cached read-only snapshot of an account.
+
+    Args:
+        account_id (int): Account id
+
+    Returns:
+        AccountSnapshot or None if the account does not exist
+    """
+    values = _get_values(account_id)
+    return AccountSnapshot(values) if values is not None else None
+
+
+def get_account(account_id):
+    """
+    Get an Account instance built from the cache.
+
+    A new instance is returned on every call, so callers may modify it freely.
+    Only SNAPSHOT_FIELDS are loaded; prefer save(update_fields=[...]) when
+    writing.
+
+    Args:
+        account_id (int): Account id
+
+    Returns:
+        Account or None if the account does not exist
+    """
+    values = _get_values(account_id)
+    if values is None:
+        return None
+    return Account.from_db('default', SNAPSHOT_FIELDS, values)
+
+
+def account_exists(account_id):
+    """Whether an account exists (cached)."""
+    return _get_values(account_id) is not None
+
+
+def invalidate_account(account_id):
+    """Drop one account from the cache."""
+    with _lock:
+        _entries.pop(account_id, None)
+
+
+def clear():
+    """Drop every cached account (tests)."""
+    with _lock:
+        _entries.clear()
+
+
+def _account_changed(sender, instance, **kwargs):
+    invalidate_account(instance.pk)
+    # Also drop it after commit, in case a concurrent request re-cached the
+    # pre-commit row in the meantime
+    transaction.on_commit(lambda: invalidate_account(instance.pk))
+
+
+def connect_signals():
+    """Invalidate cached accounts on save/delete. Called from ApiConfig.ready()."""
+    post_save.connect(_account_changed, sender=Account, dispatch_uid='account_registry_save')
+    post_delete.connect(_account_changed, sender=Account, dispatch_uid='account_registry_delete')
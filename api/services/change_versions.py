@@ -0,0 +1,53 @@
+"""
+Account Change Versions
+
+Validators for conditional GET. Database triggers bump a counter in
+account_change_versions for every statement that changes an account's
+clients, employees, roles, packages or forms (see
+supabase/migrations/20261019180000_create_account_change_versions.sql), so
+"has anything this response reads changed?" is one primary-key lookup
+instead of the list query.
+
+ETags combine those versions with whatever else shapes the response (URL,
+caller, format) and are keyed with SECRET_KEY, so they cannot be forged for a
+resource the caller has not been sent.
+"""
+
+from calendar import timegm
+
+from django.utils.crypto import salted_hmac
+
+from api.models import AccountChangeVersion
+
+ETAG_SALT = 'api.conditional_get'
+
+
+def get_versions(account_id, resources):
+    """
+    {resource: (version, changed_at)} for ``resources``; a resource that has
+    never changed since the triggers were installed is missing.
+    """
+    rows = AccountChangeVersion.objects.filter(
+        account_id=account_id, resource__in=resources
+    ).values_list('resource', 'version', 'changed_at')
+    return {resource: (version, changed_at) for resource, version, changed_at in rows}
+
+
+def get_validators(account_id, resources, key_parts=()):
+    """
+    (etag, last_modified) for a response reading ``resources`` of an
+    account. ``key_parts`` are the other inputs of the response.
+
+    etag is quoted, ready for the ETag header; last_modified is a Unix
+    timestamp, or None unless every resource has a change recorded.
+    """
+    versions = get_versions(account_id, resources)
+    parts = [str(account_id)]
+    parts.extend(f"{resource}:{versions.get(resource, (0, None))[0]}" for resource in sorted(resources))
+    parts.extend(str(part) for part in key_parts)
+    etag = '"%s"' % salted_hmac(ETAG_SALT, '\n'.join(parts), algorithm='sha256').hexdigest()[:32]
+
+    last_modified = None
+    if resources and len(versions) == len(set(resources)):
+        last_modified = timegm(max(changed_at for _, changed_at in versions.values()).utctimetuple())
+    return etag, last_modified
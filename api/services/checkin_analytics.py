@@ -0,0 +1,519 @@
+"""
+Check-In Analytics Service
+
+Aggregates check-in answers (weight, adherence scores, mood, ...) per form,
+week and client, using the form's FormBuilder schema to decide how each field
+is aggregated:
+
+- numeric fields ("number"): count, mean, min, max, standard deviation
+- choice fields ("select", "radio", "checkbox"): count per option
+
+Aggregates are kept in the check_in_answer_rollups table and refreshed
+incrementally by the refresh_checkin_analytics command (run from cron): each
+refresh reads only submissions newer than the form's (submitted_at, id)
+watermark, extracts just the analysed answer keys in SQL, and folds them into
+the rollups with an additive upsert. Editing or deleting a submission
+recomputes only the client-weeks it was and is in; changing the form's fields
+or the account's timezone makes the next refresh rebuild the form's rollups.
+
+Reads never refresh: get_form_analytics() combines the rollups with the
+submissions not folded in yet, so it takes no locks and writes nothing.
+"""
+
+import hashlib
+import json
+import logging
+import math
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db import connection, transaction
+from django.db.models import DateField, Max, Min, Q, Sum
+from django.db.models.fields.json import KeyTransform
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from api.models import (
+    CheckInAnswerRollup, CheckInFormAnalyticsState, CheckInSubmission
+)
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_FIELD_TYPES = {'number'}
+CHOICE_FIELD_TYPES = {'select', 'radio', 'checkbox'}
+
+# Submissions younger than this are not folded into the rollups yet (they are
+# aggregated live instead), so rows from transactions that commit slightly out
+# of submitted_at order are never skipped by the watermark.
+SETTLE_SECONDS = 60
+
+REFRESH_CHUNK_SIZE = 2000
+
+
+# =============================================================================
+# Schema helpers
+# =============================================================================
+
+
+def get_analyzable_fields(form_schema):
+    """
+    Extract the fields that can be aggregated from a FormBuilder schema.
+
+    Args:
+        form_schema (dict): CheckInForm.form_schema ({"fields": [...]})
+
+    Returns:
+        list: Dicts with id, label, type and kind ('numeric' or 'choice')
+    """
+    fields = []
+    for field in (form_schema or {}).get('fields', []) or []:
+        if not isinstance(field, dict) or not field.get('id'):
+            continue
+        field_type = field.get('type')
+        if field_type in NUMERIC_FIELD_TYPES:
+            kind = 'numeric'
+        elif field_type in CHOICE_FIELD_TYPES:
+            kind = 'choice'
+        else:
+            continue
+        fields.append({
+            'id': str(field['id']),
+            'label': field.get('label') or str(field['id']),
+            'type': field_type,
+            'kind': kind,
+        })
+    return fields
+
+
+def _schema_hash(fields, tz):
+    """Identifies what the rollups were built for: the analysed fields and the week boundaries."""
+    payload = json.dumps([str(tz), [(f['id'], f['kind']) for f in fields]])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _account_timezone(form):
+    try:
+        return ZoneInfo(form.account.timezone or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo('UTC')
+
+
+def _week_start(submitted_at, tz):
+    """Local Monday of a submission's week, matching TruncWeek in _answer_rows()."""
+    local_date = submitted_at.astimezone(tz).date()
+    return local_date - timedelta(days=local_date.weekday())
+
+
+# =============================================================================
+# Accumulation
+# =============================================================================
+
+
+def _to_number(value):
+    """Coerce an answer to float, or None if it is not numeric."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    else:
+        try:
+            number = float(str(value).strip())
+        except ValueError:
+            return None
+    return number if math.isfinite(number) else None
+
+
+def _to_options(value):
+    """Normalise a choice answer to a list of option strings."""
+    if value is None or value == '':
+        return []
+    if isinstance(value, list):
+        return [str(item) for item in value if item is not None and item != '']
+    if isinstance(value, bool):
+        return ['true' if value else 'false']
+    return [str(value)]
+
+
+def _accumulate(buckets, rows, fields):
+    """
+    Fold submission rows into in-memory buckets.
+
+    Args:
+        buckets (dict): (client_id, week_start, field_id, option) -> [count, sum, sum_sq, min, max]
+        rows: Iterable of dicts with client_id, week_start and answer_<n> keys
+        fields (list): Output of get_analyzable_fields()
+    """
+    for row in rows:
+        for index, field in enumerate(fields):
+            value = row[f'answer_{index}']
+            base = (row['client_id'], row['week_start'], field['id'])
+            if field['kind'] == 'numeric':
+                number = _to_number(value)
+                if number is None:
+                    continue
+                bucket = buckets.get(base + ('',))
+                if bucket is None:
+                    buckets[base + ('',)] = [1, number, number * number, number, number]
+                else:
+                    bucket[0] += 1
+                    bucket[1] += number
+                    bucket[2] += number * number
+                    bucket[3] = min(bucket[3], number)
+                    bucket[4] = max(bucket[4], number)
+            else:
+                for option in _to_options(value):
+                    key = base + (option,)
+                    bucket = buckets.get(key)
+                    if bucket is None:
+                        buckets[key] = [1, 0.0, 0.0, None, None]
+                    else:
+                        bucket[0] += 1
+
+
+def _answer_rows(submissions, fields, tz):
+    """
+    Project submissions to (client_id, week_start, answer_<n>...) rows.
+
+    Only the analysed keys are extracted from submission_data, in SQL, so the
+    rest of each JSON blob is never transferred.
+    """
+    answers = {
+        f'answer_{index}': KeyTransform(field['id'], 'submission_data')
+        for index, field in enumerate(fields)
+    }
+    return submissions.annotate(
+        week_start=TruncWeek('submitted_at', output_field=DateField(), tzinfo=tz),
+    ).values('id', 'client_id', 'submitted_at', 'week_start', **answers)
+
+
+# =============================================================================
+# Refresh
+# =============================================================================
+
+
+_UPSERT_SQL = """
+    INSERT INTO check_in_answer_rollups
+        (form_id, account_id, client_id, week_start, field_id, option,
+         answer_count, value_sum, value_sum_sq, value_min, value_max, updated_at)
+    VALUES %s
+    ON CONFLICT (form_id, client_id, week_start, field_id, option) DO UPDATE SET
+        answer_count = check_in_answer_rollups.answer_count + EXCLUDED.answer_count,
+        value_sum = check_in_answer_rollups.value_sum + EXCLUDED.value_sum,
+        value_sum_sq = check_in_answer_rollups.value_sum_sq + EXCLUDED.value_sum_sq,
+        value_min = LEAST(check_in_answer_rollups.value_min, EXCLUDED.value_min),
+        value_max = GREATEST(check_in_answer_rollups.value_max, EXCLUDED.value_max),
+        updated_at = EXCLUDED.updated_at
+"""
+
+
+def _flush_buckets(form, buckets):
+    """Additively upsert accumulated buckets into check_in_answer_rollups."""
+    if not buckets:
+        return
+    from psycopg2.extras import execute_values
+
+    now = timezone.now()
+    values = [
+        (str(form.id), form.account_id, client_id, week_start, field_id, option,
+         acc[0], acc[1], acc[2], acc[3], acc[4], now)
+        for (client_id, week_start, field_id, option), acc in buckets.items()
+    ]
+    with connection.cursor() as cursor:
+        execute_values(cursor.cursor, _UPSERT_SQL, values, page_size=1000)
+
+
+def refresh_form_analytics(form):
+    """
+    Fold submissions newer than the form's watermark into its rollups.
+
+    Safe to call concurrently: the form's state row is locked for the
+    duration of the refresh.
+
+    Args:
+        form: CheckInForm instance
+
+    Returns:
+        int: Number of submissions processed
+    """
+    fields = get_analyzable_fields(form.form_schema)
+    tz = _account_timezone(form)
+    schema_hash = _schema_hash(fields, tz)
+    boundary = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+
+    with transaction.atomic():
+        CheckInFormAnalyticsState.objects.get_or_create(form_id=form.id)
+        state = CheckInFormAnalyticsState.objects.select_for_update().get(form_id=form.id)
+
+        if state.schema_hash != schema_hash:
+            # Analysed fields or timezone changed: rebuild from scratch
+            CheckInAnswerRollup.objects.filter(form_id=form.id).delete()
+            state.schema_hash = schema_hash
+            state.last_submitted_at = None
+            state.last_submission_id = None
+
+        if not fields:
+            state.save()
+            return 0
+
+        submissions = CheckInSubmission.objects.filter(
+            form_id=form.id,
+            submitted_at__lte=boundary,
+        )
+        if state.last_submitted_at is not None:
+            submissions = submissions.filter(
+                Q(submitted_at__gt=state.last_submitted_at) |
+                Q(submitted_at=state.last_submitted_at, id__gt=state.last_submission_id)
+            )
+        rows = _answer_rows(submissions, fields, tz).order_by('submitted_at', 'id')
+
+        processed = 0
+        buckets = {}
+        last_row = None
+        for row in rows.iterator(chunk_size=REFRESH_CHUNK_SIZE):
+            _accumulate(buckets, [row], fields)
+            last_row = row
+            processed += 1
+            if len(buckets) >= REFRESH_CHUNK_SIZE:
+                _flush_buckets(form, buckets)
+                buckets = {}
+        _flush_buckets(form, buckets)
+
+        if last_row is not None:
+            state.last_submitted_at = last_row['submitted_at']
+            state.last_submission_id = last_row['id']
+        state.save()
+
+    if processed:
+        logger.info(f"Folded {processed} submissions into analytics rollups for form {form.id}")
+    return processed
+
+
+def invalidate_form_analytics(form_id):
+    """
+    Drop a form's rollups so the next refresh rebuilds them
+    (refresh_checkin_analytics --rebuild).
+    """
+    with transaction.atomic():
+        CheckInAnswerRollup.objects.filter(form_id=form_id).delete()
+        CheckInFormAnalyticsState.objects.filter(form_id=form_id).delete()
+
+
+def recompute_submission_buckets(form, buckets):
+    """
+    Recompute the rollups a submission edit or delete touched.
+
+    Only the affected client-weeks are rebuilt, from the submissions the
+    rollups already cover; the rest of the form's rollups stay as they are.
+    Nothing is done while the form has no rollups or they were built for
+    other fields or another timezone (the next refresh rebuilds them).
+
+    Args:
+        form: CheckInForm instance
+        buckets (list): (client_id, submitted_at) of the submission before
+            and after the change
+
+    Returns:
+        int: Number of client-weeks recomputed
+    """
+    fields = get_analyzable_fields(form.form_schema)
+    tz = _account_timezone(form)
+    weeks = {
+        (client_id, _week_start(submitted_at, tz))
+        for client_id, submitted_at in buckets if submitted_at is not None
+    }
+
+    with transaction.atomic():
+        # Serialised with refresh_form_analytics() on the state row
+        state = CheckInFormAnalyticsState.objects.select_for_update().filter(form_id=form.id).first()
+        covered = _watermark(state, _schema_hash(fields, tz))
+        if not fields or not weeks or covered is None or covered[0] is None:
+            return 0
+
+        last_submitted_at, last_submission_id = covered
+        folded = CheckInSubmission.objects.filter(form_id=form.id).filter(
+            Q(submitted_at__lt=last_submitted_at) |
+            Q(submitted_at=last_submitted_at, id__lte=last_submission_id)
+        )
+        for client_id, week_start in weeks:
+            CheckInAnswerRollup.objects.filter(
+                form_id=form.id, client_id=client_id, week_start=week_start
+            ).delete()
+            start = datetime.combine(week_start, time.min, tzinfo=tz)
+            end = datetime.combine(week_start + timedelta(days=7), time.min, tzinfo=tz)
+            rows = _answer_rows(
+                folded.filter(client_id=client_id, submitted_at__gte=start, submitted_at__lt=end),
+                fields, tz,
+            )
+            buckets_for_week = {}
+            _accumulate(buckets_for_week, rows, fields)
+            _flush_buckets(form, buckets_for_week)
+
+    logger.info(f"Recomputed {len(weeks)} analytics client-weeks for form {form.id}")
+    return len(weeks)
+
+
+# =============================================================================
+# Read
+# =============================================================================
+
+
+def _read_state(form_id):
+    return CheckInFormAnalyticsState.objects.filter(form_id=form_id).first()
+
+
+def _watermark(state, schema_hash):
+    """What the rollups cover: None when they are missing or built for other fields."""
+    if state is None or state.schema_hash != schema_hash:
+        return None
+    return (state.last_submitted_at, state.last_submission_id)
+
+
+def _summarise(field, stats):
+    """Turn merged accumulators into the API representation for one field."""
+    if field['kind'] == 'numeric':
+        count, total, total_sq, low, high = stats.get('', [0, 0.0, 0.0, None, None])
+        if not count:
+            return {'count': 0, 'mean': None, 'min': None, 'max': None, 'stddev': None}
+        mean = total / count
+        variance = max(total_sq / count - mean * mean, 0.0)
+        return {
+            'count': count,
+            'mean': round(mean, 4),
+            'min': low,
+            'max': high,
+            'stddev': round(math.sqrt(variance), 4),
+        }
+    options = {option: acc[0] for option, acc in stats.items() if option}
+    return {
+        'count': sum(options.values()),
+        'options': dict(sorted(options.items(), key=lambda item: -item[1])),
+    }
+
+
+def _merge(target, key, count, total, total_sq, low, high):
+    acc = target.get(key)
+    if acc is None:
+        target[key] = [count, total, total_sq, low, high]
+        return
+    acc[0] += count
+    acc[1] += total
+    acc[2] += total_sq
+    if low is not None:
+        acc[3] = low if acc[3] is None else min(acc[3], low)
+    if high is not None:
+        acc[4] = high if acc[4] is None else max(acc[4], high)
+
+
+def get_form_analytics(form, group_by='week', restrict=None, client_id=None,
+                       since=None, until=None):
+    """
+    Return aggregated answers for a form.
+
+    Reads the rollups with one grouped query and merges in the submissions
+    past the watermark, which the next refresh has not folded in yet.
+    Read-only: when the rollups were built for other analysed fields or
+    another timezone (changed since the last refresh) they are ignored and
+    every submission is aggregated live.
+
+    Args:
+        form: CheckInForm instance
+        group_by (str): 'week', 'client' or 'client_week'
+        restrict (callable): Optional function applied to both the rollup and
+            submission querysets (e.g. assigned-client visibility filtering)
+        client_id (int): Optional single client to report on
+        since (date): Optional first week_start to include
+        until (date): Optional last week_start to include
+
+    Returns:
+        dict: {'fields': [...], 'group_by': ..., 'refreshed_through': ..., 'results': [...]}
+    """
+    fields = get_analyzable_fields(form.form_schema)
+    if not fields:
+        return {'fields': [], 'group_by': group_by, 'refreshed_through': None, 'results': []}
+
+    tz = _account_timezone(form)
+    schema_hash = _schema_hash(fields, tz)
+
+    group_columns = {
+        'week': ['week_start'],
+        'client': ['client_id'],
+        'client_week': ['client_id', 'week_start'],
+    }[group_by]
+
+    rollups = CheckInAnswerRollup.objects.filter(form_id=form.id)
+    tail = CheckInSubmission.objects.filter(form_id=form.id)
+    if client_id is not None:
+        rollups = rollups.filter(client_id=client_id)
+        tail = tail.filter(client_id=client_id)
+    if restrict is not None:
+        rollups = restrict(rollups)
+        tail = restrict(tail)
+    if since is not None:
+        rollups = rollups.filter(week_start__gte=since)
+    if until is not None:
+        rollups = rollups.filter(week_start__lte=until)
+    aggregated = rollups.values(*group_columns, 'field_id', 'option').annotate(
+        total_count=Sum('answer_count'),
+        total_sum=Sum('value_sum'),
+        total_sum_sq=Sum('value_sum_sq'),
+        low=Min('value_min'),
+        high=Max('value_max'),
+    ).order_by()
+
+    # A refresh committing between reading the watermark and reading the
+    # rollups would count its submissions twice, so read again until the
+    # watermark is the same before and after
+    for _ in range(3):
+        covered = _watermark(_read_state(form.id), schema_hash)
+        # Missing, or built for other fields: aggregate every submission live
+        rollup_rows = list(aggregated.all()) if covered is not None else []
+        if _watermark(_read_state(form.id), schema_hash) == covered:
+            break
+
+    last_submitted_at, last_submission_id = covered or (None, None)
+    if last_submitted_at is not None:
+        tail = tail.filter(
+            Q(submitted_at__gt=last_submitted_at) |
+            Q(submitted_at=last_submitted_at, id__gt=last_submission_id)
+        )
+    tail_rows = _answer_rows(tail, fields, tz)
+    if since is not None:
+        tail_rows = tail_rows.filter(week_start__gte=since)
+    if until is not None:
+        tail_rows = tail_rows.filter(week_start__lte=until)
+
+    # group key -> field_id -> option -> accumulator
+    groups = {}
+    for row in rollup_rows:
+        group = tuple(row[column] for column in group_columns)
+        _merge(
+            groups.setdefault(group, {}).setdefault(row['field_id'], {}),
+            row['option'], row['total_count'], row['total_sum'],
+            row['total_sum_sq'], row['low'], row['high'],
+        )
+
+    recent = {}
+    _accumulate(recent, tail_rows.iterator(chunk_size=REFRESH_CHUNK_SIZE), fields)
+    for (row_client_id, week_start, field_id, option), acc in recent.items():
+        values = {'client_id': row_client_id, 'week_start': week_start}
+        group = tuple(values[column] for column in group_columns)
+        _merge(groups.setdefault(group, {}).setdefault(field_id, {}), option, *acc)
+
+    results = []
+    for group in sorted(groups):
+        entry = dict(zip(
+            ['client' if column == 'client_id' else column for column in group_columns],
+            group,
+        ))
+        entry['fields'] = {
+            field['id']: _summarise(field, groups[group].get(field['id'], {}))
+            for field in fields
+        }
+        results.append(entry)
+
+    return {
+        'fields': fields,
+        'group_by': group_by,
+        'refreshed_through': last_submitted_at,
+        'results': results,
+    }
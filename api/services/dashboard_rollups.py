@@ -0,0 +1,354 @@
+"""
+Dashboard Rollup Service
+
+Maintains account_daily_rollups: one row per account per day with revenue,
+payment outcomes, new/churned clients, submissions and instalments due, plus
+point-in-time snapshots (active clients, overdue instalments) recorded for the
+day the refresh runs.
+
+Refreshes are incremental. For each source table the service reads only rows
+changed since the account's watermark (payments.updated_at, clients.updated_at,
+instalments.date_updated, check_in_submissions.submitted_at), collects the
+days those rows fall on, recomputes just those days with grouped aggregate
+queries, and upserts them. Days that rows were taken away from (deletes, and
+the old day of a changed payment_date, submitted_at, schedule_date or churn
+day) are logged by database triggers in account_rollup_changes and
+recomputed as well. The dashboard endpoint then reads a window of rows with a
+single indexed query; it never refreshes (see get_dashboard).
+"""
+
+import logging
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db import connection, transaction
+from django.db.models import Count, DateField, F, Max, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from api.models import (
+    Account, AccountDailyRollup, AccountRollupState, CheckInSubmission,
+    Client, Installment, Payment
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows changed within this window are left for the next refresh, so rows from
+# transactions that commit slightly out of timestamp order are not skipped.
+SETTLE_SECONDS = 30
+
+DAILY_FIELDS = [
+    'revenue', 'paid_payments', 'failed_payments', 'refunded_payments',
+    'new_clients', 'churned_clients', 'submissions',
+    'installments_due', 'installments_due_amount',
+]
+SNAPSHOT_FIELDS = ['active_clients', 'overdue_installments', 'overdue_amount']
+
+
+def _account_timezone(account):
+    try:
+        return ZoneInfo(account.timezone or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo('UTC')
+
+
+def _changed_days(queryset, watermark, boundary, watermark_field, day_expression):
+    """
+    Return ({day, ...}, new_watermark) for rows changed since ``watermark``.
+
+    One grouped query per source: the distinct days touched and the latest
+    change timestamp on each.
+    """
+    changed = queryset.filter(**{f'{watermark_field}__lte': boundary})
+    if watermark is not None:
+        changed = changed.filter(**{f'{watermark_field}__gt': watermark})
+    else:
+        # First run: rebuild every day, including rows that predate the column
+        changed = queryset.filter(
+            Q(**{f'{watermark_field}__lte': boundary}) |
+            Q(**{f'{watermark_field}__isnull': True})
+        )
+
+    rows = changed.annotate(rollup_day=day_expression).values('rollup_day').annotate(
+        latest=Max(watermark_field)
+    ).order_by()
+
+    days = set()
+    new_watermark = watermark
+    for row in rows:
+        if row['rollup_day'] is not None:
+            days.add(row['rollup_day'])
+        if row['latest'] is not None and (new_watermark is None or row['latest'] > new_watermark):
+            new_watermark = row['latest']
+    return days, new_watermark
+
+
+def _logged_days(account_id, tz):
+    """
+    Consume the account's account_rollup_changes rows and return the days
+    they name. Runs inside the refresh transaction, so the rows come back if
+    the refresh fails.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM account_rollup_changes WHERE account_id = %s "
+            "RETURNING affected_at, affected_day",
+            [account_id]
+        )
+        rows = cursor.fetchall()
+
+    days = set()
+    for affected_at, affected_day in rows:
+        if affected_day is None and affected_at is not None:
+            affected_day = timezone.localtime(affected_at, tz).date()
+        if affected_day is not None:
+            days.add(affected_day)
+    return days
+
+
+def _day_range(days, tz):
+    """Aware [start, end) datetimes spanning the given local days."""
+    start = datetime.combine(min(days), time.min, tzinfo=tz)
+    end = datetime.combine(max(days) + timedelta(days=1), time.min, tzinfo=tz)
+    return start, end
+
+
+def _compute_days(account_id, days, tz):
+    """Recompute the daily (non-snapshot) metrics for the given local days."""
+    metrics = {day: {field: 0 for field in DAILY_FIELDS} for day in days}
+    start, end = _day_range(days, tz)
+
+    payments = Payment.objects.filter(
+        account_id=account_id, payment_date__gte=start, payment_date__lt=end
+    ).annotate(
+        rollup_day=TruncDate('payment_date', tzinfo=tz)
+    ).filter(rollup_day__in=days).values('rollup_day').annotate(
+        revenue=Sum(Coalesce('company_currency_amount', 'amount'), filter=Q(status='paid')),
+        paid_payments=Count('id', filter=Q(status='paid')),
+        failed_payments=Count('id', filter=Q(status='failed')),
+        refunded_payments=Count('id', filter=Q(status='refunded')),
+    ).order_by()
+    for row in payments:
+        day = metrics[row['rollup_day']]
+        day['revenue'] = row['revenue'] or Decimal('0')
+        day['paid_payments'] = row['paid_payments']
+        day['failed_payments'] = row['failed_payments']
+        day['refunded_payments'] = row['refunded_payments']
+
+    new_clients = Client.objects.filter(
+        account_id=account_id, created_at__gte=start, created_at__lt=end
+    ).annotate(
+        rollup_day=TruncDate('created_at', tzinfo=tz)
+    ).filter(rollup_day__in=days).values('rollup_day').annotate(
+        total=Count('id')
+    ).order_by()
+    for row in new_clients:
+        metrics[row['rollup_day']]['new_clients'] = row['total']
+
+    churned = Client.objects.filter(account_id=account_id, status='cancelled').annotate(
+        rollup_day=Coalesce(
+            'client_end_date',
+            TruncDate('updated_at', tzinfo=tz),
+            output_field=DateField(),
+        )
+    ).filter(rollup_day__in=days).values('rollup_day').annotate(
+        total=Count('id')
+    ).order_by()
+    for row in churned:
+        metrics[row['rollup_day']]['churned_clients'] = row['total']
+
+    submissions = CheckInSubmission.objects.filter(
+        account_id=account_id, submitted_at__gte=start, submitted_at__lt=end
+    ).annotate(
+        rollup_day=TruncDate('submitted_at', tzinfo=tz)
+    ).filter(rollup_day__in=days).values('rollup_day').annotate(
+        total=Count('id')
+    ).order_by()
+    for row in submissions:
+        metrics[row['rollup_day']]['submissions'] = row['total']
+
+    installments = Installment.objects.filter(
+        account_id=account_id, schedule_date__in=days
+    ).values('schedule_date').annotate(
+        total=Count('id'),
+        amount_due=Sum('amount'),
+    ).order_by()
+    for row in installments:
+        day = metrics[row['schedule_date']]
+        day['installments_due'] = row['total']
+        day['installments_due_amount'] = row['amount_due'] or Decimal('0')
+
+    return metrics
+
+
+def _compute_snapshot(account_id, today):
+    """Point-in-time metrics recorded on today's row."""
+    overdue = Installment.objects.filter(
+        account_id=account_id,
+        status__in=['open', 'failed'],
+        schedule_date__lt=today,
+    ).aggregate(total=Count('id'), amount=Sum('amount'))
+    return {
+        'active_clients': Client.objects.filter(account_id=account_id, status='active').count(),
+        'overdue_installments': overdue['total'],
+        'overdue_amount': overdue['amount'] or Decimal('0'),
+    }
+
+
+def refresh_account_rollups(account_id, full=False):
+    """
+    Incrementally refresh the dashboard rollups for one account.
+
+    Args:
+        account_id (int): Account to refresh
+        full (bool): Ignore watermarks and rebuild every day with data or
+            an existing rollup row (days left with no data are zeroed)
+
+    Returns:
+        int: Number of days recomputed
+    """
+    account = Account.objects.only('id', 'timezone').get(id=account_id)
+    tz = _account_timezone(account)
+    now = timezone.now()
+    boundary = now - timedelta(seconds=SETTLE_SECONDS)
+    today = timezone.localtime(now, tz).date()
+
+    with transaction.atomic():
+        AccountRollupState.objects.get_or_create(account_id=account_id)
+        state = AccountRollupState.objects.select_for_update().get(account_id=account_id)
+        if full:
+            state.payments_watermark = None
+            state.clients_watermark = None
+            state.installments_watermark = None
+            state.submissions_watermark = None
+
+        dirty = {today} | _logged_days(account_id, tz)
+        if full:
+            dirty |= set(
+                AccountDailyRollup.objects.filter(account_id=account_id).values_list('day', flat=True)
+            )
+
+        days, state.payments_watermark = _changed_days(
+            Payment.objects.filter(account_id=account_id),
+            state.payments_watermark, boundary, 'updated_at',
+            TruncDate('payment_date', tzinfo=tz),
+        )
+        dirty |= days
+
+        clients = Client.objects.filter(account_id=account_id)
+        previous_clients_watermark = state.clients_watermark
+        days, state.clients_watermark = _changed_days(
+            clients, previous_clients_watermark, boundary, 'updated_at',
+            TruncDate('created_at', tzinfo=tz),
+        )
+        dirty |= days
+        churn_days, _ = _changed_days(
+            clients.filter(status='cancelled'), previous_clients_watermark, boundary, 'updated_at',
+            Coalesce('client_end_date', TruncDate('updated_at', tzinfo=tz), output_field=DateField()),
+        )
+        dirty |= churn_days
+
+        days, state.installments_watermark = _changed_days(
+            Installment.objects.filter(account_id=account_id),
+            state.installments_watermark, boundary, 'date_updated',
+            F('schedule_date'),
+        )
+        dirty |= days
+
+        days, state.submissions_watermark = _changed_days(
+            CheckInSubmission.objects.filter(account_id=account_id),
+            state.submissions_watermark, boundary, 'submitted_at',
+            TruncDate('submitted_at', tzinfo=tz),
+        )
+        dirty |= days
+
+        metrics = _compute_days(account_id, dirty, tz)
+        snapshot = _compute_snapshot(account_id, today)
+
+        past_rows = [
+            AccountDailyRollup(account_id=account_id, day=day, **values)
+            for day, values in metrics.items() if day != today
+        ]
+        if past_rows:
+            AccountDailyRollup.objects.bulk_create(
+                past_rows,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['account', 'day'],
+                update_fields=DAILY_FIELDS + ['updated_at'],
+            )
+        AccountDailyRollup.objects.bulk_create(
+            [AccountDailyRollup(account_id=account_id, day=today, **metrics[today], **snapshot)],
+            update_conflicts=True,
+            unique_fields=['account', 'day'],
+            update_fields=DAILY_FIELDS + SNAPSHOT_FIELDS + ['updated_at'],
+        )
+
+        state.save()
+
+    logger.info(f"Refreshed {len(dirty)} dashboard rollup days for account {account_id}")
+    return len(dirty)
+
+
+def get_dashboard(account_id, days=30):
+    """
+    Read the dashboard for an account from its rollups.
+
+    Accounts that have never been refreshed get the window computed live
+    (read-only); building their rollups is left to refresh_dashboard_rollups.
+
+    Args:
+        account_id (int): Account to read
+        days (int): Number of trailing days to include
+
+    Returns:
+        dict: Window totals, latest snapshot and per-day series
+    """
+    account = Account.objects.only('id', 'timezone').get(id=account_id)
+    tz = _account_timezone(account)
+    today = timezone.localtime(timezone.now(), tz).date()
+    start = today - timedelta(days=days - 1)
+
+    rows = list(
+        AccountDailyRollup.objects.filter(account_id=account_id, day__gte=start).order_by('day')
+    )
+    if rows or AccountRollupState.objects.filter(account_id=account_id).exists():
+        series = [(row.day, {field: getattr(row, field) for field in DAILY_FIELDS}) for row in rows]
+        snapshot = None
+        for row in rows:
+            if row.active_clients is not None:
+                snapshot = {
+                    'as_of': row.day,
+                    'active_clients': row.active_clients,
+                    'overdue_installments': row.overdue_installments,
+                    'overdue_amount': row.overdue_amount,
+                }
+        refreshed_at = max((row.updated_at for row in rows), default=None)
+    else:
+        # Never refreshed: same shape as the rollups (days with data, plus
+        # today's snapshot row) without writing anything
+        window = [start + timedelta(days=offset) for offset in range(days)]
+        metrics = _compute_days(account_id, window, tz)
+        series = [
+            (day, metrics[day]) for day in window
+            if day == today or any(metrics[day].values())
+        ]
+        snapshot = {'as_of': today, **_compute_snapshot(account_id, today)}
+        refreshed_at = None
+
+    totals = {field: 0 for field in DAILY_FIELDS}
+    daily = []
+    for day, values in series:
+        for field in DAILY_FIELDS:
+            totals[field] += values[field]
+        daily.append({'day': day, **values})
+
+    return {
+        'account': account_id,
+        'days': days,
+        'refreshed_at': refreshed_at,
+        'snapshot': snapshot,
+        'totals': totals,
+        'daily': daily,
+    }
@@ -0,0 +1,239 @@
+"""
+Domain Provisioning Jobs
+
+Custom forms and payment domains are provisioned in the background instead
+of inside the API request: the configure endpoints queue a
+DomainProvisioningJob and return its id, and `python manage.py
+process_domain_jobs` works through the queue.
+
+Each job has three steps, tracked in job.steps so clients can poll progress:
+
+- cert: issue the Let's Encrypt certificate (certbot, up to 120s)
+- config: write and enable the domain's nginx config
+- reload: nginx -t and reload
+
+The first two run per job. The reload step is shared: every job in a batch
+whose config was written waits for a single nginx -t and reload, so N pending
+domains cost one reload instead of N. If nginx -t fails the batch's sites are
+disabled again, so one bad config does not block the next batch.
+
+With NGINX_CONFIG_MODE = "map" the config step is shared as well: the
+batch's domains are added to the single map config (nginx_domain_map.py) in
+one write, and the reload is skipped when that config did not change.
+
+On success the account's domain fields are updated, exactly as the old
+synchronous endpoints did.
+
+A batch can run far longer than one job (DOMAIN_JOB_BATCH_SIZE certbot calls
+of up to 120s each), so the worker refreshes heartbeat_at on every running
+job of its batch before each certificate and before the reload. Only jobs
+whose heartbeat is older than DOMAIN_JOB_STALE_AFTER (the worker died) are
+claimed again.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models import DomainProvisioningJob
+from api.services import nginx_domain_map
+from api.services.domain_service import DomainService
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+# Account fields set when a job succeeds, per domain type
+DOMAIN_FIELDS = {
+    'forms': ('forms_domain', 'forms_domain_verified', 'forms_domain_configured', 'forms_domain_added_at'),
+    'payment': ('payment_domain', 'payment_domain_verified', 'payment_domain_configured', 'payment_domain_added_at'),
+}
+
+
+def _initial_steps():
+    return {
+        step: {'status': 'pending', 'message': '', 'finished_at': None}
+        for step in DomainProvisioningJob.STEPS
+    }
+
+
+def enqueue(account, domain, domain_type):
+    """
+    Queue provisioning of ``domain`` for ``account``.
+
+    Returns (job, created). A pending or running job for the same account and
+    domain is returned instead of queueing the domain twice.
+    """
+    existing = DomainProvisioningJob.objects.filter(
+        account=account, domain_type=domain_type, domain=domain, status__in=ACTIVE_STATUSES
+    ).order_by('created_at').first()
+    if existing:
+        return existing, False
+
+    job = DomainProvisioningJob.objects.create(
+        account=account,
+        domain=domain,
+        domain_type=domain_type,
+        steps=_initial_steps(),
+    )
+    logger.info(f"Queued {domain_type} domain provisioning for account {account.id}: {domain} (job {job.id})")
+    return job, True
+
+
+def claim_jobs(limit=None):
+    """
+    Mark up to ``limit`` pending jobs as running and return them.
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED, so several workers never claim the
+    same job. Running jobs without a heartbeat for DOMAIN_JOB_STALE_AFTER
+    seconds (a worker died mid-batch) are claimed again.
+    """
+    limit = limit or getattr(settings, 'DOMAIN_JOB_BATCH_SIZE', 20)
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=getattr(settings, 'DOMAIN_JOB_STALE_AFTER', 900))
+
+    with transaction.atomic():
+        jobs = list(
+            DomainProvisioningJob.objects
+            .select_for_update(skip_locked=True, of=('self',))
+            .select_related('account')
+            .filter(Q(status='pending') | Q(status='running', heartbeat_at__lt=stale_before))
+            .order_by('created_at')[:limit]
+        )
+        for job in jobs:
+            job.status = 'running'
+            job.started_at = now
+            job.heartbeat_at = now
+            job.error = ''
+            job.steps = _initial_steps()
+        DomainProvisioningJob.objects.bulk_update(jobs, ['status', 'started_at', 'heartbeat_at', 'error', 'steps'])
+    return jobs
+
+
+def _heartbeat(jobs):
+    """Mark the batch's running jobs as still in progress, so no other worker re-claims them."""
+    running = [job.pk for job in jobs if job.status == 'running']
+    if running:
+        DomainProvisioningJob.objects.filter(pk__in=running, status='running').update(heartbeat_at=timezone.now())
+
+
+def _set_step(job, step, success, message):
+    job.steps[step] = {
+        'status': 'succeeded' if success else 'failed',
+        'message': message,
+        'finished_at': timezone.now().isoformat(),
+    }
+    if not success:
+        job.status = 'failed'
+        job.error = message
+        job.finished_at = timezone.now()
+        # Later steps will not run
+        for later in DomainProvisioningJob.STEPS[DomainProvisioningJob.STEPS.index(step) + 1:]:
+            job.steps[later]['status'] = 'skipped'
+    job.save(update_fields=['status', 'steps', 'error', 'finished_at', 'updated_at'])
+
+
+def _issue_certificate(job):
+    ssl_success, ssl_message = DomainService.generate_ssl_certificate(job.domain)
+    _set_step(job, 'cert', ssl_success, ssl_message)
+    if not ssl_success:
+        logger.error(f"SSL generation failed for {job.domain}: {ssl_message}")
+    return ssl_success
+
+
+def _provision(job, batch):
+    """Run the cert and config steps; returns True when the job is ready for reload."""
+    _heartbeat(batch)
+    if not _issue_certificate(job):
+        return False
+
+    config_success, config_message = DomainService.create_nginx_config(job.domain)
+    _set_step(job, 'config', config_success, config_message)
+    if not config_success:
+        logger.error(f"Nginx config creation failed for {job.domain}: {config_message}")
+        return False
+    return True
+
+
+def _provision_map(jobs):
+    """
+    Map mode: certificates per job, then one write of the map config for
+    every job that got one. Returns (ready jobs, whether the config changed).
+    """
+    ready = []
+    for job in jobs:
+        _heartbeat(jobs)
+        if _issue_certificate(job):
+            ready.append(job)
+    if not ready:
+        return [], False
+
+    config_success, config_message, changed = nginx_domain_map.sync(include=[job.domain for job in ready])
+    for job in ready:
+        _set_step(job, 'config', config_success, config_message)
+    if not config_success:
+        logger.error(f"Nginx domain map update failed for {len(ready)} domains: {config_message}")
+        return [], False
+    return ready, changed
+
+
+def _complete(job):
+    account = job.account
+    domain_field, verified_field, configured_field, added_at_field = DOMAIN_FIELDS[job.domain_type]
+    setattr(account, domain_field, job.domain)
+    setattr(account, verified_field, True)
+    setattr(account, configured_field, True)
+    setattr(account, added_at_field, timezone.now())
+    account.save(update_fields=list(DOMAIN_FIELDS[job.domain_type]) + ['updated_at'])
+
+    job.status = 'succeeded'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at', 'updated_at'])
+    logger.info(f"{job.domain_type.capitalize()} domain configured for account {account.id}: {job.domain}")
+
+
+def process_jobs(jobs):
+    """
+    Provision claimed jobs, sharing one nginx -t and reload across the batch.
+
+    Returns the jobs, each with its final status.
+    """
+    map_mode = nginx_domain_map.enabled()
+    if map_mode:
+        ready, changed = _provision_map(jobs)
+    else:
+        ready, changed = [job for job in jobs if _provision(job, jobs)], True
+    if not ready:
+        return jobs
+
+    _heartbeat(ready)
+    if changed:
+        reload_success, reload_message = DomainService.test_and_reload_nginx()
+    else:
+        reload_success, reload_message = True, "Nginx configuration unchanged, reload skipped"
+    if not reload_success:
+        logger.error(f"Nginx reload failed for {len(ready)} domains: {reload_message}")
+        if map_mode:
+            # Back to the domains already live (the batch is not in the DB yet)
+            nginx_domain_map.sync()
+        else:
+            for job in ready:
+                DomainService.disable_site(job.domain)
+
+    for job in ready:
+        _set_step(job, 'reload', reload_success, reload_message)
+        if reload_success:
+            _complete(job)
+    return jobs
+
+
+def process_pending_jobs(limit=None):
+    """Claim and process one batch of pending jobs; returns the processed jobs."""
+    jobs = claim_jobs(limit)
+    if jobs:
+        logger.info(f"Provisioning {len(jobs)} domains")
+    return process_jobs(jobs)
@@ -3,22 +3,67 @@ Domain Service
 
 Handles SSL certificate generation and Nginx configuration for custom domains.
 Automates the setup of custom forms domains with Let's Encrypt SSL.
+
+Commands go through a runner (DOMAIN_COMMAND_RUNNER, SubprocessRunner by
+default) so they can be pointed at stub certbot/nginx/systemctl binaries
+(DOMAIN_COMMAND_PATH) and run without sudo (DOMAIN_COMMAND_PREFIX) in tests
+and staging. Provisioning itself runs in the background, see domain_jobs.py.
 """
 
 import subprocess
 import os
 import logging
 from django.conf import settings
+from django.utils.module_loading import import_string
 
 logger = logging.getLogger(__name__)
 
 
+class SubprocessRunner:
+    """
+    Runs provisioning commands with subprocess.
+    
+    Every command is prefixed with DOMAIN_COMMAND_PREFIX (['sudo'] by default),
+    and DOMAIN_COMMAND_PATH, when set, is searched before PATH.
+    """
+    
+    def __init__(self, prefix=None, path=None):
+        if prefix is None:
+            prefix = getattr(settings, 'DOMAIN_COMMAND_PREFIX', ['sudo'])
+        self.prefix = [part for part in prefix if part]
+        self.path = getattr(settings, 'DOMAIN_COMMAND_PATH', '') if path is None else path
+    
+    def run(self, args, timeout):
+        """Run one command; returns subprocess.CompletedProcess, raises TimeoutExpired."""
+        env = None
+        if self.path:
+            env = dict(os.environ, PATH=f"{self.path}{os.pathsep}{os.environ.get('PATH', '')}")
+        return subprocess.run(
+            self.prefix + list(args),
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            env=env
+        )
+
+
+def get_runner():
+    """The configured command runner (DOMAIN_COMMAND_RUNNER)."""
+    runner_path = getattr(settings, 'DOMAIN_COMMAND_RUNNER', 'api.services.domain_service.SubprocessRunner')
+    return import_string(runner_path)()
+
+
 class DomainService:
     """Service class for managing custom domain SSL and Nginx configuration"""
     
     NGINX_SITES_AVAILABLE = "/etc/nginx/sites-available"
     NGINX_SITES_ENABLED = "/etc/nginx/sites-enabled"
     
+    @staticmethod
+    def run(args, timeout=10):
+        """Run a command through the configured runner."""
+        return get_runner().run(args, timeout)
+    
     @staticmethod
     def generate_ssl_certificate(domain):
         """
@@ -36,15 +81,15 @@ class DomainService:
             # Get admin email from settings
             admin_email = getattr(settings, 'ADMIN_EMAIL', 'admin@fithq.ai')
             
-            result = subprocess.run([
-                'sudo', 'certbot', 'certonly',
+            result = DomainService.run([
+                'certbot', 'certonly',
                 '--nginx',
                 '-d', domain,
                 '--non-interactive',
                 '--agree-tos',
                 '--email', admin_email,
                 '--no-eff-email',
-            ], capture_output=True, text=True, timeout=120)
+            ], timeout=120)
             
             if result.returncode != 0:
                 logger.error(f"Certbot failed for {domain}: {result.stderr}")
@@ -149,42 +194,24 @@ server {{
                 f.write(nginx_config)
             
             # Move to sites-available with sudo
-            move_result = subprocess.run(
-                ['sudo', 'mv', temp_config, config_path],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
+            move_result = DomainService.run(['mv', temp_config, config_path])
             
             if move_result.returncode != 0:
                 logger.error(f"Failed to move config file: {move_result.stderr}")
                 return False, f"Failed to create config file: {move_result.stderr}"
             
             # Set correct permissions
-            subprocess.run(
-                ['sudo', 'chmod', '644', config_path],
-                capture_output=True,
-                timeout=10
-            )
+            DomainService.run(['chmod', '644', config_path])
             
             # Create symlink in sites-enabled
             symlink_path = os.path.join(DomainService.NGINX_SITES_ENABLED, domain)
             
             # Remove existing symlink if present
             if os.path.exists(symlink_path):
-                subprocess.run(
-                    ['sudo', 'rm', symlink_path],
-                    capture_output=True,
-                    timeout=10
-                )
+                DomainService.run(['rm', symlink_path])
             
             # Create new symlink
-            symlink_result = subprocess.run(
-                ['sudo', 'ln', '-s', config_path, symlink_path],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
+            symlink_result = DomainService.run(['ln', '-s', config_path, symlink_path])
             
             if symlink_result.returncode != 0:
                 logger.error(f"Failed to create symlink: {symlink_result.stderr}")
@@ -198,35 +225,38 @@ server {{
             return False, f"Failed to create Nginx config: {str(e)}"
     
     @staticmethod
-    def test_and_reload_nginx():
+    def test_nginx():
         """
-        Test Nginx configuration and reload if valid.
+        Test Nginx configuration (nginx -t).
         
         Returns:
             tuple: (success: bool, message: str)
         """
         try:
-            # Test configuration
             logger.info("Testing Nginx configuration")
-            test_result = subprocess.run(
-                ['sudo', 'nginx', '-t'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
+            test_result = DomainService.run(['nginx', '-t'])
             
             if test_result.returncode != 0:
                 logger.error(f"Nginx config test failed: {test_result.stderr}")
                 return False, f"Nginx config test failed: {test_result.stderr}"
             
-            # Reload Nginx
+            return True, "Nginx configuration is valid"
+            
+        except Exception as e:
+            logger.exception(f"Failed to test Nginx config: {str(e)}")
+            return False, f"Failed to test Nginx config: {str(e)}"
+    
+    @staticmethod
+    def reload_nginx():
+        """
+        Reload Nginx.
+        
+        Returns:
+            tuple: (success: bool, message: str)
+        """
+        try:
             logger.info("Reloading Nginx")
-            reload_result = subprocess.run(
-                ['sudo', 'systemctl', 'reload', 'nginx'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
+            reload_result = DomainService.run(['systemctl', 'reload', 'nginx'])
             
             if reload_result.returncode != 0:
                 logger.error(f"Nginx reload failed: {reload_result.stderr}")
@@ -239,10 +269,40 @@ server {{
             logger.exception(f"Failed to reload Nginx: {str(e)}")
             return False, f"Failed to reload Nginx: {str(e)}"
     
+    @staticmethod
+    def test_and_reload_nginx():
+        """
+        Test Nginx configuration and reload if valid.
+        
+        Returns:
+            tuple: (success: bool, message: str)
+        """
+        test_success, test_message = DomainService.test_nginx()
+        if not test_success:
+            return False, test_message
+        return DomainService.reload_nginx()
+    
+    @staticmethod
+    def disable_site(domain):
+        """
+        Remove a domain's sites-enabled symlink without reloading Nginx,
+        so a config that fails nginx -t does not block later reloads.
+        
+        Args:
+            domain (str): The domain to disable
+        """
+        try:
+            symlink_path = os.path.join(DomainService.NGINX_SITES_ENABLED, domain)
+            if os.path.lexists(symlink_path):
+                DomainService.run(['rm', symlink_path])
+        except Exception as e:
+            logger.exception(f"Failed to disable Nginx site for {domain}: {str(e)}")
+    
     @staticmethod
     def remove_domain_config(domain):
         """
-        Remove Nginx configuration and symlink for a domain.
+        Remove Nginx configuration and symlink for a domain (or, with
+        NGINX_CONFIG_MODE = "map", drop it from the domain map config).
         Does NOT remove SSL certificate (Let's Encrypt handles that).
         
         Args:
@@ -251,33 +311,25 @@ server {{
         Returns:
             tuple: (success: bool, message: str)
         """
+        from api.services import nginx_domain_map
+        if nginx_domain_map.enabled():
+            return nginx_domain_map.remove(domain)
+        
         try:
             logger.info(f"Removing Nginx config for {domain}")
             
             # Remove symlink
             symlink_path = os.path.join(DomainService.NGINX_SITES_ENABLED, domain)
             if os.path.exists(symlink_path):
-                subprocess.run(
-                    ['sudo', 'rm', symlink_path],
-                    capture_output=True,
-                    timeout=10
-                )
+                DomainService.run(['rm', symlink_path])
             
             # Remove config file
             config_path = os.path.join(DomainService.NGINX_SITES_AVAILABLE, domain)
             if os.path.exists(config_path):
-                subprocess.run(
-                    ['sudo', 'rm', config_path],
-                    capture_output=True,
-                    timeout=10
-                )
+                DomainService.run(['rm', config_path])
             
             # Reload Nginx
-            subprocess.run(
-                ['sudo', 'systemctl', 'reload', 'nginx'],
-                capture_output=True,
-                timeout=10
-            )
+            DomainService.run(['systemctl', 'reload', 'nginx'])
             
             logger.info(f"Removed Nginx config for {domain}")
             return True, "Nginx configuration removed"
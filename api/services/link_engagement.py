@@ -0,0 +1,167 @@
+"""
+Link Engagement Service
+
+Clicks, last-click time and click-to-submission conversion for every client
+link in an account, computed with one aggregated query instead of one
+shortener stats call per short code.
+
+Each client's short_checkin_link / short_onboarding_link / short_reviews_link
+is split into (domain, short_code) and joined to short_urls on
+short_urls_domain_628d7f_idx. Clicks come from short_urls.clicks, first and
+last click times from click_analytics (short_url_id, clicked_at index), and
+submissions are the client's check_in_submissions on forms of the matching
+type submitted at or after the first recorded click on that link.
+
+Results are cached per account for LINK_ENGAGEMENT_CACHE_TTL seconds in this
+process, like the account registry.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Link type -> form_type of the submissions it leads to
+LINK_FORM_TYPES = {
+    'checkin': 'checkins',
+    'onboarding': 'onboarding',
+    'reviews': 'reviews',
+}
+
+ENGAGEMENT_SQL = """
+WITH links AS (
+    SELECT c.id AS client_id,
+           l.link_type,
+           l.form_type,
+           substring(l.url from '^https?://([^/:?#]+)') AS domain,
+           substring(l.url from '^https?://[^/]+/([^/?#]+)') AS short_code
+    FROM clients AS c
+    CROSS JOIN LATERAL (VALUES
+        ('checkin', 'checkins', c.short_checkin_link),
+        ('onboarding', 'onboarding', c.short_onboarding_link),
+        ('reviews', 'reviews', c.short_reviews_link)
+    ) AS l(link_type, form_type, url)
+    WHERE c.account_id = %(account_id)s
+      AND l.url IS NOT NULL
+      AND l.url <> ''
+),
+link_clicks AS (
+    SELECT links.client_id,
+           links.link_type,
+           links.form_type,
+           COALESCE(su.clicks, 0) AS clicks,
+           ca.first_clicked_at,
+           ca.last_clicked_at
+    FROM links
+    LEFT JOIN short_urls AS su
+        ON su.domain = links.domain AND su.short_code = links.short_code
+    LEFT JOIN LATERAL (
+        SELECT min(clicked_at) AS first_clicked_at, max(clicked_at) AS last_clicked_at
+        FROM click_analytics
+        WHERE click_analytics.short_url_id = su.id
+    ) AS ca ON true
+)
+SELECT lc.client_id,
+       lc.link_type,
+       lc.clicks,
+       lc.last_clicked_at,
+       count(s.id) AS submissions
+FROM link_clicks AS lc
+LEFT JOIN check_in_forms AS f
+    ON f.account_id = %(account_id)s AND f.form_type = lc.form_type
+LEFT JOIN check_in_submissions AS s
+    ON s.client_id = lc.client_id
+   AND s.form_id = f.id
+   AND s.submitted_at >= lc.first_clicked_at
+GROUP BY lc.client_id, lc.link_type, lc.clicks, lc.last_clicked_at
+"""
+
+_lock = threading.Lock()
+_entries = {}  # account id -> (engagement dict, expires_at)
+
+
+def _ttl():
+    return getattr(settings, 'LINK_ENGAGEMENT_CACHE_TTL', 300)
+
+
+def _conversion_rate(clicks, submissions):
+    if not clicks:
+        return None
+    return round(min(submissions, clicks) / clicks, 4)
+
+
+def _compute(account_id):
+    with connection.cursor() as cursor:
+        cursor.execute(ENGAGEMENT_SQL, {'account_id': account_id})
+        rows = cursor.fetchall()
+
+    engagement = {}
+    for client_id, link_type, clicks, last_clicked_at, submissions in rows:
+        entry = engagement.setdefault(client_id, {
+            'clicks': 0,
+            'last_clicked_at': None,
+            'submissions': 0,
+            'links': {},
+        })
+        entry['links'][link_type] = {
+            'clicks': clicks,
+            'last_clicked_at': last_clicked_at,
+            'submissions': submissions,
+            'conversion_rate': _conversion_rate(clicks, submissions),
+        }
+        entry['clicks'] += clicks
+        entry['submissions'] += submissions
+        if last_clicked_at and (entry['last_clicked_at'] is None or last_clicked_at > entry['last_clicked_at']):
+            entry['last_clicked_at'] = last_clicked_at
+
+    for entry in engagement.values():
+        entry['conversion_rate'] = _conversion_rate(entry['clicks'], entry['submissions'])
+    return engagement
+
+
+def get_account_engagement(account_id):
+    """
+    Link engagement for every client in an account (cached).
+
+    Args:
+        account_id (int): Account id
+
+    Returns:
+        dict: client id -> {clicks, last_clicked_at, submissions, conversion_rate,
+              links: {link type -> same figures for that link}}; clients without
+              short links are absent
+    """
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(account_id)
+    if entry is not None and entry[1] > now:
+        return entry[0]
+
+    started = time.perf_counter()
+    engagement = _compute(account_id)
+    logger.debug(
+        f"Computed link engagement for account {account_id}: {len(engagement)} clients "
+        f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+    )
+
+    ttl = _ttl()
+    if ttl > 0:
+        with _lock:
+            _entries[account_id] = (engagement, now + ttl)
+    return engagement
+
+
+def invalidate_account(account_id):
+    """Drop one account's engagement from the cache."""
+    with _lock:
+        _entries.pop(account_id, None)
+
+
+def clear():
+    """Drop every cached account (tests)."""
+    with _lock:
+        _entries.clear()
@@ -0,0 +1,224 @@
+"""
+Nginx Domain Map
+
+Alternative to one server-block file per custom domain (NGINX_CONFIG_MODE =
+"map"). Every verified forms_domain and payment_domain is rendered into a
+single file (NGINX_DOMAIN_MAP_PATH):
+
+- one HTTPS server block per domain with static ssl_certificate paths to its
+  Let's Encrypt certificate, proxying to the URL shortener service. nginx
+  loads each certificate once per reload; a variable certificate path
+  (`map $ssl_server_name`) would read it from disk on every handshake
+- one HTTP server block lists every domain, serves ACME challenges and
+  redirects to HTTPS
+
+The file is regenerated from the accounts table, not edited in place. Output
+is deterministic (domains sorted, no timestamps), so rendering the same set
+of domains twice is a no-op and callers can skip the reload. Changes are
+written to a temporary file next to the target and renamed over it, so nginx
+never reads a half-written config.
+"""
+
+import logging
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.db.models import Q
+
+from api.models import Account
+from api.services.domain_service import DomainService
+
+logger = logging.getLogger(__name__)
+
+# Hostnames only: domains come from user input and end up in the nginx config
+DOMAIN_RE = re.compile(r'^(?=.{1,253}$)([a-z0-9]([a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,63}$')
+
+CERTIFICATE_ROOT = '/etc/letsencrypt/live'
+
+HEADER = """# Custom forms and payment domains
+# Managed by Django CRM (python manage.py render_nginx_domains) - Do not edit manually
+# Domains: {count}
+"""
+
+HTTPS_SERVER = """
+server {{
+    listen 443 ssl;
+    server_name {domain};
+
+    # SSL Configuration
+    ssl_certificate {cert_dir}/fullchain.pem;
+    ssl_certificate_key {cert_dir}/privkey.pem;
+    ssl_protocols TLSv1.2 TLSv1.3;
+    ssl_ciphers HIGH:!aNULL:!MD5;
+    ssl_prefer_server_ciphers on;
+
+    # SSL session cache (one zone shared by every custom domain)
+    ssl_session_cache shared:SSL:10m;
+    ssl_session_timeout 10m;
+
+    # Proxy to URL shortener service
+    location / {{
+        proxy_pass http://localhost:8001;
+        proxy_set_header Host $host;
+        proxy_set_header X-Real-IP $remote_addr;
+        proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header X-Forwarded-Proto $scheme;
+        proxy_redirect off;
+
+        # Timeouts
+        proxy_connect_timeout 60s;
+        proxy_send_timeout 60s;
+        proxy_read_timeout 60s;
+    }}
+
+    # Security headers
+    add_header X-Frame-Options "SAMEORIGIN" always;
+    add_header X-Content-Type-Options "nosniff" always;
+    add_header X-XSS-Protection "1; mode=block" always;
+    add_header Strict-Transport-Security "max-age=31536000; includeSubDomains" always;
+
+    # Logging
+    access_log /var/log/nginx/crm_custom_domains_access.log;
+    error_log /var/log/nginx/crm_custom_domains_error.log;
+}}
+"""
+
+HTTP_SERVER = """
+# HTTP to HTTPS redirect
+server {{
+    listen 80;
+    server_name
+{server_names};
+
+    # Let's Encrypt ACME challenge
+    location /.well-known/acme-challenge/ {{
+        root /var/www/html;
+    }}
+
+    # Redirect all other requests to HTTPS
+    location / {{
+        return 301 https://$host$request_uri;
+    }}
+}}
+"""
+
+
+def enabled():
+    """Whether custom domains are served from the single map config."""
+    return getattr(settings, 'NGINX_CONFIG_MODE', 'per_domain') == 'map'
+
+
+def config_path():
+    return getattr(settings, 'NGINX_DOMAIN_MAP_PATH', '/etc/nginx/conf.d/crm_custom_domains.conf')
+
+
+def configured_domains(include=(), exclude=()):
+    """
+    Sorted verified forms/payment domains from the accounts table, plus
+    ``include`` (domains being provisioned) and minus ``exclude`` (domains
+    being removed).
+    """
+    domains = set(include)
+    rows = Account.objects.filter(
+        Q(forms_domain_verified=True) | Q(payment_domain_verified=True)
+    ).values_list('forms_domain', 'forms_domain_verified', 'payment_domain', 'payment_domain_verified')
+    for forms_domain, forms_verified, payment_domain, payment_verified in rows:
+        if forms_domain and forms_verified:
+            domains.add(forms_domain)
+        if payment_domain and payment_verified:
+            domains.add(payment_domain)
+
+    valid = set()
+    for domain in domains:
+        domain = domain.strip().lower()
+        if DOMAIN_RE.match(domain):
+            valid.add(domain)
+        else:
+            logger.warning(f"Skipping invalid custom domain in nginx map: {domain!r}")
+    return sorted(valid - {domain.strip().lower() for domain in exclude})
+
+
+def render(domains):
+    """Render the config for ``domains`` (already validated and sorted)."""
+    content = HEADER.format(count=len(domains))
+    if not domains:
+        return content
+    for domain in domains:
+        content += HTTPS_SERVER.format(domain=domain, cert_dir=f'{CERTIFICATE_ROOT}/{domain}')
+    return content + HTTP_SERVER.format(
+        server_names='\n'.join(f'        {domain}' for domain in domains),
+    )
+
+
+def read_config(path=None):
+    """Current content of the map config, or None if it does not exist yet."""
+    path = path or config_path()
+    try:
+        with open(path) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def write(content):
+    """
+    Atomically replace the map config with ``content``.
+
+    Returns (success: bool, message: str, changed: bool); nothing is written
+    when the file already has this content.
+    """
+    path = config_path()
+    if read_config(path) == content:
+        return True, "Nginx domain map unchanged", False
+
+    temp_fd, temp_config = tempfile.mkstemp(prefix='nginx_crm_domains_', suffix='.conf')
+    try:
+        with os.fdopen(temp_fd, 'w') as f:
+            f.write(content)
+        # Copy next to the target, then rename over it (same filesystem, atomic)
+        staged_path = f"{path}.tmp"
+        install_result = DomainService.run(['install', '-m', '644', temp_config, staged_path])
+        if install_result.returncode != 0:
+            logger.error(f"Failed to stage nginx domain map: {install_result.stderr}")
+            return False, f"Failed to write nginx domain map: {install_result.stderr}", False
+
+        move_result = DomainService.run(['mv', '-f', staged_path, path])
+        if move_result.returncode != 0:
+            logger.error(f"Failed to replace nginx domain map: {move_result.stderr}")
+            return False, f"Failed to write nginx domain map: {move_result.stderr}", False
+    except Exception as e:
+        logger.exception(f"Failed to write nginx domain map: {str(e)}")
+        return False, f"Failed to write nginx domain map: {str(e)}", False
+    finally:
+        if os.path.exists(temp_config):
+            os.remove(temp_config)
+
+    logger.info(f"Wrote nginx domain map: {path}")
+    return True, "Nginx domain map written", True
+
+
+def sync(include=(), exclude=()):
+    """
+    Regenerate the map config from the accounts table.
+
+    Returns (success: bool, message: str, changed: bool).
+    """
+    domains = configured_domains(include=include, exclude=exclude)
+    success, message, changed = write(render(domains))
+    if success:
+        message = f"{message} ({len(domains)} domains)"
+    return success, message, changed
+
+
+def remove(domain):
+    """
+    Drop ``domain`` from the map config and reload nginx if it changed.
+
+    Returns (success: bool, message: str).
+    """
+    success, message, changed = sync(exclude=[domain])
+    if not success or not changed:
+        return success, message
+    return DomainService.test_and_reload_nginx()
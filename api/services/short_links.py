@@ -0,0 +1,253 @@
+"""
+Short Link Resolver
+
+Serves short-link redirects (GET /api/public/links/<domain>/<short_code>/)
+without a database write per click, and usually without any query at all.
+
+Resolution: (domain, short_code) -> (short_urls id, original_url) comes from a
+process-wide LRU of SHORT_LINK_CACHE_SIZE entries. A miss is one lookup on
+short_urls_domain_628d7f_idx. Unknown codes are cached as well (for
+MISS_TTL seconds) so requests for random codes cannot hammer the table.
+Entries expire after SHORT_LINK_CACHE_TTL seconds, which bounds how long a
+deactivated link keeps redirecting.
+
+Clicks: record_click() appends the click to an in-memory buffer. A background
+thread flushes it every SHORT_LINK_CLICK_FLUSH_INTERVAL seconds (sooner once
+SHORT_LINK_CLICK_BATCH_SIZE clicks are waiting) with one multi-row INSERT into
+click_analytics and one UPDATE adding the per-link totals to short_urls.clicks.
+Clicks still buffered when a worker is killed are lost, and the buffer holds
+at most SHORT_LINK_CLICK_BUFFER_MAX clicks; both only affect analytics, never
+the redirect.
+
+Cache and buffer are per worker process.
+"""
+
+import atexit
+import ipaddress
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from api.models import ShortUrl
+
+logger = logging.getLogger(__name__)
+
+# Seconds an unknown (domain, short_code) stays cached
+MISS_TTL = 30
+
+ResolvedLink = namedtuple('ResolvedLink', ['id', 'original_url', 'expires_at'])
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # (domain, short_code) -> (ResolvedLink or None, expires_at)
+
+_click_lock = threading.Lock()
+_clicks = []  # (short_url_id, clicked_at, ip_address, user_agent, referer)
+_dropped = 0
+_wakeup = threading.Event()
+_flusher_pid = None
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def resolve(domain, short_code):
+    """
+    Resolve a short link to its target.
+
+    Args:
+        domain (str): Short-link domain (e.g. 'check.gymname.com')
+        short_code (str): Code after the domain
+
+    Returns:
+        ResolvedLink or None if the link does not exist, is inactive or has expired
+    """
+    key = (domain, short_code)
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[1] > now:
+            _entries.move_to_end(key)
+        else:
+            entry = None
+
+    if entry is not None:
+        link = entry[0]
+    else:
+        row = (
+            ShortUrl.objects
+            .filter(domain=domain, short_code=short_code, is_active=True)
+            .values_list('id', 'original_url', 'expires_at')
+            .first()
+        )
+        link = ResolvedLink(*row) if row is not None else None
+        _store(key, link, now)
+
+    if link is not None and link.expires_at is not None and link.expires_at <= timezone.now():
+        return None
+    return link
+
+
+def _store(key, link, now):
+    size = _setting('SHORT_LINK_CACHE_SIZE', 50000)
+    ttl = _setting('SHORT_LINK_CACHE_TTL', 300)
+    if size <= 0 or ttl <= 0:
+        return
+    if link is None:
+        ttl = min(ttl, MISS_TTL)
+    with _lock:
+        _entries[key] = (link, now + ttl)
+        _entries.move_to_end(key)
+        while len(_entries) > size:
+            _entries.popitem(last=False)
+
+
+def invalidate(domain, short_code):
+    """Drop one link from the cache."""
+    with _lock:
+        _entries.pop((domain, short_code), None)
+
+
+def clear():
+    """Drop every cached link and buffered click (tests)."""
+    global _dropped
+    with _lock:
+        _entries.clear()
+    with _click_lock:
+        _clicks.clear()
+        _dropped = 0
+
+
+def record_click(link, ip_address=None, user_agent='', referer=''):
+    """
+    Buffer a click on a resolved link; it is written by the next flush.
+
+    Args:
+        link (ResolvedLink): Link returned by resolve()
+        ip_address (str): Client IP (ignored unless it is a valid address)
+        user_agent (str): User-Agent header
+        referer (str): Referer header
+    """
+    global _dropped
+    try:
+        ip_address = str(ipaddress.ip_address(ip_address)) if ip_address else None
+    except ValueError:
+        ip_address = None
+    event = (link.id, timezone.now(), ip_address, user_agent or '', (referer or '')[:2048])
+
+    with _click_lock:
+        if len(_clicks) >= _setting('SHORT_LINK_CLICK_BUFFER_MAX', 100000):
+            _dropped += 1
+            return
+        _clicks.append(event)
+        pending = len(_clicks)
+
+    _ensure_flusher()
+    if pending >= _setting('SHORT_LINK_CLICK_BATCH_SIZE', 1000):
+        _wakeup.set()
+
+
+def pending_clicks():
+    """Number of clicks waiting to be flushed."""
+    with _click_lock:
+        return len(_clicks)
+
+
+def flush_clicks():
+    """
+    Write buffered clicks to the database.
+
+    One INSERT into click_analytics and one UPDATE of short_urls.clicks, in a
+    single transaction. Clicks on links deleted in the meantime are skipped.
+    If the write fails the clicks go back into the buffer for the next flush.
+
+    Returns:
+        int: Number of clicks taken from the buffer and written
+    """
+    global _dropped
+    with _click_lock:
+        events = _clicks[:]
+        _clicks.clear()
+        dropped, _dropped = _dropped, 0
+    if dropped:
+        logger.warning(f"Dropped {dropped} short-link clicks: click buffer full")
+    if not events:
+        return 0
+
+    short_url_ids, clicked_at, ip_addresses, user_agents, referers = (list(column) for column in zip(*events))
+    counts = sorted(Counter(short_url_ids).items())
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO click_analytics (
+                    short_url_id, clicked_at, ip_address, user_agent, referer, country, city
+                )
+                SELECT e.short_url_id, e.clicked_at, e.ip_address::inet, e.user_agent, e.referer, '', ''
+                FROM unnest(%s::bigint[], %s::timestamptz[], %s::text[], %s::text[], %s::text[])
+                    AS e(short_url_id, clicked_at, ip_address, user_agent, referer)
+                JOIN short_urls ON short_urls.id = e.short_url_id
+                """,
+                [short_url_ids, clicked_at, ip_addresses, user_agents, referers]
+            )
+            cursor.execute(
+                """
+                UPDATE short_urls
+                SET clicks = short_urls.clicks + c.clicks
+                FROM unnest(%s::bigint[], %s::integer[]) AS c(id, clicks)
+                WHERE short_urls.id = c.id
+                """,
+                [[short_url_id for short_url_id, _ in counts], [count for _, count in counts]]
+            )
+    except DatabaseError as e:
+        logger.error(f"Failed to write {len(events)} short-link clicks, retrying on the next flush: {str(e)}")
+        with _click_lock:
+            room = max(0, _setting('SHORT_LINK_CLICK_BUFFER_MAX', 100000) - len(_clicks))
+            kept = events[max(0, len(events) - room):] if room else []
+            _clicks[:0] = kept
+            _dropped += len(events) - len(kept)
+        return 0
+    return len(events)
+
+
+def _ensure_flusher():
+    """Start the flush thread in this process (again after a fork)."""
+    global _flusher_pid
+    interval = _setting('SHORT_LINK_CLICK_FLUSH_INTERVAL', 5)
+    pid = os.getpid()
+    if interval <= 0 or _flusher_pid == pid:
+        return
+    with _click_lock:
+        if _flusher_pid == pid:
+            return
+        _flusher_pid = pid
+    threading.Thread(target=_run_flusher, args=(interval,), name='short-link-clicks', daemon=True).start()
+
+
+def _run_flusher(interval):
+    while True:
+        _wakeup.wait(interval)
+        _wakeup.clear()
+        close_old_connections()
+        try:
+            flush_clicks()
+        except Exception:
+            logger.exception("Short-link click flush failed")
+        close_old_connections()
+
+
+def _flush_at_exit():
+    if _flusher_pid == os.getpid():
+        try:
+            flush_clicks()
+        except Exception:
+            logger.exception("Short-link click flush at exit failed")
+
+
+atexit.register(_flush_at_exit)
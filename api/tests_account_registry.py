@@ -0,0 +1,112 @@
+"""
+Tests for the process-wide account registry cache.
+
+These tests cover:
+1. Cached lookups issue no queries until the TTL expires
+2. Invalidation when an account is saved or deleted
+3. Master-token requests resolving their account through the registry
+4. Instances from the registry only writing the columns they changed
+"""
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.models import Account, MasterToken, MasterTokenUser
+from api.services import account_registry
+from api.services.account_registry import account_exists, get_account, get_account_snapshot
+
+
+class AccountRegistryTestCase(TestCase):
+    """Tests for api.services.account_registry"""
+
+    def setUp(self):
+        account_registry.clear()
+        self.account = Account.objects.create(
+            name='Registry Co', timezone='Europe/London', company_currency='gbp'
+        )
+
+    def test_snapshot_is_cached(self):
+        with self.assertNumQueries(1):
+            snapshot = get_account_snapshot(self.account.id)
+            self.assertTrue(account_exists(self.account.id))
+            get_account(self.account.id)
+        self.assertEqual(snapshot.name, 'Registry Co')
+        self.assertEqual(snapshot.company_currency, 'gbp')
+        with self.assertRaises(AttributeError):
+            snapshot.name = 'Changed'
+
+    def test_missing_account_is_not_cached(self):
+        self.assertFalse(account_exists(999999))
+        self.assertIsNone(get_account(None))
+
+    def test_entries_expire(self):
+        get_account_snapshot(self.account.id)
+        with patch('api.services.account_registry.time.monotonic', return_value=10 ** 9):
+            with self.assertNumQueries(1):
+                get_account_snapshot(self.account.id)
+
+    def test_save_and_delete_invalidate(self):
+        get_account_snapshot(self.account.id)
+
+        self.account.name = 'Renamed Co'
+        self.account.save()
+        self.assertEqual(get_account_snapshot(self.account.id).name, 'Renamed Co')
+
+        account_id = self.account.id
+        self.account.delete()
+        self.assertIsNone(get_account_snapshot(account_id))
+
+    def test_registry_instance_only_writes_changed_columns(self):
+        cached = get_account(self.account.id)
+        Account.objects.filter(id=self.account.id).update(niche='Fitness')
+
+        cached.forms_domain = 'check.registry.com'
+        cached.save(update_fields=['forms_domain', 'updated_at'])
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.forms_domain, 'check.registry.com')
+        self.assertEqual(self.account.niche, 'Fitness')
+
+    @override_settings(ACCOUNT_REGISTRY_TTL=0)
+    def test_zero_ttl_disables_caching(self):
+        get_account_snapshot(self.account.id)
+        with self.assertNumQueries(1):
+            get_account_snapshot(self.account.id)
+
+
+class MasterTokenAccountRegistryTestCase(TestCase):
+    """Master-token requests resolve their account through the registry"""
+
+    def setUp(self):
+        account_registry.clear()
+        self.master_token = MasterToken.objects.create(name='Registry Token')
+        self.account = Account.objects.create(name='Registry Account')
+
+    def test_master_token_user_account(self):
+        get_account_snapshot(self.account.id)
+        user = MasterTokenUser(master_token=self.master_token, account_id=self.account.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(user.account.name, 'Registry Account')
+
+    def test_master_token_request_uses_cached_account(self):
+        api = APIClient()
+        api.credentials(
+            HTTP_X_MASTER_TOKEN=self.master_token.key,
+            HTTP_X_ACCOUNT_ID=str(self.account.id),
+        )
+        response = api.get('/api/clients/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Account validation is served from the registry on later requests
+        with patch.object(Account.objects, 'filter', wraps=Account.objects.filter) as account_filter:
+            response = api.get('/api/clients/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        account_filter.assert_not_called()
+
+    def test_unknown_account_is_rejected(self):
+        api = APIClient()
+        api.credentials(HTTP_X_MASTER_TOKEN=self.master_token.key, HTTP_X_ACCOUNT_ID='999999')
+        response = api.get('/api/clients/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,184 @@
+"""
+Test cases for bulk upsert endpoints.
+
+Tests cover:
+- Mixed create/update/error results returned per item, in request order
+- Updates only touching fields present in the payload
+- Employee references validated against the request account
+- Permission checks for bulk writes
+- Idempotent payment ingestion keyed by payment ID
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import Account, Client, Payment, StripeCustomer
+
+Employee = get_user_model()
+
+
+class ClientBulkUpsertTestCase(TestCase):
+    """POST /api/clients/bulk-upsert/"""
+
+    def setUp(self):
+        self.account = Account.objects.create(name="Bulk Co", email="bulk@company.com")
+        self.other_account = Account.objects.create(name="Other Co", email="other@company.com")
+
+        self.admin = Employee.objects.create_user(
+            email="bulk-admin@test.com",
+            password="password123",
+            name="Bulk Admin",
+            account=self.account,
+            role='super_admin',
+        )
+        self.restricted = Employee.objects.create_user(
+            email="bulk-restricted@test.com",
+            password="password123",
+            name="Restricted",
+            account=self.account,
+            role='employee',
+        )
+        self.foreign_coach = Employee.objects.create_user(
+            email="foreign-coach@test.com",
+            password="password123",
+            name="Foreign Coach",
+            account=self.other_account,
+            role='employee',
+        )
+
+        self.existing = Client.objects.create(
+            account=self.account,
+            first_name="Existing",
+            last_name="Client",
+            email="existing@bulk.com",
+            country="UK",
+        )
+
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.admin)
+
+    def test_mixed_batch_reports_per_item_results(self):
+        payload = [
+            {'email': 'new@bulk.com', 'first_name': 'New', 'coach': self.restricted.id},
+            {'email': 'existing@bulk.com', 'last_name': 'Updated'},
+            {'first_name': 'No Email'},
+            {'email': 'bad-coach@bulk.com', 'first_name': 'Bad', 'coach': self.foreign_coach.id},
+        ]
+        response = self.api.post('/api/clients/bulk-upsert/', payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(response.data['failed'], 2)
+
+        statuses = [result['status'] for result in response.data['results']]
+        self.assertEqual(statuses, ['created', 'updated', 'error', 'error'])
+        self.assertIn('coach', response.data['results'][3]['errors'])
+
+        created = Client.objects.get(account=self.account, email='new@bulk.com')
+        self.assertEqual(created.coach_id, self.restricted.id)
+        self.assertIsNotNone(created.checkin_link)
+
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.last_name, 'Updated')
+        # Fields absent from the payload are untouched
+        self.assertEqual(self.existing.first_name, 'Existing')
+        self.assertEqual(self.existing.country, 'UK')
+
+    def test_repeated_email_is_merged(self):
+        payload = [
+            {'email': 'twice@bulk.com', 'first_name': 'First'},
+            {'email': 'twice@bulk.com', 'first_name': 'Second'},
+        ]
+        response = self.api.post('/api/clients/bulk-upsert/', {'clients': payload}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Client.objects.filter(account=self.account, email='twice@bulk.com').count(), 1)
+        self.assertEqual(
+            Client.objects.get(account=self.account, email='twice@bulk.com').first_name, 'Second'
+        )
+
+    def test_requires_manage_all_clients(self):
+        api = APIClient()
+        api.force_authenticate(user=self.restricted)
+        response = api.post(
+            '/api/clients/bulk-upsert/',
+            [{'email': 'x@bulk.com', 'first_name': 'X'}],
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class PaymentBulkIngestTestCase(TestCase):
+    """POST /api/payments/bulk-ingest/"""
+
+    def setUp(self):
+        self.account = Account.objects.create(name="Ingest Co", email="ingest@company.com")
+        self.other_account = Account.objects.create(name="Other Co", email="other@company.com")
+
+        self.admin = Employee.objects.create_user(
+            email="ingest-admin@test.com",
+            password="password123",
+            name="Ingest Admin",
+            account=self.account,
+            role='super_admin',
+        )
+        self.client_a = Client.objects.create(
+            account=self.account, first_name="Alice", email="alice@ingest.com"
+        )
+        self.client_b = Client.objects.create(
+            account=self.account, first_name="Bob", email="bob@ingest.com"
+        )
+        StripeCustomer.objects.create(
+            stripe_customer_id='cus_bob', account=self.account, client=self.client_b
+        )
+        foreign_client = Client.objects.create(
+            account=self.other_account, first_name="Foreign", email="foreign@ingest.com"
+        )
+        Payment.objects.create(
+            id='ch_foreign', account=self.other_account, client=foreign_client,
+            amount='10.00', status='paid'
+        )
+
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.admin)
+
+    def test_ingest_resolves_clients_and_is_idempotent(self):
+        payload = [
+            {'id': 'ch_1', 'client_email': 'alice@ingest.com', 'amount': '50.00',
+             'status': 'paid', 'paid_currency': 'gbp'},
+            {'id': 'ch_2', 'stripe_customer_id': 'cus_bob', 'amount': '75.00', 'status': 'failed'},
+            {'id': 'ch_3', 'client_email': 'nobody@ingest.com', 'amount': '5.00', 'status': 'paid'},
+            {'id': 'ch_foreign', 'client_email': 'alice@ingest.com', 'amount': '1.00', 'status': 'paid'},
+        ]
+        response = self.api.post('/api/payments/bulk-ingest/', payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statuses = [result['status'] for result in response.data['results']]
+        self.assertEqual(statuses, ['created', 'created', 'error', 'error'])
+        self.assertEqual(Payment.objects.get(id='ch_2').client_id, self.client_b.id)
+        self.assertEqual(Payment.objects.get(id='ch_2').stripe_customer_id, 'cus_bob')
+        # Another account's payment is never overwritten
+        self.assertEqual(Payment.objects.get(id='ch_foreign').account_id, self.other_account.id)
+
+        # A retried delivery is harmless
+        response = self.api.post('/api/payments/bulk-ingest/', {'payments': payload[:2]}, format='json')
+        self.assertEqual(response.data['unchanged'], 2)
+        self.assertEqual(Payment.objects.filter(account=self.account).count(), 2)
+
+        # A changed delivery updates the existing row
+        payload[1]['status'] = 'paid'
+        response = self.api.post('/api/payments/bulk-ingest/', payload[1:2], format='json')
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(Payment.objects.get(id='ch_2').status, 'paid')
+
+    def test_item_without_client_reference_is_rejected(self):
+        response = self.api.post(
+            '/api/payments/bulk-ingest/',
+            [{'id': 'ch_x', 'amount': '5.00', 'status': 'paid'}],
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['failed'], 1)
+        self.assertFalse(Payment.objects.filter(id='ch_x').exists())
@@ -0,0 +1,296 @@
+"""
+Tests for check-in answer analytics (api/services/checkin_analytics.py).
+
+These tests cover:
+1. Schema parsing and answer coercion (no database)
+2. Aggregates per week and per client: numeric count/mean/min/max/stddev and
+   choice option counts, with client/since/until filters
+3. GET /api/checkin-forms/{id}/analytics/ only reading: no rollup writes or
+   row locks, submissions not folded in yet aggregated live
+4. Incremental refreshes folding in only new, settled submissions, and
+   rebuilds after the analysed fields or the account timezone change
+5. Edited, moved and deleted submissions recomputing only their client-weeks
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import (
+    Account, CheckInAnswerRollup, CheckInForm, CheckInFormAnalyticsState,
+    CheckInSubmission, Client
+)
+from .services.checkin_analytics import (
+    _accumulate, _summarise, _to_number, _to_options, get_analyzable_fields,
+    get_form_analytics, invalidate_form_analytics, refresh_form_analytics
+)
+
+Employee = get_user_model()
+
+FORM_SCHEMA = {
+    'fields': [
+        {'id': 'weight', 'label': 'Weight', 'type': 'number'},
+        {'id': 'mood', 'label': 'Mood', 'type': 'select'},
+        {'id': 'habits', 'label': 'Habits', 'type': 'checkbox'},
+        {'id': 'notes', 'label': 'Notes', 'type': 'textarea'},
+    ]
+}
+
+
+class AnalyticsHelpersTestCase(SimpleTestCase):
+    """Schema parsing, coercion and accumulation (no database)"""
+
+    def test_analyzable_fields(self):
+        fields = get_analyzable_fields({
+            'fields': FORM_SCHEMA['fields'] + [{'type': 'number'}, 'broken', {'id': 7, 'type': 'radio'}]
+        })
+        self.assertEqual(
+            [(field['id'], field['kind']) for field in fields],
+            [('weight', 'numeric'), ('mood', 'choice'), ('habits', 'choice'), ('7', 'choice')]
+        )
+        self.assertEqual(fields[3]['label'], '7')
+        self.assertEqual(get_analyzable_fields(None), [])
+
+    def test_coercion(self):
+        self.assertEqual(_to_number(' 81.5 '), 81.5)
+        self.assertEqual(_to_number(3), 3.0)
+        for value in (None, True, 'heavy', 'nan', float('inf')):
+            self.assertIsNone(_to_number(value))
+        self.assertEqual(_to_options(['a', None, '', 2]), ['a', '2'])
+        self.assertEqual(_to_options(False), ['false'])
+        self.assertEqual(_to_options(''), [])
+
+    def test_accumulate_and_summarise(self):
+        fields = get_analyzable_fields(FORM_SCHEMA)
+        rows = [
+            {'client_id': 1, 'week_start': 'w', 'answer_0': value, 'answer_1': mood, 'answer_2': habits}
+            for value, mood, habits in (
+                (80, 'good', ['sleep', 'water']), ('82', 'good', ['water']), ('n/a', 'bad', None)
+            )
+        ]
+        buckets = {}
+        _accumulate(buckets, rows, fields)
+
+        weight = _summarise(fields[0], {'': buckets[(1, 'w', 'weight', '')]})
+        self.assertEqual(weight, {'count': 2, 'mean': 81.0, 'min': 80.0, 'max': 82.0, 'stddev': 1.0})
+        habits = {option: acc for (_, _, field_id, option), acc in buckets.items() if field_id == 'habits'}
+        self.assertEqual(
+            _summarise(fields[2], habits), {'count': 3, 'options': {'water': 2, 'sleep': 1}}
+        )
+        self.assertEqual(
+            _summarise(fields[0], {}), {'count': 0, 'mean': None, 'min': None, 'max': None, 'stddev': None}
+        )
+
+
+class CheckInAnalyticsTestCase(TestCase):
+    """Rollups, refreshes and the analytics endpoint"""
+
+    def setUp(self):
+        self.account = Account.objects.create(name="Analytics Gym", email="analytics@gym.com", timezone='UTC')
+        self.admin = Employee.objects.create_user(
+            email="analytics-admin@test.com",
+            password="password123",
+            name="Analytics Admin",
+            account=self.account,
+            role='super_admin',
+        )
+        self.ann = Client.objects.create(account=self.account, first_name="Ann", email="ann@analytics.com")
+        self.bob = Client.objects.create(account=self.account, first_name="Bob", email="bob@analytics.com")
+        self.form = CheckInForm.objects.create(
+            account=self.account, title='Weekly check-in', form_schema=FORM_SCHEMA,
+        )
+
+        # Two past weeks, Monday noon UTC
+        today = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        self.week2 = today - timedelta(days=today.weekday() + 7)
+        self.week1 = self.week2 - timedelta(days=7)
+        self.submit(self.ann, self.week1, weight=80, mood='good', habits=['sleep', 'water'])
+        self.submit(self.ann, self.week2, weight=79, mood='good', habits=['water'])
+        self.submit(self.bob, self.week1, weight=100, mood='bad', habits=[])
+        self.submit(self.bob, self.week1 + timedelta(days=2), weight='102', mood='good', notes='skip me')
+
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.admin)
+
+    def submit(self, client, submitted_at, **answers):
+        submission = CheckInSubmission.objects.create(
+            form=self.form, client=client, account=self.account, submission_data=answers,
+        )
+        CheckInSubmission.objects.filter(pk=submission.pk).update(submitted_at=submitted_at)
+        return submission
+
+    def analytics(self, **params):
+        return get_form_analytics(CheckInForm.objects.get(pk=self.form.pk), **params)
+
+    def weeks(self, result):
+        return {str(row['week_start']): row['fields'] for row in result['results']}
+
+    def assert_week1(self, fields):
+        self.assertEqual(
+            fields['weight'], {'count': 3, 'mean': 94.0, 'min': 80.0, 'max': 102.0, 'stddev': 9.9331}
+        )
+        self.assertEqual(fields['mood'], {'count': 3, 'options': {'good': 2, 'bad': 1}})
+        self.assertEqual(fields['habits'], {'count': 2, 'options': {'sleep': 1, 'water': 1}})
+        self.assertNotIn('notes', fields)
+
+    def test_aggregates_by_week(self):
+        weeks = self.weeks(self.analytics())
+        self.assertEqual(list(weeks), [str(self.week1.date()), str(self.week2.date())])
+        self.assert_week1(weeks[str(self.week1.date())])
+        self.assertEqual(weeks[str(self.week2.date())]['weight']['mean'], 79.0)
+
+    def test_group_by_client_and_filters(self):
+        results = self.analytics(group_by='client')['results']
+        by_client = {row['client']: row['fields'] for row in results}
+        self.assertEqual(by_client[self.ann.id]['weight']['count'], 2)
+        self.assertEqual(by_client[self.bob.id]['weight']['mean'], 101.0)
+
+        results = self.analytics(group_by='client_week', client_id=self.ann.id)['results']
+        self.assertEqual([row['client'] for row in results], [self.ann.id, self.ann.id])
+
+        weeks = self.weeks(self.analytics(since=self.week2.date()))
+        self.assertEqual(list(weeks), [str(self.week2.date())])
+        weeks = self.weeks(self.analytics(until=self.week1.date()))
+        self.assertEqual(list(weeks), [str(self.week1.date())])
+
+    def test_get_only_reads(self):
+        url = f'/api/checkin-forms/{self.form.id}/analytics/'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for query in queries.captured_queries:
+            sql = query['sql'].upper()
+            self.assertFalse(sql.startswith(('INSERT', 'UPDATE', 'DELETE')), query['sql'])
+            self.assertNotIn('FOR UPDATE', sql)
+        self.assertFalse(CheckInFormAnalyticsState.objects.filter(form_id=self.form.id).exists())
+        self.assertIsNone(response.data['refreshed_through'])
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_refresh_folds_in_new_submissions(self):
+        before = self.analytics()
+        self.assertEqual(refresh_form_analytics(self.form), 4)
+        self.assertTrue(CheckInAnswerRollup.objects.filter(form_id=self.form.id).exists())
+        self.assertEqual(self.analytics(), {**before, 'refreshed_through': self.week2})
+
+        # Nothing new: nothing processed
+        self.assertEqual(refresh_form_analytics(self.form), 0)
+
+        # Not refreshed yet: merged in live
+        self.submit(self.bob, self.week2 + timedelta(hours=1), weight=99, mood='bad')
+        self.assertEqual(self.weeks(self.analytics())[str(self.week2.date())]['weight']['count'], 2)
+
+        # Too recent to fold in (settle window), still reported
+        CheckInSubmission.objects.create(
+            form=self.form, client=self.ann, account=self.account, submission_data={'weight': 78},
+        )
+        self.assertEqual(refresh_form_analytics(self.form), 1)
+        result = self.analytics()
+        self.assertEqual(result['refreshed_through'], self.week2 + timedelta(hours=1))
+        self.assertEqual(
+            self.weeks(result)[str(self.week2.date())]['mood'], {'count': 2, 'options': {'good': 1, 'bad': 1}}
+        )
+        self.assertEqual(sum(row['fields']['weight']['count'] for row in result['results']), 6)
+
+    def test_field_changes_rebuild(self):
+        refresh_form_analytics(self.form)
+        self.form.form_schema = {'fields': [FORM_SCHEMA['fields'][0]]}
+        self.form.save()
+
+        # Rollups for the old fields are ignored until the next refresh rebuilds them
+        weeks = self.weeks(self.analytics())
+        self.assertEqual(list(weeks[str(self.week1.date())]), ['weight'])
+        self.assertEqual(weeks[str(self.week1.date())]['weight']['count'], 3)
+
+        self.assertEqual(refresh_form_analytics(self.form), 4)
+        self.assertEqual(
+            set(CheckInAnswerRollup.objects.filter(form_id=self.form.id).values_list('field_id', flat=True)),
+            {'weight'}
+        )
+        self.assertEqual(self.weeks(self.analytics()), weeks)
+
+    def rollup_weeks(self):
+        return set(
+            CheckInAnswerRollup.objects.filter(form_id=self.form.id).values_list('week_start', flat=True)
+        )
+
+    def assert_matches_rebuild(self):
+        """The rollups give the same answer as rebuilding them from scratch."""
+        result = self.analytics()
+        invalidate_form_analytics(self.form.id)
+        refresh_form_analytics(self.form)
+        self.assertEqual(self.analytics(), result)
+
+    def test_edited_submission_recomputes_its_week(self):
+        submission = self.submit(self.ann, self.week1 + timedelta(days=1), weight=90, mood='good')
+        refresh_form_analytics(self.form)
+        week2_rows = list(
+            CheckInAnswerRollup.objects.filter(form_id=self.form.id, week_start=self.week2.date())
+            .order_by('pk').values_list('pk', 'answer_count')
+        )
+
+        response = self.api.patch(
+            f'/api/checkin-submissions/{submission.id}/',
+            {'submission_data': {'weight': 60, 'mood': 'bad'}},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Still served from the rollups; other weeks left alone
+        result = self.analytics()
+        self.assertEqual(result['refreshed_through'], self.week2)
+        self.assertEqual(self.rollup_weeks(), {self.week1.date(), self.week2.date()})
+        self.assertEqual(
+            list(CheckInAnswerRollup.objects.filter(form_id=self.form.id, week_start=self.week2.date())
+                 .order_by('pk').values_list('pk', 'answer_count')),
+            week2_rows
+        )
+        week1 = self.weeks(result)[str(self.week1.date())]
+        self.assertEqual(week1['weight']['min'], 60.0)
+        self.assertEqual(week1['mood']['options'], {'good': 2, 'bad': 2})
+        self.assert_matches_rebuild()
+
+    def test_moved_and_deleted_submissions(self):
+        submission = self.submit(self.ann, self.week1 + timedelta(days=1), weight=50, mood='bad')
+        refresh_form_analytics(self.form)
+
+        # Reassigned to Bob: leaves Ann's client-week, joins Bob's
+        response = self.api.patch(
+            f'/api/checkin-submissions/{submission.id}/',
+            {'client': self.bob.id},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        by_client = {row['client']: row['fields'] for row in self.analytics(group_by='client')['results']}
+        self.assertEqual(by_client[self.ann.id]['weight']['count'], 2)
+        self.assertEqual(by_client[self.bob.id]['weight']['min'], 50.0)
+        self.assert_matches_rebuild()
+
+        response = self.api.delete(f'/api/checkin-submissions/{submission.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        week1 = self.weeks(self.analytics())[str(self.week1.date())]
+        self.assert_week1(week1)
+        self.assertTrue(CheckInFormAnalyticsState.objects.filter(form_id=self.form.id).exists())
+        self.assert_matches_rebuild()
+
+    def test_timezone_change_rebuilds(self):
+        refresh_form_analytics(self.form)
+        self.account.timezone = 'Pacific/Kiritimati'
+        self.account.save()
+
+        # Week boundaries moved: the rollups are ignored until rebuilt
+        result = self.analytics()
+        self.assertIsNone(result['refreshed_through'])
+        self.assertEqual(refresh_form_analytics(self.form), 4)
+        self.assertEqual(self.analytics(), {**result, 'refreshed_through': self.week2})
+
+    def test_form_without_analysed_fields(self):
+        self.form.form_schema = {'fields': [FORM_SCHEMA['fields'][3]]}
+        self.form.save()
+        self.assertEqual(
+            self.analytics(), {'fields': [], 'group_by': 'week', 'refreshed_through': None, 'results': []}
+        )
@@ -0,0 +1,179 @@
+"""
+Tests for conditional GET (ETag / Last-Modified) on list and detail endpoints.
+
+These tests cover:
+1. ETags change with any resource version, the URL and the caller
+2. If-None-Match answered with 304 without querying the listed rows
+3. Changes through the database triggers (including to related resources,
+   deletes and many-to-many links) invalidating the ETag
+4. Weak ETags (gzip-compressed responses) and If-Modified-Since
+5. Check-in forms versioned only without submission_count (submissions are
+   not tracked)
+6. Endpoints without change_resources left alone
+"""
+from datetime import datetime, timezone as dt_timezone
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import Account, CheckInForm, CheckInFormPackage, CheckInSubmission, Client, Package
+from .services import change_versions
+
+Employee = get_user_model()
+
+CHANGED_AT = datetime(2026, 10, 1, 12, 0, tzinfo=dt_timezone.utc)
+
+
+class ChangeValidatorsTestCase(SimpleTestCase):
+    """api.services.change_versions.get_validators (no database)"""
+
+    def validators(self, versions, account_id=1, resources=('clients', 'employees'), key_parts=('/api/clients/',)):
+        with patch.object(change_versions, 'get_versions', return_value=versions):
+            return change_versions.get_validators(account_id, resources, key_parts)
+
+    def test_etag_depends_on_every_input(self):
+        versions = {'clients': (3, CHANGED_AT), 'employees': (1, CHANGED_AT)}
+        etag, _ = self.validators(versions)
+        self.assertEqual(self.validators(dict(versions))[0], etag)
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+
+        self.assertNotEqual(self.validators({**versions, 'employees': (2, CHANGED_AT)})[0], etag)
+        self.assertNotEqual(self.validators(versions, account_id=2)[0], etag)
+        self.assertNotEqual(self.validators(versions, key_parts=('/api/clients/?page=2',))[0], etag)
+
+    def test_last_modified_needs_every_resource(self):
+        _, last_modified = self.validators({'clients': (3, CHANGED_AT), 'employees': (1, CHANGED_AT)})
+        self.assertEqual(http_date(last_modified), 'Thu, 01 Oct 2026 12:00:00 GMT')
+        self.assertIsNone(self.validators({'clients': (3, CHANGED_AT)})[1])
+
+
+class ConditionalGetTestCase(TestCase):
+    """ETags and 304 responses on the API"""
+
+    def setUp(self):
+        self.account = Account.objects.create(name="Etag Gym", email="etag@gym.com")
+        self.admin = Employee.objects.create_user(
+            email="etag-admin@test.com",
+            password="password123",
+            name="Etag Admin",
+            account=self.account,
+            role='super_admin',
+        )
+        self.coach = Employee.objects.create_user(
+            email="etag-coach@test.com",
+            password=None,
+            name="Etag Coach",
+            account=self.account,
+            role='employee',
+        )
+        self.client_obj = Client.objects.create(
+            account=self.account, first_name="Pat", email="pat@etag.com", coach=self.coach,
+        )
+        self.package = Package.objects.create(account=self.account, package_name='Etag Package')
+
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.admin)
+
+    def etag(self, url):
+        response = self.api.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        return response['ETag']
+
+    def assert_not_modified(self, url, etag, sent=None):
+        """304 for If-None-Match: ``sent`` (default: ``etag``), answered with ``etag``."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get(url, HTTP_IF_NONE_MATCH=sent or etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        return [query['sql'] for query in queries.captured_queries]
+
+    def assert_modified(self, url, etag):
+        response = self.api.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_not_modified_without_list_query(self):
+        etag = self.etag('/api/clients/')
+        queries = self.assert_not_modified('/api/clients/', etag)
+        self.assertFalse([sql for sql in queries if 'FROM "clients"' in sql])
+        self.assertEqual(len([sql for sql in queries if 'account_change_versions' in sql]), 1)
+
+    def test_detail_not_modified(self):
+        url = f'/api/clients/{self.client_obj.id}/'
+        self.assert_not_modified(url, self.etag(url))
+
+    def test_change_invalidates(self):
+        etag = self.etag('/api/clients/')
+        Client.objects.filter(pk=self.client_obj.pk).update(status='inactive')
+        self.assert_modified('/api/clients/', etag)
+
+    def test_related_change_invalidates(self):
+        # The clients list shows the coach's name
+        etag = self.etag('/api/clients/')
+        Employee.objects.filter(pk=self.coach.pk).update(name="Renamed Coach")
+        self.assert_modified('/api/clients/', etag)
+
+    def test_delete_and_link_invalidate(self):
+        etag = self.etag('/api/packages/')
+        form = CheckInForm.objects.create(account=self.account, title='Etag form', form_schema={'fields': []})
+        self.assert_modified('/api/packages/', etag)
+
+        etag = self.etag('/api/packages/')
+        CheckInFormPackage.objects.create(form=form, package=self.package)
+        self.assert_modified('/api/packages/', etag)
+
+        etag = self.etag('/api/packages/')
+        Package.objects.filter(pk=self.package.pk).delete()
+        self.assert_modified('/api/packages/', etag)
+
+    def test_other_account_changes_do_not_invalidate(self):
+        etag = self.etag('/api/clients/')
+        other = Account.objects.create(name="Other Gym", email="other@gym.com")
+        Client.objects.create(account=other, first_name="Other", email="other@etag.com")
+        self.assert_not_modified('/api/clients/', etag)
+
+    def test_etag_per_url_and_caller(self):
+        etag = self.etag('/api/clients/')
+        self.assertNotEqual(self.etag('/api/clients/?fields=id'), etag)
+
+        self.api.force_authenticate(user=self.coach)
+        self.assertNotEqual(self.etag('/api/clients/'), etag)
+
+    def test_weak_etag_and_if_modified_since(self):
+        etag = self.etag('/api/clients/')
+        self.assert_not_modified('/api/clients/', etag, sent=f'W/{etag}')
+
+        response = self.api.get('/api/clients/')
+        response = self.api.get('/api/clients/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_forms_versioned_without_submission_count(self):
+        form = CheckInForm.objects.create(account=self.account, title='Etag form', form_schema={'fields': []})
+        response = self.api.get('/api/checkin-forms/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('ETag'))
+
+        # Submissions do not bump a version, so they leave the ETag alone
+        url = '/api/checkin-forms/?omit=submission_count'
+        etag = self.etag(url)
+        CheckInSubmission.objects.create(
+            form=form, client=self.client_obj, account=self.account, submission_data={},
+        )
+        self.assert_not_modified(url, etag)
+
+        CheckInForm.objects.filter(pk=form.pk).update(title='Renamed form')
+        self.assert_modified(url, etag)
+
+    def test_views_without_change_resources(self):
+        response = self.api.get('/api/payments/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('ETag'))
@@ -0,0 +1,180 @@
+"""
+Tests for the per-account dashboard rollups (api/services/dashboard_rollups.py).
+
+These tests cover:
+1. Incremental refreshes picking up new rows, and recomputing only the days
+   they touch
+2. Days that lose rows: deleted payments, submissions and cancelled clients,
+   and payments and instalments moved to another day
+3. full=True repairing rollup rows that no longer match the data
+4. GET /api/dashboard/ totals and snapshot, computed live (without writes)
+   before the first refresh
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import (
+    Account, AccountDailyRollup, AccountRollupChange, AccountRollupState, CheckInForm,
+    CheckInSubmission, Client, Installment, Payment
+)
+from .services.dashboard_rollups import refresh_account_rollups
+
+Employee = get_user_model()
+
+
+# Rows written inside the test transaction are settled immediately
+@patch('api.services.dashboard_rollups.SETTLE_SECONDS', 0)
+class DashboardRollupTestCase(TestCase):
+    """Incremental and full rollup refreshes"""
+
+    def setUp(self):
+        self.account = Account.objects.create(name="Rollup Gym", email="rollup@gym.com", timezone='UTC')
+        self.client_obj = Client.objects.create(
+            account=self.account, first_name="Rita", email="rita@rollup.com",
+        )
+        self.today = timezone.now().date()
+        self.day_a = self.today - timedelta(days=5)
+        self.day_b = self.today - timedelta(days=4)
+        self.day_c = self.today - timedelta(days=3)
+        self.payment_count = 0
+
+    def at_noon(self, day):
+        return datetime.combine(day, time(12, 0), tzinfo=dt_timezone.utc)
+
+    def pay(self, day, amount, payment_status='paid'):
+        self.payment_count += 1
+        payment = Payment.objects.create(
+            id=f'py_rollup_{self.payment_count}', account=self.account, client=self.client_obj,
+            amount=Decimal(amount), paid_currency='usd', status=payment_status,
+        )
+        Payment.objects.filter(pk=payment.pk).update(payment_date=self.at_noon(day))
+        return payment
+
+    def rollup(self, day):
+        return AccountDailyRollup.objects.filter(account=self.account, day=day).first()
+
+    def assert_day(self, day, **expected):
+        row = self.rollup(day)
+        self.assertIsNotNone(row, f'no rollup row for {day}')
+        for field, value in expected.items():
+            self.assertEqual(getattr(row, field), value, f'{field} on {day}')
+
+    def test_incremental_refresh(self):
+        self.pay(self.day_a, '100.00')
+        self.pay(self.day_a, '40.00', payment_status='failed')
+        self.pay(self.day_b, '60.00')
+        refresh_account_rollups(self.account.id)
+        self.assert_day(self.day_a, revenue=Decimal('100.00'), paid_payments=1, failed_payments=1)
+        self.assert_day(self.day_b, revenue=Decimal('60.00'), paid_payments=1)
+        self.assertFalse(AccountRollupChange.objects.filter(account_id=self.account.id).exists())
+
+        # Only the new payment's day (and today's snapshot row) is recomputed
+        self.pay(self.day_a, '25.50')
+        self.assertEqual(refresh_account_rollups(self.account.id), 2)
+        self.assert_day(self.day_a, revenue=Decimal('125.50'), paid_payments=2)
+        self.assert_day(self.day_b, revenue=Decimal('60.00'))
+
+    def test_deleted_rows_are_removed_from_their_day(self):
+        self.pay(self.day_a, '100.00')
+        only_payment = self.pay(self.day_c, '80.00')
+        form = CheckInForm.objects.create(account=self.account, title='Rollup form', form_schema={'fields': []})
+        submission = CheckInSubmission.objects.create(
+            form=form, client=self.client_obj, account=self.account, submission_data={},
+        )
+        CheckInSubmission.objects.filter(pk=submission.pk).update(submitted_at=self.at_noon(self.day_b))
+        cancelled = Client.objects.create(
+            account=self.account, first_name="Cleo", email="cleo@rollup.com",
+            status='cancelled', client_end_date=self.day_b,
+        )
+        refresh_account_rollups(self.account.id)
+        self.assert_day(self.day_c, revenue=Decimal('80.00'), paid_payments=1)
+        self.assert_day(self.day_b, submissions=1, churned_clients=1)
+
+        only_payment.delete()
+        submission.delete()
+        cancelled.delete()
+        refresh_account_rollups(self.account.id)
+        self.assert_day(self.day_c, revenue=Decimal('0.00'), paid_payments=0)
+        self.assert_day(self.day_b, submissions=0, churned_clients=0)
+        self.assert_day(self.day_a, revenue=Decimal('100.00'))
+
+    def test_moved_rows_leave_their_old_day(self):
+        payment = self.pay(self.day_a, '100.00')
+        installment = Installment.objects.create(
+            account=self.account, client=self.client_obj, amount=Decimal('30.00'),
+            currency='usd', instalment_number=1, schedule_date=self.day_a,
+        )
+        refresh_account_rollups(self.account.id)
+        self.assert_day(self.day_a, revenue=Decimal('100.00'), installments_due=1)
+
+        Payment.objects.filter(pk=payment.pk).update(payment_date=self.at_noon(self.day_c))
+        Installment.objects.filter(pk=installment.pk).update(schedule_date=self.day_b)
+        refresh_account_rollups(self.account.id)
+        self.assert_day(self.day_a, revenue=Decimal('0.00'), paid_payments=0, installments_due=0)
+        self.assert_day(self.day_b, installments_due=1, installments_due_amount=Decimal('30.00'))
+        self.assert_day(self.day_c, revenue=Decimal('100.00'), paid_payments=1)
+
+    def test_full_refresh_repairs_stale_days(self):
+        self.pay(self.day_a, '100.00')
+        refresh_account_rollups(self.account.id)
+
+        # Drift the trigger log cannot see (e.g. rows changed before it existed)
+        AccountDailyRollup.objects.filter(account=self.account, day=self.day_a).update(revenue=Decimal('1.00'))
+        AccountDailyRollup.objects.create(
+            account=self.account, day=self.day_b, revenue=Decimal('999.00'), paid_payments=9,
+            active_clients=3,
+        )
+
+        refresh_account_rollups(self.account.id)
+        self.assert_day(self.day_a, revenue=Decimal('1.00'))
+
+        refresh_account_rollups(self.account.id, full=True)
+        self.assert_day(self.day_a, revenue=Decimal('100.00'), paid_payments=1)
+        # Days without data are zeroed; their snapshot is kept
+        self.assert_day(self.day_b, revenue=Decimal('0.00'), paid_payments=0, active_clients=3)
+
+    def test_dashboard_endpoint(self):
+        admin = Employee.objects.create_user(
+            email="rollup-admin@test.com",
+            password="password123",
+            name="Rollup Admin",
+            account=self.account,
+            role='super_admin',
+        )
+        self.pay(self.day_a, '100.00')
+        self.pay(self.day_b, '50.00')
+        api = APIClient()
+        api.force_authenticate(user=admin)
+
+        # Never refreshed: computed live, and the GET writes nothing
+        with CaptureQueriesContext(connection) as queries:
+            live = api.get('/api/dashboard/?days=7')
+        self.assertEqual(live.status_code, status.HTTP_200_OK)
+        for query in queries.captured_queries:
+            sql = query['sql'].upper()
+            self.assertFalse(sql.startswith(('INSERT', 'UPDATE', 'DELETE')), query['sql'])
+            self.assertNotIn('FOR UPDATE', sql)
+        self.assertFalse(AccountRollupState.objects.filter(account_id=self.account.id).exists())
+        self.assertIsNone(live.data['refreshed_at'])
+
+        refresh_account_rollups(self.account.id)
+        response = api.get('/api/dashboard/?days=7')
+        self.assertIsNotNone(response.data['refreshed_at'])
+        for data in (live.data, response.data):
+            self.assertEqual(data['totals']['revenue'], Decimal('150.00'))
+            self.assertEqual(data['totals']['paid_payments'], 2)
+            self.assertEqual(data['snapshot']['active_clients'], 1)
+            self.assertEqual(data['daily'][-1]['day'], self.today)
+        self.assertEqual(live.data['daily'], response.data['daily'])
+
+        response = api.get('/api/dashboard/?days=0')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
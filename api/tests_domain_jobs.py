@@ -0,0 +1,266 @@
+"""
+Tests for background custom-domain provisioning.
+
+certbot, nginx and systemctl are replaced by stub binaries on
+DOMAIN_COMMAND_PATH that log their arguments; nginx configs are written to
+temporary sites-available/sites-enabled directories.
+
+These tests cover:
+1. The command runner: prefix, stub PATH and failure output
+2. Configure endpoints queueing a job without running any command
+3. One nginx -t and reload per batch of domains
+4. Certificate and nginx -t failures marking jobs failed and skipping later steps
+5. Stale jobs claimed again, while a long batch that is still running is not
+6. Polling a job, scoped to the caller's account
+"""
+import os
+import shutil
+import stat
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.models import Account, DomainProvisioningJob
+from api.services import domain_jobs
+from api.services.domain_service import DomainService, SubprocessRunner
+
+Employee = get_user_model()
+
+# Logs "<name> <args>" and fails when the arguments contain a pattern listed in fail_<name>
+STUB_SCRIPT = """#!/bin/sh
+echo "$(basename "$0") $*" >> "{log}"
+if [ -f "{bin_dir}/fail_$(basename "$0")" ]; then
+    for pattern in $(cat "{bin_dir}/fail_$(basename "$0")"); do
+        case "$*" in *"$pattern"*) echo "stub failure for $pattern" >&2; exit 1;; esac
+    done
+fi
+exit 0
+"""
+
+
+class StubBinariesMixin:
+    """Stub certbot/nginx/systemctl on DOMAIN_COMMAND_PATH and temporary nginx site directories."""
+
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.bin_dir = os.path.join(self.root, 'bin')
+        self.log = os.path.join(self.root, 'commands.log')
+        os.makedirs(self.bin_dir)
+        for name in ('certbot', 'nginx', 'systemctl'):
+            path = os.path.join(self.bin_dir, name)
+            with open(path, 'w') as f:
+                f.write(STUB_SCRIPT.format(log=self.log, bin_dir=self.bin_dir))
+            os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+
+        self.sites_available = os.path.join(self.root, 'sites-available')
+        self.sites_enabled = os.path.join(self.root, 'sites-enabled')
+        os.makedirs(self.sites_available)
+        os.makedirs(self.sites_enabled)
+        for attr, path in (('NGINX_SITES_AVAILABLE', self.sites_available), ('NGINX_SITES_ENABLED', self.sites_enabled)):
+            patcher = patch.object(DomainService, attr, path)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        overrides = override_settings(DOMAIN_COMMAND_PREFIX=[], DOMAIN_COMMAND_PATH=self.bin_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def fail_on(self, binary, pattern):
+        with open(os.path.join(self.bin_dir, f'fail_{binary}'), 'a') as f:
+            f.write(f'{pattern}\n')
+
+    def commands(self, binary=None):
+        if not os.path.exists(self.log):
+            return []
+        with open(self.log) as f:
+            lines = f.read().splitlines()
+        return [line for line in lines if binary is None or line.split(' ', 1)[0] == binary]
+
+
+class DomainServiceRunnerTestCase(StubBinariesMixin, SimpleTestCase):
+    """DomainService commands through the pluggable runner (no database)"""
+
+    def test_runner_uses_prefix_and_stub_path(self):
+        result = SubprocessRunner(prefix=['env'], path=self.bin_dir).run(['nginx', '-t'], timeout=10)
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(self.commands(), ['nginx -t'])
+
+    def test_empty_prefix_entries_are_dropped(self):
+        self.assertEqual(SubprocessRunner(prefix=[''], path='').prefix, [])
+
+    def test_certificate_failure_returns_stderr(self):
+        self.fail_on('certbot', 'bad.gym.com')
+        success, message = DomainService.generate_ssl_certificate('bad.gym.com')
+        self.assertFalse(success)
+        self.assertIn('stub failure for bad.gym.com', message)
+
+    def test_config_written_enabled_and_disabled(self):
+        success, _ = DomainService.create_nginx_config('check.gym.com')
+        self.assertTrue(success)
+        with open(os.path.join(self.sites_available, 'check.gym.com')) as f:
+            self.assertIn('server_name check.gym.com;', f.read())
+        self.assertTrue(os.path.islink(os.path.join(self.sites_enabled, 'check.gym.com')))
+
+        DomainService.disable_site('check.gym.com')
+        self.assertFalse(os.path.lexists(os.path.join(self.sites_enabled, 'check.gym.com')))
+        self.assertEqual(self.commands('systemctl'), [])
+
+    def test_reload_skipped_when_config_test_fails(self):
+        self.fail_on('nginx', '-t')
+        success, message = DomainService.test_and_reload_nginx()
+        self.assertFalse(success)
+        self.assertIn('Nginx config test failed', message)
+        self.assertEqual(self.commands('systemctl'), [])
+
+
+class DomainJobTestCase(StubBinariesMixin, TestCase):
+    """Queueing, batch processing and polling of domain provisioning jobs"""
+
+    def setUp(self):
+        super().setUp()
+        self.account = Account.objects.create(name="Domain Gym", email="domains@gym.com")
+        self.other_account = Account.objects.create(name="Other Gym", email="other@gym.com")
+        self.admin = Employee.objects.create_user(
+            email="domain-admin@test.com",
+            password="password123",
+            name="Domain Admin",
+            account=self.account,
+            role='super_admin',
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.admin)
+
+    def test_configure_queues_job_without_running_commands(self):
+        response = self.api.post('/api/domains/configure/', {'forms_domain': 'check.gym.com'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertEqual(response.data['status_url'], f"/api/domains/jobs/{response.data['job_id']}/")
+        self.assertEqual(self.commands(), [])
+
+        job = DomainProvisioningJob.objects.get(id=response.data['job_id'])
+        self.assertEqual((job.account_id, job.domain, job.domain_type), (self.account.id, 'check.gym.com', 'forms'))
+        self.account.refresh_from_db()
+        self.assertIsNone(self.account.forms_domain)
+
+        # Configuring the same domain again returns the queued job
+        again = self.api.post('/api/domains/configure/', {'forms_domain': 'check.gym.com'}, format='json')
+        self.assertEqual(again.data['job_id'], response.data['job_id'])
+
+        payment = self.api.post('/api/domains/payment/configure/', {'payment_domain': 'pay.gym.com'}, format='json')
+        self.assertEqual(payment.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(DomainProvisioningJob.objects.get(id=payment.data['job_id']).domain_type, 'payment')
+
+    def test_batch_shares_one_nginx_reload(self):
+        domain_jobs.enqueue(self.account, 'check.gym.com', 'forms')
+        domain_jobs.enqueue(self.account, 'pay.gym.com', 'payment')
+        domain_jobs.enqueue(self.other_account, 'check.other.com', 'forms')
+
+        jobs = domain_jobs.process_pending_jobs()
+
+        self.assertEqual([job.status for job in jobs], ['succeeded'] * 3)
+        self.assertEqual(len(self.commands('certbot')), 3)
+        self.assertEqual(self.commands('nginx'), ['nginx -t'])
+        self.assertEqual(self.commands('systemctl'), ['systemctl reload nginx'])
+        for job in DomainProvisioningJob.objects.all():
+            self.assertEqual({step['status'] for step in job.steps.values()}, {'succeeded'})
+            self.assertIsNotNone(job.finished_at)
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.forms_domain, 'check.gym.com')
+        self.assertTrue(self.account.forms_domain_configured)
+        self.assertEqual(self.account.payment_domain, 'pay.gym.com')
+        self.assertTrue(self.account.payment_domain_verified)
+
+        # Nothing left to do
+        self.assertEqual(domain_jobs.process_pending_jobs(), [])
+
+    def test_certificate_failure_skips_config_and_reload(self):
+        self.fail_on('certbot', 'bad.gym.com')
+        failed, _ = domain_jobs.enqueue(self.account, 'bad.gym.com', 'forms')
+        ok, _ = domain_jobs.enqueue(self.other_account, 'check.other.com', 'forms')
+
+        domain_jobs.process_pending_jobs()
+
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, 'failed')
+        self.assertIn('stub failure for bad.gym.com', failed.error)
+        self.assertEqual(failed.steps['cert']['status'], 'failed')
+        self.assertEqual(failed.steps['config']['status'], 'skipped')
+        self.assertEqual(failed.steps['reload']['status'], 'skipped')
+        self.assertFalse(os.path.exists(os.path.join(self.sites_available, 'bad.gym.com')))
+        self.account.refresh_from_db()
+        self.assertIsNone(self.account.forms_domain)
+
+        ok.refresh_from_db()
+        self.assertEqual(ok.status, 'succeeded')
+        self.assertEqual(len(self.commands('systemctl')), 1)
+
+    def test_config_test_failure_fails_batch_and_disables_sites(self):
+        self.fail_on('nginx', '-t')
+        domain_jobs.enqueue(self.account, 'check.gym.com', 'forms')
+        domain_jobs.enqueue(self.other_account, 'check.other.com', 'forms')
+
+        jobs = domain_jobs.process_pending_jobs()
+
+        self.assertEqual([job.status for job in jobs], ['failed', 'failed'])
+        for job in jobs:
+            self.assertEqual(job.steps['config']['status'], 'succeeded')
+            self.assertEqual(job.steps['reload']['status'], 'failed')
+        self.assertEqual(os.listdir(self.sites_enabled), [])
+        self.assertEqual(self.commands('systemctl'), [])
+        self.account.refresh_from_db()
+        self.assertIsNone(self.account.forms_domain)
+
+    def test_stale_running_job_is_claimed_again(self):
+        job, _ = domain_jobs.enqueue(self.account, 'check.gym.com', 'forms')
+        self.assertEqual(domain_jobs.claim_jobs(), [job])
+        self.assertEqual(domain_jobs.claim_jobs(), [])
+
+        with override_settings(DOMAIN_JOB_STALE_AFTER=-1):
+            self.assertEqual(domain_jobs.claim_jobs(), [job])
+
+    def test_batch_in_progress_is_not_claimed_again(self):
+        for index in range(3):
+            domain_jobs.enqueue(self.account, f'check{index}.gym.com', 'forms')
+        clock = [timezone.now()]
+        reclaimed = []
+        issue_certificate = DomainService.generate_ssl_certificate
+
+        def slow_certificate(domain):
+            # Every certificate takes 10 minutes, so the batch outlives
+            # DOMAIN_JOB_STALE_AFTER; meanwhile another worker polls
+            clock[0] += timedelta(minutes=10)
+            reclaimed.extend(domain_jobs.claim_jobs())
+            return issue_certificate(domain)
+
+        with override_settings(DOMAIN_JOB_STALE_AFTER=900), \
+                patch.object(domain_jobs.timezone, 'now', lambda: clock[0]), \
+                patch.object(DomainService, 'generate_ssl_certificate', side_effect=slow_certificate):
+            jobs = domain_jobs.process_pending_jobs()
+
+        self.assertEqual(reclaimed, [])
+        self.assertEqual([job.status for job in jobs], ['succeeded'] * 3)
+        self.assertEqual(len(self.commands('certbot')), 3)
+        self.assertEqual(self.commands('systemctl'), ['systemctl reload nginx'])
+
+    def test_poll_job_status(self):
+        job, _ = domain_jobs.enqueue(self.account, 'check.gym.com', 'forms')
+        domain_jobs.process_pending_jobs()
+
+        response = self.api.get(f'/api/domains/jobs/{job.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'succeeded')
+        self.assertEqual(set(response.data['steps']), {'cert', 'config', 'reload'})
+        self.assertEqual(response.data['steps']['reload']['status'], 'succeeded')
+
+        other_job, _ = domain_jobs.enqueue(self.other_account, 'check.other.com', 'forms')
+        response = self.api.get(f'/api/domains/jobs/{other_job.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,146 @@
+"""
+Tests for the check-in form submissions actions.
+
+These tests cover:
+1. Keyset paging of GET /api/checkin-forms/{id}/submissions/ (every row once,
+   newest first, ties broken by id, no COUNT)
+2. Projection with fields=, omit= and data_keys=
+3. The NDJSON stream: line format, order, projection and submitted_after
+"""
+import json
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import Account, CheckInForm, CheckInSubmission, Client
+
+Employee = get_user_model()
+
+
+class FormSubmissionsTestCase(TestCase):
+    """Paged, projected and streamed form submissions"""
+
+    def setUp(self):
+        self.account = Account.objects.create(name="Submissions Gym", email="submissions@gym.com")
+        self.admin = Employee.objects.create_user(
+            email="submissions-admin@test.com",
+            password="password123",
+            name="Submissions Admin",
+            account=self.account,
+            role='super_admin',
+        )
+        self.client_obj = Client.objects.create(
+            account=self.account, first_name="Sam", last_name="Submit", email="sam@submissions.com",
+        )
+        self.form = CheckInForm.objects.create(
+            account=self.account, title='Weekly check-in', form_schema={'fields': []},
+        )
+        other_form = CheckInForm.objects.create(
+            account=self.account, title='Other form', form_schema={'fields': []},
+        )
+
+        # Pairs share a timestamp to exercise the id tie-breaker
+        self.base = timezone.now().replace(microsecond=0)
+        for i in range(7):
+            submission = CheckInSubmission.objects.create(
+                form=self.form, client=self.client_obj, account=self.account,
+                submission_data={'weight': 80 + i, 'mood': 'good', 'notes': 'x' * 100},
+            )
+            CheckInSubmission.objects.filter(pk=submission.pk).update(
+                submitted_at=self.base - timedelta(hours=i // 2)
+            )
+        CheckInSubmission.objects.create(
+            form=other_form, client=self.client_obj, account=self.account, submission_data={},
+        )
+
+        self.url = f'/api/checkin-forms/{self.form.id}/submissions/'
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.admin)
+
+    def expected_ids(self, **filters):
+        return [
+            str(pk) for pk in CheckInSubmission.objects.filter(form=self.form, **filters)
+            .order_by('-submitted_at', '-id').values_list('id', flat=True)
+        ]
+
+    def newest(self):
+        return CheckInSubmission.objects.get(pk=self.expected_ids()[0])
+
+    def walk(self, url):
+        rows = []
+        while url:
+            response = self.api.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(set(response.data), {'next', 'results'})
+            self.assertLessEqual(len(response.data['results']), 3)
+            rows.extend(response.data['results'])
+            url = response.data['next']
+        return rows
+
+    def stream(self, query=''):
+        response = self.api.get(f'{self.url}stream/{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        body = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(body.endswith('\n'))
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_cursor_paging_returns_every_submission_once(self):
+        rows = self.walk(f'{self.url}?page_size=3')
+        self.assertEqual([row['id'] for row in rows], self.expected_ids())
+        self.assertEqual(rows[0]['client_name'], 'Sam Submit')
+        self.assertEqual(rows[0]['submission_data']['mood'], 'good')
+
+    def test_invalid_cursor(self):
+        response = self.api.get(f'{self.url}?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_projection(self):
+        row = self.walk(f'{self.url}?page_size=3&omit=submission_data,form_title')[0]
+        self.assertNotIn('submission_data', row)
+        self.assertNotIn('form_title', row)
+        self.assertIn('client_email', row)
+
+        row = self.walk(f'{self.url}?page_size=3&fields=id,client_name')[0]
+        self.assertEqual(list(row), ['id', 'client_name'])
+
+        # Keys missing from a submission come back as null
+        row = self.walk(f'{self.url}?page_size=3&fields=id,submission_data&data_keys=weight,missing')[0]
+        self.assertEqual(
+            row['submission_data'], {'weight': self.newest().submission_data['weight'], 'missing': None}
+        )
+
+    def test_unknown_field_is_rejected(self):
+        response = self.api.get(f'{self.url}?fields=id,secret')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.api.get(f'{self.url}stream/?omit=secret')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stream(self):
+        rows = self.stream()
+        self.assertEqual([row['id'] for row in rows], self.expected_ids())
+        self.assertEqual(rows[0]['client_name'], 'Sam Submit')
+        self.assertEqual(rows[0]['form'], str(self.form.id))
+        self.assertEqual(rows[0]['submission_data'], self.newest().submission_data)
+
+        # Same values as the paged action
+        paged = self.walk(f'{self.url}?page_size=3')
+        self.assertEqual(rows[0]['submitted_at'], paged[0]['submitted_at'])
+
+    def test_stream_projection_and_submitted_after(self):
+        rows = self.stream('?fields=id,submission_data&data_keys=mood')
+        self.assertEqual(rows[0], {'id': self.expected_ids()[0], 'submission_data': {'mood': 'good'}})
+
+        after = self.base - timedelta(hours=1, minutes=30)
+        rows = self.stream(f'?fields=id&submitted_after={after.isoformat().replace("+00:00", "Z")}')
+        self.assertEqual(
+            [row['id'] for row in rows], self.expected_ids(submitted_at__gt=after)
+        )
+        self.assertEqual(len(rows), 4)
+
+        response = self.api.get(f'{self.url}stream/?submitted_after=yesterday')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
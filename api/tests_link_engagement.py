@@ -0,0 +1,137 @@
+"""
+Tests for client link engagement.
+
+Tests cover:
+- Clicks, last click and conversion per client and per link type
+- Submissions before the first click, or on other form types, not counted
+- One query per account, then cached until the TTL expires
+- Engagement limited to the clients the user can see
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import Account, CheckInForm, CheckInSubmission, ClickAnalytics, Client, ShortUrl
+from .services import link_engagement
+from .services.link_engagement import get_account_engagement
+
+Employee = get_user_model()
+
+
+class LinkEngagementTestCase(TestCase):
+    """GET /api/clients/engagement/"""
+
+    def setUp(self):
+        link_engagement.clear()
+        self.account = Account.objects.create(name="Engaged Co", email="engaged@company.com")
+        self.admin = Employee.objects.create_user(
+            email="engaged-admin@test.com",
+            password="password123",
+            name="Engaged Admin",
+            account=self.account,
+            role='super_admin',
+        )
+        self.coach = Employee.objects.create_user(
+            email="engaged-coach@test.com",
+            password="password123",
+            name="Coach",
+            account=self.account,
+            role='employee',
+        )
+
+        self.jane = Client.objects.create(
+            account=self.account, first_name="Jane", last_name="Doe", email="jane@engaged.com",
+            coach=self.coach,
+            short_checkin_link='https://check.engaged.com/jane1',
+            short_onboarding_link='https://check.engaged.com/jane2',
+        )
+        self.john = Client.objects.create(
+            account=self.account, first_name="John", last_name="Roe", email="john@engaged.com",
+            short_checkin_link='https://check.engaged.com/john1',
+        )
+        self.quiet = Client.objects.create(
+            account=self.account, first_name="Quiet", email="quiet@engaged.com",
+        )
+
+        now = timezone.now()
+        self.first_click = now - timedelta(days=7)
+        self.last_click = now - timedelta(days=1)
+        self._link('jane1', clicks=4, clicked_at=[self.first_click, self.last_click])
+        self._link('jane2', clicks=1, clicked_at=[now - timedelta(days=20)])
+        self._link('john1', clicks=0, clicked_at=[])
+
+        checkins = CheckInForm.objects.create(account=self.account, title='Weekly', form_type='checkins')
+        reviews = CheckInForm.objects.create(account=self.account, title='Review', form_type='reviews')
+        for submitted_at, form in (
+            (now - timedelta(days=30), checkins),  # before the first click
+            (now - timedelta(days=6), checkins),
+            (now - timedelta(days=1), checkins),
+            (now - timedelta(days=2), reviews),  # no reviews link
+        ):
+            submission = CheckInSubmission.objects.create(
+                form=form, client=self.jane, account=self.account, submission_data={}
+            )
+            CheckInSubmission.objects.filter(pk=submission.pk).update(submitted_at=submitted_at)
+
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.admin)
+
+    def _link(self, short_code, clicks, clicked_at):
+        link = ShortUrl.objects.create(
+            domain='check.engaged.com', short_code=short_code,
+            original_url=f'https://forms.engaged.com/{short_code}/', clicks=clicks,
+        )
+        for moment in clicked_at:
+            ClickAnalytics.objects.create(short_url=link, clicked_at=moment)
+        return link
+
+    def test_engagement_per_client_and_link(self):
+        response = self.api.get('/api/clients/engagement/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = {row['client_id']: row for row in response.data['results']}
+
+        jane = results[self.jane.id]
+        self.assertEqual(jane['clicks'], 5)
+        self.assertEqual(jane['submissions'], 2)
+        self.assertEqual(jane['conversion_rate'], 0.4)
+        self.assertEqual(jane['last_clicked_at'], self.last_click)
+        self.assertEqual(jane['links']['checkin']['clicks'], 4)
+        self.assertEqual(jane['links']['checkin']['submissions'], 2)
+        self.assertEqual(jane['links']['checkin']['conversion_rate'], 0.5)
+        self.assertEqual(jane['links']['onboarding']['submissions'], 0)
+        self.assertNotIn('reviews', jane['links'])
+
+        john = results[self.john.id]
+        self.assertEqual(john['clicks'], 0)
+        self.assertIsNone(john['last_clicked_at'])
+        self.assertIsNone(john['conversion_rate'])
+
+        self.assertEqual(results[self.quiet.id]['links'], {})
+
+    def test_engagement_is_one_query_then_cached(self):
+        with self.assertNumQueries(1):
+            engagement = get_account_engagement(self.account.id)
+        self.assertEqual(set(engagement), {self.jane.id, self.john.id})
+
+        ShortUrl.objects.filter(short_code='john1').update(clicks=3)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_account_engagement(self.account.id)[self.john.id]['clicks'], 0)
+
+        link_engagement.invalidate_account(self.account.id)
+        self.assertEqual(get_account_engagement(self.account.id)[self.john.id]['clicks'], 3)
+
+    @override_settings(LINK_ENGAGEMENT_CACHE_TTL=0)
+    def test_cache_can_be_disabled(self):
+        get_account_engagement(self.account.id)
+        with self.assertNumQueries(1):
+            get_account_engagement(self.account.id)
+
+    def test_only_visible_clients_are_returned(self):
+        self.api.force_authenticate(user=self.coach)
+        response = self.api.get('/api/clients/engagement/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['client_id'] for row in response.data['results']], [self.jane.id])
@@ -0,0 +1,111 @@
+"""
+Tests for request metrics and the Prometheus endpoint.
+
+These tests cover:
+1. Histogram bookkeeping and the Prometheus text format
+2. DB query and outbound HTTP accounting for the current request
+3. The middleware labelling requests by DRF view and action
+4. The slow-request log line
+5. The METRICS_TOKEN guard on /api/internal/metrics/
+"""
+import json
+import time
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api import metrics
+from api.middleware import RequestMetricsMiddleware, _view_labels
+from api.views import ClientViewSet, metrics_endpoint
+
+
+@override_settings(METRICS_TOKEN='scrape-me', SLOW_REQUEST_THRESHOLD_MS=1000)
+class RequestMetricsTestCase(SimpleTestCase):
+    """Tests for api.metrics and api.middleware.RequestMetricsMiddleware"""
+
+    def setUp(self):
+        metrics.reset()
+
+    def test_histogram_render(self):
+        histogram = metrics.Histogram('test_seconds', 'Test.', ('view',), (0.1, 1.0))
+        histogram.observe(('a',), 0.05)
+        histogram.observe(('a',), 0.5)
+        histogram.observe(('a',), 5.0)
+        lines = histogram.render()
+        self.assertIn('# TYPE test_seconds histogram', lines)
+        self.assertIn('test_seconds_bucket{view="a",le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{view="a",le="1.0"} 2', lines)
+        self.assertIn('test_seconds_bucket{view="a",le="+Inf"} 3', lines)
+        self.assertIn('test_seconds_count{view="a"} 3', lines)
+
+    def test_label_values_are_escaped(self):
+        counter = metrics.Counter('test_total', 'Test.', ('view',))
+        counter.inc(('say "hi"\n',))
+        self.assertIn('test_total{view="say \\"hi\\"\\n"} 1', counter.render())
+
+    def test_db_and_outbound_accounting(self):
+        stats, token = metrics.start_request()
+        try:
+            metrics.db_execute_wrapper(lambda *args: None, 'SELECT 1', None, False, {})
+            metrics.db_execute_wrapper(lambda *args: None, 'SELECT 2', None, False, {})
+            metrics.record_outbound('https://api.stripe.com/v1/charges', 0.2)
+        finally:
+            metrics.end_request(token)
+
+        self.assertEqual(stats.db_queries, 2)
+        self.assertEqual(sorted(sql for _, sql in stats.top_queries(5)), ['SELECT 1', 'SELECT 2'])
+        self.assertEqual(stats.outbound_calls, 1)
+        self.assertAlmostEqual(stats.outbound_time, 0.2)
+        self.assertIn(
+            'crm_outbound_request_duration_seconds_count{host="api.stripe.com"} 1',
+            metrics.render_prometheus(),
+        )
+
+    def test_view_labels(self):
+        view = ClientViewSet.as_view({'get': 'list', 'post': 'create'})
+        self.assertEqual(_view_labels(view, 'POST'), ('ClientViewSet', 'create'))
+        self.assertEqual(_view_labels(metrics_endpoint, 'GET'), ('metrics_endpoint', ''))
+
+    def test_middleware_records_request(self):
+        response = self.client.get(
+            '/api/internal/metrics/', HTTP_X_METRICS_TOKEN='scrape-me', secure=True
+        )
+        self.assertEqual(response.status_code, 200)
+
+        body = metrics.render_prometheus()
+        self.assertIn(
+            'crm_http_requests_total{view="metrics_endpoint",action="",method="GET",status="200"} 1',
+            body,
+        )
+        self.assertIn(
+            'crm_http_request_db_queries_count{view="metrics_endpoint",action="",method="GET"} 1',
+            body,
+        )
+        self.assertIn('crm_http_response_size_bytes_count{view="metrics_endpoint"', body)
+
+    def test_unmatched_requests_are_grouped(self):
+        self.client.get('/api/no-such-endpoint/', secure=True)
+        self.assertIn('view="unmatched"', metrics.render_prometheus())
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=1)
+    def test_slow_request_is_logged(self):
+        def slow_view(request):
+            metrics.db_execute_wrapper(lambda *args: time.sleep(0.005), 'SELECT pg_sleep(1)', None, False, {})
+            return HttpResponse('ok')
+
+        middleware = RequestMetricsMiddleware(slow_view)
+        with self.assertLogs('api.middleware', level='WARNING') as logs:
+            middleware(RequestFactory().get('/api/clients/'))
+
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['event'], 'slow_request')
+        self.assertEqual(entry['db_queries'], 1)
+        self.assertEqual(entry['top_queries'][0]['sql'], 'SELECT pg_sleep(1)')
+
+    def test_endpoint_requires_token(self):
+        response = self.client.get('/api/internal/metrics/', HTTP_X_METRICS_TOKEN='wrong', secure=True)
+        self.assertEqual(response.status_code, 403)
+
+        with override_settings(METRICS_TOKEN=''):
+            response = self.client.get('/api/internal/metrics/', HTTP_X_METRICS_TOKEN='', secure=True)
+        self.assertEqual(response.status_code, 404)
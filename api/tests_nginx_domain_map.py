@@ -0,0 +1,137 @@
+"""
+Tests for the single nginx map/SNI config for custom domains.
+
+Uses the stub certbot/nginx/systemctl binaries from tests_domain_jobs; the map
+config is written to a temporary directory.
+
+These tests cover:
+1. Deterministic rendering: one HTTPS server block per domain with static
+   certificate paths, one shared HTTP block
+2. Atomic, idempotent writes (unchanged content is not rewritten)
+3. Only verified, well-formed account domains rendered
+4. Domain jobs in map mode: one config write and one reload per batch,
+   no reload when nothing changed, previous domains restored when nginx -t fails
+5. Removing a domain from the map
+"""
+import os
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api.models import Account
+from api.services import domain_jobs, nginx_domain_map
+from api.services.domain_service import DomainService
+from api.tests_domain_jobs import StubBinariesMixin
+
+
+class MapConfigMixin(StubBinariesMixin):
+
+    def setUp(self):
+        super().setUp()
+        self.map_path = os.path.join(self.root, 'conf.d', 'crm_custom_domains.conf')
+        os.makedirs(os.path.dirname(self.map_path))
+        overrides = override_settings(NGINX_CONFIG_MODE='map', NGINX_DOMAIN_MAP_PATH=self.map_path)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def rendered_domains(self):
+        content = nginx_domain_map.read_config() or ''
+        return [line.split()[1].rstrip(';') for line in content.splitlines()
+                if line.strip().startswith('server_name ')]
+
+
+class RenderTestCase(MapConfigMixin, SimpleTestCase):
+    """Rendering and writing the map config (no database)"""
+
+    def test_static_certificate_per_domain(self):
+        content = nginx_domain_map.render(['a.gym.com', 'b.gym.com'])
+        self.assertEqual(content.count('server {'), 3)
+        self.assertEqual(content.count('listen 443 ssl;'), 2)
+        self.assertIn('ssl_certificate /etc/letsencrypt/live/a.gym.com/fullchain.pem;', content)
+        self.assertIn('ssl_certificate_key /etc/letsencrypt/live/b.gym.com/privkey.pem;', content)
+        # No per-handshake certificate loading
+        self.assertNotIn('$ssl_server_name', content)
+        self.assertNotIn('ssl_certificate $', content)
+
+    def test_no_domains_renders_no_servers(self):
+        self.assertNotIn('server {', nginx_domain_map.render([]))
+
+    def test_render_is_deterministic(self):
+        domains = ['a.gym.com', 'b.gym.com']
+        self.assertEqual(nginx_domain_map.render(domains), nginx_domain_map.render(list(domains)))
+
+    def test_write_is_atomic_and_idempotent(self):
+        content = nginx_domain_map.render(['a.gym.com'])
+        self.assertEqual(nginx_domain_map.write(content), (True, 'Nginx domain map written', True))
+        self.assertEqual(nginx_domain_map.read_config(), content)
+        self.assertFalse(os.path.exists(f'{self.map_path}.tmp'))
+        self.assertEqual(oct(os.stat(self.map_path).st_mode & 0o777), '0o644')
+
+        self.assertEqual(nginx_domain_map.write(content), (True, 'Nginx domain map unchanged', False))
+
+
+class DomainMapTestCase(MapConfigMixin, TestCase):
+    """Map config generated from accounts and by domain jobs"""
+
+    def setUp(self):
+        super().setUp()
+        self.live = Account.objects.create(
+            name="Live Gym", email="live@gym.com",
+            forms_domain='check.live.com', forms_domain_verified=True, forms_domain_configured=True,
+            payment_domain='pay.live.com', payment_domain_verified=True, payment_domain_configured=True,
+        )
+        Account.objects.create(
+            name="Unverified Gym", email="unverified@gym.com", forms_domain='check.unverified.com',
+        )
+        Account.objects.create(
+            name="Broken Gym", email="broken@gym.com",
+            forms_domain='bad.com; include /etc/passwd', forms_domain_verified=True,
+        )
+        self.account = Account.objects.create(name="New Gym", email="new@gym.com")
+        self.other_account = Account.objects.create(name="Other Gym", email="other@gym.com")
+
+    def test_only_verified_valid_domains(self):
+        self.assertEqual(nginx_domain_map.configured_domains(), ['check.live.com', 'pay.live.com'])
+        self.assertEqual(
+            nginx_domain_map.configured_domains(include=['New.Gym.com'], exclude=['pay.live.com']),
+            ['check.live.com', 'new.gym.com']
+        )
+
+    def test_batch_writes_map_once_and_reloads_once(self):
+        domain_jobs.enqueue(self.account, 'check.new.com', 'forms')
+        domain_jobs.enqueue(self.other_account, 'pay.other.com', 'payment')
+
+        jobs = domain_jobs.process_pending_jobs()
+
+        self.assertEqual([job.status for job in jobs], ['succeeded', 'succeeded'])
+        self.assertEqual(
+            self.rendered_domains(), ['check.live.com', 'check.new.com', 'pay.live.com', 'pay.other.com']
+        )
+        self.assertEqual(os.listdir(self.sites_available), [])
+        self.assertEqual(self.commands('nginx'), ['nginx -t'])
+        self.assertEqual(self.commands('systemctl'), ['systemctl reload nginx'])
+
+        # The same domain again: certificate renewed, config unchanged, no reload
+        domain_jobs.enqueue(self.account, 'check.new.com', 'forms')
+        (job,) = domain_jobs.process_pending_jobs()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertIn('reload skipped', job.steps['reload']['message'])
+        self.assertEqual(len(self.commands('systemctl')), 1)
+
+    def test_config_test_failure_restores_live_domains(self):
+        nginx_domain_map.sync()
+        self.fail_on('nginx', '-t')
+        domain_jobs.enqueue(self.account, 'check.new.com', 'forms')
+
+        (job,) = domain_jobs.process_pending_jobs()
+
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.steps['reload']['status'], 'failed')
+        self.assertEqual(self.rendered_domains(), ['check.live.com', 'pay.live.com'])
+        self.assertEqual(self.commands('systemctl'), [])
+
+    def test_remove_domain(self):
+        nginx_domain_map.sync()
+        success, _ = DomainService.remove_domain_config('pay.live.com')
+        self.assertTrue(success)
+        self.assertEqual(self.rendered_domains(), ['check.live.com'])
+        self.assertEqual(self.commands('systemctl'), ['systemctl reload nginx'])
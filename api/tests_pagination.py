@@ -0,0 +1,131 @@
+"""
+Test cases for keyset (cursor) pagination.
+
+Tests cover:
+- Cursor encoding round-trips and rejection of tampered cursors
+- Seek predicate construction for mixed sort directions
+- Walking every page of a list endpoint without gaps or duplicates
+- Page-number pagination remains the default
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.request import Request
+
+from .models import Account, Client, Payment
+from .pagination import KeysetPagination
+
+Employee = get_user_model()
+
+
+class KeysetCursorTestCase(SimpleTestCase):
+    """Cursor encoding and seek predicate construction (no database)"""
+
+    def setUp(self):
+        self.paginator = KeysetPagination()
+        self.paginator.ordering = ('-payment_date', '-id')
+        self.factory = APIRequestFactory()
+
+    def _request(self, **params):
+        return Request(self.factory.get('/api/payments/', params))
+
+    def test_cursor_round_trip(self):
+        now = timezone.now()
+        cursor = self.paginator.encode_cursor([now, 'pi_123'])
+        values = self.paginator.decode_cursor(self._request(cursor=cursor))
+        self.assertEqual(values, [now.isoformat(), 'pi_123'])
+
+    def test_cursor_for_other_ordering_is_rejected(self):
+        cursor = self.paginator.encode_cursor([timezone.now(), 'pi_123'])
+        self.paginator.ordering = ('first_name', 'id')
+        with self.assertRaises(NotFound):
+            self.paginator.decode_cursor(self._request(cursor=cursor))
+
+    def test_garbage_cursor_is_rejected(self):
+        with self.assertRaises(NotFound):
+            self.paginator.decode_cursor(self._request(cursor='not-a-cursor'))
+
+    def test_seek_filter_uses_direction_per_column(self):
+        now = timezone.now()
+        seek = self.paginator.build_seek_filter(Payment, [now.isoformat(), 'pi_123'])
+        rendered = str(seek)
+        self.assertIn('payment_date__lte', rendered)
+        self.assertIn('payment_date__lt', rendered)
+        self.assertIn('id__lt', rendered)
+
+        self.paginator.ordering = ('first_name', 'id')
+        seek = self.paginator.build_seek_filter(Client, ['Alice', 7])
+        rendered = str(seek)
+        self.assertIn('first_name__gte', rendered)
+        self.assertIn('id__gt', rendered)
+
+
+class KeysetPaginationEndpointTestCase(TestCase):
+    """Walk list endpoints page by page using cursors"""
+
+    def setUp(self):
+        self.account = Account.objects.create(
+            name="Keyset Co",
+            email="keyset@company.com"
+        )
+        self.admin = Employee.objects.create_user(
+            email="keyset-admin@test.com",
+            password="password123",
+            name="Keyset Admin",
+            account=self.account,
+            role='super_admin',
+        )
+        self.client_obj = Client.objects.create(
+            account=self.account,
+            first_name="Pat",
+            last_name="Payer",
+            email="pat@keyset.com",
+        )
+
+        # Several payments share a timestamp to exercise the id tie-breaker
+        base = timezone.now()
+        for i in range(7):
+            payment = Payment.objects.create(
+                id=f"pi_keyset_{i:02d}",
+                client=self.client_obj,
+                account=self.account,
+                amount=100 + i,
+                paid_currency='usd',
+                status='paid',
+            )
+            Payment.objects.filter(pk=payment.pk).update(
+                payment_date=base - timedelta(minutes=i // 2)
+            )
+
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.admin)
+
+    def test_cursor_walk_returns_every_row_once(self):
+        expected = list(
+            Payment.objects.filter(account=self.account)
+            .order_by('-payment_date', '-id')
+            .values_list('id', flat=True)
+        )
+
+        seen = []
+        url = '/api/payments/?pagination=cursor&page_size=3'
+        while url:
+            response = self.api.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(seen, expected)
+
+    def test_page_number_pagination_is_default(self):
+        # ?page_size= only applies to cursor pages; page numbers stay at PAGE_SIZE
+        response = self.api.get('/api/payments/?page_size=3')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual(len(response.data['results']), 7)
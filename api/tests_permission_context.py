@@ -0,0 +1,120 @@
+"""
+Tests for the per-request permission context.
+
+These tests cover:
+1. Building the context from the user's columns without touching the database
+2. Master token users getting every permission
+3. Permission classes evaluating with zero queries
+4. The context being cached per request and rebuilt when the user changes
+"""
+from types import SimpleNamespace
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import SimpleTestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.models import Employee, MasterTokenUser
+from api.permissions import (
+    CanManageClients,
+    CanManageEmployees,
+    CanManagePayments,
+    CanViewDashboard,
+    IsAccountMember,
+    IsSelfOrAdmin,
+    IsSuperAdmin,
+    IsSuperAdminOrAdmin,
+    get_permission_context,
+)
+
+
+class PermissionContextTestCase(SimpleTestCase):
+    """Tests for api.permissions.PermissionContext"""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = SimpleNamespace(action='create')
+
+    def make_request(self, user):
+        request = Request(self.factory.get('/api/clients/'))
+        request.user = user
+        return request
+
+    def make_employee(self, **kwargs):
+        defaults = {'id': 7, 'account_id': 1, 'role': 'employee', 'email': 'emp@example.com'}
+        defaults.update(kwargs)
+        return Employee(**defaults)
+
+    def test_employee_context(self):
+        employee = self.make_employee(can_view_all_clients=True)
+        context = get_permission_context(self.make_request(employee))
+        self.assertTrue(context.is_authenticated)
+        self.assertFalse(context.is_master_token)
+        self.assertEqual(context.user_id, 7)
+        self.assertEqual(context.account_id, 1)
+        self.assertFalse(context.is_admin)
+        self.assertTrue(context.can_view_all_clients)
+        self.assertFalse(context.can_manage_all_payments)
+
+    def test_master_token_context(self):
+        user = MasterTokenUser(master_token=None, account_id=3)
+        context = get_permission_context(self.make_request(user))
+        self.assertTrue(context.is_master_token)
+        self.assertTrue(context.is_super_admin)
+        self.assertTrue(context.can_manage_all_installments)
+
+    def test_anonymous_context(self):
+        context = get_permission_context(self.make_request(AnonymousUser()))
+        self.assertFalse(context.is_authenticated)
+        self.assertFalse(context.is_admin)
+        self.assertFalse(context.can_view_all_clients)
+        self.assertFalse(IsAccountMember().has_permission(self.make_request(AnonymousUser()), self.view))
+
+    def test_permissions_issue_no_queries(self):
+        admin = self.make_employee(role='admin')
+        request = self.make_request(admin)
+        target = self.make_employee(id=8)
+        client = SimpleNamespace(account_id=1, coach_id=8, closer_id=None, setter_id=None)
+
+        # SimpleTestCase fails on any database access, so these prove the
+        # permission layer never queries
+        self.assertTrue(IsAccountMember().has_permission(request, self.view))
+        self.assertTrue(IsAccountMember().has_object_permission(request, self.view, client))
+        self.assertTrue(IsSuperAdminOrAdmin().has_permission(request, self.view))
+        self.assertFalse(IsSuperAdmin().has_permission(request, self.view))
+        self.assertTrue(CanManageEmployees().has_object_permission(request, self.view, target))
+        self.assertTrue(IsSelfOrAdmin().has_object_permission(request, self.view, target))
+        self.assertFalse(CanManageClients().has_permission(request, self.view))
+        self.assertFalse(CanManageClients().has_object_permission(request, self.view, client))
+        self.assertFalse(CanManagePayments().has_permission(request, self.view))
+        self.assertFalse(CanViewDashboard().has_permission(request, self.view))
+
+    def test_account_member_requires_account_id(self):
+        employee = self.make_employee(account_id=None)
+        self.assertFalse(IsAccountMember().has_permission(self.make_request(employee), self.view))
+
+    def test_object_in_other_account_is_denied(self):
+        request = self.make_request(self.make_employee(role='admin'))
+        other = SimpleNamespace(account_id=2)
+        self.assertFalse(IsAccountMember().has_object_permission(request, self.view, other))
+
+    def test_admin_cannot_modify_super_admin(self):
+        request = self.make_request(self.make_employee(role='admin'))
+        super_admin = self.make_employee(id=9, role='super_admin')
+        view = SimpleNamespace(action='destroy')
+        self.assertFalse(CanManageEmployees().has_object_permission(request, view, super_admin))
+
+    def test_assigned_client_can_be_managed(self):
+        request = self.make_request(self.make_employee())
+        client = SimpleNamespace(account_id=1, coach_id=None, closer_id=7, setter_id=None)
+        self.assertTrue(CanManageClients().has_object_permission(request, self.view, client))
+
+    def test_context_is_cached_per_user(self):
+        request = self.make_request(self.make_employee())
+        context = get_permission_context(request)
+        self.assertIs(get_permission_context(request), context)
+
+        request.user = self.make_employee(role='super_admin')
+        rebuilt = get_permission_context(request)
+        self.assertIsNot(rebuilt, context)
+        self.assertTrue(rebuilt.is_super_admin)
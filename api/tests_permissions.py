@@ -6,6 +6,7 @@ Tests cover:
 - ViewSet queryset filtering based on permissions
 - Create/Update/Delete operations with permission checks
 - Super admin, permission flag, and assigned user scenarios
+- Account-scoped object checks for accounts and client packages
 """
 from django.test import TestCase
 from django.contrib.auth import get_user_model
@@ -17,7 +18,7 @@ from .models import Account, Client, Payment, Installment, ClientPackage, Packag
 from .views import ClientViewSet, PaymentViewSet, InstallmentViewSet
 from .permissions import (
     CanViewClients, CanManageClients, CanViewPayments, CanManagePayments,
-    CanViewInstallments, CanManageInstallments
+    CanViewInstallments, CanManageInstallments, IsAccountMember
 )
 
 Employee = get_user_model()
@@ -770,3 +771,67 @@ class SignupLoginPermissionTestCase(TestCase):
         permissions = response.data['user']['permissions']
         self.assertTrue(permissions['can_view_all_clients'])
         self.assertFalse(permissions['can_manage_all_clients'])
+
+
+class AccountObjectPermissionTestCase(TestCase):
+    """IsAccountMember object checks for Account and client-owned objects"""
+    
+    def setUp(self):
+        """Two accounts, each with a client package"""
+        self.account = Account.objects.create(name="Own Co", email="own@company.com")
+        self.other_account = Account.objects.create(name="Other Co", email="other@company.com")
+        self.employee = Employee.objects.create_user(
+            email="member@own.com",
+            password="password123",
+            name="Member",
+            account=self.account,
+            role='employee'
+        )
+        
+        self.client_package = self._client_package(self.account, "own")
+        self.other_client_package = self._client_package(self.other_account, "other")
+        
+        self.api_client = APIClient()
+        self.api_client.force_authenticate(user=self.employee)
+        self.factory = APIRequestFactory()
+    
+    def _client_package(self, account, name):
+        client = Client.objects.create(
+            account=account, first_name=name.title(), email=f"{name}@clients.com"
+        )
+        package = Package.objects.create(account=account, package_name=f"{name.title()} Package")
+        return ClientPackage.objects.create(client=client, package=package, status='active')
+    
+    def _has_object_permission(self, obj):
+        request = self.factory.get('/api/')
+        request.user = self.employee
+        return IsAccountMember().has_object_permission(request, None, obj)
+    
+    def test_member_can_view_own_account(self):
+        """Account detail is allowed for the member's own account"""
+        response = self.api_client.get(f'/api/accounts/{self.account.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], self.account.id)
+    
+    def test_member_cannot_view_other_account(self):
+        """Another account is neither listed nor allowed"""
+        response = self.api_client.get(f'/api/accounts/{self.other_account.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(self._has_object_permission(self.other_account))
+    
+    def test_member_can_view_own_client_package(self):
+        """Client package detail is allowed through the client's account"""
+        response = self.api_client.get(f'/api/client-packages/{self.client_package.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], self.client_package.id)
+    
+    def test_member_cannot_view_other_client_package(self):
+        """Another account's client package is neither listed nor allowed"""
+        response = self.api_client.get(f'/api/client-packages/{self.other_client_package.id}/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(self._has_object_permission(self.other_client_package))
+    
+    def test_objects_without_an_account_are_denied(self):
+        """Objects with no account, account_id or client are still refused"""
+        self.assertTrue(self._has_object_permission(self.client_package))
+        self.assertFalse(self._has_object_permission(object()))
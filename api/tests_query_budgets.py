@@ -0,0 +1,461 @@
+"""
+Query-count budgets for every API route.
+
+Every route registered by api/urls.py and stripe_integration/urls.py must be
+listed in QUERY_BUDGETS, or in UNBUDGETED with the reason it is not measured
+(plain create/update/delete actions are exempt). Budgeted routes are called
+twice: against a small data set (3 rows per list), then again after more rows
+have been added (15 rows, still one page). The number of queries must stay within
+the budget *and* be the same both times, so a query per row (N+1) fails even
+while it still fits the budget. Failures print the captured SQL.
+
+Budgets include the token authentication query, and for views with
+conditional GET (ConditionalGetMixin) the change-version lookup.
+
+Tests cover:
+- Every registered route is budgeted or explicitly exempt
+- Budgeted routes stay within budget independent of row count
+"""
+from collections import namedtuple
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from rest_framework.test import APIClient
+
+from stripe_integration.models import StripeApiKey
+from .models import (
+    Account, CheckInForm, CheckInFormPackage, CheckInSchedule, CheckInSubmission,
+    Client, ClientPackage, EmployeeRole, EmployeeRoleAssignment, EmployeeToken,
+    DomainProvisioningJob, Installment, Package, Payment, ShortUrl, StripeCustomer
+)
+from .services import short_links
+from .services.dashboard_rollups import refresh_account_rollups
+
+Employee = get_user_model()
+
+Route = namedtuple('Route', 'name method action basename kwargs')
+
+URLCONFS = (
+    ('api.urls', ''),
+    ('stripe_integration.urls', 'stripe_integration:'),
+)
+
+# Plain ModelViewSet writes touch a single row; they are not budgeted
+GENERIC_WRITE_ACTIONS = {'create', 'update', 'partial_update', 'destroy'}
+
+# (route name, method) -> maximum number of queries, including authentication
+QUERY_BUDGETS = {
+    ('api-root', 'get'): 1,
+    ('auth-me', 'get'): 5,
+    ('account-list', 'get'): 4,
+    ('account-detail', 'get'): 3,
+    ('employee-role-list', 'get'): 4,
+    ('employee-role-detail', 'get'): 3,
+    ('employee-role-employees', 'get'): 4,
+    ('employee-list', 'get'): 5,
+    ('employee-detail', 'get'): 4,
+    ('client-list', 'get'): 4,
+    ('client-my-clients', 'get'): 3,
+    ('client-statistics', 'get'): 2,
+    ('client-engagement', 'get'): 3,
+    ('client-export-csv', 'get'): 2,
+    ('client-detail', 'get'): 3,
+    ('client-package-history', 'get'): 6,
+    ('client-payment-details', 'get'): 5,
+    ('client-bulk-upsert', 'post'): 6,
+    ('package-list', 'get'): 5,
+    ('package-detail', 'get'): 4,
+    ('client-package-list', 'get'): 3,
+    ('client-package-detail', 'get'): 2,
+    ('payment-list', 'get'): 3,
+    ('payment-statistics', 'get'): 2,
+    ('payment-export-csv', 'get'): 2,
+    ('payment-detail', 'get'): 2,
+    ('payment-bulk-ingest', 'post'): 8,
+    ('installment-list', 'get'): 3,
+    ('installment-detail', 'get'): 2,
+    ('stripe-customer-list', 'get'): 3,
+    ('stripe-customer-detail', 'get'): 2,
+    ('checkin-form-list', 'get'): 5,
+    ('checkin-form-detail', 'get'): 4,
+    ('checkin-form-analytics', 'get'): 12,
+    ('checkin-form-submissions', 'get'): 3,
+    ('checkin-form-submissions-stream', 'get'): 3,
+    ('checkin-schedule-list', 'get'): 4,
+    ('checkin-schedule-detail', 'get'): 3,
+    ('checkin-submission-list', 'get'): 3,
+    ('checkin-submission-statistics', 'get'): 2,
+    ('checkin-submission-detail', 'get'): 2,
+    ('dashboard-list', 'get'): 3,
+    ('internal-metrics', 'get'): 0,
+    ('public-checkin-form', 'get'): 4,
+    ('public-onboarding-form', 'get'): 4,
+    ('public-reviews-form', 'get'): 4,
+    ('public-short-link-redirect', 'get'): 0,
+    ('get-domain', 'get'): 2,
+    ('get-payment-domain', 'get'): 2,
+    ('domain-job', 'get'): 2,
+    ('stripe_integration:api-root', 'get'): 1,
+    ('stripe_integration:stripe-account-list', 'get'): 3,
+    ('stripe_integration:stripe-account-detail', 'get'): 2,
+}
+
+# (route name, method) -> why the route is not measured here
+UNBUDGETED = {
+    ('auth-login', 'post'): 'Password hashing and token issue for one user',
+    ('auth-logout', 'post'): 'Deletes the caller\'s token',
+    ('auth-signup', 'post'): 'Creates one account and its first employee',
+    ('employee-change-password', 'post'): 'Single-employee write',
+    ('employee-update-permissions', 'post'): 'Single-employee write',
+    ('client-upsert', 'post'): 'Single-client write',
+    ('client-import-csv', 'post'): 'Cost follows the uploaded file; covered by run_benchmarks',
+    ('payment-import-csv', 'post'): 'Cost follows the uploaded file; covered by run_benchmarks',
+    ('checkin-form-recreate-webhooks', 'post'): 'Calls the webhook scheduler',
+    ('checkin-trigger', 'post'): 'Fans out to n8n and the URL shortener; covered by run_benchmarks',
+    ('reviews-trigger', 'post'): 'Fans out to n8n and the URL shortener',
+    ('public-checkin-submit', 'post'): 'Single-submission write',
+    ('public-onboarding-submit', 'post'): 'Single-submission write',
+    ('public-reviews-submit', 'post'): 'Single-submission write',
+    ('configure-domain', 'post'): 'Queues a domain provisioning job',
+    ('regenerate-links', 'post'): 'Calls the URL shortener per client',
+    ('update-domain', 'patch'): 'Provisions the domain on the proxy',
+    ('delete-domain', 'delete'): 'Removes the domain from the proxy',
+    ('configure-payment-domain', 'post'): 'Queues a domain provisioning job',
+    ('update-payment-domain', 'patch'): 'Provisions the domain on the proxy',
+    ('delete-payment-domain', 'delete'): 'Removes the domain from the proxy',
+    ('stripe_integration:oauth-callback', 'get'): 'Exchanges the OAuth code with Stripe',
+    ('stripe_integration:stripe-account-set-primary', 'post'): 'Single-account write',
+}
+
+FORM_SCHEMA = {
+    'fields': [
+        {'id': 'weight', 'type': 'number', 'label': 'Weight (kg)'},
+        {'id': 'mood', 'type': 'select', 'label': 'Mood', 'options': ['good', 'bad']},
+    ]
+}
+
+METRICS_TOKEN = 'query-budget-metrics-token'
+
+
+def _walk(patterns, prefix):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern.url_patterns, prefix)
+            continue
+        callback = pattern.callback
+        actions = getattr(callback, 'actions', None)
+        if actions is None:
+            view_class = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None)
+            actions = {
+                method: method for method in view_class.http_method_names
+                if method not in ('options', 'head') and hasattr(view_class, method)
+            }
+        initkwargs = getattr(callback, 'initkwargs', {})
+        kwargs = tuple(sorted(
+            name for name in pattern.pattern.regex.groupindex if name != 'format'
+        ))
+        for method, action in actions.items():
+            # ViewSet views add 'head' to their actions once they have served a request
+            if method in ('options', 'head'):
+                continue
+            yield Route(prefix + pattern.name, method, action, initkwargs.get('basename'), kwargs)
+
+
+def iter_routes():
+    """Every (route, method) registered by the API URLconfs, without format-suffix duplicates."""
+    seen = set()
+    for urlconf, prefix in URLCONFS:
+        for route in _walk(get_resolver(urlconf).url_patterns, prefix):
+            if (route.name, route.method) not in seen:
+                seen.add((route.name, route.method))
+                yield route
+
+
+class RouteCoverageTestCase(SimpleTestCase):
+    """Every route has a budget or a reason not to (no database)"""
+
+    def test_every_route_is_accounted_for(self):
+        missing = [
+            (route.name, route.method) for route in iter_routes()
+            if (route.name, route.method) not in QUERY_BUDGETS
+            and (route.name, route.method) not in UNBUDGETED
+            and route.action not in GENERIC_WRITE_ACTIONS
+        ]
+        self.assertEqual(
+            missing, [],
+            'Add these routes to QUERY_BUDGETS (or UNBUDGETED with a reason)'
+        )
+
+    def test_no_stale_entries(self):
+        registered = {(route.name, route.method) for route in iter_routes()}
+        stale = sorted((set(QUERY_BUDGETS) | set(UNBUDGETED)) - registered)
+        self.assertEqual(stale, [], 'These routes are no longer registered')
+
+    def test_budgeted_routes_are_not_also_exempt(self):
+        self.assertEqual(sorted(set(QUERY_BUDGETS) & set(UNBUDGETED)), [])
+
+
+@override_settings(METRICS_TOKEN=METRICS_TOKEN, SLOW_REQUEST_THRESHOLD_MS=0, SHORT_LINK_CLICK_FLUSH_INTERVAL=0)
+class QueryBudgetTestCase(TestCase):
+    """Query counts per route stay within budget and do not grow with row count"""
+
+    SMALL = 3
+    LARGE = 15
+
+    def setUp(self):
+        self.account = Account.objects.create(name="Budget Co", email="budget@company.com")
+        self.admin = Employee.objects.create_user(
+            email="budget-admin@test.com",
+            password="password123",
+            name="Budget Admin",
+            account=self.account,
+            role='super_admin',
+        )
+        self.token = EmployeeToken.objects.create(user=self.admin)
+        self.stripe_account = StripeApiKey.objects.create(
+            account=self.account,
+            stripe_account='Budget Stripe',
+            stripe_client_id='acct_budget',
+            api_key='sk_test_budget',
+            is_primary=True,
+        )
+        self.role = EmployeeRole.objects.create(account=self.account, name='Coach')
+
+        self.package = Package.objects.create(account=self.account, package_name='Budget Package')
+        self.forms = {}
+        for form_type in ('checkins', 'onboarding', 'reviews'):
+            form = CheckInForm.objects.create(
+                account=self.account,
+                form_type=form_type,
+                title=f'Budget {form_type}',
+                form_schema=FORM_SCHEMA,
+            )
+            CheckInFormPackage.objects.create(form=form, package=self.package)
+            self.forms[form_type] = form
+        self.schedule = CheckInSchedule.objects.create(
+            form=self.forms['checkins'],
+            account=self.account,
+            schedule_type='SAME_DAY',
+            day_of_week='monday',
+            time=time(9, 0),
+        )
+
+        self.client_obj = Client.objects.create(
+            account=self.account,
+            first_name="Primary",
+            last_name="Client",
+            email="primary@budget.com",
+            coach=self.admin,
+        )
+        self.client_package = ClientPackage.objects.create(
+            client=self.client_obj,
+            package=self.package,
+            monthly_payment_amount=100,
+            payment_schedule='subscription',
+            start_date=date(2026, 1, 1),
+            package_end_date=date(2026, 12, 31),
+            status='active',
+        )
+
+        short_links.clear()
+        self.short_url = ShortUrl.objects.create(
+            domain='go.budget.com', short_code='budget1', original_url='https://budget.com/check-in/'
+        )
+        self.domain_job = DomainProvisioningJob.objects.create(
+            account=self.account, domain='check.budget.com', domain_type='forms'
+        )
+
+        self.api = APIClient()
+        self.api.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+            HTTP_X_METRICS_TOKEN=METRICS_TOKEN,
+        )
+        self.added = 0
+        self._add_rows(self.SMALL)
+        # Built by refresh_dashboard_rollups in production; the GET only reads them
+        refresh_account_rollups(self.account.id)
+        self.pks = {
+            'account': self.account.id,
+            'employee-role': self.role.id,
+            'employee': self.admin.id,
+            'client': self.client_obj.id,
+            'package': self.package.id,
+            'client-package': self.client_package.id,
+            'payment': Payment.objects.filter(client=self.client_obj).values_list('id', flat=True).first(),
+            'installment': Installment.objects.filter(client=self.client_obj).values_list('id', flat=True).first(),
+            'stripe-customer': StripeCustomer.objects.filter(account=self.account)
+            .values_list('stripe_customer_id', flat=True).first(),
+            'checkin-form': self.forms['checkins'].id,
+            'checkin-schedule': self.schedule.id,
+            'checkin-submission': CheckInSubmission.objects.filter(form=self.forms['checkins'])
+            .values_list('id', flat=True).first(),
+            'stripe-account': self.stripe_account.id,
+        }
+
+    def _add_rows(self, count):
+        """Add `count` rows to every resource the budgeted routes read."""
+        start = self.added
+        self.added += count
+        for i in range(start, self.added):
+            employee = Employee.objects.create_user(
+                email=f"budget-employee-{i}@test.com",
+                password=None,
+                name=f"Employee {i}",
+                account=self.account,
+                role='employee',
+            )
+            role = EmployeeRole.objects.create(
+                account=self.account, name=f'Role {i}', is_active=i % 2 == 0
+            )
+            EmployeeRoleAssignment.objects.create(employee=employee, role=role)
+            EmployeeRoleAssignment.objects.create(employee=employee, role=self.role)
+
+            package = Package.objects.create(account=self.account, package_name=f'Package {i}')
+            form = CheckInForm.objects.create(
+                account=self.account, title=f'Form {i}', form_schema=FORM_SCHEMA
+            )
+            CheckInFormPackage.objects.create(form=form, package=package)
+            CheckInSchedule.objects.create(
+                form=form, account=self.account, schedule_type='SAME_DAY',
+                day_of_week='friday', time=time(9, 0),
+            )
+
+            client = Client.objects.create(
+                account=self.account,
+                first_name=f"Client {i}",
+                email=f"client-{i}@budget.com",
+                coach=employee,
+                closer=self.admin,
+            )
+            ClientPackage.objects.create(client=client, package=package, status='active')
+            ClientPackage.objects.create(
+                client=self.client_obj, package=package, status='inactive',
+                start_date=date(2025, 1, 1) + timedelta(days=i),
+                package_end_date=date(2025, 6, 1) + timedelta(days=i),
+            )
+            StripeCustomer.objects.create(
+                stripe_customer_id=f'cus_budget_{i}',
+                account=self.account,
+                client=client,
+                stripe_account=self.stripe_account,
+                status='active',
+            )
+            Payment.objects.create(
+                id=f'pi_budget_{i}',
+                account=self.account,
+                client=self.client_obj,
+                client_package=self.client_package,
+                stripe_customer_id=f'cus_budget_{i}',
+                amount=100 + i,
+                paid_currency='usd',
+                status='paid',
+            )
+            Installment.objects.create(
+                account=self.account,
+                client=self.client_obj,
+                client_package=self.client_package,
+                amount=100,
+                currency='usd',
+                instalment_number=i + 1,
+                schedule_date=date(2026, 1, 1) + timedelta(days=30 * i),
+            )
+            CheckInSubmission.objects.create(
+                form=self.forms['checkins'],
+                client=self.client_obj,
+                account=self.account,
+                submission_data={'weight': 80 + i, 'mood': 'good'},
+            )
+            CheckInSubmission.objects.create(
+                form=form, client=client, account=self.account,
+                submission_data={'weight': 70 + i, 'mood': 'bad'},
+            )
+
+    def _url(self, route):
+        kwargs = {}
+        for name in route.kwargs:
+            if name == 'pk':
+                kwargs[name] = self.pks[route.basename]
+            elif name in ('domain', 'short_code'):
+                kwargs[name] = getattr(self.short_url, name)
+            elif name == 'job_id':
+                kwargs[name] = self.domain_job.id
+            else:
+                # checkin_uuid -> checkin_link, onboarding_uuid -> onboarding_link, ...
+                kwargs[name] = getattr(self.client_obj, name.replace('_uuid', '_link'))
+        return reverse(route.name, kwargs=kwargs)
+
+    def _payload(self, route, size):
+        tag = f'{size}-{self.added}'
+        if route.name == 'client-bulk-upsert':
+            return [
+                {'email': f'bulk-{tag}-{i}@budget.com', 'first_name': f'Bulk {i}',
+                 'status': 'active', 'coach': self.admin.id}
+                for i in range(size)
+            ]
+        if route.name == 'payment-bulk-ingest':
+            return [
+                {'id': f'pi_bulk_{tag}_{i}', 'client': self.client_obj.id,
+                 'amount': '49.00', 'paid_currency': 'usd', 'status': 'paid'}
+                for i in range(size)
+            ]
+        return None
+
+    def _call(self, route, size):
+        url = self._url(route)
+        if route.method == 'get':
+            response = self.api.get(url, {'page_size': size})
+        else:
+            response = getattr(self.api, route.method)(url, self._payload(route, size), format='json')
+        if getattr(response, 'streaming', False):
+            b''.join(response.streaming_content)
+        return response
+
+    def _measure(self, routes, size):
+        """Call every route once (reads are warmed up first) and capture its queries."""
+        measured = {}
+        for route in routes:
+            if route.method == 'get':
+                self._call(route, size)
+            with CaptureQueriesContext(connection) as captured:
+                response = self._call(route, size)
+            self.assertLess(
+                response.status_code, 400,
+                f'{route.method.upper()} {route.name} returned {response.status_code}: '
+                f'{getattr(response, "content", b"")[:500]!r}'
+            )
+            measured[(route.name, route.method)] = [query['sql'] for query in captured.captured_queries]
+        return measured
+
+    def _format(self, queries):
+        return '\n'.join(f'  {number}. {sql}' for number, sql in enumerate(queries, 1))
+
+    def test_query_budgets(self):
+        routes = [route for route in iter_routes() if (route.name, route.method) in QUERY_BUDGETS]
+        # Reads first: the bulk writes add rows the reads would otherwise see
+        routes.sort(key=lambda route: route.method != 'get')
+
+        small = self._measure(routes, self.SMALL)
+        self._add_rows(self.LARGE - self.SMALL)
+        large = self._measure(routes, self.LARGE)
+
+        for key, budget in QUERY_BUDGETS.items():
+            with self.subTest(route=key):
+                name, method = key
+                few, many = small[key], large[key]
+                self.assertTrue(
+                    len(few) <= budget and len(many) <= budget,
+                    f'{method.upper()} {name}: budget is {budget} queries, used {len(few)} '
+                    f'with {self.SMALL} rows and {len(many)} with {self.LARGE} rows\n'
+                    f'{self._format(many)}'
+                )
+                self.assertEqual(
+                    len(few), len(many),
+                    f'{method.upper()} {name}: query count grows with row count '
+                    f'({len(few)} -> {len(many)})\n'
+                    f'With {self.SMALL} rows:\n{self._format(few)}\n'
+                    f'With {self.LARGE} rows:\n{self._format(many)}'
+                )
@@ -0,0 +1,124 @@
+"""
+Tests for the orjson renderer/parser and response compression.
+
+These tests cover:
+1. Byte-for-byte the same output as DRF's JSONRenderer (datetimes, Decimals,
+   UUIDs, lazy strings, non-string keys, U+2028)
+2. Indented output when the client asks for it
+3. Parsing, and ParseError on invalid JSON
+4. gzip for large responses, small and already-encoded responses untouched
+5. br when the brotli package is installed
+"""
+import gzip
+import io
+import json
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+from api import middleware
+from api.middleware import CompressionMiddleware
+from api.parsers import ORJSONParser
+from api.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTestCase(SimpleTestCase):
+    """api.renderers.ORJSONRenderer"""
+
+    def payload(self):
+        row = ReturnDict({
+            'id': 7,
+            'uuid': uuid.UUID('6f1c2a4e-0000-4000-8000-000000000001'),
+            'amount': Decimal('100.50'),
+            'created_at': datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+            'day': date(2026, 1, 2),
+            'duration': timedelta(minutes=5),
+            'label': gettext_lazy('Active'),
+            'note': 'line\u2028break, ünïcode',
+            'tags': ('a', 'b'),
+            'empty': None,
+        }, serializer=None)
+        return {'count': 1, 'results': [row], 'by_id': {7: 'seven'}}
+
+    def test_same_bytes_as_json_renderer(self):
+        data = self.payload()
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indent(self):
+        rendered = ORJSONRenderer().render({'a': [1]}, 'application/json; indent=4')
+        self.assertEqual(json.loads(rendered), {'a': [1]})
+        self.assertIn(b'\n', rendered)
+
+    def test_none_renders_empty(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class ORJSONParserTestCase(SimpleTestCase):
+    """api.parsers.ORJSONParser"""
+
+    def test_parse(self):
+        body = json.dumps({'email': 'jane@gym.com', 'amount': 49.5, 'tags': ['a']}).encode()
+        self.assertEqual(
+            ORJSONParser().parse(io.BytesIO(body)),
+            {'email': 'jane@gym.com', 'amount': 49.5, 'tags': ['a']}
+        )
+
+    def test_invalid_json(self):
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"email": '))
+
+
+@override_settings(RESPONSE_COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTestCase(SimpleTestCase):
+    """api.middleware.CompressionMiddleware"""
+
+    body = json.dumps({'results': [{'id': i, 'name': f'Client {i}'} for i in range(200)]}).encode()
+
+    def process(self, content, accept_encoding='gzip, deflate, br', **headers):
+        request = RequestFactory().get('/api/clients/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        response = HttpResponse(content, content_type='application/json', headers=headers)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    @mock.patch.object(middleware, 'brotli', None)
+    def test_large_response_is_gzipped(self):
+        response = self.process(self.body)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_small_response_is_not_compressed(self):
+        response = self.process(b'{"id": 1}' * 100)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_client_without_accept_encoding(self):
+        response = self.process(self.body, accept_encoding='')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, self.body)
+
+    def test_encoded_response_is_left_alone(self):
+        response = self.process(self.body, **{'Content-Encoding': 'identity'})
+        self.assertEqual(response['Content-Encoding'], 'identity')
+        self.assertEqual(response.content, self.body)
+
+    def test_streaming_response_is_gzipped(self):
+        request = RequestFactory().get('/api/clients/export/', HTTP_ACCEPT_ENCODING='gzip')
+        response = CompressionMiddleware(
+            lambda request: StreamingHttpResponse(iter([b'a,b\n', b'1,2\n']))
+        )(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b'a,b\n1,2\n')
+
+    @skipIf(middleware.brotli is None, 'brotli is not installed')
+    def test_brotli_when_accepted(self):
+        response = self.process(self.body, **{'ETag': '"abc"'})
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertEqual(middleware.brotli.decompress(response.content), self.body)
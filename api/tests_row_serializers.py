@@ -0,0 +1,193 @@
+"""
+Contract tests for the .values() row serializers.
+
+Every row serializer must render exactly what the DRF serializer it mirrors
+renders for the same record: same keys, same order, same values, compared
+as rendered JSON bytes.
+
+These tests cover:
+1. Mapping compiled from the mirrored serializer, unsupported fields rejected
+2. Identical output for in-memory records (no database), including null
+   relations and the client_name method field
+3. Identical output for .values() rows read from the database, all fields
+   and sparse fieldsets
+4. List endpoints served by the row serializers, with page-number and cursor
+   pagination, and with API_ROW_SERIALIZERS off
+"""
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .models import Account, Client, Payment
+from .renderers import ORJSONRenderer
+from .row_serializers import ClientRowSerializer, PaymentRowSerializer, RowSerializer
+from .serializers import ClientSerializer, EmployeeSerializer, PaymentSerializer
+
+Employee = get_user_model()
+
+ROW_SERIALIZERS = (ClientRowSerializer, PaymentRowSerializer)
+
+
+def render(data):
+    return ORJSONRenderer().render(data)
+
+
+def row_from_instance(instance, lookups):
+    """The .values() row the database would return for ``instance``."""
+    row = {}
+    for lookup in lookups:
+        value = instance
+        attrs = lookup.split('__')
+        for position, attr in enumerate(attrs):
+            if value is None:
+                break
+            field = value._meta.get_field(attr)
+            last = position == len(attrs) - 1
+            value = getattr(value, field.attname if last else field.name)
+        row[lookup] = value
+    return row
+
+
+class RowSerializerContractTestCase(SimpleTestCase):
+    """Row serializers against their DRF serializers, on in-memory records (no database)"""
+
+    def setUp(self):
+        self.account = Account(id=1, name="Contract Gym")
+        self.coach = Employee(id=5, name="Casey Coach", account=self.account)
+        self.with_relations = Client(
+            id=1, account=self.account, first_name="Pat", last_name="Payer", email="pat@gym.com",
+            status='active', client_start_date=date(2026, 1, 2), notice_given=True,
+            coach=self.coach, setter=self.coach, notes="Notes",
+        )
+        self.without_relations = Client(
+            id=2, account=self.account, first_name="Sam", last_name=None, email="sam@gym.com",
+        )
+
+    def assert_same_output(self, row_serializer_class, serializer_class, instance, fields=None):
+        row_serializer = row_serializer_class(fields=fields)
+        expected = serializer_class(instance).data
+        if fields is not None:
+            expected = {name: value for name, value in expected.items() if name in fields}
+        row = row_from_instance(instance, row_serializer.lookups)
+        self.assertEqual(render(row_serializer.to_representation(row)), render(expected))
+
+    def test_every_readable_field_is_mapped(self):
+        for row_serializer_class in ROW_SERIALIZERS:
+            readable = [
+                name for name, field in row_serializer_class.serializer_class().fields.items()
+                if not field.write_only
+            ]
+            self.assertEqual([mapper[0] for mapper in row_serializer_class().mappers], readable)
+
+    def test_unsupported_fields_are_rejected(self):
+        class EmployeeRowSerializer(RowSerializer):
+            serializer_class = EmployeeSerializer
+
+        with self.assertRaises(ImproperlyConfigured):
+            EmployeeRowSerializer()
+
+    def test_clients(self):
+        for client in (self.with_relations, self.without_relations):
+            self.assert_same_output(ClientRowSerializer, ClientSerializer, client)
+            self.assert_same_output(
+                ClientRowSerializer, ClientSerializer, client, fields=['id', 'first_name', 'coach_name']
+            )
+
+    def test_null_relation_is_omitted(self):
+        row_serializer = ClientRowSerializer()
+        data = row_serializer.to_representation(row_from_instance(self.without_relations, row_serializer.lookups))
+        self.assertNotIn('coach_name', data)
+        self.assertIsNone(data['coach'])
+
+    def test_payments(self):
+        payment = Payment(
+            id='pi_contract', account=self.account, client=self.without_relations,
+            amount=Decimal('99.90'), paid_currency='usd', exchange_rate=Decimal('1.085'),
+            status='paid', payment_date=datetime(2026, 3, 4, 5, 6, 7, 890, tzinfo=dt_timezone.utc),
+        )
+        self.assert_same_output(PaymentRowSerializer, PaymentSerializer, payment)
+        self.assert_same_output(
+            PaymentRowSerializer, PaymentSerializer, payment, fields=['client_name', 'amount']
+        )
+
+
+class RowSerializerEndpointTestCase(TestCase):
+    """List endpoints served from .values() rows"""
+
+    def setUp(self):
+        self.account = Account.objects.create(name="Rows Co", email="rows@company.com")
+        self.admin = Employee.objects.create_user(
+            email="rows-admin@test.com",
+            password="password123",
+            name="Rows Admin",
+            account=self.account,
+            role='super_admin',
+        )
+        coached = Client.objects.create(
+            account=self.account, first_name="Ada", last_name="Lovelace", email="ada@rows.com",
+            client_start_date=date(2026, 1, 1), coach=self.admin,
+        )
+        uncoached = Client.objects.create(
+            account=self.account, first_name="Bob", email="bob@rows.com",
+        )
+        for i, client in enumerate([coached, uncoached] * 3):
+            Payment.objects.create(
+                id=f"pi_rows_{i:02d}",
+                client=client,
+                account=self.account,
+                amount=Decimal('100.25') + i,
+                paid_currency='usd',
+                status='paid',
+            )
+
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.admin)
+
+    def assert_matches_serializer(self, row_serializer_class, queryset, fields=None):
+        row_serializer = row_serializer_class(fields=fields)
+        serializer = row_serializer_class.serializer_class(queryset, many=True)
+        expected = serializer.data
+        if fields is not None:
+            expected = [{name: value for name, value in row.items() if name in fields} for row in expected]
+        self.assertEqual(
+            render(row_serializer.many(queryset.values(*row_serializer.lookups))),
+            render(expected)
+        )
+
+    def test_values_rows_match_serializers(self):
+        clients = Client.objects.filter(account=self.account).order_by('id')
+        payments = Payment.objects.filter(account=self.account).order_by('id')
+        self.assert_matches_serializer(ClientRowSerializer, clients)
+        self.assert_matches_serializer(ClientRowSerializer, clients, fields=['id', 'coach_name'])
+        self.assert_matches_serializer(PaymentRowSerializer, payments)
+
+    def test_list_endpoints_match_serializer_output(self):
+        urls = (
+            '/api/clients/',
+            '/api/payments/?page=1&ordering=amount',
+            '/api/clients/?fields=first_name,coach_name',
+        )
+        for url in urls:
+            fast = self.api.get(url)
+            with override_settings(API_ROW_SERIALIZERS=False):
+                slow = self.api.get(url)
+            self.assertEqual(fast.status_code, status.HTTP_200_OK)
+            self.assertEqual(fast.content, slow.content)
+
+    def test_cursor_pagination(self):
+        seen = []
+        url = '/api/payments/?pagination=cursor&page_size=4&fields=id,client_name'
+        while url:
+            response = self.api.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(
+            seen,
+            list(Payment.objects.order_by('-payment_date', '-id').values_list('id', flat=True))
+        )
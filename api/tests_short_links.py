@@ -0,0 +1,145 @@
+"""
+Tests for short-link redirects and batched click logging.
+
+These tests cover:
+1. Redirects served from the in-process link cache without queries
+2. Unknown, inactive and expired links returning 404
+3. LRU eviction once the cache is full
+4. Buffered clicks written with one INSERT and one UPDATE per flush
+5. Clicks kept for the next flush when the write fails
+"""
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from api.models import ClickAnalytics, ShortUrl
+from api.services import short_links
+
+
+@override_settings(SHORT_LINK_CLICK_FLUSH_INTERVAL=0)
+class ShortLinkRedirectTestCase(TestCase):
+    """GET /api/public/links/{domain}/{short_code}/"""
+
+    def setUp(self):
+        short_links.clear()
+        self.link = ShortUrl.objects.create(
+            domain='check.gym.com', short_code='abc1234',
+            original_url='https://forms.gym.com/check-in/1/', title='Check-In'
+        )
+
+    def _url(self, short_code='abc1234', domain='check.gym.com'):
+        return reverse('public-short-link-redirect', kwargs={'domain': domain, 'short_code': short_code})
+
+    def test_redirect_is_cached(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self._url())
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], 'https://forms.gym.com/check-in/1/')
+        self.assertEqual(response['Cache-Control'], 'no-store')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self._url())
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(short_links.pending_clicks(), 2)
+
+    def test_unknown_links_are_cached_as_misses(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self._url('missing')).status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self._url('missing')).status_code, 404)
+        self.assertEqual(self.client.get(self._url(domain='other.gym.com')).status_code, 404)
+        self.assertEqual(short_links.pending_clicks(), 0)
+
+    def test_inactive_and_expired_links_are_not_found(self):
+        ShortUrl.objects.filter(pk=self.link.pk).update(is_active=False)
+        self.assertEqual(self.client.get(self._url()).status_code, 404)
+
+        ShortUrl.objects.create(
+            domain='check.gym.com', short_code='expired',
+            original_url='https://forms.gym.com/', expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        self.assertEqual(self.client.get(self._url('expired')).status_code, 404)
+
+    def test_head_is_not_a_click(self):
+        self.assertEqual(self.client.head(self._url()).status_code, 302)
+        self.assertEqual(short_links.pending_clicks(), 0)
+
+    @override_settings(SHORT_LINK_CACHE_SIZE=2)
+    def test_least_recently_used_link_is_evicted(self):
+        for code in ('one', 'two', 'three'):
+            ShortUrl.objects.create(domain='check.gym.com', short_code=code, original_url=f'https://gym.com/{code}')
+        short_links.resolve('check.gym.com', 'one')
+        short_links.resolve('check.gym.com', 'two')
+        short_links.resolve('check.gym.com', 'one')
+        short_links.resolve('check.gym.com', 'three')  # evicts 'two'
+        with self.assertNumQueries(0):
+            short_links.resolve('check.gym.com', 'one')
+            short_links.resolve('check.gym.com', 'three')
+        with self.assertNumQueries(1):
+            short_links.resolve('check.gym.com', 'two')
+
+
+@override_settings(SHORT_LINK_CLICK_FLUSH_INTERVAL=0)
+class ClickFlushTestCase(TestCase):
+    """short_links.record_click() / flush_clicks()"""
+
+    def setUp(self):
+        short_links.clear()
+        self.first = ShortUrl.objects.create(domain='check.gym.com', short_code='first', original_url='https://gym.com/1')
+        self.second = ShortUrl.objects.create(
+            domain='check.gym.com', short_code='second', original_url='https://gym.com/2', clicks=10
+        )
+
+    def test_flush_is_one_insert_and_one_update(self):
+        first = short_links.resolve('check.gym.com', 'first')
+        second = short_links.resolve('check.gym.com', 'second')
+        for _ in range(5):
+            short_links.record_click(first, ip_address='203.0.113.7', user_agent='Mozilla/5.0')
+        short_links.record_click(second, ip_address='not-an-ip', referer='https://mail.example.com/')
+        short_links.record_click(second)
+
+        # SAVEPOINT, INSERT, UPDATE, RELEASE
+        with self.assertNumQueries(4):
+            self.assertEqual(short_links.flush_clicks(), 7)
+        self.assertEqual(short_links.pending_clicks(), 0)
+
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual(self.first.clicks, 5)
+        self.assertEqual(self.second.clicks, 12)
+        self.assertEqual(ClickAnalytics.objects.filter(short_url=self.first).count(), 5)
+        clicks = ClickAnalytics.objects.filter(short_url=self.second)
+        self.assertEqual(clicks.count(), 2)
+        self.assertEqual(clicks.filter(ip_address__isnull=True).count(), 2)
+        self.assertTrue(clicks.filter(referer='https://mail.example.com/').exists())
+
+        with self.assertNumQueries(0):
+            self.assertEqual(short_links.flush_clicks(), 0)
+
+    def test_clicks_on_deleted_links_are_skipped(self):
+        link = short_links.resolve('check.gym.com', 'first')
+        short_links.record_click(link)
+        ShortUrl.objects.filter(pk=self.first.pk).delete()
+        self.assertEqual(short_links.flush_clicks(), 1)
+        self.assertFalse(ClickAnalytics.objects.exists())
+
+    def test_failed_flush_keeps_clicks(self):
+        link = short_links.resolve('check.gym.com', 'first')
+        short_links.record_click(link)
+        short_links.record_click(link)
+        with patch('api.services.short_links.connection') as connection:
+            connection.cursor.side_effect = DatabaseError('connection lost')
+            self.assertEqual(short_links.flush_clicks(), 0)
+        self.assertEqual(short_links.pending_clicks(), 2)
+        self.assertEqual(short_links.flush_clicks(), 2)
+
+    @override_settings(SHORT_LINK_CLICK_BUFFER_MAX=2)
+    def test_buffer_is_bounded(self):
+        link = short_links.resolve('check.gym.com', 'first')
+        for _ in range(3):
+            short_links.record_click(link)
+        self.assertEqual(short_links.pending_clicks(), 2)
@@ -0,0 +1,147 @@
+"""
+Tests for sparse fieldsets (?fields= / ?omit=) on list and retrieve.
+
+These tests cover:
+1. Projection SQL: only the requested columns, joins and prefetches
+2. Sources that are not model fields leave the queryset unchanged
+3. Trimmed list and detail responses, unknown fields rejected
+4. Computed fields (Meta.field_sources) still correct under projection
+5. Cursor pagination with a projection that does not request its columns
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .mixins import project_queryset
+from .models import Account, Client, EmployeeRole, EmployeeRoleAssignment, Payment
+
+Employee = get_user_model()
+
+
+class ProjectQuerysetTestCase(SimpleTestCase):
+    """api.mixins.project_queryset (no database)"""
+
+    def test_only_requested_columns_and_joins(self):
+        queryset = Client.objects.select_related('account', 'coach', 'closer', 'setter')
+        sql = str(project_queryset(queryset, ['first_name', 'coach.name']).query)
+        self.assertIn('"clients"."first_name"', sql)
+        self.assertIn('"employees"."name"', sql)
+        self.assertNotIn('"clients"."notes"', sql)
+        self.assertNotIn('"accounts"', sql)
+        self.assertEqual(sql.count('JOIN'), 1)
+
+    def test_foreign_key_without_join(self):
+        queryset = Payment.objects.select_related('client', 'client_package', 'account')
+        sql = str(project_queryset(queryset, ['amount', 'client']).query)
+        self.assertIn('"payments"."client_id"', sql)
+        self.assertNotIn('JOIN', sql)
+
+    def test_unused_prefetch_dropped(self):
+        queryset = Employee.objects.select_related('account').prefetch_related('custom_roles')
+        self.assertEqual(project_queryset(queryset, ['name'])._prefetch_related_lookups, ())
+        self.assertEqual(
+            project_queryset(queryset, ['name', 'custom_roles'])._prefetch_related_lookups,
+            ('custom_roles',)
+        )
+
+    def test_unresolvable_source_leaves_queryset_unchanged(self):
+        queryset = Client.objects.select_related('account')
+        self.assertIs(project_queryset(queryset, ['first_name', 'not_a_field']), queryset)
+        self.assertIs(project_queryset(queryset, ['first_name.upper']), queryset)
+
+
+class SparseFieldsetTestCase(TestCase):
+    """?fields= and ?omit= on the API"""
+
+    def setUp(self):
+        self.account = Account.objects.create(name="Sparse Co", email="sparse@company.com")
+        self.admin = Employee.objects.create_user(
+            email="sparse-admin@test.com",
+            password="password123",
+            name="Sparse Admin",
+            account=self.account,
+            role='super_admin',
+        )
+        self.coach = Employee.objects.create_user(
+            email="sparse-coach@test.com",
+            password=None,
+            name="Sparse Coach",
+            account=self.account,
+            role='employee',
+        )
+        EmployeeRoleAssignment.objects.create(
+            employee=self.coach,
+            role=EmployeeRole.objects.create(account=self.account, name='Coach'),
+        )
+        self.client_obj = Client.objects.create(
+            account=self.account,
+            first_name="Pat",
+            last_name="Payer",
+            email="pat@sparse.com",
+            notes="Long notes " * 50,
+            coach=self.coach,
+        )
+        for i in range(5):
+            Payment.objects.create(
+                id=f"pi_sparse_{i:02d}",
+                client=self.client_obj,
+                account=self.account,
+                amount=100 + i,
+                paid_currency='usd',
+                status='paid',
+            )
+
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.admin)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response, [query['sql'] for query in queries.captured_queries]
+
+    def test_list_fields(self):
+        response, queries = self.get('/api/clients/?fields=id,first_name,coach_name')
+        self.assertEqual(response.data['results'], [
+            {'id': self.client_obj.id, 'first_name': 'Pat', 'coach_name': 'Sparse Coach'}
+        ])
+        (select,) = [sql for sql in queries if 'FROM "clients"' in sql and 'COUNT' not in sql]
+        self.assertNotIn('"clients"."notes"', select)
+        self.assertEqual(select.count('JOIN'), 1)
+
+    def test_omit(self):
+        full, _ = self.get(f'/api/clients/{self.client_obj.id}/')
+        response, _ = self.get(f'/api/clients/{self.client_obj.id}/?omit=notes,account_name')
+        expected = dict(full.data)
+        del expected['notes'], expected['account_name']
+        self.assertEqual(response.data, expected)
+
+    def test_unknown_field_is_rejected(self):
+        response = self.api.get('/api/clients/?fields=first_name,password')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('password', str(response.data['detail']))
+
+    def test_computed_fields_are_loaded(self):
+        response, _ = self.get('/api/payments/?fields=id,client_name')
+        self.assertEqual({row['client_name'] for row in response.data['results']}, {'Pat Payer'})
+
+        response, queries = self.get(f'/api/employees/{self.coach.id}/?fields=name,display_role')
+        self.assertEqual(response.data, {'name': 'Sparse Coach', 'display_role': 'Coach'})
+
+        response, queries = self.get(f'/api/employees/{self.coach.id}/?fields=name')
+        self.assertFalse([sql for sql in queries if 'FROM "employee_roles"' in sql])
+
+    def test_cursor_pagination_without_ordering_fields(self):
+        seen = []
+        url = '/api/payments/?pagination=cursor&page_size=2&fields=amount'
+        while url:
+            response, queries = self.get(url)
+            self.assertEqual({tuple(row) for row in response.data['results']}, {('amount',)})
+            seen.extend(row['amount'] for row in response.data['results'])
+            url = response.data['next']
+            # Keyset columns loaded with the page, not one query per row
+            self.assertEqual(len([sql for sql in queries if 'FROM "payments"' in sql]), 1)
+        self.assertEqual(len(seen), 5)
@@ -0,0 +1,291 @@
+"""
+Tests for the URL shortener backends.
+
+These tests cover:
+1. Base62 encoding and the keyed code permutation (distinct, fixed-length codes)
+2. Backend dispatch: remote by default, native with a remote fallback
+3. Bulk link generation writing short links with one INSERT and one UPDATE
+4. Existing links reused per (original_url, domain); colliding codes retried
+5. compact_short_urls merging duplicates and repointing client links
+"""
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from api.models import Account, ClickAnalytics, Client, ShortUrl
+from api.services import account_registry
+from api.utils import url_shortener
+from api.utils.client_link_service import generate_short_links_bulk
+from api.utils.url_shortener import (
+    BASE62_ALPHABET, CODE_BITS, CODE_LENGTH, base62_encode, make_short_codes,
+    permute_code_number, shorten_checkin_url, shorten_urls_bulk,
+)
+
+
+def remote_response(short_url):
+    response = MagicMock(status_code=201)
+    response.json.return_value = {'status': 'success', 'data': {'full_short_url': short_url}}
+    return response
+
+
+class ShortCodeTestCase(SimpleTestCase):
+    """Code generation helpers"""
+
+    def test_base62_encode(self):
+        self.assertEqual(base62_encode(0), '0000000')
+        self.assertEqual(base62_encode(61), '000000z')
+        self.assertEqual(base62_encode(62), '0000010')
+        self.assertEqual(base62_encode(62 ** 7 - 1), 'zzzzzzz')
+        with self.assertRaises(ValueError):
+            base62_encode(-1)
+
+    def test_permutation_is_a_bijection_on_its_range(self):
+        self.assertEqual(permute_code_number(0), permute_code_number(0))
+        self.assertLess(permute_code_number((1 << CODE_BITS) - 1), 1 << CODE_BITS)
+        with self.assertRaises(ValueError):
+            permute_code_number(1 << CODE_BITS)
+
+    def test_sequential_numbers_give_distinct_scrambled_codes(self):
+        codes = make_short_codes(range(1, 10001))
+        self.assertEqual(len(set(codes)), 10000)
+        for code in codes:
+            self.assertEqual(len(code), CODE_LENGTH)
+            self.assertTrue(set(code) <= set(BASE62_ALPHABET))
+        # Consecutive sequence values do not produce consecutive codes
+        self.assertNotEqual(codes[1], base62_encode(2))
+
+    def test_codes_depend_on_secret_key(self):
+        codes = make_short_codes([1, 2, 3])
+        with override_settings(SECRET_KEY='another-secret-key-for-short-codes'):
+            self.assertNotEqual(make_short_codes([1, 2, 3]), codes)
+
+
+class ShortenerBackendTestCase(SimpleTestCase):
+    """Dispatch between the native and remote backends"""
+
+    items = [
+        {'original_url': 'https://forms.example.com/check-in/a/', 'domain': 'check.example.com'},
+        {'original_url': 'https://forms.example.com/check-in/b/', 'domain': 'check.example.com'},
+    ]
+
+    def setUp(self):
+        url_shortener.clear_reuse_cache()
+        patcher = patch('api.utils.url_shortener._find_existing', return_value={})
+        self.find_existing = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(URL_SHORTENER_BACKEND='remote')
+    @patch('api.utils.url_shortener._shorten_native')
+    @patch('api.utils.url_shortener.requests.post')
+    def test_remote_backend_makes_one_call_per_link(self, post, native):
+        post.return_value = remote_response('https://check.example.com/abc1234')
+        self.assertEqual(
+            shorten_urls_bulk(self.items),
+            ['https://check.example.com/abc1234'] * 2
+        )
+        self.assertEqual(post.call_count, 2)
+        native.assert_not_called()
+
+    @override_settings(URL_SHORTENER_BACKEND='native')
+    @patch('api.utils.url_shortener.requests.post')
+    def test_native_backend_skips_remote(self, post):
+        with patch.object(url_shortener, '_shorten_native', return_value=['https://x/1', 'https://x/2']):
+            self.assertEqual(shorten_urls_bulk(self.items), ['https://x/1', 'https://x/2'])
+        post.assert_not_called()
+
+    @override_settings(URL_SHORTENER_BACKEND='native')
+    @patch('api.utils.url_shortener.requests.post')
+    def test_native_failure_falls_back_to_remote(self, post):
+        post.return_value = remote_response('https://check.example.com/remote1')
+        with patch.object(url_shortener, '_shorten_native', side_effect=DatabaseError('down')):
+            self.assertEqual(
+                shorten_checkin_url(self.items[0]['original_url'], 'check.example.com'),
+                'https://check.example.com/remote1'
+            )
+        post.assert_called_once()
+
+    @override_settings(URL_SHORTENER_BACKEND='native')
+    @patch('api.utils.url_shortener.requests.post')
+    def test_unstored_native_links_fall_back_individually(self, post):
+        post.return_value = remote_response('https://check.example.com/remote2')
+        with patch.object(url_shortener, '_shorten_native', return_value=['https://x/1', None]):
+            self.assertEqual(
+                shorten_urls_bulk(self.items),
+                ['https://x/1', 'https://check.example.com/remote2']
+            )
+        post.assert_called_once()
+
+    @override_settings(URL_SHORTENER_BACKEND='remote')
+    @patch('api.utils.url_shortener.requests.post')
+    def test_existing_and_recent_links_are_reused(self, post):
+        post.return_value = remote_response('https://check.example.com/new1')
+        self.find_existing.return_value = {
+            (self.items[0]['original_url'], 'check.example.com'): 'https://check.example.com/old1'
+        }
+        # The second URL appears twice but is created once
+        self.assertEqual(
+            shorten_urls_bulk(self.items + self.items[1:]),
+            ['https://check.example.com/old1', 'https://check.example.com/new1', 'https://check.example.com/new1']
+        )
+        post.assert_called_once()
+        self.find_existing.assert_called_once()
+
+        # Both mappings are now cached: no lookup, no new link
+        self.assertEqual(
+            shorten_urls_bulk(self.items),
+            ['https://check.example.com/old1', 'https://check.example.com/new1']
+        )
+        post.assert_called_once()
+        self.find_existing.assert_called_once()
+
+    @override_settings(URL_SHORTENER_BACKEND='remote')
+    @patch('api.utils.url_shortener.requests.post')
+    def test_failed_links_are_not_cached(self, post):
+        post.return_value = MagicMock(status_code=503, **{'raise_for_status.side_effect': Exception('down')})
+        self.assertEqual(shorten_urls_bulk(self.items[:1]), [None])
+        self.assertEqual(shorten_urls_bulk(self.items[:1]), [None])
+        self.assertEqual(post.call_count, 2)
+
+
+@override_settings(URL_SHORTENER_BACKEND='native', DEFAULT_FORMS_DOMAIN='check.example.com')
+class NativeBulkLinkTestCase(TestCase):
+    """generate_short_links_bulk() with the native backend"""
+
+    def setUp(self):
+        account_registry.clear()
+        url_shortener.clear_reuse_cache()
+        self.account = Account.objects.create(name='Links Co', email='links@company.com')
+        self.clients = [
+            Client.objects.create(
+                account=self.account, first_name='Client', last_name=str(index),
+                email=f'links-{index}@example.com', status='active'
+            )
+            for index in range(25)
+        ]
+
+    @patch('api.utils.url_shortener.requests.post')
+    def test_bulk_generation_is_one_insert_and_one_update(self, post):
+        account_registry.get_account_snapshot(self.account.id)  # warm the registry
+        # Existing-link lookup, nextval(), SAVEPOINT, INSERT ... RETURNING, RELEASE, bulk UPDATE
+        with self.assertNumQueries(6):
+            generated = generate_short_links_bulk(self.clients, 'checkin')
+        self.assertEqual(generated, 25)
+        post.assert_not_called()
+
+        links = list(
+            Client.objects.filter(account=self.account).values_list('short_checkin_link', flat=True)
+        )
+        self.assertEqual(len(set(links)), 25)
+        codes = [link.rsplit('/', 1)[1] for link in links]
+        stored = ShortUrl.objects.filter(domain='check.example.com', short_code__in=codes)
+        self.assertEqual(stored.count(), 25)
+
+    @patch('api.utils.url_shortener.requests.post')
+    def test_existing_links_are_kept(self, post):
+        generate_short_links_bulk(self.clients[:5], 'onboarding')
+        for client in self.clients[:5]:
+            client.refresh_from_db()
+        self.assertEqual(generate_short_links_bulk(self.clients, 'onboarding'), 20)
+        post.assert_not_called()
+
+    @patch('api.utils.url_shortener.requests.post')
+    def test_regeneration_reuses_existing_links(self, post):
+        generate_short_links_bulk(self.clients, 'checkin')
+        first = list(Client.objects.filter(account=self.account).order_by('id')
+                     .values_list('short_checkin_link', flat=True))
+        url_shortener.clear_reuse_cache()
+
+        generate_short_links_bulk(self.clients, 'checkin', force_regenerate=True)
+        second = list(Client.objects.filter(account=self.account).order_by('id')
+                      .values_list('short_checkin_link', flat=True))
+        self.assertEqual(first, second)
+        self.assertEqual(ShortUrl.objects.filter(domain='check.example.com').count(), 25)
+
+    def test_colliding_codes_are_retried(self):
+        other = ShortUrl.objects.create(
+            domain='d.example.com', short_code='COLLIDE', original_url='https://other.example.com/'
+        )
+        codes = iter([['COLLIDE']])
+        real_make_short_codes = url_shortener.make_short_codes
+        with patch.object(
+            url_shortener, 'make_short_codes',
+            side_effect=lambda numbers: next(codes, None) or real_make_short_codes(numbers)
+        ):
+            [short_url] = url_shortener._shorten_native(
+                [{'original_url': 'https://mine.example.com/', 'domain': 'd.example.com'}]
+            )
+
+        self.assertIsNotNone(short_url)
+        self.assertNotEqual(short_url, other.full_short_url)
+        stored = ShortUrl.objects.get(domain='d.example.com', short_code=short_url.rsplit('/', 1)[1])
+        self.assertEqual(stored.original_url, 'https://mine.example.com/')
+        other.refresh_from_db()
+        self.assertEqual(other.original_url, 'https://other.example.com/')
+
+    def test_inactive_links_are_not_reused(self):
+        original_url = 'https://forms.example.com/check-in/x/'
+        ShortUrl.objects.create(domain='check.example.com', short_code='gone123', original_url=original_url, is_active=False)
+        live = ShortUrl.objects.create(domain='check.example.com', short_code='live123', original_url=original_url)
+        ShortUrl.objects.create(domain='check.example.com', short_code='live456', original_url=original_url)
+        self.assertEqual(
+            url_shortener._find_existing([(original_url, 'check.example.com'), (original_url, 'other.example.com')]),
+            {(original_url, 'check.example.com'): live.full_short_url}
+        )
+
+
+class CompactShortUrlsTestCase(TestCase):
+    """python manage.py compact_short_urls"""
+
+    def setUp(self):
+        self.account = Account.objects.create(name='Compact Co', email='compact@company.com')
+        old = timezone.now() - timedelta(days=60)
+        url = 'https://forms.example.com/check-in/a/'
+        self.keep = self._link('keep001', url, clicks=2, created_at=old)
+        self.dup = self._link('dup0001', url, clicks=3, created_at=old)
+        self.recent = self._link('recent1', url, clicks=0, created_at=timezone.now())
+        self.other = self._link('other01', 'https://forms.example.com/check-in/b/', clicks=1, created_at=old)
+        ClickAnalytics.objects.create(short_url=self.dup, clicked_at=old)
+
+        self.client_obj = Client.objects.create(
+            account=self.account, first_name='Compact', email='compact@example.com',
+            short_checkin_link=self.dup.full_short_url,
+            short_reviews_link=self.other.full_short_url,
+        )
+
+    def _link(self, short_code, original_url, clicks, created_at):
+        link = ShortUrl.objects.create(
+            domain='check.example.com', short_code=short_code, original_url=original_url, clicks=clicks
+        )
+        ShortUrl.objects.filter(pk=link.pk).update(created_at=created_at)
+        return link
+
+    def _compact(self, *args):
+        out = StringIO()
+        call_command('compact_short_urls', *args, stdout=out)
+        return out.getvalue()
+
+    def test_duplicates_are_merged(self):
+        output = self._compact()
+        self.assertIn('Deleted 1 duplicate short links', output)
+
+        self.assertFalse(ShortUrl.objects.filter(pk=self.dup.pk).exists())
+        self.assertTrue(ShortUrl.objects.filter(pk=self.recent.pk).exists())
+        self.keep.refresh_from_db()
+        self.assertEqual(self.keep.clicks, 5)
+        self.assertEqual(ClickAnalytics.objects.get().short_url_id, self.keep.pk)
+
+        self.client_obj.refresh_from_db()
+        self.assertEqual(self.client_obj.short_checkin_link, self.keep.full_short_url)
+        self.assertEqual(self.client_obj.short_reviews_link, self.other.full_short_url)
+
+    def test_dry_run_changes_nothing(self):
+        output = self._compact('--dry-run')
+        self.assertIn('1 duplicate short links of 1 links (3 clicks) to merge', output)
+        self.assertTrue(ShortUrl.objects.filter(pk=self.dup.pk).exists())
+        self.client_obj.refresh_from_db()
+        self.assertEqual(self.client_obj.short_checkin_link, self.dup.full_short_url)
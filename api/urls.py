@@ -5,13 +5,14 @@ from .views import (
     PackageViewSet, ClientPackageViewSet, PaymentViewSet,
     InstallmentViewSet, StripeCustomerViewSet,
     CheckInFormViewSet, CheckInScheduleViewSet, CheckInSubmissionViewSet,
-    checkin_trigger_webhook, get_checkin_form, submit_checkin_form,
+    DashboardViewSet, checkin_trigger_webhook, get_checkin_form, submit_checkin_form,
     get_onboarding_form, submit_onboarding_form,
     reviews_trigger_webhook, get_reviews_form, submit_reviews_form,
     configure_custom_domain, regenerate_client_links, get_domain_config,
-    update_domain_config, delete_domain_config,
+    update_domain_config, delete_domain_config, get_domain_job,
     configure_payment_domain, get_payment_domain_config,
-    update_payment_domain, remove_payment_domain
+    update_payment_domain, remove_payment_domain, metrics_endpoint,
+    ShortLinkRedirectView
 )
 
 router = DefaultRouter()
@@ -28,12 +29,14 @@ router.register(r'stripe-customers', StripeCustomerViewSet, basename='stripe-cus
 router.register(r'checkin-forms', CheckInFormViewSet, basename='checkin-form')
 router.register(r'checkin-schedules', CheckInScheduleViewSet, basename='checkin-schedule')
 router.register(r'checkin-submissions', CheckInSubmissionViewSet, basename='checkin-submission')
+router.register(r'dashboard', DashboardViewSet, basename='dashboard')
 
 urlpatterns = [
     path('', include(router.urls)),
     # Internal webhook trigger endpoints
     path('internal/checkin-trigger/', checkin_trigger_webhook, name='checkin-trigger'),
     path('internal/reviews-trigger/', reviews_trigger_webhook, name='reviews-trigger'),
+    path('internal/metrics/', metrics_endpoint, name='internal-metrics'),
     # Public check-in endpoints
     path('public/checkin/<uuid:checkin_uuid>/', get_checkin_form, name='public-checkin-form'),
     path('public/checkin/<uuid:checkin_uuid>/submit/', submit_checkin_form, name='public-checkin-submit'),
@@ -43,12 +46,15 @@ urlpatterns = [
     # Public reviews endpoints
     path('public/reviews/<uuid:reviews_uuid>/', get_reviews_form, name='public-reviews-form'),
     path('public/reviews/<uuid:reviews_uuid>/submit/', submit_reviews_form, name='public-reviews-submit'),
+    # Public short link redirects
+    path('public/links/<str:domain>/<str:short_code>/', ShortLinkRedirectView.as_view(), name='public-short-link-redirect'),
     # Custom domain management endpoints
     path('domains/configure/', configure_custom_domain, name='configure-domain'),
     path('domains/regenerate-links/', regenerate_client_links, name='regenerate-links'),
     path('domains/', get_domain_config, name='get-domain'),
     path('domains/update/', update_domain_config, name='update-domain'),
     path('domains/delete/', delete_domain_config, name='delete-domain'),
+    path('domains/jobs/<uuid:job_id>/', get_domain_job, name='domain-job'),
     # Payment domain management endpoints
     path('domains/payment/configure/', configure_payment_domain, name='configure-payment-domain'),
     path('domains/payment/', get_payment_domain_config, name='get-payment-domain'),
@@ -0,0 +1,144 @@
+"""
+Bulk Upsert Utility
+
+Set-based INSERT ... ON CONFLICT ... DO UPDATE for unmanaged models.
+
+Django's bulk_create(update_conflicts=True) cannot report which rows were
+inserted versus updated, cannot restrict the update to a subset of columns per
+row, and cannot add a WHERE clause to the conflict action. This helper builds
+the statement directly from model field metadata, one multi-row statement per
+chunk, and returns each affected row together with an ``inserted`` flag
+(PostgreSQL's ``xmax = 0`` trick).
+"""
+
+import logging
+
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _insert_fields(model):
+    """Concrete fields written on INSERT (everything except auto primary keys)."""
+    return [
+        field for field in model._meta.concrete_fields
+        if not (field.primary_key and field.get_internal_type() in ('AutoField', 'BigAutoField'))
+    ]
+
+
+def _column_value(field, row, now):
+    """
+    Value for ``field`` on insert: the provided value, an auto timestamp, or
+    the model default.
+    """
+    if field.attname in row:
+        value = row[field.attname]
+    elif field.name in row:
+        value = row[field.name]
+    elif getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+        value = now
+    elif field.has_default():
+        value = field.get_default()
+    else:
+        value = None
+    return field.get_db_prep_save(value, connection)
+
+
+def bulk_upsert(model, rows, conflict_fields, update_fields, returning=('pk',),
+                conflict_where=None, update_where=None, skip_unchanged=False,
+                ignore_conflicts=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Insert rows, updating ``update_fields`` on conflicting rows.
+
+    Args:
+        model: Django model class (managed or unmanaged)
+        rows (list): Dicts mapping field name (or attname) to Python value.
+            Rows must not repeat a conflict key within one call.
+        conflict_fields (list): Field names forming the unique constraint
+        update_fields (list): Field names to overwrite on conflict; auto_now
+            fields are always refreshed (so an empty list still updates them)
+        returning (tuple): Field names to return for each affected row
+        conflict_where (str): Optional index predicate for partial unique
+            indexes, e.g. ``"invoice_id IS NOT NULL"``
+        update_where (str): Optional condition on the existing row (table
+            name as alias) that must hold for the update to apply, e.g.
+            ``"payments.account_id = EXCLUDED.account_id"``
+        skip_unchanged (bool): Leave conflicting rows untouched (and out of
+            the result) when none of ``update_fields`` would change, so
+            replays do not rewrite rows or bump auto_now timestamps
+        ignore_conflicts (bool): ON CONFLICT DO NOTHING; conflicting rows are
+            left untouched and out of the result (``update_fields`` ignored)
+        chunk_size (int): Rows per statement
+
+    Returns:
+        list: One dict per affected row with the ``returning`` fields plus
+            ``inserted`` (bool). Rows skipped by ``update_where``,
+            ``skip_unchanged`` or ``ignore_conflicts`` are absent.
+    """
+    if not rows:
+        return []
+
+    meta = model._meta
+    table = connection.ops.quote_name(meta.db_table)
+    insert_fields = _insert_fields(model)
+    columns = ', '.join(connection.ops.quote_name(f.column) for f in insert_fields)
+    placeholders = '(' + ', '.join(['%s'] * len(insert_fields)) + ')'
+
+    conflict_columns = ', '.join(
+        connection.ops.quote_name(meta.get_field(name).column) for name in conflict_fields
+    )
+    set_fields = [] if ignore_conflicts else [meta.get_field(name) for name in update_fields]
+    conditions = [f'({update_where})'] if update_where else []
+    if skip_unchanged and set_fields:
+        existing = ', '.join(f'{table}.{connection.ops.quote_name(f.column)}' for f in set_fields)
+        excluded = ', '.join(f'EXCLUDED.{connection.ops.quote_name(f.column)}' for f in set_fields)
+        conditions.append(f'ROW({existing}) IS DISTINCT FROM ROW({excluded})')
+    if not ignore_conflicts:
+        set_fields += [
+            f for f in insert_fields
+            if getattr(f, 'auto_now', False) and f not in set_fields
+        ]
+    if set_fields:
+        assignments = ', '.join(
+            f'{connection.ops.quote_name(f.column)} = EXCLUDED.{connection.ops.quote_name(f.column)}'
+            for f in set_fields
+        )
+        action = f'DO UPDATE SET {assignments}'
+        if conditions:
+            action += ' WHERE ' + ' AND '.join(conditions)
+    else:
+        action = 'DO NOTHING'
+
+    returning_fields = [meta.pk if name == 'pk' else meta.get_field(name) for name in returning]
+    returning_sql = ', '.join(connection.ops.quote_name(f.column) for f in returning_fields)
+    target = f'({conflict_columns})'
+    if conflict_where:
+        target += f' WHERE {conflict_where}'
+
+    results = []
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            params = []
+            for row in chunk:
+                params.extend(_column_value(field, row, now) for field in insert_fields)
+            sql = (
+                f'INSERT INTO {table} ({columns}) VALUES '
+                + ', '.join([placeholders] * len(chunk))
+                + f' ON CONFLICT {target} {action}'
+                + f' RETURNING {returning_sql}, (xmax = 0) AS inserted'
+            )
+            cursor.execute(sql, params)
+            for record in cursor.fetchall():
+                result = {
+                    ('pk' if name == 'pk' else name): field.to_python(value)
+                    for name, field, value in zip(returning, returning_fields, record)
+                }
+                result['inserted'] = bool(record[-1])
+                results.append(result)
+
+    return results
@@ -3,14 +3,85 @@ Client Link Service
 
 Manages generation and retrieval of check-in and onboarding links for clients.
 Handles custom domain selection and URL shortening with graceful fallbacks.
+
+Per-client functions shorten one link at a time; generate_short_links_bulk()
+shortens a whole batch with one call to shorten_urls_bulk() (a single INSERT
+with the native shortener backend) and saves it with one bulk UPDATE.
 """
 
 import logging
 from django.conf import settings
-from .url_shortener import shorten_checkin_url
+from api.services.account_registry import get_account_snapshot
+from .url_shortener import shorten_checkin_url, shorten_urls_bulk
 
 logger = logging.getLogger(__name__)
 
+# Link type -> (Client UUID field, Client short link field, frontend path, title prefix)
+LINK_TYPES = {
+    'checkin': ('checkin_link', 'short_checkin_link', 'check-in', 'Check-In'),
+    'onboarding': ('onboarding_link', 'short_onboarding_link', 'onboarding', 'Onboarding'),
+    'reviews': ('reviews_link', 'short_reviews_link', 'reviews', 'Reviews'),
+}
+
+
+def _short_domain(account_id):
+    """Account's configured forms_domain, or DEFAULT_FORMS_DOMAIN."""
+    account = get_account_snapshot(account_id)
+    if account and account.forms_domain and account.forms_domain_configured:
+        return account.forms_domain
+    return settings.DEFAULT_FORMS_DOMAIN
+
+
+def generate_short_links_bulk(clients, link_type, force_regenerate=False):
+    """
+    Generate and save short links of one type for many clients at once.
+    
+    Same domain selection and full-URL fallback as the per-client functions,
+    but the links are shortened in one shorten_urls_bulk() call and saved
+    with one bulk_update().
+    
+    Args:
+        clients (list): Client instances
+        link_type (str): 'checkin', 'onboarding' or 'reviews'
+        force_regenerate (bool): If False, clients that already have a link are skipped
+    
+    Returns:
+        int: Number of clients whose link was generated
+    """
+    from api.models import Client
+    
+    uuid_field, short_field, path, title_prefix = LINK_TYPES[link_type]
+    clients = [
+        client for client in clients
+        if force_regenerate or not getattr(client, short_field)
+    ]
+    if not clients:
+        return 0
+    
+    frontend_url = settings.FRONTEND_URL.rstrip('/')
+    domains = {}
+    items = []
+    for client in clients:
+        if client.account_id not in domains:
+            domains[client.account_id] = _short_domain(client.account_id)
+        client_name = f"{client.first_name} {client.last_name or ''}".strip()
+        items.append({
+            'original_url': f"{frontend_url}/{path}/{getattr(client, uuid_field)}/",
+            'domain': domains[client.account_id],
+            'title': f"{title_prefix}: {client_name}",
+        })
+    
+    short_urls = shorten_urls_bulk(items)
+    shortened = 0
+    for client, item, short_url in zip(clients, items, short_urls):
+        # Fall back to the full URL if shortening failed
+        setattr(client, short_field, short_url or item['original_url'])
+        shortened += bool(short_url)
+    Client.objects.bulk_update(clients, [short_field], batch_size=1000)
+    
+    logger.info(f"Generated {len(clients)} {link_type} links in bulk ({shortened} shortened)")
+    return len(clients)
+
 
 # =============================================================================
 # Check-In Link Functions
@@ -53,8 +124,8 @@ def get_or_generate_short_link(client, force_regenerate=False):
         return client.short_checkin_link
     
     # Determine which domain to use for the SHORT URL
-    account = client.account
-    if account.forms_domain and account.forms_domain_configured:
+    account = get_account_snapshot(client.account_id)
+    if account and account.forms_domain and account.forms_domain_configured:
         short_domain = account.forms_domain
         logger.info(f"Using custom domain for client {client.id}: {short_domain}")
     else:
@@ -108,23 +179,21 @@ def regenerate_all_client_links(account):
     logger.info(f"Starting bulk link regeneration for account {account.id}")
     
     # Get all active clients for this account
-    clients = Client.objects.filter(
+    clients = list(Client.objects.filter(
         account=account,
         status='active'
-    )
+    ))
     
-    total_count = clients.count()
+    total_count = len(clients)
     success_count = 0
     fail_count = 0
     
-    for client in clients:
-        try:
-            # Force regeneration of short link
-            get_or_generate_short_link(client, force_regenerate=True)
-            success_count += 1
-        except Exception as e:
-            logger.error(f"Failed to regenerate link for client {client.id}: {str(e)}")
-            fail_count += 1
+    try:
+        # Force regeneration of every short link in one batch
+        success_count = generate_short_links_bulk(clients, 'checkin', force_regenerate=True)
+    except Exception as e:
+        logger.error(f"Failed to regenerate links for account {account.id}: {str(e)}")
+        fail_count = total_count
     
     logger.info(f"Bulk regeneration complete for account {account.id}: "
                 f"{success_count}/{total_count} successful, {fail_count} failed")
@@ -193,8 +262,8 @@ def get_or_generate_onboarding_short_link(client, force_regenerate=False):
         return client.short_onboarding_link
     
     # Determine which domain to use for the SHORT URL
-    account = client.account
-    if account.forms_domain and account.forms_domain_configured:
+    account = get_account_snapshot(client.account_id)
+    if account and account.forms_domain and account.forms_domain_configured:
         short_domain = account.forms_domain
         logger.info(f"Using custom domain for onboarding link, client {client.id}: {short_domain}")
     else:
@@ -255,18 +324,18 @@ def populate_onboarding_links_for_package(package):
         status='active'
     ).select_related('client')
     
-    total_count = client_packages.count()
+    clients = list({cp.client_id: cp.client for cp in client_packages}.values())
+    total_count = len(clients)
     success_count = 0
     fail_count = 0
     
-    for cp in client_packages:
-        try:
-            # Generate onboarding link for this client
-            get_or_generate_onboarding_short_link(cp.client, force_regenerate=False)
-            success_count += 1
-        except Exception as e:
-            logger.error(f"Failed to generate onboarding link for client {cp.client.id}: {str(e)}")
-            fail_count += 1
+    try:
+        # Clients that already have a onboarding link keep it
+        generate_short_links_bulk(clients, 'onboarding', force_regenerate=False)
+        success_count = total_count
+    except Exception as e:
+        logger.error(f"Failed to generate onboarding links for package {package.id}: {str(e)}")
+        fail_count = total_count
     
     logger.info(f"Onboarding link population complete for package {package.id}: "
                 f"{success_count}/{total_count} successful, {fail_count} failed")
@@ -335,8 +404,8 @@ def get_or_generate_reviews_short_link(client, force_regenerate=False):
         return client.short_reviews_link
     
     # Determine which domain to use for the SHORT URL
-    account = client.account
-    if account.forms_domain and account.forms_domain_configured:
+    account = get_account_snapshot(client.account_id)
+    if account and account.forms_domain and account.forms_domain_configured:
         short_domain = account.forms_domain
         logger.info(f"Using custom domain for reviews link, client {client.id}: {short_domain}")
     else:
@@ -397,18 +466,18 @@ def populate_reviews_links_for_package(package):
         status='active'
     ).select_related('client')
     
-    total_count = client_packages.count()
+    clients = list({cp.client_id: cp.client for cp in client_packages}.values())
+    total_count = len(clients)
     success_count = 0
     fail_count = 0
     
-    for cp in client_packages:
-        try:
-            # Generate reviews link for this client
-            get_or_generate_reviews_short_link(cp.client, force_regenerate=False)
-            success_count += 1
-        except Exception as e:
-            logger.error(f"Failed to generate reviews link for client {cp.client.id}: {str(e)}")
-            fail_count += 1
+    try:
+        # Clients that already have a reviews link keep it
+        generate_short_links_bulk(clients, 'reviews', force_regenerate=False)
+        success_count = total_count
+    except Exception as e:
+        logger.error(f"Failed to generate reviews links for package {package.id}: {str(e)}")
+        fail_count = total_count
     
     logger.info(f"Reviews link population complete for package {package.id}: "
                 f"{success_count}/{total_count} successful, {fail_count} failed")
@@ -1,22 +1,289 @@
 """
 URL Shortener Integration Service
 
-Integrates with the standalone URL shortener service (running on port 8001)
-to create shortened check-in links for clients.
+Creates shortened check-in links for clients. Two backends, selected by the
+URL_SHORTENER_BACKEND setting:
 
-API Documentation: See url-shortener-docs/API_REFERENCE.md
+- "remote" (default): the standalone URL shortener service (running on port
+  8001), one HTTP call per link. API Documentation: See
+  url-shortener-docs/API_REFERENCE.md
+- "native": short codes are generated in-process and written straight to the
+  short_urls table the shortener service reads, so a batch of links costs one
+  nextval() query and one multi-row INSERT. The remote service is used as a
+  fallback if the native write fails.
+
+Native codes are a keyed permutation (4-round Feistel network over 40 bits,
+keyed from SECRET_KEY) of values from the short_url_code_seq sequence,
+base62-encoded to 7 characters. The permutation is a bijection, so distinct
+sequence values always give distinct codes, and consecutive links do not get
+guessable consecutive codes.
+
+Link creation is idempotent per (original_url, domain) with either backend:
+an existing active short link is reused (found through a small in-process
+cache of recent mappings, then idx_short_urls_domain_original_url_md5), and
+only URLs without one get a new code.
 """
 
-import requests
+import hashlib
 import logging
+import threading
+import time
+from collections import OrderedDict
+
+import requests
 from django.conf import settings
+from django.db import DatabaseError, connection, transaction
 
 logger = logging.getLogger(__name__)
 
+BASE62_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+CODE_LENGTH = 7
+CODE_BITS = 40  # 2**40 < 62**7, so every permuted value fits in CODE_LENGTH characters
+FEISTEL_ROUNDS = 4
+NATIVE_MAX_ATTEMPTS = 3
+REUSE_CACHE_SIZE = 10000
+REUSE_CACHE_TTL = 300  # seconds a recent mapping is reused without a lookup
+
+_HALF_BITS = CODE_BITS // 2
+_HALF_MASK = (1 << _HALF_BITS) - 1
+
+_reuse_lock = threading.Lock()
+_reuse_cache = OrderedDict()  # (original_url, domain) -> (full short URL, expires_at)
+
+
+def base62_encode(number, length=CODE_LENGTH):
+    """Encode a non-negative integer as base62, left-padded to `length` characters."""
+    if number < 0:
+        raise ValueError('number must be non-negative')
+    chars = []
+    while number:
+        number, remainder = divmod(number, 62)
+        chars.append(BASE62_ALPHABET[remainder])
+    return ''.join(reversed(chars)).rjust(length, BASE62_ALPHABET[0])
+
+
+def _round_keys():
+    secret = settings.SECRET_KEY.encode()
+    return [
+        hashlib.blake2b(f'short-url-code:{round_number}'.encode(), key=secret[:64], digest_size=8).digest()
+        for round_number in range(FEISTEL_ROUNDS)
+    ]
+
+
+def permute_code_number(number, keys=None):
+    """
+    Map a sequence value to a scrambled value in [0, 2**CODE_BITS).
+
+    Args:
+        number (int): Sequence value, 0 <= number < 2**CODE_BITS
+        keys (list): Round keys (defaults to keys derived from SECRET_KEY)
+
+    Returns:
+        int: Permuted value; distinct inputs always give distinct outputs
+    """
+    if not 0 <= number < (1 << CODE_BITS):
+        raise ValueError(f'short code number out of range: {number}')
+    keys = keys or _round_keys()
+    left, right = number >> _HALF_BITS, number & _HALF_MASK
+    for key in keys:
+        digest = hashlib.blake2b(right.to_bytes(4, 'big'), key=key, digest_size=4).digest()
+        left, right = right, left ^ (int.from_bytes(digest, 'big') & _HALF_MASK)
+    return (left << _HALF_BITS) | right
+
+
+def make_short_codes(numbers):
+    """Short codes for a list of sequence values."""
+    keys = _round_keys()
+    return [base62_encode(permute_code_number(number, keys)) for number in numbers]
+
+
+def _reserve_code_numbers(count):
+    """Reserve `count` values from short_url_code_seq in one round trip."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval('short_url_code_seq') FROM generate_series(1, %s)", [count]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _shorten_native(items):
+    """
+    Insert short_urls rows for `items` and return their full short URLs.
+
+    Rows whose code collides with an existing (domain, short_code), e.g. one
+    created by the remote service, are retried with fresh sequence values.
+
+    Args:
+        items (list): Dicts with original_url, domain and title
+
+    Returns:
+        list: Full short URL per item (None where no code could be stored)
+    """
+    from api.models import ShortUrl
+    from .bulk_upsert import bulk_upsert
+
+    results = [None] * len(items)
+    pending = list(range(len(items)))
+    for _ in range(NATIVE_MAX_ATTEMPTS):
+        if not pending:
+            break
+        codes = make_short_codes(_reserve_code_numbers(len(pending)))
+        rows = []
+        index_by_key = {}
+        for index, code in zip(pending, codes):
+            item = items[index]
+            rows.append({
+                'short_code': code,
+                'original_url': item['original_url'],
+                'domain': item['domain'],
+                'title': item.get('title') or 'Check-in link',
+            })
+            index_by_key[(item['domain'], code)] = index
+        with transaction.atomic():
+            # ON CONFLICT DO NOTHING: collided rows are not returned and are retried
+            written = bulk_upsert(
+                ShortUrl, rows,
+                conflict_fields=['domain', 'short_code'],
+                update_fields=[],
+                returning=('domain', 'short_code'),
+                ignore_conflicts=True,
+                chunk_size=1000,
+            )
+        for record in written:
+            index = index_by_key[(record['domain'], record['short_code'])]
+            results[index] = f"https://{record['domain']}/{record['short_code']}"
+        pending = [index for index in pending if results[index] is None]
+    if pending:
+        logger.error(f"Native shortener could not store {len(pending)} of {len(items)} links")
+    return results
+
+
+def _cached_short_url(key):
+    now = time.monotonic()
+    with _reuse_lock:
+        entry = _reuse_cache.get(key)
+        if entry is None or entry[1] <= now:
+            return None
+        _reuse_cache.move_to_end(key)
+        return entry[0]
+
+
+def _remember(key, short_url):
+    with _reuse_lock:
+        _reuse_cache[key] = (short_url, time.monotonic() + REUSE_CACHE_TTL)
+        _reuse_cache.move_to_end(key)
+        while len(_reuse_cache) > REUSE_CACHE_SIZE:
+            _reuse_cache.popitem(last=False)
+
+
+def clear_reuse_cache():
+    """Forget recent (original_url, domain) mappings (tests, compaction)."""
+    with _reuse_lock:
+        _reuse_cache.clear()
+
+
+def _find_existing(keys):
+    """
+    Active short links for (original_url, domain) pairs, in one query.
+
+    Where duplicates exist the oldest row wins, the same one
+    compact_short_urls keeps.
+
+    Returns:
+        dict: (original_url, domain) -> full short URL, for pairs that have one
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT DISTINCT ON (su.domain, su.original_url) su.original_url, su.domain, su.short_code
+            FROM unnest(%s::text[], %s::text[]) AS k(original_url, domain)
+            JOIN short_urls AS su
+                ON su.domain = k.domain
+               AND md5(su.original_url) = md5(k.original_url)
+               AND su.original_url = k.original_url
+            WHERE su.is_active
+              AND su.short_code IS NOT NULL
+              AND (su.expires_at IS NULL OR su.expires_at > now())
+            ORDER BY su.domain, su.original_url, su.id
+            """,
+            [[original_url for original_url, _ in keys], [domain for _, domain in keys]]
+        )
+        return {
+            (original_url, domain): f"https://{domain}/{short_code}"
+            for original_url, domain, short_code in cursor.fetchall()
+        }
+
+
+def shorten_urls_bulk(items):
+    """
+    Shorten many URLs at once, reusing existing links.
+
+    Items whose (original_url, domain) already has an active short link get
+    that link (one lookup query for the whole batch, skipped for recently
+    seen pairs); duplicates within the batch share one new link. The rest
+    are created with the configured backend: with the native backend one
+    nextval() query and one INSERT per 1000 links, falling back to the remote
+    service for items it cannot store; with the remote backend one HTTP call
+    per link.
+
+    Args:
+        items (list): Dicts with original_url, domain and optional title
+
+    Returns:
+        list: Full short URL per item, in order (None where shortening failed)
+    """
+    if not items:
+        return []
+
+    positions = {}
+    for index, item in enumerate(items):
+        positions.setdefault((item['original_url'], item['domain']), []).append(index)
+
+    found = {}
+    for key in positions:
+        short_url = _cached_short_url(key)
+        if short_url:
+            found[key] = short_url
+    missing = [key for key in positions if key not in found]
+    if missing:
+        try:
+            found.update(_find_existing(missing))
+        except DatabaseError as e:
+            logger.warning(f"Short link lookup failed, creating {len(missing)} links: {str(e)}")
+
+    to_create = [key for key in positions if key not in found]
+    if to_create:
+        created = _create_short_urls([items[positions[key][0]] for key in to_create])
+        found.update({key: short_url for key, short_url in zip(to_create, created) if short_url})
+
+    results = [None] * len(items)
+    for key, short_url in found.items():
+        _remember(key, short_url)
+        for index in positions[key]:
+            results[index] = short_url
+    return results
+
+
+def _create_short_urls(items):
+    """New short links for `items` with the configured backend (None where it failed)."""
+    results = [None] * len(items)
+    if settings.URL_SHORTENER_BACKEND == 'native':
+        try:
+            results = _shorten_native(items)
+        except DatabaseError as e:
+            logger.error(f"Native shortener failed for {len(items)} links, falling back to remote: {str(e)}")
+    for index, item in enumerate(items):
+        if results[index] is None:
+            results[index] = _shorten_remote(item['original_url'], item['domain'], item.get('title'))
+    return results
+
 
 def shorten_checkin_url(original_url, domain, title=None):
     """
-    Create a shortened URL using the external URL shortener service.
+    Get or create a shortened URL (see module docstring).
+    
+    An existing active short link for the same URL and domain is returned
+    as is; otherwise one is created with the configured backend.
     
     Args:
         original_url (str): The full check-in URL to shorten
@@ -33,6 +300,16 @@ def shorten_checkin_url(original_url, domain, title=None):
         >>> print(short_url)
         'https://check.gymname.com/abc123'
     """
+    return shorten_urls_bulk([{'original_url': original_url, 'domain': domain, 'title': title}])[0]
+
+
+def _shorten_remote(original_url, domain, title=None):
+    """
+    Create a shortened URL using the external URL shortener service.
+    
+    Returns:
+        str: The full shortened URL, or None if shortening fails
+    """
     try:
         # Construct API URL
         api_url = f"{settings.URL_SHORTENER_API_URL}/api/shorten/"
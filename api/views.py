@@ -1,17 +1,21 @@
 from rest_framework import viewsets, status, filters
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, authentication_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.exceptions import ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth import authenticate
-from django.db.models import Q, Sum, Min, Max, Count
-from django.http import HttpResponse
+from django.db.models import Sum, Min, Max, Count, Q, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.core.exceptions import DisallowedRedirect
+from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.views import View
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 import csv
 import io
 from datetime import datetime
-from django.db import transaction
+from django.db import transaction, IntegrityError, DatabaseError
 from django.conf import settings
 import requests
 import logging
@@ -19,7 +23,7 @@ import logging
 from .models import (
     Account, Employee, EmployeeRole, Client, Package, ClientPackage,
     Payment, Installment, StripeCustomer, EmployeeToken,
-    CheckInForm, CheckInSchedule, CheckInSubmission
+    CheckInForm, CheckInSchedule, CheckInSubmission, DomainProvisioningJob
 )
 from stripe_integration.models import StripeApiKey
 from .serializers import (
@@ -32,9 +36,12 @@ from .serializers import (
 from .permissions import (
     IsAccountMember, IsSuperAdminOrAdmin, IsSuperAdmin,
     CanManageEmployees, IsSelfOrAdmin, CanViewClients, CanManageClients,
-    CanViewPayments, CanManagePayments, CanViewInstallments, CanManageInstallments
+    CanViewPayments, CanManagePayments, CanViewInstallments, CanManageInstallments,
+    CanViewDashboard
 )
-from .mixins import AccountResolutionMixin
+from .mixins import AccountResolutionMixin, ConditionalGetMixin, RowSerializerMixin, SparseFieldsetMixin
+from .row_serializers import ClientRowSerializer, PaymentRowSerializer
+from .visibility import filter_clients_for_user, filter_rows_for_assigned_clients
 
 
 class AuthViewSet(viewsets.ViewSet):
@@ -234,7 +241,7 @@ class AuthViewSet(viewsets.ViewSet):
         return Response(serializer.data)
 
 
-class AccountViewSet(AccountResolutionMixin, viewsets.ReadOnlyModelViewSet):
+class AccountViewSet(AccountResolutionMixin, ConditionalGetMixin, SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing Account information.
     Employees can only view their own account.
@@ -243,13 +250,14 @@ class AccountViewSet(AccountResolutionMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Account.objects.all()
     serializer_class = AccountSerializer
     permission_classes = [IsAuthenticated, IsAccountMember]
+    change_resources = ('account',)
 
     def get_queryset(self):
         # Users can only see their own account (or specified account for master token)
         return Account.objects.filter(id=self.get_resolved_account_id())
 
 
-class EmployeeRoleViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
+class EmployeeRoleViewSet(AccountResolutionMixin, ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing custom Employee Roles.
     - Super Admin and Admin can create/update/delete roles
@@ -258,6 +266,7 @@ class EmployeeRoleViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
     """
     serializer_class = EmployeeRoleSerializer
     permission_classes = [IsAuthenticated, IsAccountMember]
+    change_resources = ('roles', 'employees', 'account')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['is_active']
     search_fields = ['name', 'description']
@@ -266,7 +275,11 @@ class EmployeeRoleViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Filter roles by account"""
-        return EmployeeRole.objects.filter(account_id=self.get_resolved_account_id())
+        return EmployeeRole.objects.filter(
+            account_id=self.get_resolved_account_id()
+        ).select_related('account').annotate(
+            active_employee_count=Count('employees', filter=Q(employees__status='active'))
+        )
 
     def get_permissions(self):
         """Only admins can create/update/delete roles"""
@@ -301,12 +314,14 @@ class EmployeeRoleViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
         GET /api/employee-roles/{id}/employees/
         """
         role = self.get_object()
-        employees = role.employees.filter(account_id=self.get_resolved_account_id())
+        employees = role.employees.filter(
+            account_id=self.get_resolved_account_id()
+        ).select_related('account').prefetch_related('custom_roles')
         serializer = EmployeeSerializer(employees, many=True, context={'request': request})
         return Response(serializer.data)
 
 
-class EmployeeViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
+class EmployeeViewSet(AccountResolutionMixin, ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Employees.
     - Super Admin and Admin can create/update/delete employees
@@ -316,6 +331,7 @@ class EmployeeViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
     queryset = Employee.objects.all()
     serializer_class = EmployeeSerializer
     permission_classes = [IsAuthenticated, IsAccountMember]
+    change_resources = ('employees', 'roles', 'account')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['role', 'status', 'job_role']
     search_fields = ['name', 'email']
@@ -324,7 +340,9 @@ class EmployeeViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
 
     def get_queryset(self):
         # Users can only see employees in their account (or specified account for master token)
-        return Employee.objects.filter(account_id=self.get_resolved_account_id())
+        return Employee.objects.filter(
+            account_id=self.get_resolved_account_id()
+        ).select_related('account').prefetch_related('custom_roles')
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -381,7 +399,7 @@ class EmployeeViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
         return Response({'message': 'Password changed successfully'})
 
 
-class ClientViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
+class ClientViewSet(AccountResolutionMixin, ConditionalGetMixin, SparseFieldsetMixin, RowSerializerMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Clients.
     Permissions controlled by can_view_all_clients and can_manage_all_clients flags.
@@ -389,12 +407,15 @@ class ClientViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
     """
     queryset = Client.objects.all()
     serializer_class = ClientSerializer
+    row_serializer_class = ClientRowSerializer
     permission_classes = [IsAuthenticated, IsAccountMember, CanViewClients]
+    change_resources = ('clients', 'employees', 'account')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'coach', 'closer', 'setter', 'country']
     search_fields = ['first_name', 'last_name', 'email', 'instagram_handle']
     ordering_fields = ['first_name', 'last_name', 'email', 'client_start_date']
     ordering = ['first_name']
+    keyset_ordering = ('first_name', 'id')
 
     def get_permissions(self):
         """Use CanManageClients for create/update/delete operations"""
@@ -427,9 +448,7 @@ class ClientViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
             return queryset.select_related('account', 'coach', 'closer', 'setter')
         
         # Otherwise, filter to only assigned clients
-        queryset = queryset.filter(
-            Q(coach=user) | Q(closer=user) | Q(setter=user)
-        ).distinct()
+        queryset = filter_clients_for_user(queryset, user)
         
         return queryset.select_related('account', 'coach', 'closer', 'setter')
 
@@ -495,11 +514,7 @@ class ClientViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
         Get clients assigned to the current user (as coach/closer/setter)
         GET /api/clients/my_clients/
         """
-        queryset = self.get_queryset().filter(
-            Q(coach=request.user) |
-            Q(closer=request.user) |
-            Q(setter=request.user)
-        ).distinct()
+        queryset = filter_clients_for_user(self.get_queryset(), request.user)
         
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -548,17 +563,207 @@ class ClientViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
                 status=status.HTTP_200_OK
             )
         except Client.DoesNotExist:
-            # Create new client
-            serializer = self.get_serializer(data=request.data)
+            pass
+        
+        # Create new client
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                serializer.save(account_id=account_id)
+        except IntegrityError:
+            # A concurrent upsert created this email first; update it instead
+            client = Client.objects.get(account_id=account_id, email=email)
+            serializer = self.get_serializer(client, data=request.data, partial=True)
             serializer.is_valid(raise_exception=True)
-            serializer.save(account_id=account_id)
+            serializer.save()
             return Response(
                 {
-                    'created': True,
+                    'created': False,
                     'client': serializer.data
                 },
-                status=status.HTTP_201_CREATED
+                status=status.HTTP_200_OK
+            )
+        return Response(
+            {
+                'created': True,
+                'client': serializer.data
+            },
+            status=status.HTTP_201_CREATED
+        )
+
+    # Maximum number of items accepted by one bulk-upsert call
+    BULK_UPSERT_MAX_ITEMS = 5000
+    BULK_UPSERT_CHUNK_SIZE = 500
+
+    @action(detail=False, methods=['post'], url_path='bulk-upsert',
+            permission_classes=[IsAuthenticated, IsAccountMember, CanManageClients])
+    def bulk_upsert(self, request):
+        """
+        Create or update many clients in one call, keyed by email within the account.
+        POST /api/clients/bulk-upsert/
+        
+        Requires can_manage_all_clients permission.
+        Request body: a JSON array of client payloads (same fields as upsert),
+        or {"clients": [...]}. Up to 5000 items per call.
+        
+        All items are validated up front without per-item queries, then written
+        with one INSERT ... ON CONFLICT (account_id, email) DO UPDATE per chunk.
+        Existing clients are only updated on the fields present in their payload.
+        Repeated emails within one call are merged (later items win).
+        
+        Returns per-item results in request order:
+            {
+                "created": 2, "updated": 1, "failed": 1,
+                "results": [
+                    {"index": 0, "email": "a@x.com", "status": "created", "id": 17},
+                    {"index": 1, "email": "b@x.com", "status": "error", "errors": {...}}
+                ]
+            }
+        """
+        from .serializers import ClientBulkUpsertItemSerializer
+        from .utils.bulk_upsert import bulk_upsert
+        
+        logger = logging.getLogger(__name__)
+        
+        # Bulk writes can touch any client in the account
+        if not request.user.is_super_admin and not request.user.can_manage_all_clients:
+            return Response(
+                {'error': 'You do not have permission to bulk upsert clients'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        items = request.data.get('clients') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'Request body must be a non-empty array of clients (or {"clients": [...]})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.BULK_UPSERT_MAX_ITEMS:
+            return Response(
+                {'error': f'Too many items. Maximum is {self.BULK_UPSERT_MAX_ITEMS} per request.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        account_id = self.get_resolved_account_id()
+        results = [None] * len(items)
+        
+        # Set-based lookups: referenced employees and already-existing emails
+        employee_ids = set()
+        emails = set()
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            for key in ('coach', 'closer', 'setter'):
+                try:
+                    if item.get(key) is not None:
+                        employee_ids.add(int(item[key]))
+                except (TypeError, ValueError):
+                    pass
+            if isinstance(item.get('email'), str):
+                emails.add(item['email'].strip())
+        employees = {
+            employee.id: employee
+            for employee in Employee.objects.filter(account_id=account_id, id__in=employee_ids)
+        }
+        existing_clients = {
+            client.email: client
+            for client in Client.objects.filter(account_id=account_id, email__in=emails)
+        }
+        existing_emails = set(existing_clients)
+        context = {**self.get_serializer_context(), 'employees': employees}
+        
+        # Validate every item and merge repeats of the same email
+        rows_by_email = {}
+        indexes_by_email = {}
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = {'index': index, 'email': None, 'status': 'error',
+                                  'errors': {'non_field_errors': ['Expected an object.']}}
+                continue
+            email = item.get('email').strip() if isinstance(item.get('email'), str) else None
+            if not email:
+                results[index] = {'index': index, 'email': None, 'status': 'error',
+                                  'errors': {'email': ['Email is required for upsert operation.']}}
+                continue
+            
+            serializer = ClientBulkUpsertItemSerializer(
+                data=item, partial=email in existing_emails, context=context
             )
+            if not serializer.is_valid():
+                results[index] = {'index': index, 'email': email, 'status': 'error',
+                                  'errors': serializer.errors}
+                continue
+            
+            row = {}
+            for name, value in serializer.validated_data.items():
+                field = Client._meta.get_field(name)
+                row[field.attname] = value.pk if field.is_relation and value is not None else value
+            row['email'] = email
+            row['account_id'] = account_id
+            rows_by_email.setdefault(email, {}).update(row)
+            indexes_by_email.setdefault(email, []).append(index)
+        
+        # Rows with the same set of provided fields share one statement, so an
+        # update never overwrites fields the caller did not send. PostgreSQL
+        # checks NOT NULL on the proposed row before resolving the conflict, so
+        # partial rows for existing clients are filled from the stored client
+        # (only the provided fields are written by the update).
+        stored_fields = [
+            field for field in Client._meta.concrete_fields
+            if not field.primary_key and not getattr(field, 'auto_now', False)
+        ]
+        groups = {}
+        for email, row in rows_by_email.items():
+            columns = frozenset(row)
+            stored = existing_clients.get(email)
+            if stored is not None:
+                row = {**{field.attname: getattr(stored, field.attname) for field in stored_fields}, **row}
+            groups.setdefault(columns, []).append(row)
+        
+        for columns, rows in groups.items():
+            update_fields = [
+                Client._meta.get_field(name).name for name in columns
+                if name not in ('email', 'account_id')
+            ]
+            for start in range(0, len(rows), self.BULK_UPSERT_CHUNK_SIZE):
+                chunk = rows[start:start + self.BULK_UPSERT_CHUNK_SIZE]
+                try:
+                    with transaction.atomic():
+                        written = bulk_upsert(
+                            Client, chunk,
+                            conflict_fields=['account', 'email'],
+                            update_fields=update_fields,
+                            returning=('id', 'email'),
+                            chunk_size=self.BULK_UPSERT_CHUNK_SIZE,
+                        )
+                except DatabaseError as e:
+                    logger.error(f"Bulk client upsert chunk failed for account {account_id}: {str(e)}")
+                    for row in chunk:
+                        for index in indexes_by_email[row['email']]:
+                            results[index] = {'index': index, 'email': row['email'], 'status': 'error',
+                                              'errors': {'non_field_errors': ['Database error while saving this client.']}}
+                    continue
+                
+                for record in written:
+                    for index in indexes_by_email.get(record['email'], []):
+                        results[index] = {
+                            'index': index,
+                            'email': record['email'],
+                            'status': 'created' if record['inserted'] else 'updated',
+                            'id': record['id'],
+                        }
+        
+        summary = {'created': 0, 'updated': 0, 'failed': 0}
+        for result in results:
+            key = 'failed' if result['status'] == 'error' else result['status']
+            summary[key] += 1
+        
+        logger.info(
+            f"Bulk client upsert for account {account_id}: "
+            f"{summary['created']} created, {summary['updated']} updated, {summary['failed']} failed"
+        )
+        return Response({**summary, 'results': results}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'])
     def statistics(self, request):
@@ -568,17 +773,56 @@ class ClientViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
         """
         queryset = self.get_queryset()
         
-        stats = {
-            'total': queryset.count(),
-            'active': queryset.filter(status='active').count(),
-            'inactive': queryset.filter(status='inactive').count(),
-            'onboarding': queryset.filter(status='onboarding').count(),
-            'paused': queryset.filter(status='paused').count(),
-            'cancelled': queryset.filter(status='cancelled').count(),
-        }
+        # One pass over the clients instead of a COUNT(*) per status
+        stats = queryset.aggregate(
+            total=Count('id'),
+            **{
+                name: Count('id', filter=Q(status=name))
+                for name in ('active', 'inactive', 'onboarding', 'paused', 'cancelled')
+            }
+        )
         
         return Response(stats)
 
+    @action(detail=False, methods=['get'])
+    def engagement(self, request):
+        """
+        Get short link engagement for the clients visible to the user
+        GET /api/clients/engagement/
+
+        Accepts the list filters (status, coach, ...) and pagination. Figures
+        for the whole account come from one aggregated query, cached per
+        account for LINK_ENGAGEMENT_CACHE_TTL seconds.
+
+        Returns per client:
+            clicks, last_clicked_at, submissions (made after the first click),
+            conversion_rate (submissions / clicks, capped at 1), and the same
+            figures per link type under "links"
+        """
+        from .services.link_engagement import get_account_engagement
+
+        queryset = self.filter_queryset(self.get_queryset()).select_related(None).only(
+            'id', 'first_name', 'last_name'
+        )
+        page = self.paginate_queryset(queryset)
+        clients = page if page is not None else queryset
+
+        engagement = get_account_engagement(self.get_resolved_account_id())
+        empty = {'clicks': 0, 'last_clicked_at': None, 'submissions': 0, 'conversion_rate': None, 'links': {}}
+        results = [
+            {
+                'client_id': client.id,
+                'first_name': client.first_name,
+                'last_name': client.last_name,
+                **engagement.get(client.id, empty),
+            }
+            for client in clients
+        ]
+
+        if page is not None:
+            return self.get_paginated_response(results)
+        return Response(results)
+
     @action(detail=True, methods=['get'], url_path='payment-details')
     def payment_details(self, request, pk=None):
         """
@@ -597,11 +841,18 @@ class ClientViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
             status='active'
         ).select_related('package').first()
         
-        # Get successful payments
+        # Get successful payments: the latest row plus one aggregate covers
+        # every figure below
         successful_payments = Payment.objects.filter(
             client=client,
             status='paid'
         ).order_by('-payment_date')
+        latest_payment = successful_payments.first()
+        totals = successful_payments.aggregate(
+            ltv=Sum('amount'),
+            count=Count('id'),
+            first_payment_date=Min('payment_date'),
+        )
         
         # Build package info
         package_info = {
@@ -617,17 +868,17 @@ class ClientViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
         
         # Build payment info
         payment_info = {
-            'payment_method': self._get_payment_method(successful_payments),
+            'payment_method': self._get_payment_method(latest_payment),
             'payment_amount': float(client_package.monthly_payment_amount) if client_package and client_package.monthly_payment_amount else 0.00,
-            'latest_payment_amount': self._get_latest_payment_amount(successful_payments),
-            'latest_payment_date': self._get_latest_payment_date(successful_payments),
-            'next_payment_date': self._calculate_next_payment_date(client_package, successful_payments),
-            'ltv': self._calculate_ltv(successful_payments),
+            'latest_payment_amount': self._get_latest_payment_amount(latest_payment),
+            'latest_payment_date': self._get_latest_payment_date(latest_payment),
+            'next_payment_date': self._calculate_next_payment_date(client_package, latest_payment),
+            'ltv': self._calculate_ltv(totals),
             'currency': client.currency or 'USD',
-            'day_of_month': self._get_payment_day(successful_payments),
+            'day_of_month': self._get_payment_day(totals),
             'no_more_payments': client.no_more_payments,
             'number_of_months': self._calculate_months(client_package),
-            'number_of_months_paid': successful_payments.count(),
+            'number_of_months_paid': totals['count'],
         }
         
         return Response({
@@ -636,33 +887,29 @@ class ClientViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
             'payment_info': payment_info,
         })
     
-    def _get_payment_method(self, payments_queryset):
+    def _get_payment_method(self, latest_payment):
         """Determine payment method based on latest payment"""
-        latest_payment = payments_queryset.first()
         if latest_payment and latest_payment.stripe_customer_id:
             return 'Stripe'
         return 'Manual'
     
-    def _get_latest_payment_amount(self, payments_queryset):
+    def _get_latest_payment_amount(self, latest_payment):
         """Get amount from most recent payment"""
-        latest_payment = payments_queryset.first()
         if latest_payment:
             return float(latest_payment.amount)
         return 0.00
     
-    def _get_latest_payment_date(self, payments_queryset):
+    def _get_latest_payment_date(self, latest_payment):
         """Get date of most recent payment"""
-        latest_payment = payments_queryset.first()
         if latest_payment:
             return latest_payment.payment_date
         return None
     
-    def _calculate_next_payment_date(self, client_package, payments_queryset):
+    def _calculate_next_payment_date(self, client_package, latest_payment):
         """Calculate next payment date based on payment schedule"""
         if not client_package or not client_package.payment_schedule:
             return None
         
-        latest_payment = payments_queryset.first()
         if not latest_payment:
             return None
         
@@ -680,17 +927,15 @@ class ClientViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
         
         return None
     
-    def _get_payment_day(self, payments_queryset):
+    def _get_payment_day(self, totals):
         """Extract day of month from first payment"""
-        first_payment = payments_queryset.last()  # last() because ordered DESC
-        if first_payment:
-            return first_payment.payment_date.day
+        if totals['first_payment_date']:
+            return totals['first_payment_date'].day
         return None
     
-    def _calculate_ltv(self, payments_queryset):
+    def _calculate_ltv(self, totals):
         """Calculate lifetime value (sum of all successful payments)"""
-        ltv = payments_queryset.aggregate(total=Sum('amount'))['total']
-        return float(ltv) if ltv else 0.00
+        return float(totals['ltv']) if totals['ltv'] else 0.00
     
     def _calculate_months(self, client_package):
         """Calculate number of months between start and end dates"""
@@ -719,32 +964,24 @@ class ClientViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
         inactive_packages = ClientPackage.objects.filter(
             client=client,
             status='inactive'
-        ).select_related('package').order_by('-package_end_date', '-start_date')
+        ).select_related('client', 'package').order_by('-package_end_date', '-start_date')
         
         # Serialize the packages using ClientPackageSerializer
         serializer = ClientPackageSerializer(inactive_packages, many=True)
         
-        # Calculate summary statconistics
-        total_packages = inactive_packages.count()
-        
-        # Get date range if packages exist
-        if total_packages > 0:
-            earliest_start = inactive_packages.aggregate(
-                earliest=Min('start_date')
-            )['earliest']
-            latest_end = inactive_packages.aggregate(
-                latest=Max('package_end_date')
-            )['latest']
-        else:
-            earliest_start = None
-            latest_end = None
+        # Summary statistics and date range in one query (None when there are no packages)
+        summary = inactive_packages.order_by().aggregate(
+            total=Count('id'),
+            earliest=Min('start_date'),
+            latest=Max('package_end_date'),
+        )
         
         return Response({
             'client_id': client.id,
             'client_name': f"{client.first_name} {client.last_name or ''}".strip(),
-            'total_inactive_packages': total_packages,
-            'earliest_package_start': earliest_start,
-            'latest_package_end': latest_end,
+            'total_inactive_packages': summary['total'],
+            'earliest_package_start': summary['earliest'],
+            'latest_package_end': summary['latest'],
             'packages': serializer.data
         })
 
@@ -948,7 +1185,7 @@ class ClientViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
         return response
 
 
-class PackageViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
+class PackageViewSet(AccountResolutionMixin, ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Packages.
     All authenticated users can perform CRUD operations on packages in their account.
@@ -957,6 +1194,7 @@ class PackageViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
     queryset = Package.objects.all()
     serializer_class = PackageSerializer
     permission_classes = [IsAuthenticated, IsAccountMember]
+    change_resources = ('packages', 'forms', 'account')
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['package_name', 'description']
     ordering_fields = ['package_name']
@@ -964,7 +1202,9 @@ class PackageViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
 
     def get_queryset(self):
         # Users can only see packages in their account (or specified account for master token)
-        return Package.objects.filter(account_id=self.get_resolved_account_id())
+        return Package.objects.filter(
+            account_id=self.get_resolved_account_id()
+        ).select_related('account').prefetch_related('forms')
 
     def perform_create(self, serializer):
         # Automatically set the account to the resolved account
@@ -986,7 +1226,7 @@ class PackageViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
             )
 
 
-class ClientPackageViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
+class ClientPackageViewSet(AccountResolutionMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Client Packages.
     All authenticated users can perform CRUD operations on client packages in their account.
@@ -1129,7 +1369,7 @@ class ClientPackageViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
     # Removed get_permissions - all authenticated account members can CRUD client packages
 
 
-class PaymentViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
+class PaymentViewSet(AccountResolutionMixin, SparseFieldsetMixin, RowSerializerMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Payments.
     Permissions controlled by can_view_all_payments and can_manage_all_payments flags.
@@ -1137,12 +1377,14 @@ class PaymentViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
     """
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
+    row_serializer_class = PaymentRowSerializer
     permission_classes = [IsAuthenticated, IsAccountMember, CanViewPayments]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['client', 'status', 'paid_currency']
     search_fields = ['client__first_name', 'client__last_name', 'id']
     ordering_fields = ['payment_date', 'amount']
     ordering = ['-payment_date']
+    keyset_ordering = ('-payment_date', '-id')
 
     def get_permissions(self):
         """Use CanManagePayments for create/update/delete operations"""
@@ -1175,11 +1417,7 @@ class PaymentViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
             return queryset.select_related('client', 'client_package', 'account')
         
         # Otherwise, filter to only payments for assigned clients
-        queryset = queryset.filter(
-            Q(client__coach=user) |
-            Q(client__closer=user) |
-            Q(client__setter=user)
-        ).distinct()
+        queryset = filter_rows_for_assigned_clients(queryset, user)
         
         return queryset.select_related('client', 'client_package', 'account')
 
@@ -1189,18 +1427,18 @@ class PaymentViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
         Get payment statistics
         GET /api/payments/statistics/
         """
-        from django.db.models import Sum, Count
-        
         queryset = self.get_queryset()
         
-        stats = {
-            'total_payments': queryset.count(),
-            'total_amount': queryset.filter(status='paid').aggregate(Sum('amount'))['amount__sum'] or 0,
-            'paid': queryset.filter(status='paid').count(),
-            'failed': queryset.filter(status='failed').count(),
-            'refunded': queryset.filter(status='refunded').count(),
-            'disputed': queryset.filter(status='disputed').count(),
-        }
+        # One pass over the payments instead of a query per figure
+        stats = queryset.aggregate(
+            total_payments=Count('id'),
+            total_amount=Sum('amount', filter=Q(status='paid')),
+            **{
+                name: Count('id', filter=Q(status=name))
+                for name in ('paid', 'failed', 'refunded', 'disputed')
+            }
+        )
+        stats['total_amount'] = stats['total_amount'] or 0
         
         return Response(stats)
 
@@ -1368,6 +1606,189 @@ class PaymentViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    # Maximum number of items accepted by one bulk-ingest call
+    BULK_INGEST_MAX_ITEMS = 5000
+    BULK_INGEST_CHUNK_SIZE = 500
+
+    @action(detail=False, methods=['post'], url_path='bulk-ingest',
+            permission_classes=[IsAuthenticated, IsAccountMember, CanManagePayments])
+    def bulk_ingest(self, request):
+        """
+        Idempotently create or update many payments, keyed by payment ID.
+        POST /api/payments/bulk-ingest/
+
+        Requires can_manage_all_payments permission. Intended for automation
+        (e.g. forwarding Stripe charges) where deliveries may be retried.
+        Request body: a JSON array of payments, or {"payments": [...]}, up to
+        5000 items. Each item needs id, amount, status and one of client,
+        stripe_customer_id or client_email to identify the client.
+
+        Clients are resolved with one set-based lookup per batch, and the batch
+        is written with INSERT ... ON CONFLICT (id) DO UPDATE in one transaction.
+        Replaying a delivery leaves identical rows untouched ("unchanged").
+        Payment IDs already used by another account are rejected per item.
+
+        Returns per-item results in request order:
+            {
+                "created": 1, "updated": 0, "unchanged": 1, "failed": 0,
+                "results": [{"index": 0, "id": "ch_123", "status": "created"}, ...]
+            }
+        """
+        from django.db.models import Q
+        from .serializers import PaymentIngestItemSerializer
+        from .utils.bulk_upsert import bulk_upsert
+
+        logger = logging.getLogger(__name__)
+
+        # Ingestion writes payments for any client in the account
+        if not request.user.is_super_admin and not request.user.can_manage_all_payments:
+            return Response(
+                {'error': 'You do not have permission to ingest payments'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        items = request.data.get('payments') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'Request body must be a non-empty array of payments (or {"payments": [...]})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.BULK_INGEST_MAX_ITEMS:
+            return Response(
+                {'error': f'Too many items. Maximum is {self.BULK_INGEST_MAX_ITEMS} per request.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        account_id = self.get_resolved_account_id()
+        results = [None] * len(items)
+
+        def fail(index, payment_id, errors):
+            results[index] = {'index': index, 'id': payment_id, 'status': 'error', 'errors': errors}
+
+        # Validate every item (no queries)
+        valid = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                fail(index, None, {'non_field_errors': ['Expected an object.']})
+                continue
+            serializer = PaymentIngestItemSerializer(data=item)
+            if not serializer.is_valid():
+                fail(index, item.get('id'), serializer.errors)
+                continue
+            valid.append((index, serializer.validated_data))
+
+        # Set-based client resolution for the whole batch
+        client_ids = {data['client'] for _, data in valid if data.get('client')}
+        emails = {data['client_email'] for _, data in valid if data.get('client_email')}
+        customer_ids = {data['stripe_customer_id'] for _, data in valid if data.get('stripe_customer_id')}
+        package_ids = {data['client_package'] for _, data in valid if data.get('client_package')}
+
+        known_clients = set()
+        clients_by_email = {}
+        for client_id, email in Client.objects.filter(account_id=account_id).filter(
+            Q(id__in=client_ids) | Q(email__in=emails)
+        ).values_list('id', 'email'):
+            known_clients.add(client_id)
+            if email:
+                clients_by_email[email] = client_id
+        clients_by_customer = dict(
+            StripeCustomer.objects.filter(
+                account_id=account_id, stripe_customer_id__in=customer_ids
+            ).values_list('stripe_customer_id', 'client_id')
+        )
+        packages = dict(
+            ClientPackage.objects.filter(
+                client__account_id=account_id, id__in=package_ids
+            ).values_list('id', 'client_id')
+        )
+
+        # Build rows; repeated IDs are merged (later items win) because one
+        # statement cannot touch the same row twice
+        rows_by_id = {}
+        indexes_by_id = {}
+        for index, data in valid:
+            payment_id = data['id']
+            if data.get('client'):
+                client_id = data['client'] if data['client'] in known_clients else None
+            elif data.get('stripe_customer_id') and data['stripe_customer_id'] in clients_by_customer:
+                client_id = clients_by_customer[data['stripe_customer_id']]
+            else:
+                client_id = clients_by_email.get(data.get('client_email'))
+            if client_id is None:
+                fail(index, payment_id, {'client': ['Client not found in your account.']})
+                continue
+            if data.get('client_package') and packages.get(data['client_package']) != client_id:
+                fail(index, payment_id, {'client_package': ['Client package not found for this client.']})
+                continue
+
+            row = {
+                key: value for key, value in data.items()
+                if key not in ('client', 'client_email', 'client_package')
+            }
+            if 'client_package' in data:
+                row['client_package_id'] = data['client_package']
+            row['account_id'] = account_id
+            row['client_id'] = client_id
+            rows_by_id.setdefault(payment_id, {}).update(row)
+            indexes_by_id.setdefault(payment_id, []).append(index)
+
+        # Rows with the same set of provided fields share one statement, so an
+        # update never clears fields the caller did not send
+        groups = {}
+        for row in rows_by_id.values():
+            groups.setdefault(frozenset(row), []).append(row)
+
+        written = {}
+        try:
+            with transaction.atomic():
+                for columns, rows in groups.items():
+                    update_fields = [
+                        Payment._meta.get_field(name).name for name in columns
+                        if name not in ('id', 'account_id')
+                    ]
+                    for record in bulk_upsert(
+                        Payment, rows,
+                        conflict_fields=['id'],
+                        update_fields=update_fields,
+                        returning=('id',),
+                        # Never let one account overwrite another account's payment
+                        update_where='payments.account_id = EXCLUDED.account_id',
+                        skip_unchanged=True,
+                        chunk_size=self.BULK_INGEST_CHUNK_SIZE,
+                    ):
+                        written[record['id']] = 'created' if record['inserted'] else 'updated'
+        except DatabaseError as e:
+            logger.error(f"Bulk payment ingest failed for account {account_id}: {str(e)}")
+            return Response(
+                {'error': 'Database error while saving payments. No payments from this batch were saved.'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        # Rows missing from RETURNING were either identical replays or belong
+        # to another account
+        skipped = [payment_id for payment_id in rows_by_id if payment_id not in written]
+        owners = dict(Payment.objects.filter(id__in=skipped).values_list('id', 'account_id'))
+        for payment_id, indexes in indexes_by_id.items():
+            outcome = written.get(payment_id)
+            if outcome is None and owners.get(payment_id) == account_id:
+                outcome = 'unchanged'
+            for index in indexes:
+                if outcome is None:
+                    fail(index, payment_id, {'id': ['Payment ID is already used by another account.']})
+                else:
+                    results[index] = {'index': index, 'id': payment_id, 'status': outcome}
+
+        summary = {'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0}
+        for result in results:
+            key = 'failed' if result['status'] == 'error' else result['status']
+            summary[key] += 1
+
+        logger.info(
+            f"Bulk payment ingest for account {account_id}: {summary['created']} created, "
+            f"{summary['updated']} updated, {summary['unchanged']} unchanged, {summary['failed']} failed"
+        )
+        return Response({**summary, 'results': results}, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], url_path='export')
     def export_csv(self, request):
         """
@@ -1411,7 +1832,7 @@ class PaymentViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
         return response
 
 
-class InstallmentViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
+class InstallmentViewSet(AccountResolutionMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Installments.
     Permissions controlled by can_view_all_installments and can_manage_all_installments flags.
@@ -1457,11 +1878,7 @@ class InstallmentViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
             return queryset.select_related('client', 'account')
         
         # Otherwise, filter to only installments for assigned clients
-        queryset = queryset.filter(
-            Q(client__coach=user) |
-            Q(client__closer=user) |
-            Q(client__setter=user)
-        ).distinct()
+        queryset = filter_rows_for_assigned_clients(queryset, user)
         
         return queryset.select_related('client', 'account')
 
@@ -1474,7 +1891,7 @@ class InstallmentViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
             serializer.save()
 
 
-class StripeCustomerViewSet(AccountResolutionMixin, viewsets.ReadOnlyModelViewSet):
+class StripeCustomerViewSet(AccountResolutionMixin, SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing Stripe Customers.
     Read-only for all authenticated users.
@@ -1496,7 +1913,7 @@ class StripeCustomerViewSet(AccountResolutionMixin, viewsets.ReadOnlyModelViewSe
         ).select_related('client', 'account', 'stripe_account')
 
 
-class CheckInFormViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
+class CheckInFormViewSet(AccountResolutionMixin, ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Forms (checkin, onboarding, reviews).
     All authenticated account members can CRUD forms.
@@ -1505,17 +1922,38 @@ class CheckInFormViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
     queryset = CheckInForm.objects.all()
     serializer_class = CheckInFormSerializer
     permission_classes = [IsAuthenticated, IsAccountMember]
+    change_resources = ('forms', 'packages', 'account')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['packages', 'form_type', 'is_active']
     search_fields = ['title', 'description', 'packages__package_name']
     ordering_fields = ['created_at', 'title', 'form_type']
     ordering = ['-created_at']
 
+    def get_change_validators(self):
+        """
+        Submissions are not versioned, so only responses without
+        submission_count (e.g. ?omit=submission_count) get an ETag.
+        """
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is None or 'submission_count' in fieldset:
+            return None
+        return super().get_change_validators()
+
     def get_queryset(self):
         """Filter forms to user's account (or specified account for master token)"""
-        return CheckInForm.objects.filter(
-            account_id=self.get_resolved_account_id()
-        ).select_related('account', 'schedule').prefetch_related('packages')
+        forms = CheckInForm.objects.filter(account_id=self.get_resolved_account_id())
+        if self.action in ['submissions', 'submissions_stream']:
+            # Only the form row is needed to scope its submissions
+            return forms
+        
+        # Correlated subquery rather than Count('submissions'): a join would be
+        # multiplied by the packages filter/search joins
+        submission_total = CheckInSubmission.objects.filter(
+            form=OuterRef('pk')
+        ).order_by().values('form').annotate(total=Count('id')).values('total')
+        return forms.select_related('account', 'schedule').prefetch_related('packages').annotate(
+            submission_total=Coalesce(Subquery(submission_total), 0)
+        )
 
     def perform_create(self, serializer):
         """
@@ -1701,18 +2139,240 @@ class CheckInFormViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
         # Delete the form
         instance.delete()
 
+    # Response fields of the submissions actions (mirrors CheckInSubmissionSerializer)
+    SUBMISSION_FIELDS = (
+        'id', 'form', 'form_title', 'client', 'client_name', 'client_email',
+        'account', 'submission_data', 'submitted_at'
+    )
+
     @action(detail=True, methods=['get'])
     def submissions(self, request, pk=None):
-        """Get all submissions for this form"""
+        """
+        Get submissions for this form, newest first, keyset-paginated.
+        GET /api/checkin-forms/{id}/submissions/
+
+        Query params:
+            page_size: Submissions per page (default 50, max 500)
+            cursor: Opaque cursor from the previous page's `next` link
+            fields: Comma-separated response fields to include
+            omit: Comma-separated response fields to exclude (e.g. submission_data)
+            data_keys: Comma-separated submission_data keys to include
+        
+        Returns:
+            {"next": "<url or null>", "results": [...]}
+        """
+        from .pagination import KeysetPagination
+        
+        form = self.get_object()
+        fields, data_keys = self._get_submission_projection(request)
+        submissions = self._get_form_submissions(form, fields, data_keys).select_related('client', 'form')
+        
+        paginator = KeysetPagination(keyset_ordering=('-submitted_at', '-id'))
+        page = paginator.paginate_queryset(submissions, request, view=self)
+        
+        if data_keys is not None:
+            for submission in page:
+                submission.submission_data = submission.projected_submission_data
+        
+        serializer = CheckInSubmissionSerializer(page, many=True)
+        for name in set(self.SUBMISSION_FIELDS) - set(fields):
+            serializer.child.fields.pop(name, None)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'], url_path='submissions/stream')
+    def submissions_stream(self, request, pk=None):
+        """
+        Stream every submission for this form as NDJSON (one JSON object per line).
+        GET /api/checkin-forms/{id}/submissions/stream/
+
+        Rows are read from a server-side cursor and written as they arrive, so
+        memory use stays flat regardless of how many submissions the form has.
+
+        Query params:
+            fields, omit, data_keys: Same projection options as `submissions`
+            submitted_after: ISO-8601 timestamp; only stream newer submissions
+        """
+        from django.http import StreamingHttpResponse
+        from django.utils.dateparse import parse_datetime
+        from rest_framework.utils.encoders import JSONEncoder
+        import json
+        
         form = self.get_object()
+        fields, data_keys = self._get_submission_projection(request)
+        submissions = self._get_form_submissions(form, fields, data_keys)
+        
+        submitted_after = request.query_params.get('submitted_after')
+        if submitted_after:
+            parsed = parse_datetime(submitted_after)
+            if parsed is None:
+                return Response(
+                    {'error': 'submitted_after must be an ISO-8601 datetime'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if timezone.is_naive(parsed):
+                parsed = timezone.make_aware(parsed)
+            submissions = submissions.filter(submitted_at__gt=parsed)
+        
+        # Map response fields to the columns they are built from
+        columns = {
+            'id': ['id'],
+            'form': ['form_id'],
+            'form_title': ['form__title'],
+            'client': ['client_id'],
+            'client_name': ['client__first_name', 'client__last_name'],
+            'client_email': ['client__email'],
+            'account': ['account_id'],
+            'submission_data': ['projected_submission_data' if data_keys is not None else 'submission_data'],
+            'submitted_at': ['submitted_at'],
+        }
+        value_names = [column for name in fields for column in columns[name]]
+        rows = submissions.order_by('-submitted_at', '-id').values(*value_names)
+        
+        def render_row(row):
+            item = {}
+            for name in fields:
+                if name == 'client_name':
+                    item[name] = f"{row['client__first_name']} {row['client__last_name'] or ''}".strip()
+                else:
+                    item[name] = row[columns[name][0]]
+            return json.dumps(item, cls=JSONEncoder, ensure_ascii=False) + '\n'
+        
+        def generate():
+            for row in rows.iterator(chunk_size=2000):
+                yield render_row(row)
+        
+        response = StreamingHttpResponse(generate(), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'inline; filename="form_{form.id}_submissions.ndjson"'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def _get_submission_projection(self, request):
+        """
+        Parse `fields`, `omit` and `data_keys` query params.
+        
+        Returns:
+            tuple: (fields, data_keys) where fields is an ordered list of response
+                fields and data_keys is a list of submission_data keys, or None
+                to return submission_data in full.
+        
+        Raises:
+            ValidationError: If unknown fields are requested
+        """
+        def split_param(name):
+            value = request.query_params.get(name)
+            if value is None:
+                return None
+            return [item.strip() for item in value.split(',') if item.strip()]
+        
+        requested = split_param('fields')
+        omitted = split_param('omit') or []
+        data_keys = split_param('data_keys')
+        
+        unknown = [name for name in (requested or []) + omitted if name not in self.SUBMISSION_FIELDS]
+        if unknown:
+            raise ValidationError({
+                'error': f"Unknown fields: {', '.join(unknown)}. "
+                         f"Valid fields: {', '.join(self.SUBMISSION_FIELDS)}"
+            })
+        
+        fields = [
+            name for name in self.SUBMISSION_FIELDS
+            if (requested is None or name in requested) and name not in omitted
+        ]
+        if 'submission_data' not in fields:
+            data_keys = None
+        return fields, data_keys
+
+    def _get_form_submissions(self, form, fields, data_keys):
+        """
+        Build the submissions queryset for a form with the projection applied.
+        
+        submission_data is deferred when omitted, and when only some keys are
+        requested they are extracted in SQL (jsonb_build_object) into
+        `projected_submission_data`, so full blobs never leave the database.
+        """
+        from django.db.models.fields.json import KeyTransform
+        from django.db.models.functions import JSONObject
+        
         submissions = CheckInSubmission.objects.filter(
             form=form,
             account_id=self.get_resolved_account_id()
-        ).select_related('client', 'form').order_by('-submitted_at')
+        )
         
-        from .serializers import CheckInSubmissionSerializer
-        serializer = CheckInSubmissionSerializer(submissions, many=True)
-        return Response(serializer.data)
+        if 'submission_data' not in fields or data_keys is not None:
+            submissions = submissions.defer('submission_data')
+        
+        if data_keys is not None:
+            submissions = submissions.annotate(
+                projected_submission_data=JSONObject(**{
+                    key: KeyTransform(key, 'submission_data') for key in data_keys
+                })
+            )
+        return submissions
+
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, pk=None):
+        """
+        Aggregate this form's numeric and choice answers over time.
+        GET /api/checkin-forms/{id}/analytics/
+
+        Field handling follows form_schema: "number" fields report count, mean,
+        min, max and stddev; "select"/"radio"/"checkbox" fields report counts
+        per option. Text and file fields are not aggregated.
+
+        Read-only: served from the rollups kept by the refresh_checkin_analytics
+        command plus the submissions since its last run.
+
+        Query params:
+            group_by: week (default), client, or client_week
+            client: Restrict to a single client ID
+            since: First week (YYYY-MM-DD) to include
+            until: Last week (YYYY-MM-DD) to include
+        """
+        from django.utils.dateparse import parse_date
+        from .services.checkin_analytics import get_form_analytics
+        
+        form = self.get_object()
+        user = request.user
+        
+        group_by = request.query_params.get('group_by', 'week')
+        if group_by not in ('week', 'client', 'client_week'):
+            return Response(
+                {'error': 'group_by must be one of: week, client, client_week'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        client_id = request.query_params.get('client')
+        if client_id is not None:
+            try:
+                client_id = int(client_id)
+            except ValueError:
+                return Response({'error': 'client must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        dates = {}
+        for name in ('since', 'until'):
+            value = request.query_params.get(name)
+            dates[name] = parse_date(value) if value else None
+            if value and dates[name] is None:
+                return Response(
+                    {'error': f'{name} must be a date (YYYY-MM-DD)'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        # Employees without can_view_all_clients only see their assigned clients
+        restrict = None
+        if not (getattr(user, 'is_master_token', False) or user.is_super_admin or user.can_view_all_clients):
+            restrict = lambda queryset: filter_rows_for_assigned_clients(queryset, user)
+        
+        analytics = get_form_analytics(
+            form,
+            group_by=group_by,
+            restrict=restrict,
+            client_id=client_id,
+            since=dates['since'],
+            until=dates['until'],
+        )
+        return Response({'form': form.id, 'title': form.title, **analytics})
 
     @action(detail=True, methods=['post'])
     def recreate_webhooks(self, request, pk=None):
@@ -1741,7 +2401,7 @@ class CheckInFormViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
             )
 
 
-class CheckInScheduleViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
+class CheckInScheduleViewSet(AccountResolutionMixin, ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Check-In Schedules.
     All authenticated account members can CRUD schedules.
@@ -1750,6 +2410,7 @@ class CheckInScheduleViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
     queryset = CheckInSchedule.objects.all()
     serializer_class = CheckInScheduleSerializer
     permission_classes = [IsAuthenticated, IsAccountMember]
+    change_resources = ('forms',)
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['form', 'schedule_type', 'is_active']
     ordering_fields = ['created_at']
@@ -1829,7 +2490,7 @@ class CheckInScheduleViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
         instance.delete()
 
 
-class CheckInSubmissionViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
+class CheckInSubmissionViewSet(AccountResolutionMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Check-In Submissions.
     Permissions controlled by can_view_all_clients flag.
@@ -1843,6 +2504,7 @@ class CheckInSubmissionViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
     search_fields = ['client__first_name', 'client__last_name', 'form__title']
     ordering_fields = ['submitted_at']
     ordering = ['-submitted_at']
+    keyset_ordering = ('-submitted_at', '-id')
 
     def get_queryset(self):
         """
@@ -1869,14 +2531,33 @@ class CheckInSubmissionViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
             return queryset.select_related('client', 'form', 'account')
         
         # Otherwise, filter to only submissions for assigned clients
-        queryset = queryset.filter(
-            Q(client__coach=user) |
-            Q(client__closer=user) |
-            Q(client__setter=user)
-        ).distinct()
+        queryset = filter_rows_for_assigned_clients(queryset, user)
         
         return queryset.select_related('client', 'form', 'account')
 
+    def perform_update(self, serializer):
+        """Save the submission and recompute the analytics client-weeks it left and joined"""
+        from .services.checkin_analytics import recompute_submission_buckets
+        
+        previous = serializer.instance
+        previous_form = previous.form
+        previous_bucket = (previous.client_id, previous.submitted_at)
+        submission = serializer.save()
+        bucket = (submission.client_id, submission.submitted_at)
+        if submission.form_id != previous_form.id:
+            recompute_submission_buckets(previous_form, [previous_bucket])
+            recompute_submission_buckets(submission.form, [bucket])
+        else:
+            recompute_submission_buckets(submission.form, [previous_bucket, bucket])
+
+    def perform_destroy(self, instance):
+        """Delete the submission and recompute the analytics client-week it was in"""
+        from .services.checkin_analytics import recompute_submission_buckets
+        
+        form, bucket = instance.form, (instance.client_id, instance.submitted_at)
+        instance.delete()
+        recompute_submission_buckets(form, [bucket])
+
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get submission statistics by form"""
@@ -1890,6 +2571,35 @@ class CheckInSubmissionViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
         return Response(stats)
 
 
+class DashboardViewSet(AccountResolutionMixin, viewsets.ViewSet):
+    """
+    Account dashboard served from pre-computed daily rollups.
+    Rollups are refreshed incrementally by `manage.py refresh_dashboard_rollups`.
+    Master token users can access any account via X-Account-ID header.
+    """
+    permission_classes = [IsAuthenticated, IsAccountMember, CanViewDashboard]
+
+    def list(self, request):
+        """
+        Get dashboard metrics for the trailing window
+        GET /api/dashboard/?days=30
+        
+        Returns window totals (revenue, payments, new/churned clients,
+        submissions, instalments due), the latest snapshot (active clients,
+        overdue instalments) and a per-day series.
+        """
+        from .services.dashboard_rollups import get_dashboard
+        
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            return Response({'error': 'days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if days < 1 or days > 366:
+            return Response({'error': 'days must be between 1 and 366'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(get_dashboard(self.get_resolved_account_id(), days=days))
+
+
 # ===================== Internal Webhook Trigger Endpoint =====================
 
 @api_view(['POST'])
@@ -2725,6 +3435,48 @@ def submit_reviews_form(request, reviews_uuid):
         )
 
 
+# ===================== Public Short Link Redirects =====================
+
+class ShortLinkRedirectView(View):
+    """
+    Public redirect for a short link.
+    
+    GET /api/public/links/{domain}/{short_code}/
+    
+    Short-link domains proxy https://{domain}/{short_code} to this view. The
+    target comes from the in-process link cache and the click is buffered
+    (api/services/short_links.py), so a cached redirect makes no queries.
+    HEAD requests (link previews) are not counted as clicks.
+    
+    Plain Django view: no authentication, content negotiation or throttling
+    on this path.
+    """
+    http_method_names = ['get', 'head']
+    
+    def get(self, request, domain, short_code):
+        from .services import short_links
+        
+        link = short_links.resolve(domain, short_code)
+        if link is None:
+            raise Http404('Short link not found')
+        try:
+            response = HttpResponseRedirect(link.original_url)
+        except DisallowedRedirect:
+            raise Http404('Short link not found')
+        
+        if request.method == 'GET':
+            forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR', '')
+            short_links.record_click(
+                link,
+                ip_address=forwarded_for.split(',')[0].strip() or request.META.get('REMOTE_ADDR'),
+                user_agent=request.META.get('HTTP_USER_AGENT', ''),
+                referer=request.META.get('HTTP_REFERER', ''),
+            )
+        # Every click must reach us to be counted
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
 # ==============================================================================
 # Domain Management Views
 # ==============================================================================
@@ -2736,7 +3488,9 @@ def configure_custom_domain(request):
     Configure custom forms domain for the authenticated user's account.
     
     Frontend has already verified DNS points to server IP.
-    This endpoint generates SSL certificate and configures Nginx.
+    This endpoint queues a background job that generates the SSL certificate
+    and configures Nginx; poll status_url until status is "succeeded" or
+    "failed". The account's forms_domain is set when the job succeeds.
     
     POST /api/domains/configure/
     Request Body:
@@ -2744,17 +3498,19 @@ def configure_custom_domain(request):
         "forms_domain": "check.gymname.com"
     }
     
-    Response:
+    Response (202):
     {
         "success": true,
-        "message": "Custom domain configured successfully with SSL and Nginx",
+        "message": "Custom domain provisioning queued",
         "domain": "check.gymname.com",
-        "configured_at": "2025-11-25T10:30:00Z",
-        "ssl_status": "Active",
-        "nginx_status": "Configured"
+        "job_id": "6f1c2a4e-...",
+        "status": "pending",
+        "steps": {"cert": {"status": "pending", ...}, "config": {...}, "reload": {...}},
+        "status_url": "/api/domains/jobs/6f1c2a4e-.../"
     }
     """
-    from api.services.domain_service import DomainService
+    from django.urls import reverse
+    from api.services import domain_jobs
     logger = logging.getLogger(__name__)
     
     try:
@@ -2779,54 +3535,19 @@ def configure_custom_domain(request):
         
         logger.info(f"Configuring custom domain for account {account.id}: {forms_domain}")
         
-        # Step 1: Generate SSL certificate
-        ssl_success, ssl_message = DomainService.generate_ssl_certificate(forms_domain)
-        if not ssl_success:
-            logger.error(f"SSL generation failed for {forms_domain}: {ssl_message}")
-            return Response({
-                'success': False,
-                'error': 'SSL certificate generation failed',
-                'details': ssl_message
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        # Step 2: Create Nginx configuration
-        config_success, config_message = DomainService.create_nginx_config(forms_domain)
-        if not config_success:
-            logger.error(f"Nginx config creation failed for {forms_domain}: {config_message}")
-            return Response({
-                'success': False,
-                'error': 'Nginx configuration failed',
-                'details': config_message
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        # Step 3: Test and reload Nginx
-        reload_success, reload_message = DomainService.test_and_reload_nginx()
-        if not reload_success:
-            logger.error(f"Nginx reload failed for {forms_domain}: {reload_message}")
-            return Response({
-                'success': False,
-                'error': 'Nginx reload failed',
-                'details': reload_message
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        # Step 4: Save domain configuration in database
-        # Frontend has verified DNS, SSL and Nginx are now configured
-        account.forms_domain = forms_domain
-        account.forms_domain_verified = True
-        account.forms_domain_configured = True
-        account.forms_domain_added_at = timezone.now()
-        account.save()
-        
-        logger.info(f"Custom domain configured successfully for account {account.id}: {forms_domain}")
+        # SSL, Nginx config and reload run in the background (process_domain_jobs);
+        # the account is updated once the job succeeds
+        job, created = domain_jobs.enqueue(account, forms_domain, 'forms')
         
         return Response({
             'success': True,
-            'message': 'Custom domain configured successfully with SSL and Nginx',
+            'message': 'Custom domain provisioning queued' if created else 'Custom domain provisioning already in progress',
             'domain': forms_domain,
-            'configured_at': account.forms_domain_added_at.isoformat(),
-            'ssl_status': 'Active',
-            'nginx_status': 'Configured'
-        }, status=status.HTTP_200_OK)
+            'job_id': str(job.id),
+            'status': job.status,
+            'steps': job.steps,
+            'status_url': reverse('domain-job', kwargs={'job_id': job.id}),
+        }, status=status.HTTP_202_ACCEPTED)
         
     except Exception as e:
         logger.exception(f"Error configuring custom domain: {str(e)}")
@@ -2925,6 +3646,48 @@ def get_domain_config(request):
         )
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_domain_job(request, job_id):
+    """
+    Get the status of a domain provisioning job queued by the configure endpoints.
+    
+    GET /api/domains/jobs/<job_id>/
+    
+    Response:
+    {
+        "job_id": "6f1c2a4e-...",
+        "domain": "check.gymname.com",
+        "domain_type": "forms",
+        "status": "running",
+        "steps": {
+            "cert": {"status": "succeeded", "message": "...", "finished_at": "..."},
+            "config": {"status": "pending", "message": "", "finished_at": null},
+            "reload": {"status": "pending", "message": "", "finished_at": null}
+        },
+        "error": "",
+        "created_at": "2025-11-25T10:30:00Z",
+        "started_at": "2025-11-25T10:30:02Z",
+        "finished_at": null
+    }
+    """
+    job = DomainProvisioningJob.objects.filter(id=job_id, account_id=request.user.account_id).first()
+    if job is None:
+        return Response({'error': 'Domain job not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        'job_id': str(job.id),
+        'domain': job.domain,
+        'domain_type': job.domain_type,
+        'status': job.status,
+        'steps': job.steps,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['PATCH'])
 @permission_classes([IsAuthenticated, IsSuperAdmin])
 def update_domain_config(request):
@@ -2969,7 +3732,9 @@ def update_domain_config(request):
         account.forms_domain = forms_domain
         account.forms_domain_verified = True
         account.forms_domain_configured = True
-        account.save()
+        account.save(update_fields=[
+            'forms_domain', 'forms_domain_verified', 'forms_domain_configured', 'updated_at'
+        ])
         
         return Response({
             'success': True,
@@ -3020,7 +3785,10 @@ def delete_domain_config(request):
         account.forms_domain_verified = False
         account.forms_domain_configured = False
         account.forms_domain_added_at = None
-        account.save()
+        account.save(update_fields=[
+            'forms_domain', 'forms_domain_verified', 'forms_domain_configured',
+            'forms_domain_added_at', 'updated_at'
+        ])
         
         return Response({
             'success': True,
@@ -3046,7 +3814,9 @@ def configure_payment_domain(request):
     Configure custom payment domain for the authenticated user's account.
     
     Frontend has already verified DNS points to server IP.
-    This endpoint generates SSL certificate and configures Nginx.
+    This endpoint queues a background job that generates the SSL certificate
+    and configures Nginx; poll status_url until status is "succeeded" or
+    "failed". The account's payment_domain is set when the job succeeds.
     
     POST /api/domains/payment/configure/
     Request Body:
@@ -3054,17 +3824,19 @@ def configure_payment_domain(request):
         "payment_domain": "pay.gymname.com"
     }
     
-    Response:
+    Response (202):
     {
         "success": true,
-        "message": "Payment domain configured successfully with SSL and Nginx",
+        "message": "Payment domain provisioning queued",
         "domain": "pay.gymname.com",
-        "configured_at": "2025-11-28T10:30:00Z",
-        "ssl_status": "Active",
-        "nginx_status": "Configured"
+        "job_id": "6f1c2a4e-...",
+        "status": "pending",
+        "steps": {"cert": {"status": "pending", ...}, "config": {...}, "reload": {...}},
+        "status_url": "/api/domains/jobs/6f1c2a4e-.../"
     }
     """
-    from api.services.domain_service import DomainService
+    from django.urls import reverse
+    from api.services import domain_jobs
     logger = logging.getLogger(__name__)
     
     try:
@@ -3089,54 +3861,19 @@ def configure_payment_domain(request):
         
         logger.info(f"Configuring payment domain for account {account.id}: {payment_domain}")
         
-        # Step 1: Generate SSL certificate
-        ssl_success, ssl_message = DomainService.generate_ssl_certificate(payment_domain)
-        if not ssl_success:
-            logger.error(f"SSL generation failed for {payment_domain}: {ssl_message}")
-            return Response({
-                'success': False,
-                'error': 'SSL certificate generation failed',
-                'details': ssl_message
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        # Step 2: Create Nginx configuration
-        config_success, config_message = DomainService.create_nginx_config(payment_domain)
-        if not config_success:
-            logger.error(f"Nginx config creation failed for {payment_domain}: {config_message}")
-            return Response({
-                'success': False,
-                'error': 'Nginx configuration failed',
-                'details': config_message
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        # Step 3: Test and reload Nginx
-        reload_success, reload_message = DomainService.test_and_reload_nginx()
-        if not reload_success:
-            logger.error(f"Nginx reload failed for {payment_domain}: {reload_message}")
-            return Response({
-                'success': False,
-                'error': 'Nginx reload failed',
-                'details': reload_message
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        # Step 4: Save domain configuration in database
-        # Frontend has verified DNS, SSL and Nginx are now configured
-        account.payment_domain = payment_domain
-        account.payment_domain_verified = True
-        account.payment_domain_configured = True
-        account.payment_domain_added_at = timezone.now()
-        account.save()
-        
-        logger.info(f"Payment domain configured successfully for account {account.id}: {payment_domain}")
+        # SSL, Nginx config and reload run in the background (process_domain_jobs);
+        # the account is updated once the job succeeds
+        job, created = domain_jobs.enqueue(account, payment_domain, 'payment')
         
         return Response({
             'success': True,
-            'message': 'Payment domain configured successfully with SSL and Nginx',
+            'message': 'Payment domain provisioning queued' if created else 'Payment domain provisioning already in progress',
             'domain': payment_domain,
-            'configured_at': account.payment_domain_added_at.isoformat(),
-            'ssl_status': 'Active',
-            'nginx_status': 'Configured'
-        }, status=status.HTTP_200_OK)
+            'job_id': str(job.id),
+            'status': job.status,
+            'steps': job.steps,
+            'status_url': reverse('domain-job', kwargs={'job_id': job.id}),
+        }, status=status.HTTP_202_ACCEPTED)
         
     except Exception as e:
         logger.exception(f"Error configuring payment domain: {str(e)}")
@@ -3226,7 +3963,9 @@ def update_payment_domain(request):
         account.payment_domain = payment_domain
         account.payment_domain_verified = True
         account.payment_domain_configured = True
-        account.save()
+        account.save(update_fields=[
+            'payment_domain', 'payment_domain_verified', 'payment_domain_configured', 'updated_at'
+        ])
         
         return Response({
             'success': True,
@@ -3277,7 +4016,10 @@ def remove_payment_domain(request):
         account.payment_domain_verified = False
         account.payment_domain_configured = False
         account.payment_domain_added_at = None
-        account.save()
+        account.save(update_fields=[
+            'payment_domain', 'payment_domain_verified', 'payment_domain_configured',
+            'payment_domain_added_at', 'updated_at'
+        ])
         
         return Response({
             'success': True,
@@ -3290,3 +4032,31 @@ def remove_payment_domain(request):
             {'error': f'Internal server error: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+# ===================== Internal Metrics Endpoint =====================
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def metrics_endpoint(request):
+    """
+    Request metrics in the Prometheus text format (see api/metrics.py).
+
+    GET /api/internal/metrics/
+    Headers:
+        X-Metrics-Token: <METRICS_TOKEN>
+
+    Disabled (404) when METRICS_TOKEN is not configured.
+    """
+    import hmac
+    from .metrics import render_prometheus
+
+    if not settings.METRICS_TOKEN:
+        return Response({'error': 'Metrics endpoint is disabled'}, status=status.HTTP_404_NOT_FOUND)
+
+    token = request.headers.get('X-Metrics-Token', '')
+    if not hmac.compare_digest(token, settings.METRICS_TOKEN):
+        return Response({'error': 'Invalid metrics token'}, status=status.HTTP_403_FORBIDDEN)
+
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
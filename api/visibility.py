@@ -0,0 +1,91 @@
+"""
+Row visibility filters for assigned-client access.
+
+Employees without the relevant ``can_view_all_*`` flag may only see clients
+they are assigned to (as coach, closer or setter), and rows belonging to those
+clients. These helpers express that rule without ``DISTINCT``:
+
+- On ``clients`` itself the rule is a plain OR over three indexed columns of
+  the same row, so it can never duplicate rows.
+- On tables that reference a client (payments, instalments, check-in
+  submissions, ...) the rule is an ``EXISTS`` subquery against ``clients``,
+  which PostgreSQL plans as a semi-join. A semi-join emits each outer row at
+  most once, so no de-duplication (and no sort/hash over every selected
+  column) is needed.
+
+Usage in ViewSet.get_queryset():
+
+    queryset = Payment.objects.filter(account_id=account_id)
+    if not user.can_view_all_payments:
+        queryset = filter_rows_for_assigned_clients(queryset, user)
+"""
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Client
+
+
+def assigned_clients_q(user, prefix=''):
+    """
+    Build the "client is assigned to user" predicate.
+
+    Args:
+        user: Employee instance (or anything with a ``pk``)
+        prefix (str): Lookup prefix for the client relation, e.g. ``'client__'``
+
+    Returns:
+        Q: ``coach = user OR closer = user OR setter = user``
+    """
+    user_id = user.pk
+    return (
+        Q(**{f'{prefix}coach_id': user_id}) |
+        Q(**{f'{prefix}closer_id': user_id}) |
+        Q(**{f'{prefix}setter_id': user_id})
+    )
+
+
+def filter_clients_for_user(queryset, user):
+    """
+    Restrict a Client queryset to clients assigned to ``user``.
+
+    Args:
+        queryset: Client queryset
+        user: Employee instance
+
+    Returns:
+        QuerySet: Filtered queryset (no DISTINCT required)
+    """
+    return queryset.filter(assigned_clients_q(user))
+
+
+def assigned_client_exists(user, client_field='client_id'):
+    """
+    Build an EXISTS subquery matching rows whose client is assigned to ``user``.
+
+    Args:
+        user: Employee instance
+        client_field (str): Name of the client FK column on the outer queryset
+
+    Returns:
+        Exists: Correlated subquery expression usable in ``.filter()``
+    """
+    return Exists(
+        Client.objects.filter(
+            assigned_clients_q(user),
+            pk=OuterRef(client_field),
+        )
+    )
+
+
+def filter_rows_for_assigned_clients(queryset, user, client_field='client_id'):
+    """
+    Restrict a queryset of client-owned rows to clients assigned to ``user``.
+
+    Args:
+        queryset: QuerySet of a model with a client foreign key
+        user: Employee instance
+        client_field (str): Name of the client FK column on the model
+
+    Returns:
+        QuerySet: Filtered queryset (no DISTINCT required)
+    """
+    return queryset.filter(assigned_client_exists(user, client_field))
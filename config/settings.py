@@ -41,7 +41,8 @@ ALLOWED_HOSTS = [host.strip() for host in ALLOWED_HOSTS_STR.split(',') if host.s
 
 # Production Security Settings
 if not DEBUG:
-    SECURE_SSL_REDIRECT = True
+    # Can be disabled for local load tests against plain-HTTP gunicorn (tools/loadtest)
+    SECURE_SSL_REDIRECT = env.bool('SECURE_SSL_REDIRECT', default=True)
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
     SECURE_BROWSER_XSS_FILTER = True
@@ -70,6 +71,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',  # First, so timings cover the whole stack
+    'api.middleware.CompressionMiddleware',  # gzip/br; before anything that reads the response body
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -156,6 +159,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 # REST Framework Configuration
+# JSON is rendered and parsed with orjson (api/renderers.py, api/parsers.py); set these to
+# rest_framework.renderers.JSONRenderer / rest_framework.parsers.JSONParser to compare
+API_JSON_RENDERER = env.str('API_JSON_RENDERER', default='api.renderers.ORJSONRenderer')
+API_JSON_PARSER = env.str('API_JSON_PARSER', default='api.parsers.ORJSONParser')
+# Client and payment lists are built from .values() rows (api/row_serializers.py); False uses the DRF serializers
+API_ROW_SERIALIZERS = env.bool('API_ROW_SERIALIZERS', default=True)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'api.authentication.MasterTokenAuthentication',  # Master token for cross-account service access (checked first)
@@ -170,14 +180,26 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Page-number pagination by default; views with `keyset_ordering` also accept
+    # ?pagination=cursor for COUNT-free keyset pagination (see api/pagination.py)
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.DefaultPagination',
     'PAGE_SIZE': 50,
-    'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
+    # The browsable API is for local development only
+    'DEFAULT_RENDERER_CLASSES': [API_JSON_RENDERER] + (
+        ['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []
+    ),
+    'DEFAULT_PARSER_CLASSES': [
+        API_JSON_PARSER,
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
+# Responses of at least this many bytes are gzip/br-compressed (api.middleware.CompressionMiddleware);
+# Brotli needs the optional `brotli` package
+RESPONSE_COMPRESSION_MIN_SIZE = env.int('RESPONSE_COMPRESSION_MIN_SIZE', default=1024)
+RESPONSE_BROTLI_QUALITY = env.int('RESPONSE_BROTLI_QUALITY', default=5)
+
 
 # CORS Settings
 CORS_ALLOW_ALL_ORIGINS = DEBUG  # Only for development
@@ -248,11 +270,55 @@ FRONTEND_URL = env.str('FRONTEND_URL', default='http://localhost:3000')
 
 # URL Shortener Integration
 URL_SHORTENER_API_URL = env.str('URL_SHORTENER_API_URL', default='http://localhost:8001')
+# "remote" calls the shortener service per link; "native" writes short_urls directly
+# in bulk (api/utils/url_shortener.py) and falls back to the service on errors
+URL_SHORTENER_BACKEND = env.str('URL_SHORTENER_BACKEND', default='remote')
+
+# Short-link redirects served by /api/public/links/ (api/services/short_links.py):
+# cached links per worker and how long they live, and how buffered clicks are flushed
+SHORT_LINK_CACHE_SIZE = env.int('SHORT_LINK_CACHE_SIZE', default=50000)
+SHORT_LINK_CACHE_TTL = env.int('SHORT_LINK_CACHE_TTL', default=300)
+SHORT_LINK_CLICK_FLUSH_INTERVAL = env.float('SHORT_LINK_CLICK_FLUSH_INTERVAL', default=5.0)  # 0 = only flush_clicks()
+SHORT_LINK_CLICK_BATCH_SIZE = env.int('SHORT_LINK_CLICK_BATCH_SIZE', default=1000)
+SHORT_LINK_CLICK_BUFFER_MAX = env.int('SHORT_LINK_CLICK_BUFFER_MAX', default=100000)
+
+# Seconds per-account link engagement (/api/clients/engagement/) stays cached in-process
+LINK_ENGAGEMENT_CACHE_TTL = env.int('LINK_ENGAGEMENT_CACHE_TTL', default=300)
+
+# Custom domain provisioning (api/services/domain_jobs.py, run by process_domain_jobs).
+# Commands run through DOMAIN_COMMAND_RUNNER, prefixed with DOMAIN_COMMAND_PREFIX;
+# DOMAIN_COMMAND_PATH is searched before PATH, e.g. stub certbot/nginx/systemctl binaries
+DOMAIN_COMMAND_RUNNER = env.str('DOMAIN_COMMAND_RUNNER', default='api.services.domain_service.SubprocessRunner')
+DOMAIN_COMMAND_PREFIX = env.list('DOMAIN_COMMAND_PREFIX', default=['sudo'])
+DOMAIN_COMMAND_PATH = env.str('DOMAIN_COMMAND_PATH', default='')
+DOMAIN_JOB_BATCH_SIZE = env.int('DOMAIN_JOB_BATCH_SIZE', default=20)  # domains per nginx reload
+DOMAIN_JOB_STALE_AFTER = env.int('DOMAIN_JOB_STALE_AFTER', default=900)  # seconds without a heartbeat before a running job is retried
+# "per_domain" writes a server-block file per domain; "map" renders every verified domain
+# into one config file (api/services/nginx_domain_map.py, render_nginx_domains)
+NGINX_CONFIG_MODE = env.str('NGINX_CONFIG_MODE', default='per_domain')
+NGINX_DOMAIN_MAP_PATH = env.str('NGINX_DOMAIN_MAP_PATH', default='/etc/nginx/conf.d/crm_custom_domains.conf')
 
 # Stripe OAuth Integration
 STRIPE_CLIENT_ID = env.str('STRIPE_CLIENT_ID', default='')
 STRIPE_SECRET_KEY = env.str('STRIPE_SECRET_KEY', default='')
 STRIPE_OAUTH_REDIRECT_URI = env.str('STRIPE_OAUTH_REDIRECT_URI', default='https://stripe.fithq.ai/callback/')
+# Point at a local stripe-mock (e.g. http://localhost:12111) for tests; empty uses api.stripe.com
+STRIPE_API_BASE = env.str('STRIPE_API_BASE', default='')
+STRIPE_MAX_NETWORK_RETRIES = env.int('STRIPE_MAX_NETWORK_RETRIES', default=2)
+
+# Stripe sync (python manage.py sync_stripe)
+STRIPE_SYNC_WORKERS = env.int('STRIPE_SYNC_WORKERS', default=4)
+STRIPE_SYNC_LOOKBACK_DAYS = env.int('STRIPE_SYNC_LOOKBACK_DAYS', default=7)
+
+# Seconds an account stays in the in-process account registry (api/services/account_registry.py)
+ACCOUNT_REGISTRY_TTL = env.int('ACCOUNT_REGISTRY_TTL', default=300)
+
+# Request metrics (api/metrics.py), exposed at /api/internal/metrics/ with X-Metrics-Token
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=True)
+METRICS_TOKEN = env.str('METRICS_TOKEN', default='')  # Empty disables the endpoint
+# Requests slower than this are logged with their slowest queries; 0 disables
+SLOW_REQUEST_THRESHOLD_MS = env.int('SLOW_REQUEST_THRESHOLD_MS', default=1000)
+SLOW_REQUEST_TOP_QUERIES = env.int('SLOW_REQUEST_TOP_QUERIES', default=5)
 
 # Default forms domain (fallback when account has no custom domain)
 DEFAULT_FORMS_DOMAIN = env.str('DEFAULT_FORMS_DOMAIN', default='form.fithq.ai')
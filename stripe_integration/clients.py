@@ -0,0 +1,154 @@
+"""
+Stripe Client Registry
+
+Builds and caches one configured stripe.StripeClient per connected Stripe
+account (StripeApiKey), plus one for the platform account (STRIPE_SECRET_KEY),
+so code never has to assign the process-global stripe.api_key. Clients carry
+their own API key, so calls for different connected accounts can run
+concurrently in thread pools (stripe-python keeps one HTTP session per thread).
+
+Entries are invalidated explicitly when a StripeApiKey changes (set_primary,
+update, destroy, OAuth reconnect). Each lookup also compares the cached entry
+against the row's api_key and updated_at, so other worker processes pick up
+changes even though they never see the invalidation.
+"""
+
+import logging
+import threading
+
+import stripe
+from django.conf import settings
+
+from .models import StripeApiKey
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_clients = {}           # StripeApiKey.id -> StripeAccountClient
+_primary_by_account = {}  # CRM account id -> StripeApiKey.id
+_platform_client = None
+
+
+class StripeAccountClient:
+    """A configured Stripe client plus the connected account it is bound to."""
+
+    __slots__ = (
+        'client', 'stripe_api_key_id', 'account_id', 'stripe_account_id',
+        'stripe_account_name', 'default_currency', 'is_primary', '_api_key', '_updated_at',
+    )
+
+    def __init__(self, stripe_api_key):
+        self.client = _build_client(stripe_api_key.api_key)
+        self.stripe_api_key_id = stripe_api_key.id
+        self.account_id = stripe_api_key.account_id
+        self.stripe_account_id = stripe_api_key.stripe_client_id
+        self.stripe_account_name = stripe_api_key.stripe_account
+        self.default_currency = stripe_api_key.default_currency
+        self.is_primary = bool(stripe_api_key.is_primary)
+        self._api_key = stripe_api_key.api_key
+        self._updated_at = stripe_api_key.updated_at
+
+    def matches(self, stripe_api_key):
+        """Whether this entry was built from the current state of the row."""
+        return (
+            self._api_key == stripe_api_key.api_key
+            and self._updated_at == stripe_api_key.updated_at
+        )
+
+
+def _build_client(api_key):
+    options = {'max_network_retries': settings.STRIPE_MAX_NETWORK_RETRIES}
+    if settings.STRIPE_API_BASE:
+        options['base_addresses'] = {'api': settings.STRIPE_API_BASE}
+    return stripe.StripeClient(api_key, **options)
+
+
+def get_platform_client():
+    """Client for the platform account (OAuth token exchange, Account lookups)."""
+    global _platform_client
+    with _lock:
+        if _platform_client is None:
+            _platform_client = _build_client(settings.STRIPE_SECRET_KEY)
+        return _platform_client
+
+
+def get_account_client(stripe_api_key):
+    """
+    Get the cached client for a connected Stripe account.
+
+    Args:
+        stripe_api_key: StripeApiKey instance or id
+
+    Returns:
+        StripeAccountClient
+
+    Raises:
+        StripeApiKey.DoesNotExist: No such Stripe account
+        ValueError: The Stripe account has no API key
+    """
+    if not isinstance(stripe_api_key, StripeApiKey):
+        stripe_api_key = StripeApiKey.objects.get(id=stripe_api_key)
+    if not stripe_api_key.api_key:
+        raise ValueError(f"Stripe account {stripe_api_key.id} has no API key")
+
+    with _lock:
+        entry = _clients.get(stripe_api_key.id)
+        if entry is None or not entry.matches(stripe_api_key):
+            entry = StripeAccountClient(stripe_api_key)
+            _clients[stripe_api_key.id] = entry
+        return entry
+
+
+def get_primary_client(account_id):
+    """
+    Get the client for a CRM account's primary, active Stripe account.
+
+    Args:
+        account_id (int): CRM account id
+
+    Returns:
+        StripeAccountClient or None if the account has no primary Stripe account
+    """
+    with _lock:
+        cached_id = _primary_by_account.get(account_id)
+
+    queryset = StripeApiKey.objects.filter(account_id=account_id, is_active=True)
+    stripe_api_key = None
+    if cached_id is not None:
+        stripe_api_key = queryset.filter(id=cached_id, is_primary=True).first()
+    if stripe_api_key is None:
+        stripe_api_key = queryset.filter(is_primary=True).order_by('-updated_at').first()
+    if stripe_api_key is None or not stripe_api_key.api_key:
+        invalidate_account(account_id)
+        return None
+
+    entry = get_account_client(stripe_api_key)
+    with _lock:
+        _primary_by_account[account_id] = stripe_api_key.id
+    return entry
+
+
+def invalidate(stripe_api_key_id):
+    """Drop the cached client for one Stripe account."""
+    with _lock:
+        entry = _clients.pop(stripe_api_key_id, None)
+        if entry is not None:
+            _primary_by_account.pop(entry.account_id, None)
+    logger.debug(f"Invalidated Stripe client for Stripe account {stripe_api_key_id}")
+
+
+def invalidate_account(account_id):
+    """Drop every cached client belonging to a CRM account."""
+    with _lock:
+        _primary_by_account.pop(account_id, None)
+        for key_id in [key_id for key_id, entry in _clients.items() if entry.account_id == account_id]:
+            del _clients[key_id]
+
+
+def clear():
+    """Drop all cached clients (tests, settings changes)."""
+    global _platform_client
+    with _lock:
+        _clients.clear()
+        _primary_by_account.clear()
+        _platform_client = None
@@ -0,0 +1,102 @@
+"""
+Management command to sync customers, charges and invoices from Stripe.
+
+Fans out across every active connected Stripe account, syncing each one
+incrementally from its stored cursor. Run from cron, or as a long-lived
+worker with --loop (see deployment/crm-stripe-sync.service).
+
+Set STRIPE_API_BASE=http://localhost:12111 to run against a local stripe-mock.
+
+Usage:
+    python manage.py sync_stripe
+    python manage.py sync_stripe --account-id 1
+    python manage.py sync_stripe --stripe-account-id 3 --full
+    python manage.py sync_stripe --loop --interval 900 --workers 8
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from stripe_integration.sync import sync_all_accounts
+
+
+class Command(BaseCommand):
+    help = 'Incrementally sync Stripe customers, charges and invoices for connected accounts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--account-id',
+            type=int,
+            help='Only sync Stripe accounts connected to this CRM account'
+        )
+        parser.add_argument(
+            '--stripe-account-id',
+            type=int,
+            help='Only sync this connected Stripe account (StripeApiKey id)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Connected accounts synced concurrently (default: STRIPE_SYNC_WORKERS)'
+        )
+        parser.add_argument(
+            '--lookback-days',
+            type=int,
+            help='Days of charges/invoices re-read for status changes, and of unmatched customers re-read '
+                 'for a client (default: STRIPE_SYNC_LOOKBACK_DAYS)'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignore stored cursors and list everything'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, syncing every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=900,
+            help='Seconds between sync passes in --loop mode (default: 900)'
+        )
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            self._sync(options, full)
+            if not options['loop']:
+                return
+            # Only the first pass of a looping worker is a full sync
+            full = False
+            close_old_connections()
+            time.sleep(max(1, options['interval']))
+
+    def _sync(self, options, full):
+        results = sync_all_accounts(
+            account_id=options['account_id'],
+            stripe_api_key_id=options['stripe_account_id'],
+            workers=options['workers'],
+            full=full,
+            lookback_days=options['lookback_days'],
+        )
+
+        failed = 0
+        for key_id, result in sorted(results.items()):
+            if 'error' in result:
+                failed += 1
+                self.stderr.write(self.style.ERROR(f"Stripe account {key_id}: {result['error']}"))
+            elif 'skipped' in result:
+                self.stdout.write(self.style.WARNING(f"Stripe account {key_id}: {result['skipped']}"))
+            else:
+                self.stdout.write(
+                    f"Stripe account {key_id}: {result['customers']} customers, "
+                    f"{result['charges']} charges, {result['invoices']} invoices written, "
+                    f"{result['unmatched']} unmatched"
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Synced {len(results) - failed} of {len(results)} connected Stripe accounts'
+        ))
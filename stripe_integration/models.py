@@ -81,3 +81,40 @@ class StripeApiKey(models.Model):
 
     def __str__(self):
         return f"Stripe Account: {self.stripe_account} (Account: {self.account.name if self.account else 'None'})"
+
+
+class StripeSyncCursor(models.Model):
+    """
+    Incremental sync position for one connected Stripe account.
+
+    Each *_cursor holds the Unix `created` timestamp of the newest object of
+    that type already pulled by stripe_integration.sync, so the next run only
+    lists objects created since then (minus a lookback window for status
+    changes such as refunds and late invoice payments).
+    """
+
+    id = models.AutoField(primary_key=True)
+    stripe_api_key = models.OneToOneField(
+        StripeApiKey,
+        on_delete=models.CASCADE,
+        db_column='stripe_account_id',
+        related_name='sync_cursor'
+    )
+    account = models.ForeignKey(
+        'api.Account',
+        on_delete=models.CASCADE,
+        db_column='account_id'
+    )
+    customers_cursor = models.BigIntegerField(null=True, blank=True)
+    charges_cursor = models.BigIntegerField(null=True, blank=True)
+    invoices_cursor = models.BigIntegerField(null=True, blank=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = False  # Table managed by Supabase migrations
+        db_table = 'stripe_sync_cursors'
+
+    def __str__(self):
+        return f"Sync cursor for Stripe account {self.stripe_api_key_id}"
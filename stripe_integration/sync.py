@@ -0,0 +1,436 @@
+"""
+Stripe Sync Engine
+
+Pulls customers, charges and invoices from every active connected Stripe
+account (StripeApiKey) into stripe_customers, payments and instalments.
+
+Each connected account has a StripeSyncCursor holding the `created` timestamp
+of the newest customer/charge/invoice already synced. A run lists objects
+created since the cursor (charges and invoices go back an extra lookback
+window so refunds, disputes and late invoice payments are picked up), one
+page at a time. The customers cursor is held at the oldest unmatched customer
+from the lookback window, so a customer whose client is created later is
+matched on a following run. Each page is mapped with set-based client lookups and written
+with a single INSERT ... ON CONFLICT statement, so re-running a window is
+harmless.
+
+Connected accounts are synced concurrently in a thread pool. Every account
+uses its own client from stripe_integration.clients (no global
+stripe.api_key) and backs off independently when Stripe rate-limits it.
+"""
+
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import stripe
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from api.models import Client, Installment, Payment, StripeCustomer
+from api.utils.bulk_upsert import bulk_upsert
+from .clients import get_account_client
+from .models import StripeApiKey, StripeSyncCursor
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100
+MAX_RATE_LIMIT_RETRIES = 6
+MAX_BACKOFF_SECONDS = 60
+
+# Namespace for pg_try_advisory_lock so two workers never sync one account at once
+ADVISORY_LOCK_NAMESPACE = 0x53594e43
+
+# https://docs.stripe.com/currencies#zero-decimal
+ZERO_DECIMAL_CURRENCIES = {
+    'bif', 'clp', 'djf', 'gnf', 'jpy', 'kmf', 'krw', 'mga',
+    'pyg', 'rwf', 'ugx', 'vnd', 'vuv', 'xaf', 'xof', 'xpf',
+}
+
+CHARGE_STATUS_MAP = {
+    'succeeded': 'paid',
+    'failed': 'failed',
+    'pending': 'incomplete',
+}
+
+# Draft invoices are not synced
+INVOICE_STATUS_MAP = {
+    'open': 'open',
+    'paid': 'paid',
+    'uncollectible': 'failed',
+    'void': 'closed',
+}
+
+
+class StripeSyncSkipped(Exception):
+    """Another worker is already syncing this connected account."""
+
+
+def to_amount(minor_units, currency):
+    """Convert a Stripe integer amount to a Decimal in major units."""
+    if minor_units is None:
+        return None
+    if (currency or '').lower() in ZERO_DECIMAL_CURRENCIES:
+        return Decimal(minor_units)
+    return (Decimal(minor_units) / 100).quantize(Decimal('0.01'))
+
+
+def _to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+def _email(value):
+    return value.strip().lower() if value else None
+
+
+def charge_status(charge):
+    """Map a Stripe charge to a Payment status."""
+    if charge.get('disputed'):
+        return 'disputed'
+    if charge.get('refunded'):
+        return 'refunded'
+    return CHARGE_STATUS_MAP.get(charge.get('status'), 'incomplete')
+
+
+def _with_backoff(call, label):
+    """
+    Run a Stripe request, sleeping with exponential backoff and jitter while
+    the connected account is rate limited.
+    """
+    for attempt in range(MAX_RATE_LIMIT_RETRIES):
+        try:
+            return call()
+        except stripe.RateLimitError:
+            if attempt == MAX_RATE_LIMIT_RETRIES - 1:
+                raise
+            delay = min(MAX_BACKOFF_SECONDS, 2 ** attempt) + random.uniform(0, 1)
+            logger.warning(f"Stripe rate limit for {label}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _iterate_pages(service, params, label):
+    """
+    Yield each page of a Stripe list endpoint as plain dicts, following
+    has_more with the library's next_page() so every page request gets
+    rate-limit backoff.
+    """
+    page = _with_backoff(lambda: service.list(params={**params, 'limit': PAGE_SIZE}), label)
+    while True:
+        yield [item.to_dict() for item in page.data]
+        if not page.has_more:
+            return
+        page = _with_backoff(page.next_page, label)
+
+
+def _created_filter(cursor, lookback_seconds=0):
+    if cursor is None:
+        return {}
+    return {'created': {'gte': max(0, cursor - lookback_seconds)}}
+
+
+def _clients_by_email(account_id, emails):
+    if not emails:
+        return {}
+    return {
+        email: client_id
+        for client_id, email in Client.objects.filter(account_id=account_id).annotate(
+            email_lower=Lower('email')
+        ).filter(email_lower__in=emails).values_list('id', 'email_lower')
+    }
+
+
+def _clients_by_customer(account_id, customer_ids):
+    if not customer_ids:
+        return {}
+    return dict(
+        StripeCustomer.objects.filter(
+            account_id=account_id, stripe_customer_id__in=customer_ids
+        ).values_list('stripe_customer_id', 'client_id')
+    )
+
+
+def _sync_customers(client, stripe_api_key, cursor, lookback_seconds, stats):
+    account_id = stripe_api_key.account_id
+    newest = cursor
+    oldest_unmatched = None
+    # Unmatched customers older than this stay skipped until a --full sync
+    recheck_after = int(time.time()) - lookback_seconds
+    label = f"customers of {stripe_api_key.stripe_client_id}"
+    for customers in _iterate_pages(client.v1.customers, _created_filter(cursor), label):
+        emails = {_email(customer.get('email')) for customer in customers if customer.get('email')}
+        clients = _clients_by_email(account_id, emails)
+
+        rows = {}
+        for customer in customers:
+            newest = max(newest or 0, customer['created'])
+            client_id = clients.get(_email(customer.get('email')))
+            if client_id is None:
+                stats['unmatched'] += 1
+                if customer['created'] >= recheck_after:
+                    oldest_unmatched = min(oldest_unmatched or customer['created'], customer['created'])
+                continue
+            rows[customer['id']] = {
+                'stripe_customer_id': customer['id'],
+                'account_id': account_id,
+                'client_id': client_id,
+                'stripe_account_id': stripe_api_key.stripe_account,
+                'email': customer.get('email'),
+                'status': 'active',
+            }
+
+        with transaction.atomic():
+            written = bulk_upsert(
+                StripeCustomer, list(rows.values()),
+                conflict_fields=['stripe_customer_id'],
+                update_fields=['email', 'status'],
+                returning=('stripe_customer_id',),
+                update_where='stripe_customers.account_id = EXCLUDED.account_id',
+                skip_unchanged=True,
+            )
+        stats['customers'] += len(written)
+    if oldest_unmatched is not None:
+        # Re-read from the unmatched customer next run; its client may exist by then
+        return oldest_unmatched
+    return newest
+
+
+def _sync_charges(client, stripe_api_key, cursor, lookback_seconds, stats):
+    account_id = stripe_api_key.account_id
+    newest = cursor
+    label = f"charges of {stripe_api_key.stripe_client_id}"
+    params = _created_filter(cursor, lookback_seconds)
+    for charges in _iterate_pages(client.v1.charges, params, label):
+        customer_ids = {charge['customer'] for charge in charges if charge.get('customer')}
+        emails = set()
+        for charge in charges:
+            billing = charge.get('billing_details') or {}
+            for email in (billing.get('email'), charge.get('receipt_email')):
+                if email:
+                    emails.add(_email(email))
+        by_customer = _clients_by_customer(account_id, customer_ids)
+        by_email = _clients_by_email(account_id, emails)
+
+        rows = {}
+        for charge in charges:
+            newest = max(newest or 0, charge['created'])
+            billing = charge.get('billing_details') or {}
+            client_id = (
+                by_customer.get(charge.get('customer'))
+                or by_email.get(_email(billing.get('email')))
+                or by_email.get(_email(charge.get('receipt_email')))
+            )
+            if client_id is None:
+                stats['unmatched'] += 1
+                continue
+            rows[charge['id']] = {
+                'id': charge['id'],
+                'account_id': account_id,
+                'client_id': client_id,
+                'stripe_customer_id': charge.get('customer'),
+                'amount': to_amount(charge['amount'], charge['currency']),
+                'paid_currency': charge['currency'],
+                'native_account_currency': stripe_api_key.default_currency,
+                'status': charge_status(charge),
+                'failure_reason': charge.get('failure_message'),
+                'payment_date': _to_datetime(charge['created']),
+            }
+
+        with transaction.atomic():
+            written = bulk_upsert(
+                Payment, list(rows.values()),
+                conflict_fields=['id'],
+                # Client and package links may have been corrected in the CRM
+                update_fields=['amount', 'paid_currency', 'status', 'failure_reason', 'stripe_customer_id'],
+                returning=('id',),
+                update_where='payments.account_id = EXCLUDED.account_id',
+                skip_unchanged=True,
+            )
+        stats['charges'] += len(written)
+    return newest
+
+
+def _sync_invoices(client, stripe_api_key, cursor, lookback_seconds, stats):
+    account_id = stripe_api_key.account_id
+    newest = cursor
+    label = f"invoices of {stripe_api_key.stripe_client_id}"
+    params = _created_filter(cursor, lookback_seconds)
+    for invoices in _iterate_pages(client.v1.invoices, params, label):
+        customer_ids = {invoice['customer'] for invoice in invoices if invoice.get('customer')}
+        emails = {_email(invoice.get('customer_email')) for invoice in invoices if invoice.get('customer_email')}
+        by_customer = _clients_by_customer(account_id, customer_ids)
+        by_email = _clients_by_email(account_id, emails)
+
+        rows = {}
+        for invoice in invoices:
+            newest = max(newest or 0, invoice['created'])
+            status = INVOICE_STATUS_MAP.get(invoice.get('status'))
+            if status is None:
+                continue
+            client_id = (
+                by_customer.get(invoice.get('customer'))
+                or by_email.get(_email(invoice.get('customer_email')))
+            )
+            if client_id is None:
+                stats['unmatched'] += 1
+                continue
+            rows[invoice['id']] = {
+                'invoice_id': invoice['id'],
+                'account_id': account_id,
+                'client_id': client_id,
+                'stripe_customer_id': invoice.get('customer'),
+                'stripe_account': stripe_api_key.stripe_account,
+                'amount': to_amount(invoice['amount_due'], invoice['currency']),
+                'currency': invoice['currency'],
+                'status': status,
+                'schedule_date': _to_datetime(invoice.get('due_date') or invoice['created']).date(),
+            }
+
+        with transaction.atomic():
+            written = bulk_upsert(
+                Installment, list(rows.values()),
+                conflict_fields=['invoice_id'],
+                update_fields=['amount', 'currency', 'status', 'stripe_customer_id'],
+                returning=('id',),
+                conflict_where='invoice_id IS NOT NULL',
+                update_where='instalments.account_id = EXCLUDED.account_id',
+                skip_unchanged=True,
+            )
+        stats['invoices'] += len(written)
+    return newest
+
+
+def _acquire_lock(stripe_api_key_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_try_advisory_lock(%s, %s)', [ADVISORY_LOCK_NAMESPACE, stripe_api_key_id]
+        )
+        return cursor.fetchone()[0]
+
+
+def _release_lock(stripe_api_key_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_advisory_unlock(%s, %s)', [ADVISORY_LOCK_NAMESPACE, stripe_api_key_id]
+        )
+
+
+def sync_stripe_account(stripe_api_key_id, full=False, lookback_days=None):
+    """
+    Incrementally sync one connected Stripe account.
+
+    Args:
+        stripe_api_key_id (int): StripeApiKey to sync
+        full (bool): Ignore the stored cursors and list everything
+        lookback_days (int): Days before the charge/invoice cursors to
+            re-read for status changes, and how long unmatched customers are
+            re-read for a client (default: STRIPE_SYNC_LOOKBACK_DAYS)
+
+    Returns:
+        dict: Rows written per object type plus unmatched objects
+
+    Raises:
+        StripeSyncSkipped: Another worker holds this account's sync lock
+        stripe.StripeError: The sync failed; the error is also stored on the cursor
+    """
+    if lookback_days is None:
+        lookback_days = settings.STRIPE_SYNC_LOOKBACK_DAYS
+    lookback_seconds = int(timedelta(days=lookback_days).total_seconds())
+
+    if not _acquire_lock(stripe_api_key_id):
+        raise StripeSyncSkipped(f"Stripe account {stripe_api_key_id} is already being synced")
+
+    try:
+        stripe_api_key = StripeApiKey.objects.get(id=stripe_api_key_id)
+        cursor, _ = StripeSyncCursor.objects.get_or_create(
+            stripe_api_key=stripe_api_key,
+            defaults={'account_id': stripe_api_key.account_id},
+        )
+        if full:
+            cursor.customers_cursor = None
+            cursor.charges_cursor = None
+            cursor.invoices_cursor = None
+
+        client = get_account_client(stripe_api_key).client
+        stats = {'customers': 0, 'charges': 0, 'invoices': 0, 'unmatched': 0}
+        try:
+            # Customers first so charges and invoices can resolve their clients
+            cursor.customers_cursor = _sync_customers(
+                client, stripe_api_key, cursor.customers_cursor, lookback_seconds, stats
+            )
+            cursor.charges_cursor = _sync_charges(
+                client, stripe_api_key, cursor.charges_cursor, lookback_seconds, stats
+            )
+            cursor.invoices_cursor = _sync_invoices(
+                client, stripe_api_key, cursor.invoices_cursor, lookback_seconds, stats
+            )
+            cursor.last_error = None
+        except stripe.StripeError as e:
+            cursor.last_error = str(e)
+            raise
+        finally:
+            # Cursors for object types that completed are kept even on failure
+            cursor.last_synced_at = timezone.now()
+            cursor.save()
+    finally:
+        _release_lock(stripe_api_key_id)
+
+    logger.info(f"Synced Stripe account {stripe_api_key_id}: {stats}")
+    return stats
+
+
+def _sync_in_thread(stripe_api_key_id, full, lookback_days):
+    try:
+        return sync_stripe_account(stripe_api_key_id, full=full, lookback_days=lookback_days)
+    finally:
+        # Worker threads get their own DB connections; don't leak them
+        connections.close_all()
+
+
+def sync_all_accounts(account_id=None, stripe_api_key_id=None, workers=None,
+                      full=False, lookback_days=None):
+    """
+    Sync every active connected Stripe account concurrently.
+
+    Args:
+        account_id (int): Only sync this CRM account's connected accounts
+        stripe_api_key_id (int): Only sync this connected account
+        workers (int): Thread pool size (default: STRIPE_SYNC_WORKERS)
+        full (bool): Ignore stored cursors
+        lookback_days (int): See sync_stripe_account
+
+    Returns:
+        dict: {stripe_api_key_id: stats dict, or {'error': message}}
+    """
+    keys = StripeApiKey.objects.filter(
+        is_active=True, account__isnull=False, api_key__isnull=False
+    ).exclude(api_key='')
+    if account_id:
+        keys = keys.filter(account_id=account_id)
+    if stripe_api_key_id:
+        keys = keys.filter(id=stripe_api_key_id)
+    key_ids = list(keys.order_by('id').values_list('id', flat=True))
+
+    results = {}
+    if not key_ids:
+        return results
+
+    with ThreadPoolExecutor(max_workers=workers or settings.STRIPE_SYNC_WORKERS) as pool:
+        futures = {
+            pool.submit(_sync_in_thread, key_id, full, lookback_days): key_id
+            for key_id in key_ids
+        }
+        for future in as_completed(futures):
+            key_id = futures[future]
+            try:
+                results[key_id] = future.result()
+            except StripeSyncSkipped as e:
+                results[key_id] = {'skipped': str(e)}
+            except Exception as e:
+                logger.error(f"Stripe sync failed for Stripe account {key_id}: {str(e)}", exc_info=True)
+                results[key_id] = {'error': str(e)}
+    return results
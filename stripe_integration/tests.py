@@ -25,16 +25,16 @@ class TestStripeOAuthCallback:
         
         assert response.status_code == status.HTTP_400_BAD_REQUEST
     
-    @patch('stripe.OAuth.token')
-    @patch('stripe.Account.retrieve')
-    def test_successful_oauth_callback(self, mock_account, mock_token, api_client, account):
+    @patch('stripe_integration.views.get_platform_client')
+    def test_successful_oauth_callback(self, mock_platform_client, api_client, account):
         """Test successful OAuth callback creates Stripe API key"""
         # Mock Stripe API responses
-        mock_token.return_value = {
+        platform_client = mock_platform_client.return_value
+        platform_client.oauth.token.return_value = {
             'stripe_user_id': 'acct_test123',
             'access_token': 'sk_test_token123'
         }
-        mock_account.return_value = {
+        platform_client.v1.accounts.retrieve.return_value = {
             'business_profile': {'name': 'Test Business'},
             'email': 'test@stripe.com'
         }
@@ -48,3 +48,158 @@ class TestStripeOAuthCallback:
         # Should redirect to settings with success
         assert response.status_code == 302
         assert 'stripe_connected=true' in response.url
+        platform_client.v1.accounts.retrieve.assert_called_once_with('acct_test123')
+
+
+class TestStripeClientRegistry:
+    """Test per-account Stripe client caching"""
+
+    def setup_method(self):
+        from stripe_integration import clients
+        clients.clear()
+
+    def _stripe_api_key(self, **overrides):
+        from datetime import datetime, timezone
+        from stripe_integration.models import StripeApiKey
+
+        fields = {
+            'id': 1, 'account_id': 10, 'stripe_client_id': 'acct_1', 'api_key': 'sk_test_one',
+            'default_currency': 'gbp', 'is_primary': True,
+            'updated_at': datetime(2026, 1, 1, tzinfo=timezone.utc),
+        }
+        fields.update(overrides)
+        return StripeApiKey(**fields)
+
+    def test_client_is_cached_per_stripe_account(self):
+        from stripe_integration.clients import get_account_client
+
+        first = get_account_client(self._stripe_api_key())
+        assert get_account_client(self._stripe_api_key()) is first
+        assert first.account_id == 10
+        assert first.stripe_account_id == 'acct_1'
+        assert get_account_client(self._stripe_api_key(id=2, api_key='sk_test_two')) is not first
+
+    def test_changed_row_rebuilds_client(self):
+        from datetime import datetime, timezone
+        from stripe_integration.clients import get_account_client
+
+        first = get_account_client(self._stripe_api_key())
+        rotated = get_account_client(self._stripe_api_key(
+            api_key='sk_test_rotated', updated_at=datetime(2026, 2, 1, tzinfo=timezone.utc)
+        ))
+        assert rotated is not first
+        assert rotated.client is not first.client
+
+    def test_invalidation(self):
+        from stripe_integration.clients import get_account_client, invalidate, invalidate_account
+
+        first = get_account_client(self._stripe_api_key())
+        invalidate(1)
+        second = get_account_client(self._stripe_api_key())
+        assert second is not first
+        invalidate_account(10)
+        assert get_account_client(self._stripe_api_key()) is not second
+
+    def test_missing_api_key_is_rejected(self):
+        from stripe_integration.clients import get_account_client
+
+        with pytest.raises(ValueError):
+            get_account_client(self._stripe_api_key(api_key=None))
+
+
+class TestStripeSyncMapping:
+    """Test mapping of Stripe objects used by the sync engine"""
+
+    def test_amounts_respect_zero_decimal_currencies(self):
+        from decimal import Decimal
+        from stripe_integration.sync import to_amount
+
+        assert to_amount(1999, 'gbp') == Decimal('19.99')
+        assert to_amount(1999, 'JPY') == Decimal('1999')
+        assert to_amount(None, 'usd') is None
+
+    def test_charge_status(self):
+        from stripe_integration.sync import charge_status
+
+        assert charge_status({'status': 'succeeded'}) == 'paid'
+        assert charge_status({'status': 'failed'}) == 'failed'
+        assert charge_status({'status': 'pending'}) == 'incomplete'
+        assert charge_status({'status': 'succeeded', 'refunded': True}) == 'refunded'
+        assert charge_status({'status': 'succeeded', 'disputed': True}) == 'disputed'
+
+    @pytest.mark.django_db
+    @patch('stripe_integration.sync.bulk_upsert')
+    @patch('stripe_integration.sync._clients_by_email', return_value={'alice@example.com': 8})
+    @patch('stripe_integration.sync._clients_by_customer', return_value={'cus_1': 7})
+    def test_charges_are_paged_and_mapped(self, mock_customers, mock_emails, mock_upsert):
+        from stripe_integration.sync import _sync_charges
+
+        first_page = MagicMock(has_more=True, data=[MagicMock(to_dict=lambda: {
+            'id': 'ch_2', 'created': 200, 'amount': 1500, 'currency': 'gbp',
+            'status': 'succeeded', 'customer': 'cus_1',
+        })])
+        first_page.next_page.return_value = MagicMock(has_more=False, data=[MagicMock(to_dict=lambda: {
+            'id': 'ch_1', 'created': 100, 'amount': 1000, 'currency': 'gbp', 'status': 'failed',
+            'customer': None, 'receipt_email': 'Alice@example.com', 'failure_message': 'declined',
+        })])
+        client = MagicMock()
+        client.v1.charges.list.return_value = first_page
+        mock_upsert.side_effect = lambda model, rows, **kwargs: rows
+        stripe_api_key = MagicMock(account_id=1, stripe_account='Biz', default_currency='gbp')
+        stats = {'customers': 0, 'charges': 0, 'invoices': 0, 'unmatched': 0}
+
+        newest = _sync_charges(client, stripe_api_key, 150, 3600, stats)
+
+        assert newest == 200
+        assert stats['charges'] == 2
+        client.v1.charges.list.assert_called_once_with(
+            params={'created': {'gte': 0}, 'limit': 100}
+        )
+        written = [call.args[1][0] for call in mock_upsert.call_args_list]
+        assert written[0]['client_id'] == 7
+        assert written[1]['client_id'] == 8
+        assert written[1]['status'] == 'failed'
+        assert mock_upsert.call_args.kwargs['conflict_fields'] == ['id']
+
+    @pytest.mark.django_db
+    @patch('stripe_integration.sync.bulk_upsert')
+    @patch('stripe_integration.sync._clients_by_email')
+    def test_unmatched_customers_are_read_again(self, mock_emails, mock_upsert):
+        import time
+        from stripe_integration.sync import _sync_customers
+
+        now = int(time.time())
+        customers = [
+            {'id': 'cus_old', 'created': now - 30 * 86400, 'email': 'gone@example.com'},
+            {'id': 'cus_1', 'created': now - 300, 'email': 'alice@example.com'},
+            {'id': 'cus_2', 'created': now - 200, 'email': 'bob@example.com'},
+            {'id': 'cus_3', 'created': now - 100, 'email': 'carol@example.com'},
+        ]
+        client = MagicMock()
+        client.v1.customers.list.return_value = MagicMock(
+            has_more=False, data=[MagicMock(to_dict=lambda c=c: c) for c in customers]
+        )
+        mock_upsert.side_effect = lambda model, rows, **kwargs: rows
+        mock_emails.return_value = {'alice@example.com': 1, 'carol@example.com': 3}
+        stripe_api_key = MagicMock(account_id=1, stripe_account='Biz')
+        stats = {'customers': 0, 'charges': 0, 'invoices': 0, 'unmatched': 0}
+
+        # Bob has no client yet: the cursor stops at him, not at Carol. The
+        # customer outside the lookback window does not hold it back
+        newest = _sync_customers(client, stripe_api_key, None, 7 * 86400, stats)
+        assert newest == now - 200
+        assert stats['customers'] == 2
+        assert stats['unmatched'] == 2
+
+        # Once Bob's client exists the next run matches him and moves on
+        client.v1.customers.list.return_value = MagicMock(
+            has_more=False, data=[MagicMock(to_dict=lambda c=c: c) for c in customers[2:]]
+        )
+        mock_emails.return_value = {'bob@example.com': 2, 'carol@example.com': 3}
+        newest = _sync_customers(client, stripe_api_key, newest, 7 * 86400, stats)
+        assert newest == now - 100
+        client.v1.customers.list.assert_called_with(
+            params={'created': {'gte': now - 200}, 'limit': 100}
+        )
+        written = [row['stripe_customer_id'] for row in mock_upsert.call_args.args[1]]
+        assert written == ['cus_2', 'cus_3']
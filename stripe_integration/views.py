@@ -5,13 +5,13 @@ Handles Stripe Connect OAuth flow for connecting Stripe accounts
 import logging
 import stripe
 from django.shortcuts import redirect
-from django.conf import settings
 from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, viewsets, serializers
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from .clients import get_platform_client, invalidate, invalidate_account
 from .models import StripeApiKey
 from .serializers import StripeApiKeySerializer
 from api.permissions import IsAccountMember, IsSuperAdmin
@@ -19,8 +19,10 @@ from api.mixins import AccountResolutionMixin
 
 logger = logging.getLogger(__name__)
 
-# Initialize Stripe with your secret key
-stripe.api_key = settings.STRIPE_SECRET_KEY
+
+def _as_dict(stripe_object):
+    """Stripe objects are not dicts; convert responses before reading them."""
+    return stripe_object.to_dict() if hasattr(stripe_object, 'to_dict') else dict(stripe_object)
 
 
 class StripeOAuthCallbackView(APIView):
@@ -77,10 +79,12 @@ class StripeOAuthCallbackView(APIView):
         try:
             # STEP 1: Exchange authorization code for tokens
             logger.info(f"Exchanging OAuth code for account_id: {account_id}")
-            token_response = stripe.OAuth.token(
-                grant_type='authorization_code',
-                code=code,
-            )
+            # Platform client: our own secret key, never the process-global stripe.api_key
+            platform_client = get_platform_client()
+            token_response = _as_dict(platform_client.oauth.token(params={
+                'grant_type': 'authorization_code',
+                'code': code,
+            }))
             
             # Extract the important values from response
             stripe_user_id = token_response.get('stripe_user_id')  # acct_xxxxx
@@ -93,9 +97,7 @@ class StripeOAuthCallbackView(APIView):
             logger.info(f"Successfully obtained Stripe account ID: {stripe_user_id}")
             
             # STEP 2: Fetch the Stripe account details using the Account API
-            # Set authorization header with secret key
-            stripe.api_key = settings.STRIPE_SECRET_KEY
-            stripe_account_data = stripe.Account.retrieve(stripe_user_id)
+            stripe_account_data = _as_dict(platform_client.v1.accounts.retrieve(stripe_user_id))
             logger.info(f"Retrieved Stripe account data :\n{stripe_account_data}")
             # STEP 3: Extract business display name (with fallback chain)
             business_name = (
@@ -129,6 +131,9 @@ class StripeOAuthCallbackView(APIView):
                 }
             )
             
+            # Reconnecting may rotate the access token
+            invalidate(stripe_api_key.id)
+            
             action = 'created' if created else 'updated'
             logger.info(f"Stripe API key {action} for account_id {account_id}, business: {business_name}")
             
@@ -206,6 +211,9 @@ class StripeAccountViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
         stripe_account.is_active = True
         stripe_account.save(update_fields=['is_primary', 'is_active', 'updated_at'])
         
+        # Every Stripe account of this CRM account changed (bulk update above)
+        transaction.on_commit(lambda: invalidate_account(account_id))
+        
         logger.info(f"Set Stripe account {stripe_account.id} as primary and active for account {account_id}")
         
         serializer = self.get_serializer(stripe_account)
@@ -214,6 +222,11 @@ class StripeAccountViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
             'data': serializer.data
         })
     
+    def perform_update(self, serializer):
+        """Save changes and drop the cached Stripe client for this account."""
+        instance = serializer.save()
+        invalidate(instance.id)
+    
     def perform_destroy(self, instance):
         """
         Prevent deletion if it's the only Stripe account.
@@ -240,3 +253,5 @@ class StripeAccountViewSet(AccountResolutionMixin, viewsets.ModelViewSet):
                 logger.info(f"Auto-set Stripe account {new_primary.id} as primary after deletion")
         
         instance.delete()
+        # The deleted account and possibly the primary changed
+        invalidate_account(account_id)
@@ -0,0 +1,21 @@
+-- Migration: Keyset pagination indexes
+-- Composite indexes matching the keyset orderings used by api/pagination.py.
+-- Each index leads with account_id (every list endpoint is account-scoped) and
+-- ends with the primary key tie-breaker, so a seek to the next page is a single
+-- index range scan with no sort and no OFFSET.
+
+-- Payments: ORDER BY payment_date DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_payments_account_payment_date_id
+    ON public.payments(account_id, payment_date DESC, id DESC);
+
+-- Check-in submissions: ORDER BY submitted_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_check_in_submissions_account_submitted_id
+    ON public.check_in_submissions(account_id, submitted_at DESC, id DESC);
+
+-- Clients: ORDER BY first_name ASC, id ASC
+CREATE INDEX IF NOT EXISTS idx_clients_account_first_name_id
+    ON public.clients(account_id, first_name, id);
+
+COMMENT ON INDEX idx_payments_account_payment_date_id IS 'Keyset pagination for payments list (-payment_date, -id)';
+COMMENT ON INDEX idx_check_in_submissions_account_submitted_id IS 'Keyset pagination for submissions list (-submitted_at, -id)';
+COMMENT ON INDEX idx_clients_account_first_name_id IS 'Keyset pagination for clients list (first_name, id)';
@@ -0,0 +1,23 @@
+-- Migration: Client assignment indexes
+-- Supports the assigned-client visibility filter (api/visibility.py):
+--   coach_id = $1 OR closer_id = $1 OR setter_id = $1
+-- PostgreSQL combines the three indexes with a BitmapOr, both for the clients
+-- list and for the EXISTS semi-join used on payments, instalments and
+-- check-in submissions. Partial indexes skip the (common) unassigned rows.
+
+CREATE INDEX IF NOT EXISTS idx_clients_coach_id
+    ON public.clients(coach_id) WHERE coach_id IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_clients_closer_id
+    ON public.clients(closer_id) WHERE closer_id IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_clients_setter_id
+    ON public.clients(setter_id) WHERE setter_id IS NOT NULL;
+
+-- Client FK lookups from the EXISTS side of the semi-join
+CREATE INDEX IF NOT EXISTS idx_payments_client_id ON public.payments(client_id);
+CREATE INDEX IF NOT EXISTS idx_instalments_client_id ON public.instalments(client_id);
+
+COMMENT ON INDEX idx_clients_coach_id IS 'Assigned-client visibility filter (coach)';
+COMMENT ON INDEX idx_clients_closer_id IS 'Assigned-client visibility filter (closer)';
+COMMENT ON INDEX idx_clients_setter_id IS 'Assigned-client visibility filter (setter)';
@@ -0,0 +1,52 @@
+-- Migration: Check-in answer rollups
+-- Incrementally maintained aggregates of check-in answers, used by the
+-- per-form analytics endpoint (GET /api/checkin-forms/{id}/analytics/).
+--
+-- check_in_answer_rollups holds one row per (form, client, week, field, option):
+--   - numeric fields: option = '' with count / sum / sum of squares / min / max
+--   - choice fields:  one row per selected option with its count
+-- check_in_form_analytics_state holds the (submitted_at, id) watermark of the
+-- last submission folded into the rollups, so each refresh only reads newer
+-- submissions.
+
+CREATE TABLE IF NOT EXISTS check_in_form_analytics_state (
+    form_id UUID PRIMARY KEY REFERENCES check_in_forms(id) ON DELETE CASCADE,
+    schema_hash VARCHAR(64) NOT NULL DEFAULT '',
+    last_submitted_at TIMESTAMP WITH TIME ZONE,
+    last_submission_id UUID,
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS check_in_answer_rollups (
+    id BIGSERIAL PRIMARY KEY,
+    form_id UUID NOT NULL REFERENCES check_in_forms(id) ON DELETE CASCADE,
+    account_id INTEGER NOT NULL REFERENCES accounts(id) ON DELETE CASCADE,
+    client_id INTEGER NOT NULL REFERENCES clients(id) ON DELETE CASCADE,
+    week_start DATE NOT NULL,
+    field_id TEXT NOT NULL,
+    option TEXT NOT NULL DEFAULT '',
+    answer_count INTEGER NOT NULL DEFAULT 0,
+    value_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    value_sum_sq DOUBLE PRECISION NOT NULL DEFAULT 0,
+    value_min DOUBLE PRECISION,
+    value_max DOUBLE PRECISION,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+    CONSTRAINT check_in_answer_rollups_unique
+        UNIQUE (form_id, client_id, week_start, field_id, option)
+);
+
+-- Per-form reads grouped by week (the unique constraint covers client grouping)
+CREATE INDEX IF NOT EXISTS idx_check_in_answer_rollups_form_week
+    ON check_in_answer_rollups(form_id, week_start, field_id);
+
+CREATE INDEX IF NOT EXISTS idx_check_in_answer_rollups_client_id
+    ON check_in_answer_rollups(client_id);
+
+-- Incremental refresh seeks by (form_id, submitted_at, id)
+CREATE INDEX IF NOT EXISTS idx_check_in_submissions_form_submitted_id
+    ON check_in_submissions(form_id, submitted_at, id);
+
+COMMENT ON TABLE check_in_answer_rollups IS 'Weekly per-client aggregates of check-in answers by form field (numeric stats and choice counts)';
+COMMENT ON TABLE check_in_form_analytics_state IS 'Watermark of the last submission folded into check_in_answer_rollups per form';
+COMMENT ON COLUMN check_in_answer_rollups.option IS 'Selected option for choice fields; empty string for numeric fields';
@@ -0,0 +1,69 @@
+-- Migration: Per-account dashboard rollups
+-- Daily per-account metrics read by GET /api/dashboard/ and refreshed
+-- incrementally by `python manage.py refresh_dashboard_rollups`.
+--
+-- The refresh reads only rows changed since the per-source watermarks in
+-- account_rollup_state (payments.updated_at, clients.updated_at,
+-- instalments.date_updated, check_in_submissions.submitted_at), recomputes the
+-- days those rows touch, and upserts them into account_daily_rollups.
+
+-- Step 1: Track payment changes (status updates from Stripe, refunds, ...)
+ALTER TABLE payments ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+UPDATE payments SET updated_at = payment_date WHERE updated_at IS NULL;
+
+DROP TRIGGER IF EXISTS update_payments_updated_at ON payments;
+CREATE TRIGGER update_payments_updated_at
+    BEFORE UPDATE ON payments
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- Step 2: Keep clients.updated_at current for bulk updates that bypass the ORM
+DROP TRIGGER IF EXISTS update_clients_updated_at ON clients;
+CREATE TRIGGER update_clients_updated_at
+    BEFORE UPDATE ON clients
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- Step 3: Watermark indexes
+CREATE INDEX IF NOT EXISTS idx_payments_account_updated_at ON payments(account_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_clients_account_updated_at ON clients(account_id, updated_at);
+CREATE INDEX IF NOT EXISTS idx_instalments_account_date_updated ON instalments(account_id, date_updated);
+
+-- Step 4: Rollup tables
+CREATE TABLE IF NOT EXISTS account_daily_rollups (
+    id BIGSERIAL PRIMARY KEY,
+    account_id INTEGER NOT NULL REFERENCES accounts(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    revenue NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    paid_payments INTEGER NOT NULL DEFAULT 0,
+    failed_payments INTEGER NOT NULL DEFAULT 0,
+    refunded_payments INTEGER NOT NULL DEFAULT 0,
+    new_clients INTEGER NOT NULL DEFAULT 0,
+    churned_clients INTEGER NOT NULL DEFAULT 0,
+    submissions INTEGER NOT NULL DEFAULT 0,
+    installments_due INTEGER NOT NULL DEFAULT 0,
+    installments_due_amount NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    -- Point-in-time snapshots, written for the current day on every refresh
+    active_clients INTEGER,
+    overdue_installments INTEGER,
+    overdue_amount NUMERIC(14, 2),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+    CONSTRAINT account_daily_rollups_account_day_unique UNIQUE (account_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS account_rollup_state (
+    account_id INTEGER PRIMARY KEY REFERENCES accounts(id) ON DELETE CASCADE,
+    payments_watermark TIMESTAMP WITH TIME ZONE,
+    clients_watermark TIMESTAMP WITH TIME ZONE,
+    installments_watermark TIMESTAMP WITH TIME ZONE,
+    submissions_watermark TIMESTAMP WITH TIME ZONE,
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+COMMENT ON TABLE account_daily_rollups IS 'Per-account daily dashboard metrics maintained incrementally by refresh_dashboard_rollups';
+COMMENT ON TABLE account_rollup_state IS 'Per-source change watermarks for incremental dashboard rollup refresh';
+COMMENT ON COLUMN account_daily_rollups.revenue IS 'Sum of paid payments in company currency (falls back to amount when not converted)';
+COMMENT ON COLUMN account_daily_rollups.churned_clients IS 'Clients cancelled on this day (client_end_date, else last update date)';
+COMMENT ON COLUMN account_daily_rollups.active_clients IS 'Snapshot of active clients, recorded for the day the refresh ran';
+COMMENT ON COLUMN payments.updated_at IS 'Last modification time (maintained by trigger); dashboard rollup watermark';
@@ -0,0 +1,37 @@
+-- Migration: Incremental Stripe sync
+-- `python manage.py sync_stripe` pulls customers, charges and invoices from
+-- every active connected Stripe account into stripe_customers, payments and
+-- instalments. It keeps one cursor row per connected account and upserts
+-- with ON CONFLICT on the Stripe object IDs.
+
+-- Step 1: Per connected account sync cursors (Unix `created` timestamps)
+CREATE TABLE IF NOT EXISTS stripe_sync_cursors (
+    id SERIAL PRIMARY KEY,
+    stripe_account_id INTEGER NOT NULL REFERENCES stripe_accounts(id) ON DELETE CASCADE,
+    account_id INTEGER NOT NULL REFERENCES accounts(id) ON DELETE CASCADE,
+    customers_cursor BIGINT,
+    charges_cursor BIGINT,
+    invoices_cursor BIGINT,
+    last_synced_at TIMESTAMP WITH TIME ZONE,
+    last_error TEXT,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+    CONSTRAINT stripe_sync_cursors_stripe_account_unique UNIQUE (stripe_account_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_stripe_sync_cursors_account ON stripe_sync_cursors(account_id);
+
+DROP TRIGGER IF EXISTS update_stripe_sync_cursors_updated_at ON stripe_sync_cursors;
+CREATE TRIGGER update_stripe_sync_cursors_updated_at
+    BEFORE UPDATE ON stripe_sync_cursors
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- The conflict target for invoice upserts (instalments_invoice_id_unique) is
+-- built concurrently in 20261019140500_add_instalments_invoice_id_unique.sql
+
+-- Step 2: Client resolution lookups used by the sync
+CREATE INDEX IF NOT EXISTS idx_stripe_customers_account ON stripe_customers(account_id);
+
+COMMENT ON TABLE stripe_sync_cursors IS 'Incremental Stripe sync position per connected Stripe account';
+COMMENT ON COLUMN stripe_sync_cursors.charges_cursor IS 'Unix created timestamp of the newest charge synced';
@@ -0,0 +1,47 @@
+-- Migration: Unique Stripe invoice IDs on instalments
+-- Conflict target for the invoice upserts of `python manage.py sync_stripe`.
+-- Stripe invoice IDs are globally unique; instalments created ahead of
+-- invoicing keep a NULL invoice_id and are not covered by the index.
+--
+-- The index is built CONCURRENTLY so instalments stay writable during the
+-- build. CREATE INDEX CONCURRENTLY cannot run inside a transaction block:
+-- apply this file on its own, statement by statement (psql -f does; see
+-- scripts/init_test_db.sh).
+
+-- Step 1: Existing duplicates would fail the build halfway; stop with a
+-- clear error instead. Resolve them (keep one instalment per invoice, or
+-- clear invoice_id on the others) and re-run.
+DO $$
+DECLARE
+    duplicates INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO duplicates FROM (
+        SELECT invoice_id FROM instalments
+        WHERE invoice_id IS NOT NULL
+        GROUP BY invoice_id
+        HAVING COUNT(*) > 1
+    ) AS duplicated;
+    IF duplicates > 0 THEN
+        RAISE EXCEPTION '% invoice_id values are shared by more than one instalment; instalments_invoice_id_unique cannot be built', duplicates
+            USING HINT = 'List them with: SELECT invoice_id, array_agg(id ORDER BY id) FROM instalments '
+                         'WHERE invoice_id IS NOT NULL GROUP BY invoice_id HAVING COUNT(*) > 1;';
+    END IF;
+END $$;
+
+-- Step 2: A failed concurrent build leaves an INVALID index behind, which
+-- IF NOT EXISTS would otherwise keep
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_index
+        JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+        WHERE pg_class.relname = 'instalments_invoice_id_unique' AND NOT pg_index.indisvalid
+    ) THEN
+        DROP INDEX instalments_invoice_id_unique;
+    END IF;
+END $$;
+
+-- Step 3: Build without blocking writes
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS instalments_invoice_id_unique
+    ON instalments(invoice_id)
+    WHERE invoice_id IS NOT NULL;
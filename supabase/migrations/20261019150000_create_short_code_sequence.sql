@@ -0,0 +1,14 @@
+-- Migration: Native short-link generation
+-- With URL_SHORTENER_BACKEND=native the CRM writes short_urls itself instead
+-- of calling the standalone shortener. Each short code is a keyed permutation
+-- of a value from this sequence, base62-encoded, so codes are unique without
+-- a lookup per link and a batch of links needs one nextval() round trip.
+
+CREATE SEQUENCE IF NOT EXISTS short_url_code_seq
+    AS BIGINT
+    START WITH 1
+    INCREMENT BY 1
+    NO MAXVALUE
+    CACHE 1;
+
+COMMENT ON SEQUENCE short_url_code_seq IS 'Source numbers for natively generated short_urls.short_code values (see api/utils/url_shortener.py)';
@@ -0,0 +1,11 @@
+-- Migration: Reuse existing short links
+-- shorten_urls_bulk() looks up an active short link for (domain, original_url)
+-- before creating a new one, so regenerating a client's links no longer adds
+-- a row per call. original_url can exceed the btree row size limit, so the
+-- index holds its md5; lookups compare the hash and then the full URL.
+
+CREATE INDEX IF NOT EXISTS idx_short_urls_domain_original_url_md5
+    ON public.short_urls(domain, md5(original_url))
+    WHERE is_active;
+
+COMMENT ON INDEX idx_short_urls_domain_original_url_md5 IS 'Active short link lookup by (domain, original_url) for idempotent link creation';
@@ -0,0 +1,45 @@
+-- Migration: Background custom-domain provisioning
+-- POST /api/domains/configure/ and /api/domains/payment/configure/ queue a job
+-- here instead of running certbot and reloading nginx inside the request.
+-- `python manage.py process_domain_jobs` claims pending jobs, issues the
+-- certificate and writes the nginx config per job, then runs one nginx -t and
+-- reload for the whole batch. Clients poll GET /api/domains/jobs/<id>/.
+--
+-- steps holds one entry per step (cert, config, reload):
+--   {"cert": {"status": "succeeded", "message": "...", "finished_at": "..."}, ...}
+
+CREATE TABLE IF NOT EXISTS domain_provisioning_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    account_id INTEGER NOT NULL REFERENCES accounts(id) ON DELETE CASCADE,
+    domain TEXT NOT NULL,
+    domain_type VARCHAR(20) NOT NULL CHECK (domain_type IN ('forms', 'payment')),
+    status VARCHAR(20) NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'running', 'succeeded', 'failed')),
+    steps JSONB NOT NULL DEFAULT '{}'::jsonb,
+    error TEXT NOT NULL DEFAULT '',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    started_at TIMESTAMP WITH TIME ZONE,
+    -- Refreshed by the worker before each step of its batch; running jobs
+    -- whose heartbeat is older than DOMAIN_JOB_STALE_AFTER are claimed again
+    heartbeat_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Worker claim: oldest pending (or stale running) jobs first
+CREATE INDEX IF NOT EXISTS idx_domain_provisioning_jobs_status_created
+    ON domain_provisioning_jobs(status, created_at)
+    WHERE status IN ('pending', 'running');
+
+-- Enqueue dedupe and per-account history
+CREATE INDEX IF NOT EXISTS idx_domain_provisioning_jobs_account_domain
+    ON domain_provisioning_jobs(account_id, domain_type, domain);
+
+DROP TRIGGER IF EXISTS update_domain_provisioning_jobs_updated_at ON domain_provisioning_jobs;
+CREATE TRIGGER update_domain_provisioning_jobs_updated_at
+    BEFORE UPDATE ON domain_provisioning_jobs
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+COMMENT ON TABLE domain_provisioning_jobs IS 'Background SSL + nginx provisioning of custom forms/payment domains';
+COMMENT ON COLUMN domain_provisioning_jobs.steps IS 'Per-step status for cert, config and reload';
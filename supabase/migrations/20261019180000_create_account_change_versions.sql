@@ -0,0 +1,111 @@
+-- Migration: Per-account change versions for conditional GET
+-- List and detail endpoints for clients, employees, roles, packages and forms
+-- answer If-None-Match with 304 Not Modified. Their ETag is derived from the
+-- versions below instead of from the rows themselves, so a revalidation costs
+-- one primary-key lookup rather than the list query and serialization.
+--
+-- Statement-level triggers bump (account_id, resource) once per INSERT, UPDATE
+-- or DELETE statement, for every account the statement touched:
+--
+--   accounts                    -> account
+--   clients                     -> clients
+--   employees                   -> employees
+--   employee_role_assignments   -> employees (custom roles shown per employee)
+--   employee_roles              -> roles
+--   packages                    -> packages
+--   check_in_forms              -> forms
+--   check_in_form_packages      -> forms
+--   check_in_schedules          -> forms
+--
+-- check_in_submissions is deliberately not tracked: a counter bumped by every
+-- submission would serialize an account's submissions on its version row. Form
+-- responses that include submission_count are therefore not versioned.
+--
+-- A viewset lists every resource its responses read (a client shows its
+-- coach's name, so the clients ETag also covers employees); see
+-- ConditionalGetMixin in api/mixins.py.
+
+CREATE TABLE IF NOT EXISTS account_change_versions (
+    id BIGSERIAL PRIMARY KEY,
+    -- No foreign key: deleting an account cascades into tracked tables whose
+    -- triggers still write a row for it
+    account_id INTEGER NOT NULL,
+    resource VARCHAR(50) NOT NULL,
+    version BIGINT NOT NULL DEFAULT 1,
+    changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    CONSTRAINT account_change_versions_account_resource_key UNIQUE (account_id, resource)
+);
+
+-- TG_ARGV[0]: resource name
+-- TG_ARGV[1]: query returning the affected account ids, with %I standing for
+--             the transition table (default: SELECT account_id FROM %I)
+CREATE OR REPLACE FUNCTION bump_account_change_version()
+RETURNS TRIGGER AS $$
+DECLARE
+    account_query TEXT := COALESCE(TG_ARGV[1], 'SELECT account_id FROM %I');
+    changed_rows TEXT := CASE WHEN TG_OP = 'DELETE' THEN 'old_rows' ELSE 'new_rows' END;
+BEGIN
+    -- Sorted, so concurrent statements lock version rows in the same order
+    EXECUTE
+        'INSERT INTO account_change_versions (account_id, resource, version, changed_at)
+         SELECT DISTINCT changed.account_id, $1, 1, NOW()
+         FROM (' || format(account_query, changed_rows) || ') AS changed(account_id)
+         WHERE changed.account_id IS NOT NULL
+         ORDER BY changed.account_id
+         ON CONFLICT (account_id, resource) DO UPDATE
+         SET version = account_change_versions.version + 1, changed_at = EXCLUDED.changed_at'
+    USING TG_ARGV[0];
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION bump_account_change_version() IS 'Statement trigger: bump account_change_versions for the accounts a statement changed';
+
+-- Transition tables allow one event per trigger, so each table gets three
+DO $$
+DECLARE
+    tracked RECORD;
+BEGIN
+    FOR tracked IN
+        SELECT * FROM (VALUES
+            ('accounts', 'account', 'SELECT id FROM %I'),
+            ('clients', 'clients', NULL),
+            ('employees', 'employees', NULL),
+            ('employee_role_assignments', 'employees',
+             'SELECT e.account_id FROM %I r JOIN employees e ON e.id = r.employee_id'),
+            ('employee_roles', 'roles', NULL),
+            ('packages', 'packages', NULL),
+            ('check_in_forms', 'forms', NULL),
+            ('check_in_form_packages', 'forms',
+             'SELECT f.account_id FROM %I fp JOIN check_in_forms f ON f.id = fp.form_id'),
+            ('check_in_schedules', 'forms', NULL)
+        ) AS t(table_name, resource, account_query)
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', tracked.table_name || '_change_version_insert', tracked.table_name);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', tracked.table_name || '_change_version_update', tracked.table_name);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', tracked.table_name || '_change_version_delete', tracked.table_name);
+
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows
+             FOR EACH STATEMENT EXECUTE FUNCTION bump_account_change_version(%L%s)',
+            tracked.table_name || '_change_version_insert', tracked.table_name, tracked.resource,
+            CASE WHEN tracked.account_query IS NULL THEN '' ELSE format(', %L', tracked.account_query) END
+        );
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER UPDATE ON %I REFERENCING NEW TABLE AS new_rows
+             FOR EACH STATEMENT EXECUTE FUNCTION bump_account_change_version(%L%s)',
+            tracked.table_name || '_change_version_update', tracked.table_name, tracked.resource,
+            CASE WHEN tracked.account_query IS NULL THEN '' ELSE format(', %L', tracked.account_query) END
+        );
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows
+             FOR EACH STATEMENT EXECUTE FUNCTION bump_account_change_version(%L%s)',
+            tracked.table_name || '_change_version_delete', tracked.table_name, tracked.resource,
+            CASE WHEN tracked.account_query IS NULL THEN '' ELSE format(', %L', tracked.account_query) END
+        );
+    END LOOP;
+END;
+$$;
+
+COMMENT ON TABLE account_change_versions IS 'Per-account change counters behind list/detail ETags (conditional GET)';
+COMMENT ON COLUMN account_change_versions.version IS 'Incremented by statement triggers on every change to the resource';
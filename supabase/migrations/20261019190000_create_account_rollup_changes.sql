@@ -0,0 +1,100 @@
+-- Migration: Log the days that deletes and date changes take rows away from
+-- The incremental dashboard rollup refresh finds dirty days from rows changed
+-- since its watermarks, which cannot see rows that no longer exist or the day
+-- a row was on before its date changed. These triggers record those days in
+-- account_rollup_changes; refresh_dashboard_rollups recomputes and clears them.
+--
+--   payments               payment_date   (deleted, or payment_date/account changed)
+--   check_in_submissions   submitted_at   (deleted, or submitted_at/account changed)
+--   instalments            schedule_date  (deleted, or schedule_date/account changed)
+--   clients                created_at     (deleted, or created_at/account changed)
+--                          churn day      (a cancelled client deleted or updated)
+--
+-- Updates log the new day as well as the old one: the new day of a submission
+-- or of a bulk UPDATE that bypasses date_updated may be behind the watermark.
+
+CREATE TABLE IF NOT EXISTS account_rollup_changes (
+    id BIGSERIAL PRIMARY KEY,
+    -- No foreign key: deleting an account cascades into the tracked tables,
+    -- whose triggers still log rows for it
+    account_id INTEGER NOT NULL,
+    -- The affected day is affected_day, or the local date of affected_at in
+    -- the account's timezone
+    affected_at TIMESTAMP WITH TIME ZONE,
+    affected_day DATE,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_account_rollup_changes_account ON account_rollup_changes(account_id);
+
+CREATE OR REPLACE FUNCTION log_account_rollup_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'payments' THEN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO account_rollup_changes (account_id, affected_at) VALUES (OLD.account_id, OLD.payment_date);
+        ELSIF OLD.payment_date IS DISTINCT FROM NEW.payment_date OR OLD.account_id IS DISTINCT FROM NEW.account_id THEN
+            INSERT INTO account_rollup_changes (account_id, affected_at)
+            VALUES (OLD.account_id, OLD.payment_date), (NEW.account_id, NEW.payment_date);
+        END IF;
+
+    ELSIF TG_TABLE_NAME = 'check_in_submissions' THEN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO account_rollup_changes (account_id, affected_at) VALUES (OLD.account_id, OLD.submitted_at);
+        ELSIF OLD.submitted_at IS DISTINCT FROM NEW.submitted_at OR OLD.account_id IS DISTINCT FROM NEW.account_id THEN
+            INSERT INTO account_rollup_changes (account_id, affected_at)
+            VALUES (OLD.account_id, OLD.submitted_at), (NEW.account_id, NEW.submitted_at);
+        END IF;
+
+    ELSIF TG_TABLE_NAME = 'instalments' THEN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO account_rollup_changes (account_id, affected_day) VALUES (OLD.account_id, OLD.schedule_date);
+        ELSIF OLD.schedule_date IS DISTINCT FROM NEW.schedule_date OR OLD.account_id IS DISTINCT FROM NEW.account_id THEN
+            INSERT INTO account_rollup_changes (account_id, affected_day)
+            VALUES (OLD.account_id, OLD.schedule_date), (NEW.account_id, NEW.schedule_date);
+        END IF;
+
+    ELSIF TG_TABLE_NAME = 'clients' THEN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO account_rollup_changes (account_id, affected_at) VALUES (OLD.account_id, OLD.created_at);
+        ELSIF OLD.created_at IS DISTINCT FROM NEW.created_at OR OLD.account_id IS DISTINCT FROM NEW.account_id THEN
+            INSERT INTO account_rollup_changes (account_id, affected_at)
+            VALUES (OLD.account_id, OLD.created_at), (NEW.account_id, NEW.created_at);
+        END IF;
+        -- Churn day: client_end_date, else the day of the last update
+        IF OLD.status = 'cancelled' THEN
+            INSERT INTO account_rollup_changes (account_id, affected_at, affected_day)
+            VALUES (OLD.account_id, OLD.updated_at, OLD.client_end_date);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION log_account_rollup_change() IS 'Log the dashboard rollup days a deleted or re-dated row no longer counts towards';
+
+DROP TRIGGER IF EXISTS payments_rollup_change ON payments;
+CREATE TRIGGER payments_rollup_change
+    AFTER UPDATE OR DELETE ON payments
+    FOR EACH ROW
+    EXECUTE FUNCTION log_account_rollup_change();
+
+DROP TRIGGER IF EXISTS check_in_submissions_rollup_change ON check_in_submissions;
+CREATE TRIGGER check_in_submissions_rollup_change
+    AFTER UPDATE OR DELETE ON check_in_submissions
+    FOR EACH ROW
+    EXECUTE FUNCTION log_account_rollup_change();
+
+DROP TRIGGER IF EXISTS instalments_rollup_change ON instalments;
+CREATE TRIGGER instalments_rollup_change
+    AFTER UPDATE OR DELETE ON instalments
+    FOR EACH ROW
+    EXECUTE FUNCTION log_account_rollup_change();
+
+DROP TRIGGER IF EXISTS clients_rollup_change ON clients;
+CREATE TRIGGER clients_rollup_change
+    AFTER UPDATE OR DELETE ON clients
+    FOR EACH ROW
+    EXECUTE FUNCTION log_account_rollup_change();
+
+COMMENT ON TABLE account_rollup_changes IS 'Dashboard rollup days to recompute after deletes and date changes; consumed by refresh_dashboard_rollups';
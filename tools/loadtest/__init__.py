@@ -0,0 +1 @@
+"""Load-test harness with local fakes for external services (see run.py)."""
@@ -0,0 +1,231 @@
+"""
+Load generation and measurement.
+
+Two ways to drive load:
+
+- run_closed(): N concurrent virtual users, each sending its next request as
+  soon as the previous one finishes (maximum throughput, e.g. a burst of
+  scheduler triggers or an n8n flood).
+- run_open(): requests are started on a fixed schedule (N per second)
+  whatever the server does. Latency is measured from the *scheduled* start, so
+  queueing in front of saturated workers shows up in the percentiles instead
+  of silently lowering the offered rate (coordinated omission).
+
+WorkerMonitor samples CPU time of gunicorn worker processes from /proc, so
+reports show how busy the workers were alongside the latency numbers.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+class Recorder:
+    """Thread-safe collection of request outcomes."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.statuses = {}
+        self.errors = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = None
+        self.finished = None
+
+    def begin(self):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def end(self, latency, status=None, error=None):
+        with self.lock:
+            self.in_flight -= 1
+            self.latencies.append(latency)
+            if error is not None:
+                self.errors[error] = self.errors.get(error, 0) + 1
+            else:
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def summary(self, capacity=None):
+        latencies = sorted(self.latencies)
+        duration = max(1e-9, (self.finished or time.perf_counter()) - (self.started or 0))
+        completed = len(latencies)
+        ok = sum(count for status, count in self.statuses.items() if status < 400)
+        mean = sum(latencies) / completed if completed else 0.0
+        summary = {
+            'requests': completed,
+            'duration_s': round(duration, 2),
+            'throughput_rps': round(completed / duration, 2),
+            'success_rps': round(ok / duration, 2),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'max_ms': round((latencies[-1] if latencies else 0) * 1000, 2),
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+            'errors': self.errors,
+            'max_in_flight': self.max_in_flight,
+        }
+        # Little's law: average requests in the system = throughput x mean latency
+        average_in_flight = completed / duration * mean
+        summary['average_in_flight'] = round(average_in_flight, 2)
+        if capacity:
+            summary['saturation'] = round(min(1.0, average_in_flight / capacity), 3)
+        return summary
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of a sorted list (0 for an empty list)."""
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+_local = threading.local()
+
+
+def session():
+    """Per-thread requests session, so connections are reused."""
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def execute(recorder, request, scheduled_at=None, timeout=30):
+    """
+    Send one request and record it.
+
+    Args:
+        request: dict with method, url and optional json/headers
+        scheduled_at: perf_counter() time the request was due (open loop)
+    """
+    recorder.begin()
+    start = scheduled_at if scheduled_at is not None else time.perf_counter()
+    try:
+        response = session().request(
+            request['method'], request['url'],
+            json=request.get('json'), headers=request.get('headers'),
+            timeout=timeout, allow_redirects=False,
+        )
+        recorder.end(time.perf_counter() - start, status=response.status_code)
+    except requests.RequestException as e:
+        recorder.end(time.perf_counter() - start, error=type(e).__name__)
+
+
+def run_closed(requests_iter, concurrency, duration=None, timeout=30):
+    """
+    Send requests from requests_iter with `concurrency` virtual users until the
+    iterator is exhausted or `duration` seconds have passed.
+    """
+    recorder = Recorder()
+    iterator_lock = threading.Lock()
+    deadline = time.perf_counter() + duration if duration else None
+
+    def user():
+        while deadline is None or time.perf_counter() < deadline:
+            with iterator_lock:
+                request = next(requests_iter, None)
+            if request is None:
+                return
+            execute(recorder, request, timeout=timeout)
+
+    recorder.started = time.perf_counter()
+    threads = [threading.Thread(target=user, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    recorder.finished = time.perf_counter()
+    return recorder
+
+
+def run_open(make_request, rate, duration, max_workers=256, timeout=30):
+    """
+    Start `rate` requests per second for `duration` seconds. make_request(i)
+    returns the i-th request dict.
+    """
+    recorder = Recorder()
+    interval = 1.0 / rate
+    total = int(rate * duration)
+    recorder.started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for index in range(total):
+            scheduled_at = recorder.started + index * interval
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(execute, recorder, make_request(index), scheduled_at, timeout)
+    recorder.finished = time.perf_counter()
+    return recorder
+
+
+class WorkerMonitor:
+    """
+    Samples CPU usage of a gunicorn master's worker processes (Linux /proc).
+    Reports average and peak CPU utilisation per worker over the run.
+    """
+
+    def __init__(self, master_pid, interval=0.5):
+        self.master_pid = master_pid
+        self.interval = interval
+        self.samples = []  # per-sample list of worker utilisations (0..1)
+        self._stop = threading.Event()
+        self._thread = None
+        self._ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+    def _workers(self):
+        workers = []
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as fh:
+                    fields = fh.read().rsplit(')', 1)[1].split()
+            except OSError:
+                continue
+            # fields[1] is ppid, fields[11]/[12] are utime/stime (after the comm field)
+            if int(fields[1]) == self.master_pid:
+                workers.append((int(entry), int(fields[11]) + int(fields[12])))
+        return dict(workers)
+
+    def _run(self):
+        previous = self._workers()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            current = self._workers()
+            now = time.perf_counter()
+            elapsed = now - last
+            utilisation = [
+                (ticks - previous[pid]) / self._ticks / elapsed
+                for pid, ticks in current.items() if pid in previous
+            ]
+            if utilisation:
+                self.samples.append(utilisation)
+            previous, last = current, now
+
+    def start(self):
+        if os.path.isdir('/proc'):
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        averages = [sum(sample) / len(sample) for sample in self.samples]
+        return {
+            'workers': max(len(sample) for sample in self.samples),
+            'cpu_avg': round(sum(averages) / len(averages), 3),
+            'cpu_peak': round(max(max(sample) for sample in self.samples), 3),
+            'busy_samples': round(
+                sum(1 for sample in self.samples if min(sample) > 0.9) / len(self.samples), 3
+            ),
+        }
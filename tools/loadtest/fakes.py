@@ -0,0 +1,282 @@
+"""
+Local stand-ins for the external services the CRM calls.
+
+- URL shortener (URL_SHORTENER_API_URL): POST /api/shorten/, GET /api/stats/<code>/
+- Webhook scheduler (WEBHOOK_SCHEDULER_URL): /api/webhooks/ create, cancel,
+  activate, delete and executions
+- n8n (N8N_CHECKIN_WEBHOOK_URL): accepts any POST
+
+Each fake can add latency (fixed + random jitter), fail a fraction of requests
+with 503, and cap throughput with a token bucket (excess requests get 429),
+so load tests can reproduce slow or flaky dependencies. Counters are served
+at GET /__stats__.
+
+Standalone:
+    python -m tools.loadtest.fakes --latency-ms 80 --jitter-ms 40 --error-rate 0.02 --max-rps 200
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@dataclass
+class FaultConfig:
+    """Latency, error and throughput behaviour of a fake service."""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    max_rps: float = 0.0  # 0 = unlimited
+
+
+class TokenBucket:
+    """Thread-safe token bucket; allow() is False once the rate is exceeded."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self):
+        if self.rate <= 0:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, handler, name, faults):
+        super().__init__(address, handler)
+        self.name = name
+        self.faults = faults
+        self.bucket = TokenBucket(faults.max_rps)
+        self.stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'ok': 0, 'errors_injected': 0, 'throttled': 0}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def snapshot(self):
+        with self.stats_lock:
+            return dict(self.stats)
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Applies the server's faults, then dispatches to route()."""
+
+    protocol_version = 'HTTP/1.1'
+    # Send headers and body in one segment; otherwise Nagle + delayed ACK add
+    # ~40ms to every keep-alive response
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _handle(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+
+        if self.path == '/__stats__':
+            return self._send(200, {'service': self.server.name, **self.server.snapshot()})
+
+        server = self.server
+        server.count('requests')
+        if not server.bucket.allow():
+            server.count('throttled')
+            return self._send(429, {'error': 'rate limited'})
+
+        faults = server.faults
+        delay = faults.latency_ms + random.uniform(0, faults.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if faults.error_rate and random.random() < faults.error_rate:
+            server.count('errors_injected')
+            return self._send(503, {'error': 'injected failure'})
+
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            body = {}
+        status, payload = self.route(method, self.path, body)
+        server.count('ok')
+        self._send(status, payload)
+
+    def route(self, method, path, body):
+        return 200, {'status': 'ok'}
+
+    def _send(self, status, payload):
+        data = b'' if status == 204 else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ShortenerHandler(FakeHandler):
+    def route(self, method, path, body):
+        if method == 'POST' and path.startswith('/api/shorten/'):
+            code = uuid.uuid4().hex[:7]
+            domain = body.get('domain') or 'short.local'
+            return 201, {
+                'status': 'success',
+                'data': {
+                    'short_code': code,
+                    'original_url': body.get('original_url'),
+                    'full_short_url': f'https://{domain}/{code}',
+                },
+            }
+        match = re.match(r'^/api/stats/([^/]+)/$', path)
+        if method == 'GET' and match:
+            return 200, {'status': 'success', 'data': {'short_code': match.group(1), 'clicks': 0}}
+        return 404, {'error': 'not found'}
+
+
+class SchedulerHandler(FakeHandler):
+    def route(self, method, path, body):
+        if method == 'POST' and path == '/api/webhooks/':
+            return 201, {'id': str(uuid.uuid4()), 'status': 'active', **body}
+        if re.match(r'^/api/webhooks/[^/]+/(cancel|activate)/$', path) and method == 'POST':
+            return 200, {'status': 'ok'}
+        if re.match(r'^/api/webhooks/[^/]+/executions/$', path) and method == 'GET':
+            return 200, []
+        if re.match(r'^/api/webhooks/[^/]+/$', path) and method == 'DELETE':
+            return 204, {}
+        return 404, {'error': 'not found'}
+
+
+class N8nHandler(FakeHandler):
+    def route(self, method, path, body):
+        clients = body.get('clients') if isinstance(body, dict) else None
+        return 200, {'status': 'accepted', 'received': len(clients) if isinstance(clients, list) else 1}
+
+
+HANDLERS = {
+    'shortener': ShortenerHandler,
+    'scheduler': SchedulerHandler,
+    'n8n': N8nHandler,
+}
+
+
+class FakeServices:
+    """Starts the three fakes on background threads (ports 0 = pick free ports)."""
+
+    def __init__(self, faults=None, host='127.0.0.1', ports=None):
+        faults = faults or {}
+        ports = ports or {}
+        self.servers = {
+            name: FakeServer((host, ports.get(name, 0)), handler, name, faults.get(name, FaultConfig()))
+            for name, handler in HANDLERS.items()
+        }
+        self.threads = []
+
+    def start(self):
+        for server in self.servers.values():
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def environment(self):
+        """Settings overrides pointing the CRM at the fakes."""
+        return {
+            'URL_SHORTENER_API_URL': self.servers['shortener'].url,
+            'WEBHOOK_SCHEDULER_URL': self.servers['scheduler'].url,
+            'N8N_CHECKIN_WEBHOOK_URL': f"{self.servers['n8n'].url}/webhook/checkin",
+        }
+
+    def stats(self):
+        return {name: server.snapshot() for name, server in self.servers.items()}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_fault_arguments(parser):
+    """--latency-ms/--jitter-ms/--error-rate/--max-rps, globally or per service."""
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='Base latency for every fake (default: 50)')
+    parser.add_argument('--jitter-ms', type=float, default=25.0, help='Random extra latency (default: 25)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests failed with 503')
+    parser.add_argument('--max-rps', type=float, default=0.0, help='Throughput cap per fake, 0 = unlimited')
+    for name in HANDLERS:
+        parser.add_argument(
+            f'--{name}-faults', metavar='LATENCY,JITTER,ERROR_RATE,MAX_RPS',
+            help=f'Override the faults for the {name} fake, e.g. 200,100,0.05,50'
+        )
+
+
+def faults_from_args(args):
+    default = FaultConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.max_rps)
+    faults = {}
+    for name in HANDLERS:
+        spec = getattr(args, f'{name}_faults')
+        if spec:
+            values = [float(value) for value in spec.split(',')]
+            faults[name] = FaultConfig(*values)
+        else:
+            faults[name] = default
+    return faults
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run fake shortener, scheduler and n8n services')
+    parser.add_argument('--host', default='127.0.0.1')
+    for name, port in (('shortener', 8101), ('scheduler', 8102), ('n8n', 8103)):
+        parser.add_argument(f'--{name}-port', type=int, default=port)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    ports = {name: getattr(args, f'{name}_port') for name in HANDLERS}
+    services = FakeServices(faults_from_args(args), host=args.host, ports=ports).start()
+    for key, value in services.environment().items():
+        print(f'{key}={value}')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        services.stop()
+
+
+if __name__ == '__main__':
+    main()
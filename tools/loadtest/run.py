@@ -0,0 +1,244 @@
+"""
+Load-test harness.
+
+Starts local fakes for the URL shortener, webhook scheduler and n8n, starts a
+gunicorn instance pointed at them (or targets an already running one with
+--base-url), runs the requested scenarios and reports throughput, latency
+percentiles and worker saturation.
+
+Runs against data from ``python manage.py seed_benchmark_data``; use the
+throwaway database from docker-compose.test.yml, never production.
+
+Usage (from the repository root, with DATABASE_URL pointing at the test DB):
+    python -m tools.loadtest.run all
+    python -m tools.loadtest.run monday_storm --rounds 3 --concurrency 64 --workers 4
+    python -m tools.loadtest.run submit_burst --rate 200 --duration 60 --latency-ms 300
+    python -m tools.loadtest.run n8n_sync_flood --error-rate 0.05 --output flood.json --cleanup
+"""
+import argparse
+import json
+import os
+import secrets
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import requests
+
+from .driver import WorkerMonitor
+from .fakes import FakeServices, add_fault_arguments, faults_from_args
+from .scenarios import LOADTEST_MARKER, SCENARIOS
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+
+def setup_django():
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def load_fixtures(account_id, max_schedules, max_links):
+    """Schedule ids, check-in links, short links and Stripe customers from the seeded data."""
+    from api.models import Account, CheckInSchedule, Client, ShortUrl
+    from api.models import StripeCustomer
+
+    bench_accounts = Account.objects.filter(email__endswith='@bench.example')
+    if account_id is None:
+        account_id = bench_accounts.order_by('id').values_list('id', flat=True).first()
+    if account_id is None:
+        raise SystemExit('No benchmark accounts found. Run "python manage.py seed_benchmark_data" first.')
+
+    return {
+        'account_id': account_id,
+        'schedule_ids': [
+            str(schedule_id) for schedule_id in
+            CheckInSchedule.objects.filter(
+                account__in=bench_accounts, is_active=True, form__is_active=True
+            ).values_list('id', flat=True)[:max_schedules]
+        ],
+        'checkin_links': [
+            str(link) for link in
+            Client.objects.filter(
+                account__in=bench_accounts, checkin_link__isnull=False, packages__status='active'
+            ).values_list('checkin_link', flat=True)[:max_links]
+        ],
+        'short_links': list(
+            ShortUrl.objects.filter(domain='bench.example', is_active=True)
+            .values_list('domain', 'short_code')[:max_links]
+        ),
+        'stripe_customer_ids': list(
+            StripeCustomer.objects.filter(account_id=account_id)
+            .values_list('stripe_customer_id', flat=True)[:1000]
+        ),
+    }
+
+
+def create_master_token():
+    from api.models import MasterToken
+
+    return MasterToken.objects.create(
+        key=secrets.token_hex(32),
+        name=f'{LOADTEST_MARKER} {time.strftime("%Y-%m-%d %H:%M:%S")}',
+        description='Temporary token created by tools/loadtest; deleted when the run ends',
+    )
+
+
+def cleanup():
+    """Delete rows written by the scenarios."""
+    from api.models import CheckInSubmission, ClickAnalytics, Client, Payment, ShortUrl
+
+    payments = Payment.objects.filter(id__startswith=f'py_{LOADTEST_MARKER}_').delete()[0]
+    submissions = CheckInSubmission.objects.filter(submission_data__notes=LOADTEST_MARKER).delete()[0]
+    clients = Client.objects.filter(
+        email__startswith=f'{LOADTEST_MARKER}-', email__endswith='@bench.example'
+    ).delete()[0]
+    clicks = ClickAnalytics.objects.filter(short_url__domain='bench.example').delete()[0]
+    ShortUrl.objects.filter(domain='bench.example').update(clicks=0)
+    print(f'Cleanup: {payments} payments, {submissions} submissions, {clients} clients, {clicks} clicks deleted')
+
+
+def start_gunicorn(args, fake_env):
+    env = dict(os.environ)
+    env.update(fake_env)
+    host = args.bind.rsplit(':', 1)[0]
+    env.update({
+        'ALLOWED_HOSTS': f'{host},localhost,127.0.0.1',
+        'SECURE_SSL_REDIRECT': 'False',
+        'PYTHONUNBUFFERED': '1',
+    })
+    command = [
+        sys.executable, '-m', 'gunicorn',
+        '--workers', str(args.workers),
+        '--threads', str(args.threads),
+        '--bind', args.bind,
+        '--timeout', '120',
+        '--log-level', 'warning',
+        'config.wsgi:application',
+    ]
+    process = subprocess.Popen(command, cwd=BASE_DIR, env=env)
+    base_url = f'http://{args.bind}'
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'gunicorn exited with status {process.returncode}')
+        try:
+            requests.get(f'{base_url}/api/', timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.3)
+    process.terminate()
+    raise SystemExit('gunicorn did not start within 30s')
+
+
+def print_report(name, report):
+    result = report['result']
+    print(
+        f'{name:<16} {result["requests"]:>7} req  {result["throughput_rps"]:>8.1f} rps  '
+        f'p50={result["p50_ms"]:>8.1f}ms p95={result["p95_ms"]:>8.1f}ms p99={result["p99_ms"]:>8.1f}ms  '
+        f'saturation={result.get("saturation", "n/a")}'
+    )
+    print(f'{"":<16} statuses={result["statuses"]} errors={result["errors"]}')
+    if report.get('workers'):
+        workers = report['workers']
+        print(
+            f'{"":<16} workers={workers["workers"]} cpu_avg={workers["cpu_avg"]:.0%} '
+            f'cpu_peak={workers["cpu_peak"]:.0%} all_busy={workers["busy_samples"]:.0%} of samples'
+        )
+    print(f'{"":<16} fakes={report["fakes"]}')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='CRM load-test harness')
+    parser.add_argument('scenarios', nargs='+', choices=list(SCENARIOS) + ['all'])
+    parser.add_argument('--base-url', help='Target an already running server instead of starting gunicorn')
+    parser.add_argument('--bind', default='127.0.0.1:8099', help='gunicorn bind address (default: 127.0.0.1:8099)')
+    parser.add_argument('--workers', type=int, default=3, help='gunicorn workers (default: 3, as in production)')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker (default: 1)')
+    parser.add_argument('--account-id', type=int, help='Account for n8n_sync_flood (default: first benchmark account)')
+    parser.add_argument('--concurrency', type=int, default=32, help='Virtual users / max outstanding requests')
+    parser.add_argument('--rate', type=float, default=50.0, help='Requests per second for open-loop scenarios')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds per time-based scenario')
+    parser.add_argument('--rounds', type=int, default=1, help='Trigger rounds for monday_storm')
+    parser.add_argument('--batch-size', type=int, default=50, help='Payments per bulk-ingest call')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds')
+    parser.add_argument('--max-schedules', type=int, default=1000)
+    parser.add_argument('--max-links', type=int, default=5000)
+    parser.add_argument('--output', help='Write the report as JSON to this path')
+    parser.add_argument('--cleanup', action='store_true', help='Delete rows written by the scenarios afterwards')
+    add_fault_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = list(SCENARIOS) if 'all' in args.scenarios else args.scenarios
+
+    setup_django()
+    from django.conf import settings
+
+    fixtures = load_fixtures(args.account_id, args.max_schedules, args.max_links)
+    master_token = create_master_token()
+    fakes = FakeServices(faults_from_args(args)).start()
+    gunicorn = None
+    reports = {}
+    try:
+        if args.base_url:
+            base_url = args.base_url.rstrip('/')
+            print('Targeting an existing server; make sure it uses these settings:')
+            for key, value in fakes.environment().items():
+                print(f'  {key}={value}')
+        else:
+            gunicorn, base_url = start_gunicorn(args, fakes.environment())
+
+        ctx = SimpleNamespace(
+            base_url=base_url,
+            fixtures=fixtures,
+            options=args,
+            master_token=master_token.key,
+            webhook_secret=settings.WEBHOOK_SECRET,
+        )
+        capacity = args.workers * args.threads
+
+        for name in names:
+            before = fakes.stats()
+            monitor = WorkerMonitor(gunicorn.pid).start() if gunicorn else None
+            recorder = SCENARIOS[name](ctx)
+            if monitor:
+                monitor.stop()
+            after = fakes.stats()
+            reports[name] = {
+                'result': recorder.summary(capacity=None if args.base_url else capacity),
+                'workers': monitor.summary() if monitor else {},
+                'fakes': {
+                    service: {key: after[service][key] - before[service][key] for key in after[service]}
+                    for service in after
+                },
+            }
+            print_report(name, reports[name])
+    finally:
+        if gunicorn:
+            gunicorn.send_signal(signal.SIGTERM)
+            gunicorn.wait(timeout=30)
+        fakes.stop()
+        master_token.delete()
+        if args.cleanup:
+            cleanup()
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump({
+                'config': {
+                    key: value for key, value in vars(args).items() if not key.endswith('_faults')
+                },
+                'scenarios': reports,
+            }, fh, indent=2, default=str)
+        print(f'Report written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
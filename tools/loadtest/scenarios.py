@@ -0,0 +1,141 @@
+"""
+Load-test scenarios.
+
+Each scenario takes the run context (base URL, fixtures, options) and returns a
+Recorder from tools.loadtest.driver.
+
+- monday_storm: every active check-in schedule fires at 09:00 on Monday; all
+  triggers arrive together (closed loop, one request per schedule per round)
+  and each fans out to n8n and, for clients without a short link, the URL
+  shortener.
+- submit_burst: after the check-in emails go out, clients open the form and
+  submit it at a steady arrival rate (open loop, GET + POST per client).
+- n8n_sync_flood: n8n pushes client upserts and payment batches with a master
+  token as fast as the server accepts them (closed loop).
+- redirect_burst: clients open their short links right after an n8n send, as
+  fast as the server redirects them (closed loop); throughput_rps is
+  redirects per second.
+"""
+import itertools
+import uuid
+
+
+LOADTEST_MARKER = 'loadtest'
+
+
+def monday_storm(ctx):
+    from .driver import run_closed
+
+    schedules = ctx.fixtures['schedule_ids']
+    if not schedules:
+        raise SystemExit('monday_storm needs active check-in schedules (run seed_benchmark_data)')
+    headers = {'X-Webhook-Secret': ctx.webhook_secret}
+    requests_iter = (
+        {
+            'method': 'POST',
+            'url': f'{ctx.base_url}/api/internal/checkin-trigger/',
+            'json': {'schedule_id': schedule_id, 'day_filter': 'monday'},
+            'headers': headers,
+        }
+        for _ in range(ctx.options.rounds)
+        for schedule_id in schedules
+    )
+    return run_closed(requests_iter, concurrency=ctx.options.concurrency, timeout=ctx.options.timeout)
+
+
+def submit_burst(ctx):
+    from .driver import run_open
+
+    links = ctx.fixtures['checkin_links']
+    if not links:
+        raise SystemExit('submit_burst needs clients with check-in links (run seed_benchmark_data)')
+
+    def make_request(index):
+        link = links[(index // 2) % len(links)]
+        if index % 2 == 0:
+            return {'method': 'GET', 'url': f'{ctx.base_url}/api/public/checkin/{link}/'}
+        return {
+            'method': 'POST',
+            'url': f'{ctx.base_url}/api/public/checkin/{link}/submit/',
+            'json': {'submission_data': {
+                'weight': 80.5, 'energy': 7, 'mood': 'good', 'notes': LOADTEST_MARKER,
+            }},
+        }
+
+    return run_open(
+        make_request, rate=ctx.options.rate, duration=ctx.options.duration,
+        max_workers=ctx.options.concurrency, timeout=ctx.options.timeout,
+    )
+
+
+def n8n_sync_flood(ctx):
+    from .driver import run_closed
+
+    account_id = ctx.fixtures['account_id']
+    customers = ctx.fixtures['stripe_customer_ids'] or [None]
+    headers = {
+        'Authorization': f'MasterToken {ctx.master_token}',
+        'X-Account-ID': str(account_id),
+    }
+    batch_size = ctx.options.batch_size
+    run_id = uuid.uuid4().hex[:8]
+
+    def requests_gen():
+        for index in itertools.count():
+            if index % 2 == 0:
+                yield {
+                    'method': 'POST',
+                    'url': f'{ctx.base_url}/api/clients/upsert/',
+                    'json': {
+                        'email': f'{LOADTEST_MARKER}-{index % 5000}@bench.example',
+                        'first_name': 'Load',
+                        'last_name': f'Test {index % 5000}',
+                        'status': 'active',
+                    },
+                    'headers': headers,
+                }
+            else:
+                yield {
+                    'method': 'POST',
+                    'url': f'{ctx.base_url}/api/payments/bulk-ingest/',
+                    'json': [
+                        {
+                            'id': f'py_{LOADTEST_MARKER}_{run_id}_{index}_{item}',
+                            'stripe_customer_id': customers[(index + item) % len(customers)],
+                            'amount': '149.00',
+                            'paid_currency': 'gbp',
+                            'status': 'paid',
+                        }
+                        for item in range(batch_size)
+                    ],
+                    'headers': headers,
+                }
+
+    return run_closed(
+        requests_gen(), concurrency=ctx.options.concurrency,
+        duration=ctx.options.duration, timeout=ctx.options.timeout,
+    )
+
+
+def redirect_burst(ctx):
+    from .driver import run_closed
+
+    links = ctx.fixtures['short_links']
+    if not links:
+        raise SystemExit('redirect_burst needs seeded short links (run seed_benchmark_data)')
+    requests_iter = (
+        {'method': 'GET', 'url': f'{ctx.base_url}/api/public/links/{domain}/{short_code}/'}
+        for domain, short_code in itertools.cycle(links)
+    )
+    return run_closed(
+        requests_iter, concurrency=ctx.options.concurrency,
+        duration=ctx.options.duration, timeout=ctx.options.timeout,
+    )
+
+
+SCENARIOS = {
+    'monday_storm': monday_storm,
+    'submit_burst': submit_burst,
+    'n8n_sync_flood': n8n_sync_flood,
+    'redirect_burst': redirect_burst,
+}